@@ -0,0 +1,172 @@
+"""
+Benchmark local schema selection in text2cypher_lambda.py against asking Claude.
+
+    python benchmark_schema_selection.py
+    python benchmark_schema_selection.py --labels 200 --bedrock
+
+The graph is replaced by a synthetic Reactome-like schema (or a schema dump
+saved from NeptuneGraph.schema with --schema), so no Neptune cluster is
+needed. Prompt sizes are estimated at 4 characters per token; with
+--bedrock the Claude path is also timed against Amazon Bedrock. Works for
+any copy of the Lambda with --lambda-dir.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import types
+from pathlib import Path
+
+CHARS_PER_TOKEN = 4
+
+REACTOME_LABELS = {
+    "Pathway": ["stId", "displayName", "speciesName", "isInDisease", "hasDiagram"],
+    "Reaction": ["stId", "displayName", "speciesName", "category", "isInDisease"],
+    "BlackBoxEvent": ["stId", "displayName", "speciesName", "category"],
+    "PhysicalEntity": ["stId", "displayName", "speciesName", "schemaClass"],
+    "EntityWithAccessionedSequence": ["stId", "displayName", "startCoordinate", "endCoordinate"],
+    "Complex": ["stId", "displayName", "speciesName", "isChimeric"],
+    "SimpleEntity": ["stId", "displayName", "name"],
+    "ReferenceGeneProduct": ["identifier", "displayName", "geneName", "databaseName", "url"],
+    "Species": ["taxId", "displayName", "abbreviation"],
+    "Disease": ["identifier", "displayName", "databaseName", "definition"],
+    "GO_BiologicalProcess": ["accession", "displayName", "definition"],
+    "CatalystActivity": ["displayName", "dbId"],
+    "Regulation": ["displayName", "dbId", "schemaClass"],
+    "LiteratureReference": ["pubMedIdentifier", "title", "journal", "year"],
+    "Compartment": ["accession", "displayName"],
+}
+
+REACTOME_RELATIONSHIPS = [
+    ("Pathway", "hasEvent", "Reaction"),
+    ("Pathway", "hasEvent", "Pathway"),
+    ("Pathway", "hasEvent", "BlackBoxEvent"),
+    ("Reaction", "input", "PhysicalEntity"),
+    ("Reaction", "output", "PhysicalEntity"),
+    ("Reaction", "catalystActivity", "CatalystActivity"),
+    ("Reaction", "regulatedBy", "Regulation"),
+    ("Regulation", "regulator", "PhysicalEntity"),
+    ("CatalystActivity", "physicalEntity", "PhysicalEntity"),
+    ("Complex", "hasComponent", "EntityWithAccessionedSequence"),
+    ("Complex", "hasComponent", "SimpleEntity"),
+    ("EntityWithAccessionedSequence", "referenceEntity", "ReferenceGeneProduct"),
+    ("Pathway", "species", "Species"),
+    ("Reaction", "species", "Species"),
+    ("Pathway", "disease", "Disease"),
+    ("Pathway", "goBiologicalProcess", "GO_BiologicalProcess"),
+    ("Pathway", "literatureReference", "LiteratureReference"),
+    ("PhysicalEntity", "compartment", "Compartment"),
+]
+
+QUESTIONS = [
+    "Which pathways involve the gene TP53?",
+    "List the reactions catalysed by complexes containing EGFR",
+    "What diseases are associated with the apoptosis pathway?",
+    "Which publications describe reactions in the cell cycle in humans?",
+    "How many regulators of glycolysis reactions are there?",
+]
+
+
+def synthetic_schema(extra_labels, seed=0):
+    """NeptuneGraph.schema text for the Reactome labels plus extra_labels filler labels"""
+    rng = random.Random(seed)
+    labels = dict(REACTOME_LABELS)
+    relationships = list(REACTOME_RELATIONSHIPS)
+    names = list(labels)
+    for i in range(extra_labels):
+        name = f"AuxiliaryEntity{i}"
+        labels[name] = ["displayName", "dbId"] + [f"attribute{rng.randint(0, 500)}" for _ in range(4)]
+        relationships.append((rng.choice(names), f"auxiliaryLink{i % 40}", name))
+        names.append(name)
+    node_properties = [
+        {"properties": [{"property": p, "type": "STRING"} for p in props], "labels": label}
+        for label, props in labels.items()
+    ]
+    edge_properties = [
+        {"type": t, "properties": [{"property": "order", "type": "INTEGER"}]}
+        for t in dict.fromkeys(t for _, t, _ in relationships)
+    ]
+    triples = [f"(:`{a}`)-[:`{e}`]->(:`{b}`)" for a, e, b in relationships]
+    return f"""
+        Node properties are the following:
+        {node_properties}
+        Relationship properties are the following:
+        {edge_properties}
+        The relationships are the following:
+        {triples}
+        """
+
+
+def load_lambda(lambda_dir, schema):
+    """Import text2cypher_lambda with NeptuneGraph replaced by a graph serving schema"""
+
+    class FakeNeptuneGraph:
+        def __init__(self, host, port):
+            self.schema = schema
+            self.client = types.SimpleNamespace(
+                get_propertygraph_summary=lambda: {"payload": {"lastStatisticsComputationTime": "v1"}}
+            )
+
+    graphs = types.ModuleType("langchain_community.graphs")
+    graphs.NeptuneGraph = FakeNeptuneGraph
+    sys.modules.setdefault("langchain_community", types.ModuleType("langchain_community"))
+    sys.modules["langchain_community.graphs"] = graphs
+    sys.modules.setdefault("langchain", types.ModuleType("langchain"))
+    os.environ.setdefault("NEPTUNE_HOST", "localhost")
+    os.environ.setdefault("NEPTUNE_PORT", "8182")
+    sys.path.insert(0, str(lambda_dir))
+    import text2cypher_lambda
+
+    return text2cypher_lambda
+
+
+def llm_prompt_chars(schema, question):
+    """Characters sent to Claude by select_schema_with_llm (system prompt and question framing included)"""
+    return len(schema) + len(question) + 1200
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark text2cypher schema selection")
+    parser.add_argument("--labels", type=int, default=60, help="Synthetic labels added to the Reactome ones")
+    parser.add_argument("--schema", help="File containing a NeptuneGraph.schema dump")
+    parser.add_argument("--lambda-dir", default=str(Path(__file__).resolve().parent))
+    parser.add_argument("--bedrock", action="store_true", help="Also time the Claude path")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    schema = Path(args.schema).read_text() if args.schema else synthetic_schema(args.labels)
+    t2c = load_lambda(args.lambda_dir, schema)
+
+    start = time.perf_counter()
+    catalog = t2c.get_schema_catalog()
+    print(f"schema: {len(schema):,} chars, {len(catalog.node_properties)} labels, "
+          f"{len(catalog.edge_properties)} relationship types, {len(catalog.triples)} triples")
+    print(f"catalog build: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    header = f"{'question':<60} {'local ms':>8} {'labels':>6} {'local tok':>9} {'llm prompt tok':>14}"
+    if args.bedrock:
+        header += f" {'llm s':>6}"
+    print(header)
+    for question in QUESTIONS:
+        best = float("inf")
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            selected = catalog.relevant_schema(question) or ""
+            best = min(best, time.perf_counter() - start)
+        labels = len(catalog.select(question)[0]) if selected else 0
+        row = (
+            f"{question[:60]:<60} {best * 1000:>8.2f} {labels:>6} "
+            f"{len(selected) // CHARS_PER_TOKEN:>9} "
+            f"{llm_prompt_chars(schema, question) // CHARS_PER_TOKEN:>14}"
+        )
+        if args.bedrock:
+            start = time.perf_counter()
+            t2c.select_schema_with_llm(question)
+            row += f" {time.perf_counter() - start:>6.2f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
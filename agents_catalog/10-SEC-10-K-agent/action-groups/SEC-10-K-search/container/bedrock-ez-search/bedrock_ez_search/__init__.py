@@ -2,6 +2,20 @@
 bedrock-ez-search: Simple semantic search using Amazon Bedrock embeddings
 """
 
+from .cache import EmbeddingCache, normalize_query
+from .index import ExactIndex, IVFIndex, VectorIndex, load_index
+from .packed import PackedCorpus, read_packed_metadata, write_packed_corpus
 from .search import SemanticSearch
 
-__all__ = ["SemanticSearch"]
+__all__ = [
+    "SemanticSearch",
+    "VectorIndex",
+    "ExactIndex",
+    "IVFIndex",
+    "load_index",
+    "PackedCorpus",
+    "write_packed_corpus",
+    "read_packed_metadata",
+    "EmbeddingCache",
+    "normalize_query",
+]
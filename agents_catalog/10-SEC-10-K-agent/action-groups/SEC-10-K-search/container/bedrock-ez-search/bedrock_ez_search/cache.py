@@ -0,0 +1,214 @@
+"""
+Size-bounded LRU and TTL cache for query embeddings
+"""
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """
+    Normalise query text for use as a cache key.
+
+    Case and surrounding/repeated whitespace don't change what a query means
+    to the embedding model in practice, so "Total  Revenue " and
+    "total revenue" share a cache entry.
+    """
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+
+class EmbeddingCache:
+    """
+    Thread-safe cache of text embeddings keyed by model ID and normalised text.
+
+    Entries live in an in-memory LRU with a maximum size and a time-to-live.
+    An optional SQLite file (for example under /tmp on AWS Lambda) adds a
+    second tier that survives across warm invocations and process restarts
+    on the same host.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl_seconds: Optional[float] = 24 * 3600,
+        disk_path: Optional[str] = None,
+        disk_max_size: int = 50_000,
+    ):
+        """
+        Initialize the embedding cache.
+
+        Args:
+            max_size: Maximum number of entries held in memory. 0 disables the cache
+            ttl_seconds: Seconds before an entry expires (None never expires)
+            disk_path: Optional path to a SQLite file used as a second tier
+            disk_max_size: Maximum number of entries kept in the SQLite file
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.disk_path = disk_path
+        self.disk_max_size = disk_max_size
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk: Optional[sqlite3.Connection] = None
+        self._disk_writes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if disk_path and max_size > 0:
+            self._open_disk(disk_path)
+
+    def _open_disk(self, disk_path: str) -> None:
+        try:
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model_id TEXT NOT NULL, key TEXT NOT NULL, created_at REAL NOT NULL, "
+                "vector BLOB NOT NULL, PRIMARY KEY (model_id, key))"
+            )
+            self._disk.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_created_at ON embeddings (created_at)"
+            )
+            self._disk.commit()
+        except sqlite3.Error as e:
+            logger.warning("Disabling on-disk embedding cache %s: %s", disk_path, e)
+            self._disk = None
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def _remember(self, key: Tuple[str, str], created_at: float, vector: np.ndarray) -> None:
+        self._entries[key] = (created_at, vector)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_get(self, key: Tuple[str, str], now: float) -> Optional[Tuple[float, np.ndarray]]:
+        try:
+            row = self._disk.execute(
+                "SELECT created_at, vector FROM embeddings WHERE model_id = ? AND key = ?",
+                key,
+            ).fetchone()
+            if row is None:
+                return None
+            created_at, blob = row
+            if self._expired(created_at, now):
+                self._disk.execute(
+                    "DELETE FROM embeddings WHERE model_id = ? AND key = ?", key
+                )
+                self._disk.commit()
+                return None
+        except sqlite3.Error as e:
+            logger.warning("Embedding cache read failed: %s", e)
+            return None
+        return created_at, np.frombuffer(blob, dtype=np.float32)
+
+    def _disk_put(self, key: Tuple[str, str], created_at: float, vector: np.ndarray) -> None:
+        try:
+            self._disk.execute(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)",
+                (*key, created_at, np.asarray(vector, dtype=np.float32).tobytes()),
+            )
+            self._disk_writes += 1
+            # Trim the oldest rows now and then rather than on every write
+            if self._disk_writes % 100 == 0:
+                self._disk.execute(
+                    "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings "
+                    "ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.disk_max_size,),
+                )
+            self._disk.commit()
+        except sqlite3.Error as e:
+            logger.warning("Embedding cache write failed: %s", e)
+
+    def get(self, model_id: str, text: str) -> Optional[np.ndarray]:
+        """
+        Look up the cached embedding for a text.
+
+        Args:
+            model_id: The embedding model ID
+            text: The text that was embedded
+
+        Returns:
+            The cached embedding, or None on a miss
+        """
+        if self.max_size <= 0:
+            return None
+        key = (model_id, normalize_query(text))
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry[0], now):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+
+            if self._disk is not None:
+                entry = self._disk_get(key, now)
+                if entry is not None:
+                    self._remember(key, *entry)
+                    self.disk_hits += 1
+                    return entry[1]
+
+            self.misses += 1
+            return None
+
+    def put(self, model_id: str, text: str, vector: np.ndarray) -> None:
+        """
+        Store the embedding for a text.
+
+        Args:
+            model_id: The embedding model ID
+            text: The text that was embedded
+            vector: Its embedding
+        """
+        if self.max_size <= 0:
+            return
+        key = (model_id, normalize_query(text))
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, vector)
+            if self._disk is not None:
+                self._disk_put(key, now, vector)
+
+    def clear(self) -> None:
+        """Remove all entries from both tiers"""
+        with self._lock:
+            self._entries.clear()
+            if self._disk is not None:
+                try:
+                    self._disk.execute("DELETE FROM embeddings")
+                    self._disk.commit()
+                except sqlite3.Error as e:
+                    logger.warning("Embedding cache clear failed: %s", e)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return hit/miss counters.
+
+        Returns:
+            Dictionary with hits (memory), disk_hits, misses, evictions and size
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+            }
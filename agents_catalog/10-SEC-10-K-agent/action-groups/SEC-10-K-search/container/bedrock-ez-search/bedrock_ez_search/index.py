@@ -0,0 +1,304 @@
+"""
+Vector index backends used by SemanticSearch
+"""
+
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple, Type
+
+import numpy as np
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """
+    Scale each row of a matrix to unit length as float32.
+
+    Rows with zero norm are left as zeros so they score 0 against any query.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Return the indices of the ``top_k`` highest scores, best first.
+
+    Uses ``argpartition`` so only the selected candidates are sorted.
+    """
+    top_k = min(top_k, len(scores))
+    if top_k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if top_k < len(scores):
+        candidates = np.argpartition(scores, -top_k)[-top_k:]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(scores[candidates])[::-1]]
+
+
+class VectorIndex(ABC):
+    """
+    Base class for vector indexes.
+
+    An index is built from an embedding matrix and answers cosine similarity
+    queries with the row numbers of the best matching embeddings.
+    """
+
+    kind: str = ""
+
+    @abstractmethod
+    def build(self, embeddings: np.ndarray) -> "VectorIndex":
+        """
+        Build the index from an embedding matrix (one row per document).
+
+        Returns:
+            The index itself, to allow chaining
+        """
+
+    @abstractmethod
+    def query(self, vector: np.ndarray, top_k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the rows most similar to a query vector.
+
+        Args:
+            vector: The query embedding
+            top_k: Number of results to return
+
+        Returns:
+            A tuple of (row indices, cosine similarity scores), best first
+        """
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of indexed vectors"""
+
+    @abstractmethod
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        """Arrays that fully describe the built index, used by save()"""
+
+    @classmethod
+    @abstractmethod
+    def _from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "VectorIndex":
+        """Recreate an index from the arrays written by save()"""
+
+    def save(self, path: str) -> None:
+        """
+        Save the built index to a .npz file.
+
+        Args:
+            path: Destination file path
+        """
+        with open(path, "wb") as f:
+            np.savez(f, kind=np.array(self.kind), **self._arrays())
+
+
+class ExactIndex(VectorIndex):
+    """
+    Exact (brute force) cosine similarity index.
+
+    Embeddings are normalised once when the index is built, so a query is a
+    single matrix-vector product followed by a partial sort.
+    """
+
+    kind = "exact"
+
+    def __init__(self):
+        self._vectors: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_normalized(cls, vectors: np.ndarray) -> "ExactIndex":
+        """
+        Wrap an already L2-normalised float32 matrix without copying it.
+
+        Useful for memory-mapped matrices, which would otherwise be copied
+        into memory by build().
+        """
+        index = cls()
+        index._vectors = vectors
+        return index
+
+    def build(self, embeddings: np.ndarray) -> "ExactIndex":
+        self._vectors = normalize_rows(embeddings)
+        return self
+
+    def query(self, vector: np.ndarray, top_k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        if self._vectors is None:
+            raise ValueError("Index has not been built. Call build() first.")
+        scores = self._vectors @ normalize_rows(vector)[0]
+        indices = top_k_indices(scores, top_k)
+        return indices, scores[indices]
+
+    def __len__(self) -> int:
+        return 0 if self._vectors is None else len(self._vectors)
+
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        return {"vectors": self._vectors}
+
+    @classmethod
+    def _from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "ExactIndex":
+        index = cls()
+        index._vectors = arrays["vectors"]
+        return index
+
+
+class IVFIndex(VectorIndex):
+    """
+    Approximate inverted-file (IVF) cosine similarity index.
+
+    Normalised embeddings are clustered with spherical k-means into
+    ``n_lists`` cells. A query is compared against the cell centroids and only
+    the vectors in the ``n_probe`` closest cells are scored, which trades a
+    little recall for a large reduction in work on big collections.
+    """
+
+    kind = "ivf"
+
+    def __init__(
+        self,
+        n_lists: Optional[int] = None,
+        n_probe: int = 8,
+        n_iter: int = 10,
+        max_training_points: int = 100_000,
+        seed: int = 0,
+    ):
+        """
+        Initialize the IVF index.
+
+        Args:
+            n_lists: Number of clusters. Defaults to about 4 * sqrt(N)
+            n_probe: Number of clusters searched per query
+            n_iter: Number of k-means iterations used to train the centroids
+            max_training_points: Maximum number of vectors sampled for training
+            seed: Random seed for centroid initialisation and sampling
+        """
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.max_training_points = max_training_points
+        self.seed = seed
+        self._centroids: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+        self._ids: Optional[np.ndarray] = None
+        self._vectors: Optional[np.ndarray] = None
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        # Assign in chunks to bound the size of the similarity matrix
+        assignments = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), chunk_size):
+            chunk = vectors[start : start + chunk_size]
+            assignments[start : start + chunk_size] = np.argmax(chunk @ centroids.T, axis=1)
+        return assignments
+
+    def _train(self, vectors: np.ndarray, n_lists: int) -> np.ndarray:
+        rng = np.random.default_rng(self.seed)
+        if len(vectors) > self.max_training_points:
+            sample = vectors[rng.choice(len(vectors), self.max_training_points, replace=False)]
+        else:
+            sample = vectors
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(self.n_iter):
+            assignments = self._assign(sample, centroids)
+            counts = np.bincount(assignments, minlength=n_lists)
+            # Sum the members of each cluster as contiguous runs of the
+            # sorted sample, which is much faster than np.add.at
+            order = np.argsort(assignments, kind="stable")
+            nonempty = np.flatnonzero(counts)
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[nonempty]
+            sums = np.zeros_like(centroids)
+            sums[nonempty] = np.add.reduceat(sample[order], starts, axis=0)
+            # Re-seed empty clusters from random training points
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            centroids = normalize_rows(sums)
+        return centroids
+
+    def build(self, embeddings: np.ndarray) -> "IVFIndex":
+        vectors = normalize_rows(embeddings)
+        n_lists = self.n_lists or max(1, int(4 * np.sqrt(len(vectors))))
+        n_lists = max(1, min(n_lists, len(vectors)))
+
+        self._centroids = self._train(vectors, n_lists)
+        assignments = self._assign(vectors, self._centroids)
+
+        # Store vectors grouped by cell so each cell is a contiguous slice
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=n_lists)
+        self._offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self._ids = order.astype(np.int64)
+        self._vectors = vectors[order]
+        return self
+
+    def query(self, vector: np.ndarray, top_k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        if self._vectors is None:
+            raise ValueError("Index has not been built. Call build() first.")
+        query = normalize_rows(vector)[0]
+        n_probe = min(self.n_probe, len(self._centroids))
+        cells = top_k_indices(self._centroids @ query, n_probe)
+
+        candidate_ids = []
+        candidate_scores = []
+        for cell in cells:
+            start, end = self._offsets[cell], self._offsets[cell + 1]
+            if start == end:
+                continue
+            candidate_ids.append(self._ids[start:end])
+            candidate_scores.append(self._vectors[start:end] @ query)
+        if not candidate_ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        ids = np.concatenate(candidate_ids)
+        scores = np.concatenate(candidate_scores)
+        best = top_k_indices(scores, top_k)
+        return ids[best], scores[best]
+
+    def __len__(self) -> int:
+        return 0 if self._vectors is None else len(self._vectors)
+
+    def _arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "centroids": self._centroids,
+            "offsets": self._offsets,
+            "ids": self._ids,
+            "vectors": self._vectors,
+            "n_probe": np.array(self.n_probe),
+        }
+
+    @classmethod
+    def _from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "IVFIndex":
+        index = cls(n_lists=len(arrays["centroids"]), n_probe=int(arrays["n_probe"]))
+        index._centroids = arrays["centroids"]
+        index._offsets = arrays["offsets"]
+        index._ids = arrays["ids"]
+        index._vectors = arrays["vectors"]
+        return index
+
+
+INDEX_TYPES: Dict[str, Type[VectorIndex]] = {
+    ExactIndex.kind: ExactIndex,
+    IVFIndex.kind: IVFIndex,
+}
+
+
+def load_index(path: str) -> VectorIndex:
+    """
+    Load an index saved with VectorIndex.save().
+
+    Args:
+        path: Path to the .npz index file
+
+    Returns:
+        The loaded index
+
+    Raises:
+        ValueError: If the file contains an unknown index type
+    """
+    with np.load(path) as data:
+        kind = str(data["kind"])
+        if kind not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type in {path}: {kind}")
+        arrays = {key: data[key] for key in data.files if key != "kind"}
+    return INDEX_TYPES[kind]._from_arrays(arrays)
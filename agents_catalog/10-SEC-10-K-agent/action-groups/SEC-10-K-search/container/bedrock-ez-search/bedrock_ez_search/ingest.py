@@ -0,0 +1,316 @@
+"""
+Concurrent embedding ingestion with adaptive throttling and checkpoint/resume
+"""
+
+import hashlib
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger(__name__)
+
+THROTTLING_ERROR_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+}
+
+
+class _AdaptiveLimiter:
+    """
+    Concurrency limiter that shrinks on throttling and slowly grows back.
+
+    The limit follows an additive-increase / multiplicative-decrease policy:
+    each throttled request halves the number of in-flight requests allowed,
+    and every ``increase_after`` consecutive successes raises it by one, up
+    to ``max_limit``.
+    """
+
+    def __init__(self, max_limit: int, increase_after: int = 20):
+        self.max_limit = max(1, max_limit)
+        self.limit = self.max_limit
+        self.increase_after = increase_after
+        self._in_flight = 0
+        self._successes = 0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self, throttled: bool = False) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            if throttled:
+                self._successes = 0
+                self.limit = max(1, self.limit // 2)
+            else:
+                self._successes += 1
+                if (
+                    self._successes >= self.increase_after
+                    and self.limit < self.max_limit
+                ):
+                    self._successes = 0
+                    self.limit += 1
+            self._condition.notify_all()
+
+
+def _is_throttling_error(error: Exception) -> bool:
+    if isinstance(error, ClientError):
+        code = error.response.get("Error", {}).get("Code", "")
+        return code in THROTTLING_ERROR_CODES
+    return False
+
+
+def documents_fingerprint(texts: List[str], model_id: str) -> str:
+    """
+    Compute a stable fingerprint for a list of documents and embedding model.
+
+    Used to make sure a checkpoint is only resumed for the same inputs.
+    """
+    digest = hashlib.sha256(model_id.encode("utf-8"))
+    for text in texts:
+        digest.update(b"\x00")
+        digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class BatchEmbedder:
+    """
+    Embed a list of texts with bounded concurrency.
+
+    Requests are issued from a thread pool. ``ThrottlingException`` responses
+    are retried with exponential backoff and jitter and reduce the number of
+    concurrent requests. When a checkpoint path is given, completed
+    embeddings are periodically written to disk so an interrupted run can be
+    resumed without re-embedding finished documents.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[str], np.ndarray],
+        model_id: str,
+        max_workers: int = 8,
+        max_retries: int = 8,
+        base_backoff: float = 0.5,
+        max_backoff: float = 20.0,
+        checkpoint_every: int = 500,
+    ):
+        """
+        Initialize the batch embedder.
+
+        Args:
+            embed_fn: Function that returns the embedding for a single text
+            model_id: Embedding model ID, recorded in checkpoints
+            max_workers: Maximum number of concurrent embedding requests
+            max_retries: Maximum retries per text on throttling errors
+            base_backoff: Initial backoff in seconds after a throttling error
+            max_backoff: Upper bound for a single backoff sleep in seconds
+            checkpoint_every: Number of completed embeddings between checkpoints
+        """
+        self.embed_fn = embed_fn
+        self.model_id = model_id
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.stats: Dict[str, Any] = {}
+        self._stats_lock = threading.Lock()
+
+    def _embed_with_retry(self, text: str, limiter: _AdaptiveLimiter) -> np.ndarray:
+        attempt = 0
+        while True:
+            limiter.acquire()
+            try:
+                embedding = self.embed_fn(text)
+            except Exception as e:
+                throttled = _is_throttling_error(e)
+                limiter.release(throttled=throttled)
+                if not throttled or attempt >= self.max_retries:
+                    raise
+                with self._stats_lock:
+                    self.stats["throttled"] += 1
+                delay = min(self.max_backoff, self.base_backoff * (2**attempt))
+                time.sleep(delay * random.uniform(0.5, 1.0))
+                attempt += 1
+                continue
+            limiter.release()
+            return embedding
+
+    @staticmethod
+    def _load_checkpoint(
+        checkpoint_path: Optional[str], fingerprint: str, count: int
+    ) -> Optional[Dict[str, np.ndarray]]:
+        if checkpoint_path is None or not os.path.exists(checkpoint_path):
+            return None
+        try:
+            with np.load(checkpoint_path) as checkpoint:
+                if str(checkpoint["fingerprint"]) != fingerprint:
+                    logger.info(
+                        "Ignoring checkpoint %s for different inputs", checkpoint_path
+                    )
+                    return None
+                embeddings = checkpoint["embeddings"]
+                completed = checkpoint["completed"]
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning("Could not read checkpoint %s: %s", checkpoint_path, e)
+            return None
+        if len(embeddings) != count or len(completed) != count:
+            return None
+        return {"embeddings": embeddings, "completed": completed}
+
+    @staticmethod
+    def _write_checkpoint(
+        checkpoint_path: str,
+        fingerprint: str,
+        embeddings: np.ndarray,
+        completed: np.ndarray,
+    ) -> None:
+        # Write to a temporary file and rename so a crash never leaves a
+        # truncated checkpoint behind. The temporary file is unique per writer
+        # so concurrent runs against the same cache path never interleave.
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(checkpoint_path)), suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    fingerprint=np.array(fingerprint),
+                    embeddings=embeddings,
+                    completed=completed,
+                )
+            os.replace(tmp_path, checkpoint_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def embed(
+        self,
+        texts: List[str],
+        checkpoint_path: Optional[str] = None,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> np.ndarray:
+        """
+        Embed all texts, resuming from ``checkpoint_path`` if possible.
+
+        Args:
+            texts: List of texts to embed
+            checkpoint_path: Optional path to a .npz checkpoint file. It is
+                             removed once all texts have been embedded.
+            progress_callback: Optional function called with a copy of the
+                               progress metrics after each completed text
+
+        Returns:
+            A numpy array containing the embedding vectors, one row per text
+        """
+        count = len(texts)
+        fingerprint = documents_fingerprint(texts, self.model_id)
+        embeddings: Optional[np.ndarray] = None
+        completed = np.zeros(count, dtype=bool)
+
+        checkpoint = self._load_checkpoint(checkpoint_path, fingerprint, count)
+        if checkpoint is not None:
+            embeddings = checkpoint["embeddings"]
+            completed = checkpoint["completed"].copy()
+
+        self.stats = {
+            "documents": count,
+            "resumed": int(completed.sum()),
+            "embedded": 0,
+            "throttled": 0,
+            "concurrency": self.max_workers,
+            "elapsed_seconds": 0.0,
+            "docs_per_second": 0.0,
+        }
+        if self.stats["resumed"]:
+            logger.info(
+                "Resuming embedding from checkpoint: %d/%d already done",
+                self.stats["resumed"],
+                count,
+            )
+
+        pending = [i for i in range(count) if not completed[i]]
+        limiter = _AdaptiveLimiter(self.max_workers)
+        start = time.perf_counter()
+        since_checkpoint = 0
+
+        def _update_progress() -> None:
+            elapsed = time.perf_counter() - start
+            self.stats["elapsed_seconds"] = elapsed
+            self.stats["docs_per_second"] = (
+                self.stats["embedded"] / elapsed if elapsed > 0 else 0.0
+            )
+            self.stats["concurrency"] = limiter.limit
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            futures = {
+                executor.submit(self._embed_with_retry, texts[i], limiter): i
+                for i in pending
+            }
+            not_done = set(futures)
+            while not_done:
+                done, not_done = wait(not_done, return_when=FIRST_COMPLETED)
+                error = None
+                for future in done:
+                    if future.exception() is not None:
+                        # Keep the successful results from this round so they
+                        # are included in the checkpoint written below.
+                        error = error or future.exception()
+                        continue
+                    i = futures[future]
+                    vector = np.asarray(future.result())
+                    if embeddings is None:
+                        embeddings = np.zeros((count, vector.shape[0]))
+                    embeddings[i] = vector
+                    completed[i] = True
+                    since_checkpoint += 1
+                    self.stats["embedded"] += 1
+                    _update_progress()
+                    if progress_callback is not None:
+                        progress_callback(dict(self.stats))
+                if error is not None:
+                    raise error
+                if checkpoint_path and since_checkpoint >= self.checkpoint_every:
+                    self._write_checkpoint(
+                        checkpoint_path, fingerprint, embeddings, completed
+                    )
+                    since_checkpoint = 0
+        except BaseException:
+            # Drop queued work and persist whatever finished so the next
+            # call can pick up where this one stopped.
+            executor.shutdown(wait=True, cancel_futures=True)
+            if checkpoint_path and embeddings is not None and since_checkpoint:
+                self._write_checkpoint(
+                    checkpoint_path, fingerprint, embeddings, completed
+                )
+            raise
+        executor.shutdown()
+
+        _update_progress()
+        logger.info(
+            "Embedded %d documents (%d resumed) in %.1fs, %d throttled requests",
+            self.stats["embedded"],
+            self.stats["resumed"],
+            self.stats["elapsed_seconds"],
+            self.stats["throttled"],
+        )
+
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+        if embeddings is None:
+            return np.empty((0, 0))
+        return embeddings
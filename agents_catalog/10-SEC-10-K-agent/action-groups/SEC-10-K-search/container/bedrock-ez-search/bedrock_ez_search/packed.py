@@ -0,0 +1,202 @@
+"""
+Compact memory-mapped storage for an embedding matrix and its text records
+"""
+
+import json
+import mmap
+import os
+import struct
+from collections.abc import Sequence
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .index import ExactIndex, normalize_rows
+
+MAGIC = b"EZSPACK1"
+# magic, rows, dim, fields per row, strings table bytes, metadata bytes
+_HEADER = struct.Struct("<8sQQQQQ")
+# Matrix data starts on a 64 byte boundary so it can be mapped as float32
+_DATA_OFFSET = 64
+
+
+def write_packed_corpus(
+    path: str,
+    records: List[Tuple[str, ...]],
+    embeddings: np.ndarray,
+    metadata: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Write records and their embeddings to a single packed file.
+
+    The file holds a header, the L2-normalised float32 embedding matrix, a
+    uint64 offsets table and a UTF-8 strings table, followed by JSON metadata.
+    It is written to a temporary file and renamed into place, so readers that
+    already mapped the previous version are not affected.
+
+    Args:
+        path: Destination file path
+        records: One tuple of strings per embedding row. All tuples must have
+                 the same number of fields
+        embeddings: Embedding matrix with one row per record
+        metadata: Optional JSON-serialisable metadata (e.g. a source version)
+
+    Raises:
+        ValueError: If the records and embeddings don't line up
+    """
+    vectors = normalize_rows(embeddings) if len(records) else np.empty((0, 0), dtype=np.float32)
+    if len(vectors) != len(records):
+        raise ValueError(
+            f"Number of embeddings ({len(vectors)}) doesn't match "
+            f"number of records ({len(records)})"
+        )
+    n_fields = len(records[0]) if records else 0
+    if any(len(record) != n_fields for record in records):
+        raise ValueError("All records must have the same number of fields")
+
+    encoded = [field.encode("utf-8") for record in records for field in record]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    offsets[1:] = np.cumsum([len(field) for field in encoded], dtype=np.uint64)
+    strings = b"".join(encoded)
+    metadata_bytes = json.dumps(metadata or {}).encode("utf-8")
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        header = _HEADER.pack(
+            MAGIC,
+            vectors.shape[0],
+            vectors.shape[1] if vectors.ndim == 2 else 0,
+            n_fields,
+            len(strings),
+            len(metadata_bytes),
+        )
+        f.write(header.ljust(_DATA_OFFSET, b"\x00"))
+        f.write(np.ascontiguousarray(vectors, dtype="<f4").tobytes())
+        f.write(offsets.astype("<u8").tobytes())
+        f.write(strings)
+        f.write(metadata_bytes)
+    os.replace(tmp_path, path)
+
+
+def read_packed_metadata(path: str) -> Dict[str, Any]:
+    """
+    Read only the JSON metadata of a packed corpus file, without mapping it.
+
+    Args:
+        path: Path to the packed file
+
+    Raises:
+        ValueError: If the file is not a packed corpus
+    """
+    with open(path, "rb") as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError(f"{path} is not a packed corpus file")
+        magic, rows, dim, n_fields, strings_nbytes, metadata_nbytes = _HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a packed corpus file")
+        f.seek(_DATA_OFFSET + rows * dim * 4 + (rows * n_fields + 1) * 8 + strings_nbytes)
+        return json.loads(f.read(metadata_nbytes) or b"{}")
+
+
+class _FieldView(Sequence):
+    """Read-only sequence over one field of every record in a PackedCorpus"""
+
+    def __init__(self, corpus: "PackedCorpus", field: int):
+        self._corpus = corpus
+        self._field = field
+
+    def __len__(self) -> int:
+        return len(self._corpus)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("record index out of range")
+        return self._corpus._string(i * self._corpus.n_fields + self._field)
+
+
+class PackedCorpus(Sequence):
+    """
+    Read-only, memory-mapped view of a file written by write_packed_corpus().
+
+    Opening a corpus only maps the file; embedding rows and strings are paged
+    in by the operating system as they are accessed, and strings are decoded
+    on demand.
+    """
+
+    def __init__(self, path: str):
+        """
+        Map a packed corpus file.
+
+        Args:
+            path: Path to the packed file
+
+        Raises:
+            ValueError: If the file is not a packed corpus
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mmap) < _DATA_OFFSET:
+            raise ValueError(f"{path} is not a packed corpus file")
+        magic, rows, dim, n_fields, strings_nbytes, metadata_nbytes = _HEADER.unpack_from(
+            self._mmap, 0
+        )
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a packed corpus file")
+
+        self.n_fields = n_fields
+        matrix_nbytes = rows * dim * 4
+        offsets_start = _DATA_OFFSET + matrix_nbytes
+        self._strings_start = offsets_start + (rows * n_fields + 1) * 8
+        metadata_start = self._strings_start + strings_nbytes
+
+        self.vectors = np.frombuffer(
+            self._mmap, dtype="<f4", count=rows * dim, offset=_DATA_OFFSET
+        ).reshape(rows, dim)
+        self._offsets = np.frombuffer(
+            self._mmap, dtype="<u8", count=rows * n_fields + 1, offset=offsets_start
+        )
+        self.metadata: Dict[str, Any] = json.loads(
+            self._mmap[metadata_start : metadata_start + metadata_nbytes] or b"{}"
+        )
+
+    def _string(self, position: int) -> str:
+        start = self._strings_start + int(self._offsets[position])
+        end = self._strings_start + int(self._offsets[position + 1])
+        return self._mmap[start:end].decode("utf-8")
+
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("record index out of range")
+        base = i * self.n_fields
+        return tuple(self._string(base + j) for j in range(self.n_fields))
+
+    def field(self, field: int) -> Sequence:
+        """
+        Return a lazy sequence over one field of every record.
+
+        Args:
+            field: Zero-based field position within each record
+        """
+        if not 0 <= field < self.n_fields:
+            raise IndexError("field index out of range")
+        return _FieldView(self, field)
+
+    def as_index(self) -> ExactIndex:
+        """
+        Return an ExactIndex that searches the mapped vectors without copying them.
+        """
+        return ExactIndex.from_normalized(self.vectors)
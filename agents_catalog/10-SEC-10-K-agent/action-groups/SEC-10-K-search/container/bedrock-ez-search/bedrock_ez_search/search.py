@@ -3,11 +3,14 @@ Core semantic search functionality using Amazon Bedrock embeddings
 """
 
 import json
-from typing import Dict, List, Tuple, Union, Optional, Any
+from typing import Callable, Dict, List, Sequence, Tuple, Union, Optional, Any
 
 import boto3
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+
+from .cache import EmbeddingCache
+from .index import ExactIndex, VectorIndex, load_index
+from .ingest import BatchEmbedder
 
 
 class SemanticSearch:
@@ -23,6 +26,10 @@ class SemanticSearch:
         model_id: str = "amazon.titan-embed-text-v2:0",
         region_name: Optional[str] = None,
         profile_name: Optional[str] = None,
+        max_workers: int = 8,
+        checkpoint_every: int = 500,
+        vector_index: Optional[VectorIndex] = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
     ):
         """
         Initialize the semantic search engine.
@@ -31,6 +38,16 @@ class SemanticSearch:
             model_id: The Amazon Bedrock model ID to use for embeddings
             region_name: AWS region name (uses boto3 default if None)
             profile_name: AWS profile name (uses boto3 default if None)
+            max_workers: Maximum number of concurrent embedding requests
+                         used when indexing documents
+            checkpoint_every: Number of embedded documents between
+                              checkpoints when indexing with a cache_path
+            vector_index: Index backend used for similarity search
+                          (defaults to an exact ExactIndex; pass an IVFIndex
+                          for approximate search over large collections)
+            embedding_cache: Cache for query embeddings (defaults to an
+                             in-memory EmbeddingCache; pass one with a
+                             disk_path to share it across processes)
         """
         session_kwargs = {}
         if region_name:
@@ -41,9 +58,16 @@ class SemanticSearch:
         session = boto3.Session(**session_kwargs)
         self.bedrock_runtime = session.client("bedrock-runtime")
         self.model_id = model_id
+        self.max_workers = max_workers
+        self.checkpoint_every = checkpoint_every
         
         self._documents = []
         self._embeddings = None
+        self._vector_index = vector_index if vector_index is not None else ExactIndex()
+        self.embedding_cache = (
+            embedding_cache if embedding_cache is not None else EmbeddingCache()
+        )
+        self.ingest_stats: Dict[str, Any] = {}
         
     def _get_embedding(self, text: str) -> np.ndarray:
         """
@@ -69,26 +93,70 @@ class SemanticSearch:
         
         return embedding
     
-    def _get_batch_embeddings(self, texts: List[str]) -> np.ndarray:
+    def _get_query_embedding(self, query: str) -> Tuple[np.ndarray, bool]:
+        """
+        Get the embedding for a search query, using the embedding cache.
+        
+        Args:
+            query: The search query
+            
+        Returns:
+            A tuple of (embedding, whether it was served from the cache)
+        """
+        embedding = self.embedding_cache.get(self.model_id, query)
+        if embedding is not None:
+            return embedding, True
+        
+        embedding = self._get_embedding(query)
+        self.embedding_cache.put(self.model_id, query, embedding)
+        return embedding, False
+    
+    def _get_batch_embeddings(
+        self,
+        texts: List[str],
+        checkpoint_path: Optional[str] = None,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> np.ndarray:
         """
         Get embeddings for a batch of texts.
         
+        Texts are embedded concurrently (up to ``max_workers`` requests in
+        flight). Throttled requests are retried with backoff and reduce the
+        concurrency until Bedrock stops throttling.
+        
         Args:
             texts: List of texts to embed
+            checkpoint_path: Optional path used to checkpoint progress so an
+                             interrupted run can be resumed
+            progress_callback: Optional function called with progress metrics
+                               after each embedded text
             
         Returns:
             A numpy array containing the embedding vectors
         """
-        # For simplicity, we'll process one at a time
-        # In a production system, you might want to batch these calls
-        embeddings = []
-        for text in texts:
-            embedding = self._get_embedding(text)
-            embeddings.append(embedding)
+        embedder = BatchEmbedder(
+            self._get_embedding,
+            model_id=self.model_id,
+            max_workers=self.max_workers,
+            checkpoint_every=self.checkpoint_every,
+        )
+        embeddings = embedder.embed(
+            texts,
+            checkpoint_path=checkpoint_path,
+            progress_callback=progress_callback,
+        )
+        self.ingest_stats = embedder.stats
         
-        return np.vstack(embeddings)
+        return embeddings
     
-    def index(self, documents: List[str], cache_path: Optional[str] = None, embeddings_file: Optional[str] = None) -> None:
+    def index(
+        self,
+        documents: List[str],
+        cache_path: Optional[str] = None,
+        embeddings_file: Optional[str] = None,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+        index_file: Optional[str] = None,
+    ) -> None:
         """
         Index a list of documents for semantic search.
         
@@ -99,13 +167,25 @@ class SemanticSearch:
             embeddings_file: Optional path to load pre-computed embeddings from a .npy file
                             If provided, embeddings will be loaded from this file instead
                             of computing them via the Bedrock API
+            progress_callback: Optional function called with progress metrics
+                               (documents, embedded, resumed, throttled,
+                               concurrency, elapsed_seconds, docs_per_second)
+                               while embeddings are computed
+            index_file: Optional path to a vector index saved with save_index()
+                        If provided, the index is loaded from this file instead
+                        of being built, and no embeddings are loaded or computed
                             
         Raises:
-            ValueError: If the number of embeddings loaded from file doesn't match
-                       the number of documents
+            ValueError: If the number of embeddings or indexed vectors loaded
+                       from file doesn't match the number of documents
         """
         self._documents = documents
         
+        # Load a previously built index if index_file is provided
+        if index_file is not None:
+            self.attach_index(documents, load_index(index_file))
+            return
+        
         # Load embeddings from file if embeddings_file is provided
         if embeddings_file is not None:
             loaded_embeddings = np.load(embeddings_file)
@@ -119,12 +199,57 @@ class SemanticSearch:
                 
             self._embeddings = loaded_embeddings
         else:
-            # Otherwise compute embeddings via the Bedrock API
-            self._embeddings = self._get_batch_embeddings(documents)
+            # Otherwise compute embeddings via the Bedrock API, checkpointing
+            # next to cache_path so an interrupted run can be resumed
+            checkpoint_path = (
+                f"{cache_path}.partial.npz" if cache_path is not None else None
+            )
+            self._embeddings = self._get_batch_embeddings(
+                documents,
+                checkpoint_path=checkpoint_path,
+                progress_callback=progress_callback,
+            )
         
         # Save embeddings to file if cache_path is provided
         if cache_path is not None:
             np.save(cache_path, self._embeddings)
+        
+        self._vector_index.build(self._embeddings)
+    
+    def attach_index(self, documents: Sequence[str], vector_index: VectorIndex) -> None:
+        """
+        Use an already built vector index for the given documents.
+        
+        No embeddings are loaded or computed. This is how memory-mapped
+        indexes (see PackedCorpus.as_index()) are searched without copying.
+        
+        Args:
+            documents: Documents in the same order as the indexed vectors
+            vector_index: A built vector index
+            
+        Raises:
+            ValueError: If the number of indexed vectors doesn't match the
+                       number of documents
+        """
+        if len(vector_index) != len(documents):
+            raise ValueError(
+                f"Number of vectors in index ({len(vector_index)}) "
+                f"doesn't match number of documents ({len(documents)})"
+            )
+        self._documents = documents
+        self._vector_index = vector_index
+        self._embeddings = None
+    
+    def save_index(self, path: str) -> None:
+        """
+        Save the built vector index so it can be reused with index(index_file=...).
+        
+        Args:
+            path: Destination .npz file path
+        """
+        if len(self._vector_index) == 0:
+            raise ValueError("No documents have been indexed. Call index() first.")
+        self._vector_index.save(path)
     
     def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         """
@@ -135,30 +260,28 @@ class SemanticSearch:
             top_k: Number of top results to return
             
         Returns:
-            List of dictionaries containing document text and similarity score
+            List of dictionaries containing document text, similarity score,
+            index and whether the query embedding came from the cache
+            (cache_hit). Cumulative counters are available from
+            embedding_cache.stats()
         """
-        if self._embeddings is None or len(self._documents) == 0:
+        if len(self._vector_index) == 0 or len(self._documents) == 0:
             raise ValueError("No documents have been indexed. Call index() first.")
         
         # Get query embedding
-        query_embedding = self._get_embedding(query)
-        
-        # Calculate cosine similarities
-        similarities = cosine_similarity(
-            query_embedding.reshape(1, -1), 
-            self._embeddings
-        )[0]
+        query_embedding, cache_hit = self._get_query_embedding(query)
         
-        # Get top-k indices
-        top_indices = np.argsort(similarities)[::-1][:top_k]
+        # Find the top-k most similar documents
+        top_indices, scores = self._vector_index.query(query_embedding, top_k=top_k)
         
         # Prepare results
         results = []
-        for idx in top_indices:
+        for idx, score in zip(top_indices, scores):
             results.append({
                 "document": self._documents[idx],
-                "score": float(similarities[idx]),
-                "index": int(idx)
+                "score": float(score),
+                "index": int(idx),
+                "cache_hit": cache_hit
             })
         
         return results
@@ -0,0 +1,108 @@
+"""
+Benchmark recall and query latency of the vector index backends
+
+Compares the previous search path (sklearn cosine_similarity + full argsort,
+if scikit-learn is installed), ExactIndex and IVFIndex on synthetic clustered
+embeddings. Not collected by pytest; run it directly:
+
+    python tests/benchmark_index.py --sizes 10000 100000 1000000 --dim 256
+
+Memory use is roughly 3 * size * dim * 4 bytes at the largest size, so reduce
+--dim when benchmarking 1M vectors on a small machine.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from bedrock_ez_search import ExactIndex, IVFIndex
+
+try:
+    from sklearn.metrics.pairwise import cosine_similarity
+except ImportError:
+    cosine_similarity = None
+
+
+def make_embeddings(size: int, dim: int, n_queries: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    n_clusters = max(16, size // 1000)
+    centers = rng.normal(size=(n_clusters, dim)).astype(np.float32)
+    embeddings = np.empty((size, dim), dtype=np.float32)
+    for start in range(0, size, 100_000):
+        end = min(size, start + 100_000)
+        labels = rng.integers(0, n_clusters, size=end - start)
+        embeddings[start:end] = centers[labels] + 0.5 * rng.normal(
+            size=(end - start, dim)
+        ).astype(np.float32)
+    queries = centers[rng.integers(0, n_clusters, size=n_queries)] + 0.5 * rng.normal(
+        size=(n_queries, dim)
+    ).astype(np.float32)
+    return embeddings, queries
+
+
+def time_queries(query_fn, queries, top_k):
+    results = []
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(query_fn(query, top_k))
+        latencies.append(time.perf_counter() - start)
+    latencies_ms = np.array(latencies) * 1000
+    return results, float(np.percentile(latencies_ms, 50)), float(np.percentile(latencies_ms, 95))
+
+
+def recall(results, truth):
+    hits = sum(len(set(r.tolist()) & set(t.tolist())) for r, t in zip(results, truth))
+    return hits / sum(len(t) for t in truth)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--n-probe", type=int, nargs="+", default=[4, 16])
+    args = parser.parse_args()
+
+    header = f"{'size':>9} {'backend':<18} {'build_s':>8} {'p50_ms':>8} {'p95_ms':>8} {'recall':>7}"
+    print(header)
+    print("-" * len(header))
+
+    for size in args.sizes:
+        embeddings, queries = make_embeddings(size, args.dim, args.queries)
+
+        start = time.perf_counter()
+        exact = ExactIndex().build(embeddings)
+        build_s = time.perf_counter() - start
+        truth, p50, p95 = time_queries(lambda q, k: exact.query(q, k)[0], queries, args.top_k)
+        print(f"{size:>9} {'exact':<18} {build_s:>8.2f} {p50:>8.2f} {p95:>8.2f} {1.0:>7.3f}")
+
+        if cosine_similarity is not None:
+
+            def sklearn_query(q, k):
+                similarities = cosine_similarity(q.reshape(1, -1), embeddings)[0]
+                return np.argsort(similarities)[::-1][:k]
+
+            results, p50, p95 = time_queries(sklearn_query, queries, args.top_k)
+            print(
+                f"{size:>9} {'sklearn+argsort':<18} {0.0:>8.2f} {p50:>8.2f} {p95:>8.2f} "
+                f"{recall(results, truth):>7.3f}"
+            )
+
+        start = time.perf_counter()
+        ivf = IVFIndex().build(embeddings)
+        build_s = time.perf_counter() - start
+        for n_probe in args.n_probe:
+            ivf.n_probe = n_probe
+            results, p50, p95 = time_queries(lambda q, k: ivf.query(q, k)[0], queries, args.top_k)
+            name = f"ivf(n_probe={n_probe})"
+            print(
+                f"{size:>9} {name:<18} {build_s:>8.2f} {p50:>8.2f} {p95:>8.2f} "
+                f"{recall(results, truth):>7.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
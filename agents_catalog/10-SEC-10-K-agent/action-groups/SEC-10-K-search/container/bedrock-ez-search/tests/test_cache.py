@@ -0,0 +1,99 @@
+"""
+Tests for the query embedding cache
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+
+import numpy as np
+
+from bedrock_ez_search import EmbeddingCache, SemanticSearch, normalize_query
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    """Test cases for the EmbeddingCache class"""
+
+    def setUp(self):
+        self.vector = np.array([0.1, 0.2, 0.3], dtype=np.float32)
+
+    def test_normalized_keys(self):
+        """Test that case and whitespace differences share an entry"""
+        self.assertEqual(normalize_query("  Total\tRevenue "), "total revenue")
+
+        cache = EmbeddingCache()
+        cache.put("model", "Total Revenue", self.vector)
+        np.testing.assert_array_equal(cache.get("model", "total  revenue"), self.vector)
+        self.assertIsNone(cache.get("other-model", "total revenue"))
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted"""
+        cache = EmbeddingCache(max_size=2)
+        cache.put("model", "a", self.vector)
+        cache.put("model", "b", self.vector)
+        cache.get("model", "a")
+        cache.put("model", "c", self.vector)
+
+        self.assertIsNotNone(cache.get("model", "a"))
+        self.assertIsNone(cache.get("model", "b"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_ttl_expiry(self):
+        """Test that entries expire after ttl_seconds"""
+        cache = EmbeddingCache(ttl_seconds=10)
+        with patch("bedrock_ez_search.cache.time.time", return_value=1000.0):
+            cache.put("model", "revenue", self.vector)
+        with patch("bedrock_ez_search.cache.time.time", return_value=1005.0):
+            self.assertIsNotNone(cache.get("model", "revenue"))
+        with patch("bedrock_ez_search.cache.time.time", return_value=1011.0):
+            self.assertIsNone(cache.get("model", "revenue"))
+
+    def test_disabled(self):
+        """Test that max_size=0 disables caching"""
+        cache = EmbeddingCache(max_size=0)
+        cache.put("model", "revenue", self.vector)
+        self.assertIsNone(cache.get("model", "revenue"))
+
+    def test_disk_tier_survives_new_instance(self):
+        """Test that the SQLite tier serves entries to a fresh cache"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "embeddings.sqlite")
+            EmbeddingCache(disk_path=path).put("model", "revenue", self.vector)
+
+            cache = EmbeddingCache(disk_path=path)
+            np.testing.assert_array_equal(cache.get("model", "Revenue"), self.vector)
+            self.assertEqual(cache.stats()["disk_hits"], 1)
+
+            # Promoted to memory, so the next lookup is a memory hit
+            cache.get("model", "revenue")
+            self.assertEqual(cache.stats()["hits"], 1)
+
+
+class TestSemanticSearchQueryCache(unittest.TestCase):
+    """Test cases for query embedding caching in SemanticSearch"""
+
+    @patch("boto3.Session")
+    def test_repeated_queries_skip_bedrock(self, mock_session):
+        mock_session.return_value.client.return_value = MagicMock()
+        search = SemanticSearch()
+        with patch("numpy.load", return_value=np.eye(3)):
+            search.index(["a", "b", "c"], embeddings_file="embeddings.npy")
+
+        with patch.object(
+            search, "_get_embedding", return_value=np.array([0.0, 1.0, 0.0])
+        ) as mock_get_embedding:
+            first = search.search("Revenue", top_k=1)
+            second = search.search("  revenue ", top_k=1)
+
+        mock_get_embedding.assert_called_once_with("Revenue")
+        self.assertFalse(first[0]["cache_hit"])
+        self.assertTrue(second[0]["cache_hit"])
+        self.assertEqual(second[0]["index"], 1)
+        self.assertEqual(search.embedding_cache.stats()["hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+"""
+Tests for the vector index backends
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+
+import numpy as np
+
+from bedrock_ez_search import ExactIndex, IVFIndex, SemanticSearch, load_index
+from bedrock_ez_search.index import top_k_indices
+
+
+def _brute_force_top_k(embeddings, query, top_k):
+    normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    return np.argsort(scores)[::-1][:top_k], scores
+
+
+class TestExactIndex(unittest.TestCase):
+    """Test cases for the ExactIndex class"""
+
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.embeddings = rng.normal(size=(500, 16))
+        self.query = rng.normal(size=16)
+
+    def test_matches_brute_force(self):
+        """Test that results match a full cosine similarity sort"""
+        index = ExactIndex().build(self.embeddings)
+        indices, scores = index.query(self.query, top_k=10)
+
+        expected, expected_scores = _brute_force_top_k(self.embeddings, self.query, 10)
+        np.testing.assert_array_equal(indices, expected)
+        np.testing.assert_allclose(scores, expected_scores[expected], rtol=1e-5)
+
+    def test_top_k_larger_than_index(self):
+        """Test that asking for more results than vectors returns all of them"""
+        index = ExactIndex().build(self.embeddings[:3])
+        indices, _ = index.query(self.query, top_k=10)
+        self.assertEqual(sorted(indices.tolist()), [0, 1, 2])
+
+    def test_zero_vector_does_not_produce_nan(self):
+        """Test that zero-norm embeddings score 0 instead of NaN"""
+        embeddings = np.vstack([np.zeros(16), self.embeddings[:2]])
+        _, scores = ExactIndex().build(embeddings).query(self.query, top_k=3)
+        self.assertFalse(np.isnan(scores).any())
+
+    def test_query_before_build(self):
+        """Test that querying an empty index raises ValueError"""
+        with self.assertRaises(ValueError):
+            ExactIndex().query(self.query)
+
+    def test_save_and_load(self):
+        """Test that a saved index returns the same results after loading"""
+        index = ExactIndex().build(self.embeddings)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "index.npz")
+            index.save(path)
+            loaded = load_index(path)
+
+        self.assertIsInstance(loaded, ExactIndex)
+        np.testing.assert_array_equal(
+            loaded.query(self.query, 5)[0], index.query(self.query, 5)[0]
+        )
+
+
+class TestIVFIndex(unittest.TestCase):
+    """Test cases for the IVFIndex class"""
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        # Clustered data so the coarse quantizer has structure to find
+        centers = rng.normal(size=(20, 32))
+        labels = rng.integers(0, 20, size=4000)
+        self.embeddings = centers[labels] + 0.1 * rng.normal(size=(4000, 32))
+        self.queries = centers[:10] + 0.1 * rng.normal(size=(10, 32))
+
+    def test_recall(self):
+        """Test that probing a few cells recovers most exact neighbours"""
+        index = IVFIndex(n_lists=32, n_probe=4).build(self.embeddings)
+        hits = 0
+        for query in self.queries:
+            indices, _ = index.query(query, top_k=10)
+            expected, _ = _brute_force_top_k(self.embeddings, query, 10)
+            hits += len(set(indices.tolist()) & set(expected.tolist()))
+        self.assertGreaterEqual(hits / (10 * len(self.queries)), 0.9)
+
+    def test_probing_all_cells_is_exact(self):
+        """Test that n_probe == n_lists gives exact results"""
+        index = IVFIndex(n_lists=16, n_probe=16).build(self.embeddings)
+        for query in self.queries:
+            indices, _ = index.query(query, top_k=5)
+            expected, _ = _brute_force_top_k(self.embeddings, query, 5)
+            np.testing.assert_array_equal(indices, expected)
+
+    def test_save_and_load(self):
+        """Test that a saved index returns the same results after loading"""
+        index = IVFIndex(n_lists=16, n_probe=2).build(self.embeddings)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "index.npz")
+            index.save(path)
+            loaded = load_index(path)
+
+        self.assertIsInstance(loaded, IVFIndex)
+        self.assertEqual(loaded.n_probe, 2)
+        self.assertEqual(len(loaded), len(self.embeddings))
+        for query in self.queries:
+            np.testing.assert_array_equal(
+                loaded.query(query, 5)[0], index.query(query, 5)[0]
+            )
+
+
+class TestTopKIndices(unittest.TestCase):
+    """Test cases for the top_k_indices helper"""
+
+    def test_sorted_best_first(self):
+        scores = np.array([0.1, 0.9, 0.5, 0.7])
+        np.testing.assert_array_equal(top_k_indices(scores, 2), [1, 3])
+        np.testing.assert_array_equal(top_k_indices(scores, 10), [1, 3, 2, 0])
+
+
+class TestSemanticSearchIndexFile(unittest.TestCase):
+    """Test cases for saving and loading the index through SemanticSearch"""
+
+    @patch("boto3.Session")
+    def test_index_file_round_trip(self, mock_session):
+        mock_session.return_value.client.return_value = MagicMock()
+        documents = ["Document 1", "Document 2", "Document 3"]
+        embeddings = np.array(
+            [[0.9, 0.1, 0.1, 0.1], [0.1, 0.9, 0.1, 0.1], [0.5, 0.5, 0.1, 0.1]]
+        )
+
+        search = SemanticSearch()
+        with patch("numpy.load", return_value=embeddings):
+            search.index(documents, embeddings_file="embeddings.npy")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "index.npz")
+            search.save_index(path)
+
+            restored = SemanticSearch()
+            restored.index(documents, index_file=path)
+
+        with patch.object(
+            restored, "_get_embedding", return_value=np.array([0.1, 0.9, 0.1, 0.1])
+        ):
+            results = restored.search("query", top_k=2)
+        self.assertEqual(results[0]["document"], "Document 2")
+
+        with self.assertRaises(ValueError):
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = os.path.join(tmp_dir, "index.npz")
+                search.save_index(path)
+                SemanticSearch().index(documents[:2], index_file=path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,202 @@
+"""
+Tests for the concurrent embedding ingestion engine
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+from botocore.exceptions import ClientError
+
+from bedrock_ez_search.ingest import BatchEmbedder, _AdaptiveLimiter
+
+
+def _throttling_error():
+    return ClientError(
+        {"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}},
+        "InvokeModel",
+    )
+
+
+def _fake_embedding(text):
+    return np.array([float(len(text)), float(text.count("a")), 1.0])
+
+
+class TestBatchEmbedder(unittest.TestCase):
+    """Test cases for the BatchEmbedder class"""
+
+    def setUp(self):
+        self.texts = [f"document {'a' * i}" for i in range(25)]
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.checkpoint_path = os.path.join(self.tmp_dir.name, "emb.npy.partial.npz")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_embeddings_keep_document_order(self):
+        """Test that concurrent embedding returns rows in input order"""
+        embedder = BatchEmbedder(_fake_embedding, model_id="test", max_workers=4)
+        embeddings = embedder.embed(self.texts)
+
+        expected = np.vstack([_fake_embedding(t) for t in self.texts])
+        np.testing.assert_array_equal(embeddings, expected)
+        self.assertEqual(embedder.stats["embedded"], len(self.texts))
+        self.assertEqual(embedder.stats["resumed"], 0)
+
+    def test_concurrency_is_bounded(self):
+        """Test that no more than max_workers requests are in flight"""
+        lock = threading.Lock()
+        state = {"current": 0, "peak": 0}
+
+        def slow_embedding(text):
+            with lock:
+                state["current"] += 1
+                state["peak"] = max(state["peak"], state["current"])
+            threading.Event().wait(0.005)
+            with lock:
+                state["current"] -= 1
+            return _fake_embedding(text)
+
+        embedder = BatchEmbedder(slow_embedding, model_id="test", max_workers=3)
+        embedder.embed(self.texts)
+
+        self.assertLessEqual(state["peak"], 3)
+
+    @patch("bedrock_ez_search.ingest.time.sleep")
+    def test_throttling_is_retried(self, mock_sleep):
+        """Test that ThrottlingException is retried and counted"""
+        calls = {}
+        lock = threading.Lock()
+
+        def flaky_embedding(text):
+            with lock:
+                calls[text] = calls.get(text, 0) + 1
+                first_call = calls[text] == 1
+            if first_call and text.endswith("aaa"):
+                raise _throttling_error()
+            return _fake_embedding(text)
+
+        embedder = BatchEmbedder(flaky_embedding, model_id="test", max_workers=4)
+        embeddings = embedder.embed(self.texts)
+
+        expected = np.vstack([_fake_embedding(t) for t in self.texts])
+        np.testing.assert_array_equal(embeddings, expected)
+        self.assertGreater(embedder.stats["throttled"], 0)
+        mock_sleep.assert_called()
+
+    def test_non_throttling_errors_are_raised(self):
+        """Test that other errors are not retried"""
+
+        def failing_embedding(text):
+            raise ValueError("bad input")
+
+        embedder = BatchEmbedder(failing_embedding, model_id="test", max_workers=2)
+        with self.assertRaises(ValueError):
+            embedder.embed(self.texts)
+
+    def test_resume_from_checkpoint(self):
+        """Test that an interrupted run resumes without re-embedding"""
+
+        def failing_after_ten(text):
+            if len(text) > len("document ") + 10:
+                raise RuntimeError("interrupted")
+            return _fake_embedding(text)
+
+        embedder = BatchEmbedder(
+            failing_after_ten, model_id="test", max_workers=1, checkpoint_every=1
+        )
+        with self.assertRaises(RuntimeError):
+            embedder.embed(self.texts, checkpoint_path=self.checkpoint_path)
+        self.assertTrue(os.path.exists(self.checkpoint_path))
+
+        embedded = []
+
+        def recording_embedding(text):
+            embedded.append(text)
+            return _fake_embedding(text)
+
+        embedder = BatchEmbedder(recording_embedding, model_id="test", max_workers=4)
+        embeddings = embedder.embed(self.texts, checkpoint_path=self.checkpoint_path)
+
+        expected = np.vstack([_fake_embedding(t) for t in self.texts])
+        np.testing.assert_array_equal(embeddings, expected)
+        self.assertEqual(embedder.stats["resumed"], 11)
+        self.assertEqual(len(embedded), len(self.texts) - 11)
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+
+    def test_checkpoint_for_other_documents_is_ignored(self):
+        """Test that a checkpoint is not resumed for different inputs"""
+        embedder = BatchEmbedder(_fake_embedding, model_id="test", max_workers=1)
+        BatchEmbedder._write_checkpoint(
+            self.checkpoint_path,
+            "not-a-matching-fingerprint",
+            np.zeros((len(self.texts), 3)),
+            np.ones(len(self.texts), dtype=bool),
+        )
+
+        embedder.embed(self.texts, checkpoint_path=self.checkpoint_path)
+
+        self.assertEqual(embedder.stats["resumed"], 0)
+        self.assertEqual(embedder.stats["embedded"], len(self.texts))
+
+    def test_concurrent_checkpoint_writes_do_not_collide(self):
+        """Test that concurrent checkpoint writers each leave a readable file"""
+        completed = np.ones(len(self.texts), dtype=bool)
+
+        def write(value):
+            BatchEmbedder._write_checkpoint(
+                self.checkpoint_path,
+                "fingerprint",
+                np.full((len(self.texts), 3), value),
+                completed,
+            )
+
+        threads = [threading.Thread(target=write, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        with np.load(self.checkpoint_path) as checkpoint:
+            self.assertEqual(checkpoint["embeddings"].shape, (len(self.texts), 3))
+        self.assertEqual(os.listdir(self.tmp_dir.name), ["emb.npy.partial.npz"])
+
+    def test_progress_callback(self):
+        """Test that progress metrics are reported for every document"""
+        progress = []
+        embedder = BatchEmbedder(_fake_embedding, model_id="test", max_workers=2)
+        embedder.embed(self.texts, progress_callback=progress.append)
+
+        self.assertEqual(len(progress), len(self.texts))
+        self.assertEqual(progress[-1]["embedded"], len(self.texts))
+        self.assertIn("docs_per_second", progress[-1])
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    """Test cases for the adaptive concurrency limiter"""
+
+    def test_limit_halves_on_throttle_and_recovers(self):
+        limiter = _AdaptiveLimiter(8, increase_after=2)
+
+        limiter.acquire()
+        limiter.release(throttled=True)
+        self.assertEqual(limiter.limit, 4)
+
+        for _ in range(4):
+            limiter.acquire()
+            limiter.release()
+        self.assertEqual(limiter.limit, 6)
+
+    def test_limit_never_drops_below_one(self):
+        limiter = _AdaptiveLimiter(2)
+        for _ in range(5):
+            limiter.acquire()
+            limiter.release(throttled=True)
+        self.assertEqual(limiter.limit, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+Tests for the packed, memory-mapped corpus format
+"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+
+import numpy as np
+
+from bedrock_ez_search import (
+    PackedCorpus,
+    SemanticSearch,
+    read_packed_metadata,
+    write_packed_corpus,
+)
+
+
+class TestPackedCorpus(unittest.TestCase):
+    """Test cases for write_packed_corpus and PackedCorpus"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "corpus.ezpack")
+        self.records = [
+            ("us-gaap", "AccountsPayableCurrent", "Accounts payable, current"),
+            ("us-gaap", "Revenues", "Revenues — total, incl. ünïcode"),
+            ("dei", "EntityRegistrantName", ""),
+        ]
+        self.embeddings = np.array(
+            [[3.0, 4.0, 0.0], [0.0, 1.0, 0.0], [1.0, 1.0, 1.0]]
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        """Test that records, vectors and metadata survive a round trip"""
+        write_packed_corpus(
+            self.path, self.records, self.embeddings, metadata={"version": "abc"}
+        )
+        corpus = PackedCorpus(self.path)
+
+        self.assertEqual(len(corpus), 3)
+        self.assertEqual(list(corpus), self.records)
+        self.assertEqual(corpus[-1], self.records[-1])
+        self.assertEqual(list(corpus.field(1)), [r[1] for r in self.records])
+        self.assertEqual(corpus.metadata, {"version": "abc"})
+        self.assertEqual(corpus.vectors.dtype, np.float32)
+        np.testing.assert_allclose(corpus.vectors[0], [0.6, 0.8, 0.0], rtol=1e-6)
+        np.testing.assert_allclose(np.linalg.norm(corpus.vectors, axis=1), 1.0, rtol=1e-6)
+
+    def test_read_metadata_without_mapping(self):
+        """Test that read_packed_metadata() reads the metadata from the header"""
+        write_packed_corpus(
+            self.path, self.records, self.embeddings, metadata={"version": "abc"}
+        )
+        self.assertEqual(read_packed_metadata(self.path), {"version": "abc"})
+
+        with open(self.path, "wb") as f:
+            f.write(b"x" * 128)
+        with self.assertRaises(ValueError):
+            read_packed_metadata(self.path)
+
+    def test_index_uses_mapped_vectors(self):
+        """Test that as_index() searches the mapped matrix without copying"""
+        write_packed_corpus(self.path, self.records, self.embeddings)
+        corpus = PackedCorpus(self.path)
+        index = corpus.as_index()
+
+        self.assertIs(index._vectors, corpus.vectors)
+        indices, _ = index.query(np.array([0.0, 2.0, 0.0]), top_k=1)
+        self.assertEqual(indices.tolist(), [1])
+
+    def test_rewrite_does_not_affect_open_corpus(self):
+        """Test that replacing the file leaves an open mapping intact"""
+        write_packed_corpus(self.path, self.records, self.embeddings)
+        corpus = PackedCorpus(self.path)
+        write_packed_corpus(self.path, self.records[:1], self.embeddings[:1])
+
+        self.assertEqual(len(corpus), 3)
+        self.assertEqual(corpus[1], self.records[1])
+        self.assertEqual(len(PackedCorpus(self.path)), 1)
+
+    def test_mismatched_lengths(self):
+        """Test that records and embeddings must line up"""
+        with self.assertRaises(ValueError):
+            write_packed_corpus(self.path, self.records[:2], self.embeddings)
+
+    def test_not_a_packed_file(self):
+        """Test that other files are rejected"""
+        with open(self.path, "wb") as f:
+            f.write(b"x" * 128)
+        with self.assertRaises(ValueError):
+            PackedCorpus(self.path)
+
+    @patch("boto3.Session")
+    def test_semantic_search_over_packed_corpus(self, mock_session):
+        """Test searching a packed corpus through SemanticSearch.attach_index"""
+        mock_session.return_value.client.return_value = MagicMock()
+        write_packed_corpus(self.path, self.records, self.embeddings)
+        corpus = PackedCorpus(self.path)
+
+        search = SemanticSearch()
+        search.attach_index(corpus.field(2), corpus.as_index())
+        with patch.object(search, "_get_embedding", return_value=np.array([0.0, 1.0, 0.0])):
+            results = search.search("revenue", top_k=1)
+
+        self.assertEqual(results[0]["index"], 1)
+        self.assertEqual(results[0]["document"], self.records[1][2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -73,10 +73,12 @@ class TestSemanticSearch(unittest.TestCase):
         # Mock the _get_embedding method to return controlled values
         with patch.object(search, '_get_embedding') as mock_get_embedding:
             # For document embeddings
-            mock_get_embedding.side_effect = [
-                np.array([0.9, 0.1, 0.1, 0.1]),  # doc 1
-                np.array([0.1, 0.9, 0.1, 0.1]),  # doc 2
-            ]
+            # Keyed by text because documents are embedded concurrently
+            doc_embeddings = {
+                "Document 1": np.array([0.9, 0.1, 0.1, 0.1]),  # doc 1
+                "Document 2": np.array([0.1, 0.9, 0.1, 0.1]),  # doc 2
+            }
+            mock_get_embedding.side_effect = doc_embeddings.__getitem__
             
             # Mock np.save to verify it's called with correct arguments
             with patch('numpy.save') as mock_save:
@@ -116,11 +118,13 @@ class TestSemanticSearch(unittest.TestCase):
         # Mock the _get_embedding method to return controlled values
         with patch.object(search, '_get_embedding') as mock_get_embedding:
             # For document embeddings
-            mock_get_embedding.side_effect = [
-                np.array([0.9, 0.1, 0.1, 0.1]),  # doc 1 - less similar
-                np.array([0.1, 0.9, 0.1, 0.1]),  # doc 2 - most similar
-                np.array([0.5, 0.5, 0.1, 0.1]),  # doc 3 - medium similar
-            ]
+            # Keyed by text because documents are embedded concurrently
+            doc_embeddings = {
+                "Document 1": np.array([0.9, 0.1, 0.1, 0.1]),  # doc 1 - less similar
+                "Document 2": np.array([0.1, 0.9, 0.1, 0.1]),  # doc 2 - most similar
+                "Document 3": np.array([0.5, 0.5, 0.1, 0.1]),  # doc 3 - medium similar
+            }
+            mock_get_embedding.side_effect = doc_embeddings.__getitem__
             
             # Index the documents
             search.index([
@@ -160,10 +164,12 @@ class TestSemanticSearch(unittest.TestCase):
         # Mock the _get_embedding method to return controlled values
         with patch.object(search, '_get_embedding') as mock_get_embedding:
             # For document embeddings
-            mock_get_embedding.side_effect = [
-                np.array([0.9, 0.1, 0.1, 0.1]),  # doc 1
-                np.array([0.1, 0.9, 0.1, 0.1]),  # doc 2
-            ]
+            # Keyed by text because documents are embedded concurrently
+            doc_embeddings = {
+                "Document 1": np.array([0.9, 0.1, 0.1, 0.1]),  # doc 1
+                "Document 2": np.array([0.1, 0.9, 0.1, 0.1]),  # doc 2
+            }
+            mock_get_embedding.side_effect = doc_embeddings.__getitem__
             
             # Mock np.save to verify it's not called when cache_path is None
             with patch('numpy.save') as mock_save:
@@ -0,0 +1,113 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Benchmark CompanyIndex lookups against the previous get_cik implementation.
+
+The previous implementation re-read cik-ref.json and scored every company
+with rapidfuzz WRatio on each call. Run from this directory:
+
+    python benchmark_company_index.py --queries 200
+"""
+
+import argparse
+import json
+import random
+import time
+
+from rapidfuzz import fuzz, process, utils
+
+from lambda_function import CompanyIndex, DEFAULT_SCORE_CUTOFF
+
+DATA_FILE = "cik-ref.json"
+
+
+def legacy_get_cik(query, data_file, score_cutoff=DEFAULT_SCORE_CUTOFF):
+    with open(data_file, "r", encoding="utf-8") as f:
+        company_tickers = json.load(f)
+    choices = [company.get("title", "") for company in company_tickers.values()]
+    match = process.extractOne(
+        query,
+        choices,
+        scorer=fuzz.WRatio,
+        processor=utils.default_process,
+        score_cutoff=score_cutoff,
+    )
+    return list(company_tickers.values())[match[2]] if match else None
+
+
+def make_queries(count, seed=0):
+    """Sample company names and perturb them the way an agent might"""
+    with open(DATA_FILE, "r", encoding="utf-8") as f:
+        titles = [c["title"] for c in json.load(f).values()]
+    rng = random.Random(seed)
+    queries = []
+    for title in rng.sample(titles, count):
+        words = title.replace(",", "").replace(".", "").split()
+        variant = rng.choice(["lower", "drop_suffix", "typo", "as_is"])
+        if variant == "lower":
+            queries.append(title.lower())
+        elif variant == "drop_suffix" and len(words) > 1:
+            queries.append(" ".join(words[:-1]))
+        elif variant == "typo" and len(title) > 4:
+            i = rng.randrange(1, len(title) - 1)
+            queries.append(title[:i] + title[i + 1 :])
+        else:
+            queries.append(title)
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark company name lookups")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    queries = make_queries(args.queries)
+
+    start = time.perf_counter()
+    legacy = [legacy_get_cik(q, DATA_FILE) for q in queries]
+    legacy_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    company_index = CompanyIndex(DATA_FILE)
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = [company_index.lookup(q) for q in queries]
+    lookup_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = company_index.lookup_many(queries)
+    batch_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    exhaustive = company_index.lookup_many(queries, exhaustive=True)
+    exhaustive_s = time.perf_counter() - start
+
+    def agreement(results):
+        same = sum(
+            (a or {}).get("cik_str") == (b or {}).get("cik_str")
+            for a, b in zip(legacy, results)
+        )
+        return same / len(queries)
+
+    n = len(queries)
+    print(f"queries: {n}, companies: {len(company_index)}")
+    print(f"{'path':<24} {'total_s':>8} {'per_query_ms':>13} {'agreement':>10}")
+    print(f"{'legacy get_cik':<24} {legacy_s:>8.3f} {legacy_s / n * 1000:>13.3f} {1.0:>10.3f}")
+    print(f"{'index build (once)':<24} {build_s:>8.3f} {'':>13} {'':>10}")
+    print(
+        f"{'CompanyIndex.lookup':<24} {lookup_s:>8.3f} {lookup_s / n * 1000:>13.3f} "
+        f"{agreement(indexed):>10.3f}"
+    )
+    print(
+        f"{'CompanyIndex.lookup_many':<24} {batch_s:>8.3f} {batch_s / n * 1000:>13.3f} "
+        f"{agreement(batched):>10.3f}"
+    )
+    print(
+        f"{'lookup_many(exhaustive)':<24} {exhaustive_s:>8.3f} "
+        f"{exhaustive_s / n * 1000:>13.3f} {agreement(exhaustive):>10.3f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
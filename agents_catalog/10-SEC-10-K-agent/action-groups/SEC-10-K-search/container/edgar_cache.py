@@ -0,0 +1,560 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Local columnar cache for SEC EDGAR XBRL company concept and company facts data.
+
+Responses from the EDGAR XBRL API are flattened into one row per reported
+fact and stored as compressed NumPy column files under a local directory
+(/tmp on AWS Lambda). Entries are served locally until they are older than a
+TTL, then revalidated with a conditional GET (If-None-Match /
+If-Modified-Since) so unchanged data is not downloaded again. The directory
+is kept under a size cap by removing the least recently used files. All
+requests, retries included, share one keep-alive session and a token bucket
+that stays under SEC's limit of 10 requests per second.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+EDGAR_BASE_URL = "https://data.sec.gov/api/xbrl"
+# https://www.sec.gov/os/webmaster-faq#developers
+SEC_MAX_REQUESTS_PER_SECOND = 10
+# Responses retried through the rate limiter, honouring Retry-After
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+# String columns of the flattened fact table; "val" and "fy" are numeric
+STRING_COLUMNS = ["unit", "end", "start", "fp", "form", "filed", "frame", "accn"]
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate (float): Tokens added per second
+            capacity (float): Maximum burst size (defaults to rate)
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a token is available and consume it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def facts_to_columns(
+    units: Dict[str, List[Dict]], taxonomy: str = "", tag: str = ""
+) -> Dict[str, np.ndarray]:
+    """
+    Flatten the "units" object of an EDGAR concept into fact columns.
+
+    Args:
+        units (Dict[str, List[Dict]]): Facts keyed by unit of measure
+        taxonomy (str): Taxonomy recorded for every row
+        tag (str): Tag recorded for every row
+
+    Returns:
+        Dict[str, np.ndarray]: One array per column, one row per fact
+    """
+    rows = [(unit, fact) for unit, facts in units.items() for fact in facts]
+    columns = {
+        name: np.array([str(fact.get(name, "")) for _, fact in rows], dtype=str)
+        for name in STRING_COLUMNS
+        if name != "unit"
+    }
+    columns["unit"] = np.array([unit for unit, _ in rows], dtype=str)
+    columns["taxonomy"] = np.full(len(rows), taxonomy, dtype=f"<U{max(len(taxonomy), 1)}")
+    columns["tag"] = np.full(len(rows), tag, dtype=f"<U{max(len(tag), 1)}")
+    values = [fact.get("val", 0) for _, fact in rows]
+    columns["val"] = np.array(values, dtype=np.float64)
+    columns["val_is_int"] = np.array([isinstance(v, int) for v in values], dtype=bool)
+    columns["fy"] = np.array(
+        [fact.get("fy") if fact.get("fy") is not None else -1 for _, fact in rows],
+        dtype=np.int64,
+    )
+    return columns
+
+
+def concat_columns(tables: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Concatenate fact column tables row-wise."""
+    if not tables:
+        return facts_to_columns({})
+    return {name: np.concatenate([t[name] for t in tables]) for name in tables[0]}
+
+
+def retry_after_seconds(response: requests.Response) -> Optional[float]:
+    """The Retry-After header of a response in seconds, or None if absent or invalid."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def read_npz_rows(path: str, start: int, stop: int) -> Dict[str, np.ndarray]:
+    """
+    Read rows start to stop of every 1-D array in an .npz file except "meta",
+    without reading the other rows into memory.
+    """
+    columns = {}
+    with zipfile.ZipFile(path) as archive:
+        for member in archive.namelist():
+            name = member[: -len(".npy")]
+            if name == "meta":
+                continue
+            with archive.open(member) as f:
+                version = np.lib.format.read_magic(f)
+                if version == (1, 0):
+                    _, _, dtype = np.lib.format.read_array_header_1_0(f)
+                else:
+                    _, _, dtype = np.lib.format.read_array_header_2_0(f)
+                f.seek(start * dtype.itemsize, os.SEEK_CUR)
+                data = f.read((stop - start) * dtype.itemsize)
+            columns[name] = np.frombuffer(data, dtype=dtype)
+    return columns
+
+
+def columns_to_units(
+    columns: Dict[str, np.ndarray], mask: Optional[np.ndarray] = None
+) -> Dict[str, List[Dict]]:
+    """
+    Rebuild an EDGAR "units" object from fact columns.
+
+    Args:
+        columns (Dict[str, np.ndarray]): Fact columns
+        mask (np.ndarray): Optional boolean row selection
+
+    Returns:
+        Dict[str, List[Dict]]: Facts keyed by unit of measure, in stored order
+    """
+    rows = np.flatnonzero(mask) if mask is not None else range(len(columns["val"]))
+    units = {}
+    for i in rows:
+        fact = {
+            name: str(columns[name][i])
+            for name in STRING_COLUMNS
+            if name != "unit" and columns[name][i] != ""
+        }
+        val = columns["val"][i]
+        fact["val"] = int(val) if columns["val_is_int"][i] else float(val)
+        if columns["fy"][i] >= 0:
+            fact["fy"] = int(columns["fy"][i])
+        units.setdefault(str(columns["unit"][i]), []).append(fact)
+    return units
+
+
+class EdgarFactStore:
+    """
+    Cached access to the EDGAR XBRL companyconcept and companyfacts APIs.
+    """
+
+    def __init__(
+        self,
+        user_agent: str,
+        cache_dir: str = "/tmp/edgar-cache",
+        ttl_seconds: float = 3600,
+        max_workers: int = 8,
+        requests_per_second: float = SEC_MAX_REQUESTS_PER_SECOND,
+        max_cache_bytes: int = 256 * 1024 * 1024,
+        max_retries: int = 5,
+        backoff_seconds: float = 0.5,
+    ):
+        """
+        Args:
+            user_agent (str): User-Agent header required by SEC
+            cache_dir (str): Directory for cached column files
+            ttl_seconds (float): Age after which cached entries are revalidated
+            max_workers (int): Maximum concurrent requests in bulk mode
+            requests_per_second (float): Shared request budget for this process
+            max_cache_bytes (int): Size of cache_dir above which the least
+                                   recently used files are removed
+            max_retries (int): Retries of throttled or failed requests
+            backoff_seconds (float): First retry delay when the response has
+                                     no Retry-After header, doubled per retry
+        """
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_workers = max_workers
+        self.max_cache_bytes = max_cache_bytes
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.rate_limiter = TokenBucket(requests_per_second)
+        self.session = requests.Session()
+        self.session.headers.update(
+            {"User-Agent": user_agent, "Accept-Encoding": "gzip, deflate"}
+        )
+        # Only connection errors are retried here; retried responses go
+        # through _get so they count against the rate limiter
+        retries = Retry(total=5, backoff_factor=0.5, status_forcelist=[])
+        adapter = HTTPAdapter(
+            max_retries=retries, pool_connections=1, pool_maxsize=max_workers
+        )
+        self.session.mount("https://", adapter)
+        self.stats = {"hits": 0, "revalidated": 0, "downloaded": 0}
+        self._stats_lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    @staticmethod
+    def _load(path: str) -> Optional[Tuple[Dict[str, np.ndarray], Dict]]:
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                columns = {name: data[name] for name in data.files if name != "meta"}
+                meta = json.loads(str(data["meta"]))
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+            logger.warning(f"Ignoring unreadable cache file {path}: {str(e)}")
+            return None
+        return columns, meta
+
+    @staticmethod
+    def _load_meta(path: str) -> Optional[Dict]:
+        """The metadata of a cache file, without reading its columns."""
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                return json.loads(str(data["meta"]))
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+            logger.warning(f"Ignoring unreadable cache file {path}: {str(e)}")
+            return None
+
+    @staticmethod
+    def _touch(path: str) -> None:
+        """Mark a cache file as recently used for eviction."""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _save(self, path: str, columns: Dict[str, np.ndarray], meta: Dict) -> None:
+        # A unique temporary file per writer, so concurrent saves of the same
+        # entry never interleave before the atomic rename
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(f, meta=np.array(json.dumps(meta)), **columns)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self._evict(keep=path)
+
+    def _evict(self, keep: str) -> None:
+        """Remove the least recently used cache files until the directory fits max_cache_bytes."""
+        files = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith(".npz"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+        for _, size, path in sorted(files):
+            if total <= self.max_cache_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def _get(self, url: str, headers: Dict[str, str]) -> requests.Response:
+        """
+        GET a URL within the request budget, retrying throttled and failed
+        responses after Retry-After (or an exponential backoff).
+        """
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            response = self.session.get(url, headers=headers, timeout=30)
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return response
+            delay = retry_after_seconds(response)
+            if delay is None:
+                delay = self.backoff_seconds * 2**attempt
+            logger.warning(
+                f"{response.status_code} from {url}, retrying in {delay:.1f} seconds"
+            )
+            response.close()
+            time.sleep(delay)
+        return response
+
+    def _fetch(
+        self,
+        url: str,
+        path: str,
+        to_columns: Callable[[Dict], Tuple[Dict[str, np.ndarray], Dict]],
+        load_columns: bool = True,
+    ) -> Tuple[Optional[Dict[str, np.ndarray]], Dict]:
+        """
+        Return cached columns for a URL, revalidating or downloading as needed.
+
+        With load_columns=False a fresh cache hit returns (None, meta) without
+        reading the columns, for callers that read only some rows of path.
+        """
+        meta = self._load_meta(path) if os.path.exists(path) else None
+        if meta is not None and time.time() - meta["fetched_at"] < self.ttl_seconds:
+            cached = self._load(path) if load_columns else (None, meta)
+            if cached is not None:
+                self._touch(path)
+                self._count("hits")
+                return cached
+
+        headers = {}
+        if meta is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        response = self._get(url, headers)
+        cached = self._load(path) if response.status_code == 304 else None
+        if cached is not None:
+            columns, meta = cached
+            meta["fetched_at"] = time.time()
+            self._save(path, columns, meta)
+            self._count("revalidated")
+            return columns, meta
+        if response.status_code == 304:
+            # The cached file went away since it was checked; download it again
+            response = self._get(url, {})
+        response.raise_for_status()
+
+        columns, meta = to_columns(response.json())
+        meta.update(
+            {
+                "fetched_at": time.time(),
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            }
+        )
+        self._save(path, columns, meta)
+        self._count("downloaded")
+        return columns, meta
+
+    def get_company_concept(self, cik: str, taxonomy: str, tag: str) -> Dict:
+        """
+        Get a company concept response, from the local cache when possible.
+
+        If the full company facts for this company are cached and fresh, the
+        concept is answered from them without a request.
+
+        Args:
+            cik (str): The company CIK
+            taxonomy (str): The taxonomy, e.g. "us-gaap"
+            tag (str): The concept tag
+
+        Returns:
+            Dict: A response in the shape of the EDGAR companyconcept API
+
+        Raises:
+            requests.RequestException: If the EDGAR API request fails
+        """
+        cik = str(cik).zfill(10)
+        facts_path = os.path.join(self.cache_dir, f"CIK{cik}.facts.npz")
+        meta = self._load_meta(facts_path) if os.path.exists(facts_path) else None
+        if meta is not None and time.time() - meta["fetched_at"] < self.ttl_seconds:
+            concept = self._read_concept(facts_path, meta, taxonomy, tag)
+            if concept is not None:
+                self._touch(facts_path)
+                self._count("hits")
+                return concept
+
+        def to_columns(response: Dict) -> Tuple[Dict[str, np.ndarray], Dict]:
+            meta = {
+                "cik": response.get("cik"),
+                "entityName": response.get("entityName", ""),
+                "label": response.get("label", ""),
+                "description": response.get("description", ""),
+            }
+            return facts_to_columns(response.get("units", {}), taxonomy, tag), meta
+
+        columns, meta = self._fetch(
+            f"{EDGAR_BASE_URL}/companyconcept/CIK{cik}/{taxonomy}/{tag}.json",
+            os.path.join(self.cache_dir, f"CIK{cik}.{taxonomy}.{tag}.npz"),
+            to_columns,
+        )
+        return {
+            "cik": meta.get("cik"),
+            "taxonomy": taxonomy,
+            "tag": tag,
+            "label": meta.get("label", ""),
+            "description": meta.get("description", ""),
+            "entityName": meta.get("entityName", ""),
+            "units": columns_to_units(columns),
+        }
+
+    def get_company_facts(self, cik: str) -> Tuple[Dict[str, np.ndarray], Dict]:
+        """
+        Get all XBRL facts for a company as columns, from the local cache when possible.
+
+        Args:
+            cik (str): The company CIK
+
+        Returns:
+            Tuple[Dict[str, np.ndarray], Dict]: Fact columns (including
+            taxonomy and tag) and metadata with entityName and concept labels
+
+        Raises:
+            requests.RequestException: If the EDGAR API request fails
+        """
+        return self._company_facts(cik)
+
+    def _company_facts(
+        self, cik: str, load_columns: bool = True
+    ) -> Tuple[Optional[Dict[str, np.ndarray]], Dict]:
+        cik = str(cik).zfill(10)
+
+        def to_columns(response: Dict) -> Tuple[Dict[str, np.ndarray], Dict]:
+            tables = []
+            labels = {}
+            # Rows of each concept are contiguous; record where, so one
+            # concept can be read without the others
+            spans = {}
+            rows = 0
+            for taxonomy, concepts in response.get("facts", {}).items():
+                for tag, concept in concepts.items():
+                    table = facts_to_columns(concept.get("units", {}), taxonomy, tag)
+                    tables.append(table)
+                    labels[f"{taxonomy}/{tag}"] = concept.get("label", "")
+                    spans[f"{taxonomy}/{tag}"] = [rows, rows + len(table["val"])]
+                    rows += len(table["val"])
+            meta = {
+                "cik": response.get("cik"),
+                "entityName": response.get("entityName", ""),
+                "labels": labels,
+                "spans": spans,
+            }
+            return concat_columns(tables), meta
+
+        return self._fetch(
+            f"{EDGAR_BASE_URL}/companyfacts/CIK{cik}.json",
+            self._facts_path(cik),
+            to_columns,
+            load_columns,
+        )
+
+    def _facts_path(self, cik: str) -> str:
+        return os.path.join(self.cache_dir, f"CIK{str(cik).zfill(10)}.facts.npz")
+
+    def _read_concept(self, path: str, meta: Dict, taxonomy: str, tag: str) -> Optional[Dict]:
+        """
+        One concept from a cached companyfacts file, reading only its rows.
+
+        Returns None if the company does not report the concept or the file
+        cannot be read.
+        """
+        span = meta.get("spans", {}).get(f"{taxonomy}/{tag}")
+        if span is None:
+            # Not reported, or a file written before spans were recorded
+            cached = self._load(path) if f"{taxonomy}/{tag}" in meta.get("labels", {}) else None
+            return self._select_concept(*cached, taxonomy, tag) if cached else None
+        try:
+            columns = read_npz_rows(path, *span)
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+            logger.warning(f"Ignoring unreadable cache file {path}: {str(e)}")
+            return None
+        return self._select_concept(columns, meta, taxonomy, tag)
+
+    @staticmethod
+    def _select_concept(
+        columns: Dict[str, np.ndarray], meta: Dict, taxonomy: str, tag: str
+    ) -> Optional[Dict]:
+        label_key = f"{taxonomy}/{tag}"
+        if label_key not in meta.get("labels", {}):
+            return None
+        mask = (columns["taxonomy"] == taxonomy) & (columns["tag"] == tag)
+        return {
+            "cik": meta.get("cik"),
+            "taxonomy": taxonomy,
+            "tag": tag,
+            "label": meta["labels"][label_key],
+            "entityName": meta.get("entityName", ""),
+            "units": columns_to_units(columns, mask),
+        }
+
+    def get_concept_for_companies(
+        self, ciks: List[str], tag: str, taxonomy: str = "us-gaap"
+    ) -> List[Dict]:
+        """
+        Get one concept for many companies with one companyfacts fetch per company.
+
+        Companies are fetched concurrently (up to max_workers at a time) within
+        the shared request budget. From cached companyfacts files only the
+        concept's rows are read.
+
+        Args:
+            ciks (List[str]): Company CIKs
+            tag (str): The concept tag
+            taxonomy (str): The taxonomy ("us-gaap" by default)
+
+        Returns:
+            List[Dict]: One item per CIK, either a companyconcept-shaped
+            response or {"cik": ..., "error": ...}
+        """
+
+        def fetch_one(cik: str) -> Dict:
+            try:
+                columns, meta = self._company_facts(cik, load_columns=False)
+                if columns is not None:
+                    concept = self._select_concept(columns, meta, taxonomy, tag)
+                else:
+                    concept = self._read_concept(self._facts_path(cik), meta, taxonomy, tag)
+                    if concept is None and f"{taxonomy}/{tag}" in meta.get("labels", {}):
+                        # The file could not be read; load it whole instead
+                        concept = self._select_concept(
+                            *self.get_company_facts(cik), taxonomy, tag
+                        )
+            except requests.RequestException as e:
+                logger.error(f"Error retrieving company facts for {cik}: {str(e)}")
+                return {"cik": cik, "error": str(e)}
+            if concept is None:
+                return {"cik": cik, "error": f"No {taxonomy}:{tag} facts reported"}
+            return concept
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(fetch_one, ciks))
@@ -1,18 +1,28 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
-from bedrock_ez_search import SemanticSearch
+from bedrock_ez_search import (
+    EmbeddingCache,
+    PackedCorpus,
+    SemanticSearch,
+    read_packed_metadata,
+    write_packed_corpus,
+)
+
+from edgar_cache import EdgarFactStore
 
 import boto3
 import json
 import logging
+import numpy as np
 import os
 from pathlib import Path
 from rapidfuzz import process, fuzz, utils
 import re
 import requests
-from sec_edgar_api import EdgarClient
-from typing import Dict, Optional, List
+import threading
+import time
+from typing import Dict, Optional, List, Tuple
 import urllib
 import warnings
 
@@ -33,25 +43,225 @@ DEFAULT_SCORE_CUTOFF = (
 )
 
 # amazonq-ignore-next-line
-edgar = EdgarClient(
-    user_agent=os.environ.get("USER_AGENT", "AWS HCLS AGENTS").strip().upper()
+edgar = EdgarFactStore(
+    user_agent=os.environ.get("USER_AGENT", "AWS HCLS AGENTS").strip().upper(),
+    ttl_seconds=int(os.environ.get("EDGAR_CACHE_TTL", "3600")),
+    max_cache_bytes=int(os.environ.get("EDGAR_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
 )
 
-s3 = boto3.client("s3")
-s3.download_file(
-    "5d1a4b76751b4c8a994ce96bafd91ec9", "us-gaap/embeddings.npy", "/tmp/embeddings.npy"
-)
-s3.download_file(
-    "5d1a4b76751b4c8a994ce96bafd91ec9",
-    "us-gaap/descriptions.csv",
-    "/tmp/descriptions.csv",
-)
+TAG_INDEX_BUCKET = os.environ.get(
+    "TAG_INDEX_BUCKET", "5d1a4b76751b4c8a994ce96bafd91ec9"
+).strip()
+TAG_INDEX_EMBEDDINGS_KEY = "us-gaap/embeddings.npy"
+TAG_INDEX_DESCRIPTIONS_KEY = "us-gaap/descriptions.csv"
+TAG_INDEX_PATH = "/tmp/us-gaap-tags.ezpack"
+# Minimum number of seconds between S3 ETag checks on warm invocations
+TAG_INDEX_CHECK_INTERVAL = int(os.environ.get("TAG_INDEX_CHECK_INTERVAL", "300"))
+# Query embeddings are cached in memory and in /tmp so repeated concepts
+# ("revenue", "Revenue ") skip the Bedrock embedding call
+QUERY_CACHE_PATH = "/tmp/query-embeddings.sqlite"
+QUERY_CACHE_TTL = int(os.environ.get("QUERY_CACHE_TTL", "86400"))
 
 ##############################################################################
 # Get CIK for company name
 ##############################################################################
 
 
+def _trigrams(text: str) -> set:
+    padded = f" {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class CompanyIndex:
+    """
+    In-memory lookup index over the SEC company tickers file.
+
+    Company names are preprocessed once. Lookups first try exact name and
+    ticker matches, then narrow the candidates with a character trigram
+    inverted index before scoring them with rapidfuzz WRatio. WRatio also
+    scores token matches that share few trigrams overall, so names sharing an
+    uncommon word with the query are always candidates, and if no candidate
+    reaches the cutoff every company is scored instead.
+    """
+
+    def __init__(self, data_file: Path, max_candidates: int = 500):
+        """
+        Load and index a company tickers file.
+
+        Args:
+            data_file (Path): Path to the JSON file containing company data
+            max_candidates (int): Maximum number of trigram candidates scored
+                with WRatio for a single query
+
+        Raises:
+            FileNotFoundError: If the data_file doesn't exist
+            json.JSONDecodeError: If the data_file contains invalid JSON
+        """
+        # amazonq-ignore-next-line
+        with open(data_file, "r", encoding="utf-8") as f:
+            company_tickers = json.load(f)
+
+        self.max_candidates = max_candidates
+        self.companies = list(company_tickers.values())
+        self.names = [
+            utils.default_process(company.get("title", ""))
+            for company in self.companies
+        ]
+        self.by_name = {}
+        self.by_ticker = {}
+        postings = {}
+        words = {}
+        for i, (company, name) in enumerate(zip(self.companies, self.names)):
+            self.by_name.setdefault(name, i)
+            ticker = str(company.get("ticker", "")).strip().upper()
+            if ticker:
+                self.by_ticker.setdefault(ticker, i)
+            for trigram in _trigrams(name):
+                postings.setdefault(trigram, []).append(i)
+            for word in set(name.split()):
+                words.setdefault(word, []).append(i)
+        self.postings = {
+            trigram: np.array(ids, dtype=np.int32) for trigram, ids in postings.items()
+        }
+        # Words in at most max_candidates names; common ones ("inc") say little
+        self.words = {
+            word: np.array(ids, dtype=np.int32)
+            for word, ids in words.items()
+            if len(ids) <= max_candidates
+        }
+
+    def __len__(self) -> int:
+        return len(self.companies)
+
+    def _candidates(self, processed_query: str) -> np.ndarray:
+        lists = [
+            self.postings[t] for t in _trigrams(processed_query) if t in self.postings
+        ]
+        if not lists:
+            return np.arange(len(self.companies))
+        counts = np.bincount(np.concatenate(lists), minlength=len(self.companies))
+        candidates = np.flatnonzero(counts)
+        if len(candidates) > self.max_candidates:
+            top = np.argpartition(counts[candidates], -self.max_candidates)
+            candidates = np.sort(candidates[top[-self.max_candidates :]])
+            shared = [self.words[w] for w in set(processed_query.split()) if w in self.words]
+            if shared:
+                candidates = np.union1d(candidates, np.concatenate(shared))
+        return candidates
+
+    def _exact(self, query: str, processed_query: str) -> Optional[Dict]:
+        i = self.by_name.get(processed_query)
+        if i is None:
+            i = self.by_ticker.get(query.strip().upper())
+        return self.companies[i] if i is not None else None
+
+    def lookup(
+        self, query: str, score_cutoff: int = DEFAULT_SCORE_CUTOFF
+    ) -> Optional[Dict]:
+        """
+        Find the company that best matches a name or ticker.
+
+        Args:
+            query (str): The company name or ticker to search for
+            score_cutoff (int): Minimum similarity score threshold
+
+        Returns:
+            Optional[Dict]: Company information dictionary if found, None otherwise
+        """
+        processed_query = utils.default_process(query)
+        exact = self._exact(query, processed_query)
+        if exact is not None:
+            return exact
+
+        candidates = self._candidates(processed_query)
+        match = process.extractOne(
+            processed_query,
+            [self.names[i] for i in candidates],
+            scorer=fuzz.WRatio,
+            processor=None,
+            score_cutoff=score_cutoff,
+        )
+        if match:
+            return self.companies[candidates[match[2]]]
+        if len(candidates) == len(self.companies):
+            return None
+        match = process.extractOne(
+            processed_query,
+            self.names,
+            scorer=fuzz.WRatio,
+            processor=None,
+            score_cutoff=score_cutoff,
+        )
+        return self.companies[match[2]] if match else None
+
+    def lookup_many(
+        self,
+        queries: List[str],
+        score_cutoff: int = DEFAULT_SCORE_CUTOFF,
+        exhaustive: bool = False,
+    ) -> List[Optional[Dict]]:
+        """
+        Find the best matching company for each of several names in one call.
+
+        Exact matches are resolved directly. By default the remaining queries
+        are scored against their own trigram candidates, as in lookup(). With
+        exhaustive=True they are instead scored against every company in a
+        single multi-threaded rapidfuzz cdist call, which skips the prefilter
+        and benefits from multiple cores.
+
+        Args:
+            queries (List[str]): Company names or tickers to search for
+            score_cutoff (int): Minimum similarity score threshold
+            exhaustive (bool): Score against all companies with cdist
+
+        Returns:
+            List[Optional[Dict]]: One result per query, None where nothing matched
+        """
+        processed = [utils.default_process(q) for q in queries]
+        results = [self._exact(q, p) for q, p in zip(queries, processed)]
+        pending = [i for i, result in enumerate(results) if result is None]
+        if not pending:
+            return results
+
+        if not exhaustive:
+            for i in pending:
+                results[i] = self.lookup(queries[i], score_cutoff=score_cutoff)
+            return results
+
+        scores = process.cdist(
+            [processed[i] for i in pending],
+            self.names,
+            scorer=fuzz.WRatio,
+            processor=None,
+            score_cutoff=score_cutoff,
+            workers=-1,
+        )
+        for row, i in zip(scores, pending):
+            best = int(np.argmax(row))
+            if row[best] >= score_cutoff and row[best] > 0:
+                results[i] = self.companies[best]
+        return results
+
+
+_company_indexes: Dict[str, CompanyIndex] = {}
+
+
+def get_company_index(data_file: Path) -> CompanyIndex:
+    """
+    Return the CompanyIndex for a data file, loading it once per container.
+
+    Args:
+        data_file (Path): Path to the JSON file containing company data
+
+    Returns:
+        CompanyIndex: The shared index for that file
+    """
+    key = str(data_file)
+    if key not in _company_indexes:
+        _company_indexes[key] = CompanyIndex(data_file)
+    return _company_indexes[key]
+
+
 def get_cik(
     query: str, data_file: Path, score_cutoff: int = DEFAULT_SCORE_CUTOFF
 ) -> Optional[Dict]:
@@ -65,58 +275,40 @@ def get_cik(
 
     Returns:
         Optional[Dict]: Company information dictionary if found, None if no match or error
-
-    Raises:
-        FileNotFoundError: If the data_file doesn't exist
-        json.JSONDecodeError: If the data_file contains invalid JSON
     """
     try:
-        # amazonq-ignore-next-line
-        with open(data_file, "r", encoding="utf-8") as f:
-            company_tickers = json.load(f)
-    except IOError as e:
+        company_index = get_company_index(data_file)
+    except (IOError, json.JSONDecodeError) as e:
         logger.error(f"Error opening file {data_file}: {str(e)}")
         return None
 
-    if not company_tickers:
+    if not len(company_index):
         return None
 
-    choices = [company.get("title", "") for company in company_tickers.values()]
-
-    match = process.extractOne(
-        query,
-        choices,
-        scorer=fuzz.WRatio,
-        processor=utils.default_process,
-        score_cutoff=score_cutoff,
-    )
-    return list(company_tickers.values())[match[2]] if match else None
-
-
-##############################################################################
-# Get all company facts (all tags)
-##############################################################################
+    return company_index.lookup(query, score_cutoff=score_cutoff)
 
 
-# def get_company_facts(cik: str) -> Dict:
-#     """
-#     Retrieve all company facts for a given company CIK.
+def get_ciks(
+    queries: List[str], data_file: Path, score_cutoff: int = DEFAULT_SCORE_CUTOFF
+) -> List[Optional[Dict]]:
+    """
+    Look up the SEC Central Index Keys (CIKs) for several company names at once.
 
-#     Args:
-#         cik (str): The company CIK
+    Args:
+        queries (List[str]): The company names to search for
+        data_file (Path): Path to the JSON file containing company data
+        score_cutoff (int): Minimum similarity score threshold
 
-#     Returns:
-#         Dict: A dictionary containing all of the facts for the specified company
+    Returns:
+        List[Optional[Dict]]: Company information per query, None where no match
+    """
+    try:
+        company_index = get_company_index(data_file)
+    except (IOError, json.JSONDecodeError) as e:
+        logger.error(f"Error opening file {data_file}: {str(e)}")
+        return [None] * len(queries)
 
-#     Raises:
-#         Exception: If there's an error retrieving company facts
-#     """
-#     try:
-#         facts = edgar.get_company_facts(cik)
-#         return facts
-#     except Exception as e:
-#         logger.error(f"Error retrieving company facts: {str(e)}")
-#         raise
+    return company_index.lookup_many(queries, score_cutoff=score_cutoff)
 
 
 ##############################################################################
@@ -124,41 +316,166 @@ def get_cik(
 ##############################################################################
 
 
-def get_relevant_tags(
-    query: str,
-    top_k: int = 5,
-    index_descriptions: Path = "/tmp/descriptions.csv",
-    index_embeddings: Path = "/tmp/embeddings.npy",
-) -> Dict:
+def parse_tag_descriptions(index_descriptions: Path) -> List[Tuple[str, str, str]]:
+    """
+    Parse the tag descriptions file into (taxonomy, tag, description) records.
+
+    Args:
+        index_descriptions (Path): Path to the descriptions CSV file
+
+    Returns:
+        List[Tuple[str, str, str]]: One record per parseable line, in file order
+    """
+    pattern = re.compile(r"^([^,]+),([^,]+),(.+)$")
+    records = []
     with open(index_descriptions, "r") as f:
-        pattern = r"^([^,]+),([^,]+),(.+)$"
-        available_facts = []
         for line in f:
-            match = re.match(pattern, line.strip())
+            match = pattern.match(line.strip())
             if match:
-                taxonomy, tag, description = match.groups()
-                available_facts.append(
-                    {
-                        "taxonomy": taxonomy,
-                        "tag": tag,
-                        "description": description,
-                    }
-                )
+                records.append(match.groups())
             else:
                 logger.error(f"Error parsing line: {line.strip()}")
+    return records
+
+
+class TagIndex:
+    """
+    Process-wide tag index shared across warm Lambda invocations.
+
+    The index is built lazily on first use: the source descriptions and
+    embeddings are downloaded from S3 once and packed into a single
+    memory-mapped file. Warm invocations reuse the mapped index and only
+    re-check the S3 ETags every ``check_interval`` seconds, rebuilding when
+    the source objects change.
+    """
+
+    def __init__(
+        self,
+        bucket: str = TAG_INDEX_BUCKET,
+        descriptions_key: str = TAG_INDEX_DESCRIPTIONS_KEY,
+        embeddings_key: str = TAG_INDEX_EMBEDDINGS_KEY,
+        pack_path: str = TAG_INDEX_PATH,
+        check_interval: int = TAG_INDEX_CHECK_INTERVAL,
+    ):
+        self.bucket = bucket
+        self.descriptions_key = descriptions_key
+        self.embeddings_key = embeddings_key
+        self.pack_path = pack_path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._s3 = None
+        self._search = None
+        self._corpus = None
+        self._checked_at = 0.0
+
+    @property
+    def s3(self):
+        if self._s3 is None:
+            self._s3 = boto3.client("s3")
+        return self._s3
+
+    def _source_version(self) -> str:
+        etags = [
+            self.s3.head_object(Bucket=self.bucket, Key=key)["ETag"].strip('"')
+            for key in (self.descriptions_key, self.embeddings_key)
+        ]
+        return ":".join(etags)
+
+    def _build(self, version: str) -> None:
+        descriptions_path = f"{self.pack_path}.descriptions.csv"
+        embeddings_path = f"{self.pack_path}.embeddings.npy"
+        try:
+            self.s3.download_file(self.bucket, self.descriptions_key, descriptions_path)
+            self.s3.download_file(self.bucket, self.embeddings_key, embeddings_path)
+            records = parse_tag_descriptions(descriptions_path)
+            embeddings = np.load(embeddings_path)
+            write_packed_corpus(
+                self.pack_path, records, embeddings, metadata={"version": version}
+            )
+        finally:
+            for path in (descriptions_path, embeddings_path):
+                if os.path.exists(path):
+                    os.remove(path)
+        logger.info(f"Built tag index with {len(records)} tags (version {version})")
+
+    def _open(self) -> None:
+        self._corpus = PackedCorpus(self.pack_path)
+        if self._search is None:
+            self._search = SemanticSearch(
+                model_id="amazon.titan-embed-text-v2:0",
+                embedding_cache=EmbeddingCache(
+                    ttl_seconds=QUERY_CACHE_TTL, disk_path=QUERY_CACHE_PATH
+                ),
+            )
+        self._search.attach_index(self._corpus.field(2), self._corpus.as_index())
+
+    def get(self) -> Tuple[SemanticSearch, PackedCorpus]:
+        """
+        Return the search engine and tag records, building or refreshing them if needed.
+
+        Returns:
+            Tuple[SemanticSearch, PackedCorpus]: The search engine and the
+            (taxonomy, tag, description) records it searches over
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._corpus is not None and now - self._checked_at < self.check_interval:
+                return self._search, self._corpus
+
+            try:
+                version = self._source_version()
+            except Exception as e:
+                if self._corpus is None:
+                    raise
+                # Keep serving the index we already have if S3 is unavailable
+                logger.warning(f"Could not check tag index version: {str(e)}")
+                self._checked_at = now
+                return self._search, self._corpus
+            self._checked_at = now
+            if self._corpus is not None and self._corpus.metadata.get("version") == version:
+                return self._search, self._corpus
+
+            if not (
+                os.path.exists(self.pack_path)
+                and read_packed_metadata(self.pack_path).get("version") == version
+            ):
+                self._build(version)
+            self._open()
+            return self._search, self._corpus
+
+
+tag_index = TagIndex()
+
+
+def get_relevant_tags(query: str, top_k: int = 5) -> List[Dict]:
+    """
+    Find the XBRL tags whose descriptions are most similar to a query.
+
+    Args:
+        query (str): Natural language description of the concept
+        top_k (int): Number of tags to return
 
+    Returns:
+        List[Dict]: Matching tags with taxonomy, tag and description
+    """
     try:
-        search = SemanticSearch(
-            model_id="amazon.titan-embed-text-v2:0",  # Using v2 model
-        )
-        search.index(
-            [i["description"] for i in available_facts if i["description"] is not None],
-            embeddings_file=index_embeddings,
-        )
+        search, corpus = tag_index.get()
         hits = search.search(query, top_k=top_k)
+        logger.debug(
+            f"Query embedding cache: {search.embedding_cache.stats()}"
+        )
 
-        # Get the records in available_facts that correspond to the index values for the records in search_results
-        search_results = [available_facts[i["index"]] for i in hits]
+        # Get the tag records that correspond to the index values of the hits
+        search_results = []
+        for hit in hits:
+            taxonomy, tag, description = corpus[hit["index"]]
+            search_results.append(
+                {
+                    "taxonomy": taxonomy,
+                    "tag": tag,
+                    "description": description,
+                }
+            )
 
         return search_results
     except Exception as e:
@@ -262,18 +579,18 @@ def get_company_concept(cik: str, tag: str, taxonomy: str = "us-gaap") -> Dict:
         raise
 
 
-def format_concept_response(response: Dict) -> Dict:
+def summarize_concept(response: Dict) -> Dict:
     """
-    Format the company concept response into a human-readable string.
+    Reduce a company concept response to the framed 10-K values.
 
     Args:
         response (Dict): The company concept response dictionary
 
     Returns:
-        Dict: A dictionary containing the formatted response body
+        Dict: Entity name, label, unit and a list of date/value pairs
     """
 
-    unit, data = next(iter(response.get("units", {}).items()), [])
+    unit, data = next(iter(response.get("units", {}).items()), ("", []))
     short_data = [
         {
             "date": i.get("end", ""),
@@ -282,13 +599,26 @@ def format_concept_response(response: Dict) -> Dict:
         for i in data
         if i.get("form", "") == "10-K" and "frame" in i
     ]
-    formatted_response = {
+    return {
         "entity_name": response.get("entityName", ""),
         "label": response.get("label", ""),
         "unit": unit,
         "data": short_data,
     }
-    return json.dumps(formatted_response, separators=(",", ":"))
+
+
+def format_concept_response(response: Dict) -> Dict:
+    """
+    Format the company concept response into a human-readable string.
+
+    Args:
+        response (Dict): The company concept response dictionary
+
+    Returns:
+        Dict: A dictionary containing the formatted response body
+    """
+
+    return json.dumps(summarize_concept(response), separators=(",", ":"))
 
 
 def handle_get_company_concept(parameters: Dict):
@@ -326,6 +656,82 @@ def handle_get_company_concept(parameters: Dict):
         return {"TEXT": {"body": f"An error occurred: {str(e)}"}}
 
 
+##############################################################################
+# Get a specific tag for many companies
+##############################################################################
+
+
+def get_company_concept_bulk(
+    company_names: List[str], tag: str, taxonomy: str = "us-gaap"
+) -> List[Dict]:
+    """
+    Retrieve one concept for many companies.
+
+    Each company's facts are fetched once from the EDGAR companyfacts API
+    (concurrently, within SEC's request rate limit) and cached locally, so
+    further tags for the same companies are answered without new requests.
+
+    Args:
+        company_names (List[str]): Company names or tickers
+        tag (str): The tag to search for
+        taxonomy (str): The taxonomy to search in ("us-gaap" by default)
+
+    Returns:
+        List[Dict]: One summary per company, or an error entry
+    """
+    cik_infos = get_ciks(company_names, "cik-ref.json")
+    resolved = [
+        (name, info) for name, info in zip(company_names, cik_infos) if info is not None
+    ]
+    concepts = edgar.get_concept_for_companies(
+        [info.get("cik_str", "") for _, info in resolved], tag, taxonomy
+    )
+    concepts_by_name = {name: c for (name, _), c in zip(resolved, concepts)}
+
+    results = []
+    for name in company_names:
+        concept = concepts_by_name.get(name)
+        if concept is None:
+            results.append({"company": name, "error": "Could not find CIK"})
+        elif "error" in concept:
+            results.append({"company": name, "error": concept["error"]})
+        else:
+            results.append({"company": name, **summarize_concept(concept)})
+    return results
+
+
+def handle_get_company_concept_bulk(parameters: Dict):
+    required_params = ["company_names", "tag"]
+    missing_params = [
+        param
+        for param in required_params
+        if not next((p["value"] for p in parameters if p["name"] == param), None)
+    ]
+
+    if missing_params:
+        return {
+            "TEXT": {
+                "body": f"Missing mandatory parameter(s): {', '.join(missing_params)}"
+            }
+        }
+
+    company_names = next(
+        (param["value"] for param in parameters if param["name"] == "company_names"),
+        None,
+    )
+    company_names = [name.strip() for name in company_names.split(",") if name.strip()]
+
+    tag = next((param["value"] for param in parameters if param["name"] == "tag"), None)
+
+    try:
+        results = get_company_concept_bulk(company_names, tag)
+        logger.debug(f"EDGAR cache: {edgar.stats}")
+        return {"TEXT": {"body": json.dumps(results, separators=(",", ":"))}}
+    except Exception as e:
+        logger.error(f"Error in get_company_concept_bulk: {str(e)}")
+        return {"TEXT": {"body": f"An error occurred: {str(e)}"}}
+
+
 ##############################################################################
 # Process incoming Lambda event
 ##############################################################################
@@ -363,6 +769,8 @@ def process_event(event):
         responseBody = handle_find_relevant_tags(parameters)
     elif function == "get_company_concept":
         responseBody = handle_get_company_concept(parameters)
+    elif function == "get_company_concept_bulk":
+        responseBody = handle_get_company_concept_bulk(parameters)
     else:
         responseBody = {"TEXT": {"body": f"Function {function} not implemented"}}
 
@@ -435,3 +843,27 @@ if __name__ == "__main__":
         "AMAZON.COM, INC."
         in response["response"]["functionResponse"]["responseBody"]["TEXT"]["body"]
     )
+
+    print("Testing get_company_concept_bulk")
+    event = {
+        "messageVersion": "1.0",
+        "agent": {
+            "name": "SEC-10-K-search-agent",
+            "id": "ABCDEF",
+            "alias": "123456",
+            "version": "1",
+        },
+        "sessionId": "123456789",
+        "actionGroup": "sec-10-k-search",
+        "function": "get_company_concept_bulk",
+        "parameters": [
+            {"name": "company_names", "type": "string", "value": "pfizer, merck, AMGN"},
+            {"name": "tag", "type": "string", "value": "Revenues"},
+        ],
+    }
+    response = handler(event, None)
+    print(response)
+    assert (
+        '"company":"pfizer"'
+        in response["response"]["functionResponse"]["responseBody"]["TEXT"]["body"]
+    )
@@ -0,0 +1,66 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Tests for CompanyIndex against the previous exhaustive get_cik. Run from this directory:
+
+    PYTHONPATH=bedrock-ez-search python -m pytest test_company_index.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.join(HERE, "bedrock-ez-search"))
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+from benchmark_company_index import DATA_FILE, legacy_get_cik, make_queries  # noqa: E402
+from lambda_function import CompanyIndex  # noqa: E402
+
+
+class TestCompanyIndex(unittest.TestCase):
+    """Test cases for CompanyIndex.lookup"""
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        os.chdir(HERE)
+        self.addCleanup(os.chdir, self.cwd)
+
+    def test_matches_baseline(self):
+        """Test that fuzzy lookups agree with scoring every company on a sample of names"""
+        company_index = CompanyIndex(DATA_FILE)
+        for query in make_queries(60, seed=1) + ["Alphabet", "Berkshire", "Google"]:
+            if query.strip().upper() in company_index.by_ticker:
+                # Exact tickers are resolved directly, which the baseline did not do
+                continue
+            expected = legacy_get_cik(query, DATA_FILE)
+            actual = company_index.lookup(query)
+            self.assertEqual(
+                (actual or {}).get("cik_str"), (expected or {}).get("cik_str"), query
+            )
+
+    def test_match_sharing_few_trigrams(self):
+        """Test that a token match is found when other names share more trigrams with the query"""
+        companies = {"0": {"cik_str": 0, "ticker": "ABC", "title": "ALPHABET"}}
+        for i in range(1, 201):
+            companies[str(i)] = {
+                "cik_str": i,
+                "ticker": f"D{i}",
+                "title": f"HOLDINGS CORPORATION NUMBER {i} OF MANY MORE WORDS HERE",
+            }
+        query = "Alphabet Holdings Corporation"
+        with tempfile.TemporaryDirectory() as tmp:
+            data_file = os.path.join(tmp, "tickers.json")
+            with open(data_file, "w") as f:
+                json.dump(companies, f)
+            company_index = CompanyIndex(data_file, max_candidates=5)
+            self.assertEqual(legacy_get_cik(query, data_file)["cik_str"], 0)
+            self.assertEqual(company_index.lookup(query)["cik_str"], 0)
+            self.assertEqual(company_index.lookup_many([query])[0]["cik_str"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
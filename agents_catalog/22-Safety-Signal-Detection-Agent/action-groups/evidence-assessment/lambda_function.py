@@ -4,7 +4,7 @@ import os
 import urllib.request
 import urllib.parse
 from datetime import datetime
-import xml.etree.ElementTree as ET
+from ncbi_client import search_articles
 
 # Configure logging
 logger = logging.getLogger()
@@ -14,61 +14,18 @@ def search_pubmed(product_name, adverse_event):
     """
     Search PubMed for literature evidence
     """
-    base_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
     search_term = f'"{product_name}"[Title/Abstract] AND "{adverse_event}"[Title/Abstract] AND "adverse effects"[Subheading]'
-    search_url = f"{base_url}/esearch.fcgi"
-    params = {
-        'db': 'pubmed',
-        'term': search_term,
-        'retmax': 10,
-        'sort': 'relevance'
-    }
 
     try:
-        url = f"{search_url}?{urllib.parse.urlencode(params)}"
-        with urllib.request.urlopen(url) as response:
-            search_data = response.read()
-            root = ET.fromstring(search_data)
-            pmids = [id_elem.text for id_elem in root.findall('.//Id')]
-
-        if not pmids:
-            return []
-
-        fetch_url = f"{base_url}/efetch.fcgi"
-        fetch_params = {
-            'db': 'pubmed',
-            'id': ','.join(pmids),
-            'rettype': 'abstract',
-            'retmode': 'xml'
-        }
-
-        url = f"{fetch_url}?{urllib.parse.urlencode(fetch_params)}"
-        with urllib.request.urlopen(url) as response:
-            fetch_data = response.read()
-            root = ET.fromstring(fetch_data)
-
-        articles = []
-        for article in root.findall('.//PubmedArticle'):
-            try:
-                title = article.find('.//ArticleTitle').text
-                abstract = article.find('.//Abstract/AbstractText')
-                abstract_text = abstract.text if abstract is not None else "No abstract available"
-                year = article.find('.//DateCompleted/Year')
-                if year is None:
-                    year = article.find('.//PubDate/Year')
-                year_text = year.text if year is not None else "Year not available"
-
-                articles.append({
-                    'title': title,
-                    'abstract': abstract_text,
-                    'year': year_text,
-                    'pmid': article.find('.//PMID').text
-                })
-            except Exception as e:
-                logger.warning(f"Error parsing article: {str(e)}")
-                continue
-
-        return articles
+        return [
+            {
+                'title': article['title'],
+                'abstract': article['abstract'] or "No abstract available",
+                'year': article['year'] or "Year not available",
+                'pmid': article['pmid']
+            }
+            for article in search_articles(search_term, retmax=10, sort='relevance')
+        ]
 
     except Exception as e:
         logger.error(f"Error searching PubMed: {str(e)}")
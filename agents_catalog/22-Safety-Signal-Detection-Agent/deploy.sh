@@ -5,6 +5,9 @@
 : "${REGION:?Need REGION}"
 : "${BEDROCK_AGENT_SERVICE_ROLE_ARN:?Need BEDROCK_AGENT_SERVICE_ROLE_ARN}"
 
+# Vendor the shared NCBI E-utilities client into the evidence assessment Lambda
+pip install ../shared/ncbi-client --target action-groups/evidence-assessment --upgrade
+
 # Package
 aws cloudformation package \
   --template-file safety-signal-detection-agent-cfn.yaml \
@@ -0,0 +1,107 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""
+Benchmark the memory-mapped citation graph in lambda/citation_graph.py on a
+synthetic graph with a heavy-tailed (Zipf) citation distribution.
+
+Run from the 24-Research-agent directory:
+
+    python benchmarks/benchmark_citation_graph.py --edges 10000000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "lambda"))
+
+from citation_graph import CitationGraph, compute_pagerank  # noqa: E402
+
+
+def synthetic_edges(n_edges, n_articles, seed=0):
+    """Citing PMIDs uniform over the corpus, cited PMIDs heavily skewed towards a few"""
+    rng = np.random.default_rng(seed)
+    pmids = np.sort(rng.choice(40_000_000, size=n_articles, replace=False)) + 1
+    citing = pmids[rng.integers(0, n_articles, size=n_edges)]
+    # Rank r is cited with probability proportional to r ** (-2/3)
+    popularity = rng.permutation(n_articles)
+    cited = pmids[popularity[(n_articles * rng.random(n_edges) ** 3).astype(np.int64)]]
+    return pmids, citing, cited
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the citation graph")
+    parser.add_argument("--edges", type=int, default=10_000_000)
+    parser.add_argument("--articles", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=1000)
+    args = parser.parse_args()
+
+    pmids, citing, cited = synthetic_edges(args.edges, args.articles)
+    rng = np.random.default_rng(1)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "graph.bin")
+        _, build_s = timed(CitationGraph.build, path, citing, cited, pagerank=False)
+        graph, open_s = timed(CitationGraph, path)
+        print(
+            f"graph: {len(graph):,} nodes, {graph.num_edges:,} edges, "
+            f"{os.path.getsize(path) / 1e6:.0f} MB on disk"
+        )
+        print(f"build (no PageRank):        {build_s:8.2f} s")
+        print(f"open (memory map):          {open_s * 1000:8.2f} ms")
+
+        arrays = graph._arrays
+        _, pagerank_s = timed(
+            compute_pagerank,
+            np.asarray(arrays["indptr"]),
+            np.asarray(arrays["indices"]),
+        )
+        print(f"PageRank:                   {pagerank_s:8.2f} s")
+        _, compact_s = timed(graph.compact, pagerank=True)
+        print(f"compact with PageRank:      {compact_s:8.2f} s")
+
+        query = [str(p) for p in rng.choice(pmids, size=args.lookups)]
+        graph.in_degree(query)
+        repeats = 100
+        _, in_degree_s = timed(lambda: [graph.in_degree(query) for _ in range(repeats)])
+        _, pagerank_lookup_s = timed(
+            lambda: [graph.pagerank(query) for _ in range(repeats)]
+        )
+        print(
+            f"in_degree, {args.lookups} PMIDs:     {in_degree_s / repeats * 1e6:8.0f} us"
+        )
+        print(
+            f"pagerank, {args.lookups} PMIDs:      {pagerank_lookup_s / repeats * 1e6:8.0f} us"
+        )
+
+        # A typical search adds a few hundred new articles with ~40 references each
+        new_ids = np.arange(50_000_001, 50_000_501)
+        articles = [
+            {
+                "id": str(pmid),
+                "references": [str(r) for r in rng.choice(pmids, size=40)],
+            }
+            for pmid in new_ids
+        ]
+        _, add_s = timed(graph.add_articles, articles)
+        _, readd_s = timed(graph.add_articles, articles)
+        _, merge_s = timed(graph.compact)
+        print(f"add 500 articles (delta):   {add_s * 1000:8.2f} ms")
+        print(f"re-add same 500 (skipped):  {readd_s * 1000:8.2f} ms")
+        print(f"compact without PageRank:   {merge_s:8.2f} s")
+
+
+if __name__ == "__main__":
+    main()
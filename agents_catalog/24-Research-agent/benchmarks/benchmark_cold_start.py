@@ -0,0 +1,177 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""
+Benchmark cold and warm invocations of lambda/agent_handler.py.
+
+Run from the 24-Research-agent directory:
+
+    python benchmarks/benchmark_cold_start.py
+    python benchmarks/benchmark_cold_start.py --failing amazon.nova-pro-v1:0
+
+Bedrock is replaced by a stub with fixed latencies, and the Strands Agent
+by a stub that sleeps instead of calling a model, so no tokens are used.
+Each handler runs in a fresh interpreter, making the first invocation a
+real cold start including module imports. "legacy" reproduces the previous
+handler: list models and a test invoke on every request, then a new Agent
+per request walking the fallback chain.
+"""
+
+import argparse
+import importlib
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "lambda"))
+
+MODEL_IDS = [
+    "amazon.nova-pro-v1:0",
+    "anthropic.claude-3-5-sonnet-20241022-v2:0",
+    "anthropic.claude-3-haiku-20240307-v1:0",
+]
+
+
+class Stats:
+    list_calls = 0
+    test_invokes = 0
+    agents_created = 0
+    model_calls = 0
+
+
+class StubBedrock:
+    """bedrock and bedrock-runtime client with fixed latencies"""
+
+    def __init__(self, args):
+        self.args = args
+
+    def list_foundation_models(self):
+        Stats.list_calls += 1
+        time.sleep(self.args.list_latency)
+        return {"modelSummaries": [{"modelId": m} for m in MODEL_IDS]}
+
+    def invoke_model(self, **kwargs):
+        Stats.test_invokes += 1
+        time.sleep(self.args.invoke_latency)
+        return {}
+
+
+def stub_agent_class(args):
+    """A Strands Agent stand-in that fails for the --failing models"""
+
+    class StubAgent:
+        def __init__(self, system_prompt, tools, model):
+            Stats.agents_created += 1
+            time.sleep(args.agent_init)
+            self.model = model
+            self.messages = []
+
+        def __call__(self, prompt):
+            Stats.model_calls += 1
+            if self.model in args.failing:
+                time.sleep(args.failure_latency)
+                raise Exception(f"AccessDeniedException: no access to {self.model}")
+            time.sleep(args.answer_latency)
+            self.messages.append(prompt)
+            return f"answer from {self.model}"
+
+    return StubAgent
+
+
+def legacy_handler(agent_class, tools, boto3):
+    """The previous handler, with its per-request discovery and test invoke"""
+
+    def handler(event, _context):
+        try:
+            bedrock_client = boto3.client("bedrock", region_name="us-east-2")
+            bedrock_client.list_foundation_models()
+        except Exception as e:
+            print(f"Error listing models: {e}")
+        try:
+            bedrock_runtime = boto3.client("bedrock-runtime", region_name="us-east-2")
+            bedrock_runtime.invoke_model(
+                modelId="anthropic.claude-3-7-sonnet-20250219-v1:0", body=b"{}"
+            )
+        except Exception as e:
+            print(f"Direct Bedrock access failed: {e}")
+        last_error = None
+        for model_id in MODEL_IDS:
+            try:
+                agent = agent_class(system_prompt="", tools=tools, model=model_id)
+                return str(agent(event.get("prompt")))
+            except Exception as e:
+                last_error = e
+        return f"All model attempts failed. Last error: {last_error}"
+
+    return handler
+
+
+def run_child(args):
+    """Time import, first and warm invocations of one handler in this interpreter"""
+    import boto3
+
+    event = {"prompt": "What drives osimertinib resistance?"}
+    with patch.object(boto3, "client", lambda *a, **k: StubBedrock(args)), patch(
+        "strands.Agent", stub_agent_class(args)
+    ):
+        start = time.perf_counter()
+        if args.child == "legacy":
+            tools = [importlib.import_module(name) for name in ("search_pubmed", "read_pubmed")]
+            handler = legacy_handler(stub_agent_class(args), tools, boto3)
+        else:
+            handler = importlib.import_module("agent_handler").handler
+        imported = time.perf_counter()
+        handler(event, None)
+        first = time.perf_counter()
+        warm = []
+        for _ in range(args.repeats):
+            call_start = time.perf_counter()
+            handler(event, None)
+            warm.append(time.perf_counter() - call_start)
+    print(json.dumps({
+        "import": imported - start,
+        "first": first - imported,
+        "warm": sum(warm) / len(warm),
+        "list_calls": Stats.list_calls,
+        "test_invokes": Stats.test_invokes,
+        "agents_created": Stats.agents_created,
+        "model_calls": Stats.model_calls,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark agent_handler cold and warm starts")
+    parser.add_argument("--list-latency", type=float, default=0.4, help="list_foundation_models seconds")
+    parser.add_argument("--invoke-latency", type=float, default=0.6, help="Test invoke seconds")
+    parser.add_argument("--agent-init", type=float, default=0.05, help="Agent construction seconds")
+    parser.add_argument("--answer-latency", type=float, default=0.5, help="Agent answer seconds")
+    parser.add_argument("--failure-latency", type=float, default=0.3, help="Seconds before a failing model errors")
+    parser.add_argument("--failing", nargs="*", default=[], help="Model IDs that always fail")
+    parser.add_argument("--repeats", type=int, default=5, help="Warm invocations")
+    parser.add_argument("--child", choices=["legacy", "cached"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    print(f"{'handler':>8} {'import s':>8} {'cold call s':>11} {'warm call s':>11} "
+          f"{'list calls':>10} {'test invokes':>12} {'agents':>6} {'model calls':>11}")
+    for mode in ("legacy", "cached"):
+        output = subprocess.run(
+            [sys.executable, __file__, "--child", mode] + sys.argv[1:],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{mode:>8} {result['import']:>8.2f} {result['first']:>11.2f} {result['warm']:>11.2f} "
+            f"{result['list_calls']:>10} {result['test_invokes']:>12} "
+            f"{result['agents_created']:>6} {result['model_calls']:>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
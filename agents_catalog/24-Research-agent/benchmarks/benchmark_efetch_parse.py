@@ -0,0 +1,186 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""
+Benchmark efetch XML parsing: the previous fromstring + descendant-search
+extractor against the streaming iterparse extractor in lambda/search_pubmed.py.
+
+Run from the 24-Research-agent directory. Pass recorded efetch responses, e.g.
+
+    curl -s "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi?db=pubmed&retmode=xml&id=<pmids>" > efetch.xml
+    python benchmarks/benchmark_efetch_parse.py efetch.xml
+
+or omit them to generate synthetic responses with realistic reference lists.
+"""
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from defusedxml import ElementTree as ET
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "lambda"))
+
+import search_pubmed  # noqa: E402
+
+
+def legacy_extract(article_element):
+    """
+    The previous _extract_article_data, using .// descendant searches, with
+    the MeSH descriptors added since so both extractors return the same fields
+    """
+    article = {}
+    pmid_element = article_element.find(".//PMID")
+    if pmid_element is not None and pmid_element.text:
+        article["id"] = pmid_element.text
+    title_element = article_element.find(".//ArticleTitle")
+    if title_element is not None:
+        title_text = "".join(title_element.itertext()).strip()
+        if title_text:
+            article["title"] = title_text
+    abstract_texts = [
+        "".join(part.itertext()).strip()
+        for part in article_element.findall(".//AbstractText")
+    ]
+    abstract_texts = [text for text in abstract_texts if text]
+    if abstract_texts:
+        article["abstract"] = article["text"] = " ".join(abstract_texts)
+    authors = []
+    for author in article_element.findall(".//Author"):
+        last_name = author.find("LastName")
+        fore_name = author.find("ForeName")
+        if last_name is not None and fore_name is not None:
+            if last_name.text and fore_name.text:
+                authors.append(f"{fore_name.text} {last_name.text}")
+        elif last_name is not None and last_name.text:
+            authors.append(last_name.text)
+    if authors:
+        article["authors"] = ", ".join(authors)
+    journal_element = article_element.find(".//Journal/Title")
+    if journal_element is not None and journal_element.text:
+        article["journal"] = journal_element.text
+    pub_date_element = article_element.find(".//PubDate/Year")
+    if pub_date_element is not None and pub_date_element.text:
+        article["year"] = pub_date_element.text
+    mesh_terms = [
+        descriptor.text
+        for descriptor in article_element.findall(".//MeshHeading/DescriptorName")
+        if descriptor.text
+    ]
+    if mesh_terms:
+        article["mesh_terms"] = mesh_terms
+    pubmed_data = article_element.find("PubmedData")
+    if pubmed_data is not None:
+        article_id_list = pubmed_data.find("ArticleIdList")
+        if article_id_list is not None:
+            for article_id in article_id_list.findall("ArticleId"):
+                id_type = article_id.get("IdType")
+                if id_type == "doi" and article_id.text:
+                    article["doi"] = article_id.text
+                    article["uri"] = article["source"] = f"https://doi.org/{article_id.text}"
+                elif id_type == "pmc" and article_id.text:
+                    article["pmc"] = article_id.text
+    references = []
+    for ref in article_element.findall(".//Reference"):
+        ref_pmid_element = ref.find(".//ArticleId[@IdType='pubmed']")
+        if ref_pmid_element is not None and ref_pmid_element.text:
+            references.append(ref_pmid_element.text)
+    if references:
+        article["references"] = references
+    return article
+
+
+def legacy_parse(content):
+    root = ET.fromstring(content)
+    return [
+        article
+        for article in map(legacy_extract, root.findall(".//PubmedArticle"))
+        if article
+    ]
+
+
+def streaming_parse(content):
+    return list(search_pubmed.iter_articles(content))
+
+
+def synthetic_efetch(n_articles, seed=0):
+    """Build an efetch response shaped like PubMed's, with 20-150 references per article"""
+    rng = random.Random(seed)
+    words = "cell tumor gene expression protein immune response clinical trial patient therapy".split()
+    parts = ['<?xml version="1.0" ?>\n<PubmedArticleSet>']
+    for i in range(n_articles):
+        pmid = 30000000 + i
+        abstract = "".join(
+            f'<AbstractText Label="S{s}">{" ".join(rng.choices(words, k=60))}</AbstractText>'
+            for s in range(4)
+        )
+        authors = "".join(
+            f"<Author><LastName>Author{a}</LastName><ForeName>F{a}</ForeName></Author>"
+            for a in range(rng.randint(3, 15))
+        )
+        references = "".join(
+            f"<Reference><Citation>{' '.join(rng.choices(words, k=12))}</Citation>"
+            f'<ArticleIdList><ArticleId IdType="doi">10.1000/r{r}</ArticleId>'
+            f'<ArticleId IdType="pubmed">{rng.randint(1, 39000000)}</ArticleId></ArticleIdList></Reference>'
+            for r in range(rng.randint(20, 150))
+        )
+        parts.append(
+            f"<PubmedArticle><MedlineCitation><PMID>{pmid}</PMID><Article>"
+            f"<Journal><JournalIssue><PubDate><Year>{rng.randint(2000, 2025)}</Year></PubDate></JournalIssue>"
+            f"<Title>Journal {i % 50}</Title></Journal>"
+            f"<ArticleTitle>{' '.join(rng.choices(words, k=10))}</ArticleTitle>"
+            f"<Abstract>{abstract}</Abstract><AuthorList>{authors}</AuthorList></Article>"
+            f"<MeshHeadingList><MeshHeading><DescriptorName>Neoplasms</DescriptorName></MeshHeading></MeshHeadingList>"
+            f"</MedlineCitation><PubmedData><ArticleIdList>"
+            f'<ArticleId IdType="pubmed">{pmid}</ArticleId><ArticleId IdType="doi">10.1000/a{pmid}</ArticleId>'
+            f'<ArticleId IdType="pmc">PMC{pmid}</ArticleId></ArticleIdList>'
+            f"<ReferenceList>{references}</ReferenceList></PubmedData></PubmedArticle>"
+        )
+    parts.append("</PubmedArticleSet>")
+    return "".join(parts).encode("utf-8")
+
+
+def measure(parse, content, repeat):
+    """Best-of-repeat parse time, then peak traced memory from a separate run"""
+    elapsed = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        articles = parse(content)
+        elapsed = min(elapsed, time.perf_counter() - start)
+    tracemalloc.start()
+    parse(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return articles, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark efetch XML parsing")
+    parser.add_argument("fixtures", nargs="*", help="Recorded efetch XML responses")
+    parser.add_argument("--articles", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.fixtures:
+        fixtures = [(path, Path(path).read_bytes()) for path in args.fixtures]
+    else:
+        fixtures = [(f"synthetic-{n}", synthetic_efetch(n)) for n in args.articles]
+
+    print(
+        f"{'fixture':<20} {'MB':>6} {'legacy_s':>9} {'stream_s':>9} "
+        f"{'legacy_peak_MB':>15} {'stream_peak_MB':>15} {'match':>6}"
+    )
+    for name, content in fixtures:
+        legacy, legacy_s, legacy_peak = measure(legacy_parse, content, args.repeat)
+        streamed, stream_s, stream_peak = measure(streaming_parse, content, args.repeat)
+        print(
+            f"{name:<20} {len(content) / 1e6:>6.1f} {legacy_s:>9.3f} {stream_s:>9.3f} "
+            f"{legacy_peak / 1e6:>15.1f} {stream_peak / 1e6:>15.1f} {str(legacy == streamed):>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""
+Benchmark the hybrid BM25 + citation + recency reranker in lambda/hybrid_rank.py.
+
+Run from the 24-Research-agent directory. Pass recorded efetch responses for
+a search, e.g.
+
+    curl -s "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi?db=pubmed&retmode=xml&id=<pmids>" > efetch.xml
+    python benchmarks/benchmark_hybrid_rank.py efetch.xml --query "CRISPR gene editing"
+
+or omit them to generate a synthetic result set with abstract-length text.
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "lambda"))
+
+from hybrid_rank import BM25Index, query_terms, rank_hybrid  # noqa: E402
+from search_pubmed import iter_articles  # noqa: E402
+
+
+def synthetic_articles(n, seed=0):
+    """Articles with Zipf-distributed vocabulary, ~10 word titles and ~220 word abstracts"""
+    rng = random.Random(seed)
+    vocabulary = [f"term{i}" for i in range(20_000)]
+    weights = [1.0 / (rank + 1) for rank in range(len(vocabulary))]
+
+    def words(k):
+        return " ".join(rng.choices(vocabulary, weights=weights, k=k))
+
+    return [
+        {
+            "id": str(30_000_000 + i),
+            "title": words(rng.randint(6, 16)),
+            "abstract": words(rng.randint(120, 320)),
+            "mesh_terms": [words(2) for _ in range(rng.randint(3, 12))],
+            "year": str(rng.randint(1990, 2025)),
+            "referenced_by_count": rng.randint(0, 5),
+            "global_cited_by_count": int(rng.paretovariate(1.2)),
+        }
+        for i in range(n)
+    ]
+
+
+def best_of(repeats, fn, *args):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hybrid reranking")
+    parser.add_argument("files", nargs="*", help="Recorded efetch XML responses")
+    parser.add_argument("--query", default="term3 term40 term500 term7000")
+    parser.add_argument("--articles", type=int, default=1000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.files:
+        articles = []
+        for path in args.files:
+            with open(path, "rb") as f:
+                articles.extend(iter_articles(f))
+    else:
+        articles = synthetic_articles(args.articles)
+    terms = query_terms(args.query)
+
+    index_s = best_of(args.repeats, BM25Index, articles)
+    index = BM25Index(articles)
+    score_s = best_of(args.repeats, index.score, terms)
+    rank_s = best_of(args.repeats, lambda: rank_hybrid(list(articles), args.query))
+    print(
+        f"{len(articles)} articles, {len(index):,} distinct terms, "
+        f"{len(index.doc_ids):,} tokens, query terms {terms}"
+    )
+    print(f"build BM25 index:           {index_s * 1000:8.2f} ms")
+    print(f"score query:                {score_s * 1000:8.2f} ms")
+    print(f"rank_hybrid (end to end):   {rank_s * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""
+Benchmark question-focused passage retrieval in read_pubmed against
+summarising the whole article.
+
+Run from the 24-Research-agent directory. Pass PMC Open Access text files,
+e.g.
+
+    aws s3 cp --no-sign-request s3://pmc-oa-opendata/oa_comm/txt/all/PMC6033041.txt .
+    python benchmarks/benchmark_passages.py PMC6033041.txt --question "..."
+
+or omit them to generate a synthetic 30,000 word article. Without --bedrock,
+input tokens are estimated at 4 characters per token and no model is
+called; with --bedrock both summaries are generated and the reported tokens
+and latencies come from Amazon Bedrock.
+"""
+
+import argparse
+import io
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "lambda"))
+
+import read_pubmed as rp  # noqa: E402
+from passages import format_passages, select_passages, split_passages  # noqa: E402
+
+CHARS_PER_TOKEN = 4
+
+
+def synthetic_article(words=30_000, seed=0):
+    """An article with Zipf-distributed vocabulary and one paragraph about the default question"""
+    rng = random.Random(seed)
+    vocabulary = [f"term{i}" for i in range(20_000)]
+    weights = [1.0 / (rank + 1) for rank in range(len(vocabulary))]
+    sections = ["Abstract", "Introduction", "Methods", "Results", "Discussion"]
+    paragraphs_per_section = words // (len(sections) * 150)
+    lines = ["A synthetic article for benchmarking passage retrieval"]
+    for section in sections:
+        lines.append(section)
+        for i in range(paragraphs_per_section):
+            paragraph = " ".join(rng.choices(vocabulary, weights=weights, k=150))
+            if section == "Results" and i == paragraphs_per_section // 2:
+                paragraph += " osimertinib resistance was driven by MET amplification"
+            lines.append(paragraph + ".")
+    lines.append("References")
+    lines.extend(f"{i}. Osimertinib resistance in EGFR mutant cancer." for i in range(80))
+    return "\n".join(lines)
+
+
+class RecordingClient:
+    """Bedrock runtime client wrapper that records input tokens and latency"""
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def invoke_model(self, **kwargs):
+        start = time.perf_counter()
+        response = self.client.invoke_model(**kwargs)
+        body = response["body"].read()
+        usage = json.loads(body).get("usage", {})
+        self.calls.append((usage.get("input_tokens"), time.perf_counter() - start))
+        return dict(response, body=io.BytesIO(body))
+
+
+def summarize(recorder, content, pmcid, question=None):
+    """Input tokens and seconds of one _summarize_content call"""
+    recorder.calls.clear()
+    rp._summarize_content(content, pmcid, question)
+    return recorder.calls[-1] if recorder.calls else (0, 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark read_pubmed passage retrieval")
+    parser.add_argument("files", nargs="*", help="PMC Open Access .txt files")
+    parser.add_argument("--question", default="What drives osimertinib resistance?")
+    parser.add_argument("--bedrock", action="store_true", help="Call Amazon Bedrock")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.files:
+        articles = [(Path(path).stem, Path(path).read_text()) for path in args.files]
+    else:
+        articles = [("synthetic", synthetic_article())]
+
+    recorder = None
+    if args.bedrock:
+        recorder = RecordingClient(rp._get_bedrock_client())
+        rp._get_bedrock_client = lambda: recorder
+
+    header = f"{'article':>12} {'words':>7} {'passages':>8} {'select ms':>9} {'full tok':>9} {'focused tok':>11}"
+    if args.bedrock:
+        header += f" {'full s':>7} {'focused s':>9}"
+    print(f"question: {args.question}")
+    print(header)
+    for name, text in articles:
+        best = float("inf")
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            excerpts = format_passages(select_passages(text, args.question))
+            best = min(best, time.perf_counter() - start)
+        full = text[: rp.CONTENT_CHARACTER_LIMIT]
+        row = (
+            f"{name:>12} {len(text.split()):>7} {len(split_passages(text)):>8} "
+            f"{best * 1000:>9.1f}"
+        )
+        if args.bedrock:
+            full_tokens, full_s = summarize(recorder, text, name)
+            focused_tokens, focused_s = summarize(recorder, excerpts, name, args.question)
+            row += f" {full_tokens:>9} {focused_tokens:>11} {full_s:>7.2f} {focused_s:>9.2f}"
+        else:
+            row += f" {len(full) // CHARS_PER_TOKEN:>9} {len(excerpts) // CHARS_PER_TOKEN:>11}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,15 @@
-from typing import Any, Dict
-import read_pubmed
-import search_pubmed
+from typing import Any, Dict, List, Optional, Set
+import importlib
+import os
+import time
 from strands import Agent
 import boto3
-import os
 
 # Define a system prompt
 SYSTEM_PROMPT = """You are a life science research assistant. When given a scientific question, follow this process:
 
 1. Use the search_pubmed tool with rerank="referenced_by", max_results to 200-500, and max_records to 20-50 to find highly-cited papers. Search broadly first, then narrow down. Use temporal filters like "last 5 years"[dp] for recent work. 
-2. Use read_pubmed on the 1-2 most relevant articles from your search results to gain a better understanding of the space. Focus on highly-cited papers and reviews.
+2. Use read_pubmed on the 1-2 most relevant articles from your search results to gain a better understanding of the space. Focus on highly-cited papers and reviews. To read several articles, use read_pubmed_many with a list of PMCIDs instead of repeated read_pubmed calls. Pass the question you are reading for as question to get a faster summary focused on it.
 3. Extract and summarize the most relevant clinical findings.
 3. Return structured, well-cited information with PMID references.
 
@@ -19,89 +19,121 @@ Key guidelines:
 - Select articles strategically based on citation count and relevance.
 """
 
-def handler(event: Dict[str, Any], _context) -> str:
-    # Debug information
-    print(f"AWS_REGION environment variable: {os.environ.get('AWS_REGION', 'Not set')}")
-    print(f"AWS_DEFAULT_REGION environment variable: {os.environ.get('AWS_DEFAULT_REGION', 'Not set')}")
-    print(f"Lambda function region: {_context.invoked_function_arn.split(':')[3] if _context else 'Unknown'}")
-    
-    # List available models in this region
+# Models tried in order: Amazon Nova Pro, then Claude 3.5 Sonnet v2, then Claude 3 Haiku
+MODEL_IDS = [
+    "amazon.nova-pro-v1:0",
+    "anthropic.claude-3-5-sonnet-20241022-v2:0",
+    "anthropic.claude-3-haiku-20240307-v1:0",
+]
+
+# Tool modules, imported when the first agent is created
+TOOL_MODULES = ["search_pubmed", "read_pubmed"]
+
+# How long the list of models offered in the region is trusted
+MODEL_DISCOVERY_TTL_SECONDS = 3600
+
+# How long a model that failed is skipped before it is tried again
+MODEL_FAILURE_TTL_SECONDS = 300
+
+# Errors that say nothing about whether a model is usable
+_TRANSIENT_ERRORS = {"ThrottlingException", "ModelThrottledException", "ServiceUnavailableException"}
+
+# Model availability and agents, kept across warm invocations of the same container
+_available_models: Optional[Set[str]] = None
+_available_models_expiry = 0.0
+_failed_models: Dict[str, float] = {}
+_agents: Dict[str, Agent] = {}
+_tools: Optional[List[Any]] = None
+
+
+def _region() -> str:
+    return os.environ.get("AWS_REGION", os.environ.get("AWS_DEFAULT_REGION", "us-east-2"))
+
+
+def _discover_models() -> Optional[Set[str]]:
+    """
+    Model IDs offered in this region, listed at most once per MODEL_DISCOVERY_TTL_SECONDS.
+
+    Returns None when the list cannot be fetched, in which case every model is tried.
+    """
+    global _available_models, _available_models_expiry
+    now = time.monotonic()
+    if now < _available_models_expiry:
+        return _available_models
     try:
-        bedrock_client = boto3.client('bedrock', region_name='us-east-2')
+        bedrock_client = boto3.client('bedrock', region_name=_region())
         models = bedrock_client.list_foundation_models()
-        anthropic_models = [m for m in models['modelSummaries'] if 'anthropic' in m['modelId']]
-        print(f"Available Anthropic models in us-east-2: {[m['modelId'] for m in anthropic_models]}")
-        
-        # Check specifically for Claude 3.7 Sonnet
-        claude_37_available = any('claude-3-7-sonnet' in m['modelId'] for m in anthropic_models)
-        print(f"Claude 3.7 Sonnet available: {claude_37_available}")
-        
+        _available_models = {m['modelId'] for m in models['modelSummaries']}
+        print(f"Available models in {_region()}: {[m for m in MODEL_IDS if m in _available_models]}")
     except Exception as e:
         print(f"Error listing models: {e}")
-    
-    # Test direct Bedrock access
-    try:
-        bedrock_runtime = boto3.client('bedrock-runtime', region_name='us-east-2')
-        test_body = {
-            "anthropic_version": "bedrock-2023-05-31",
-            "max_tokens": 10,
-            "messages": [{"role": "user", "content": "Hello"}]
-        }
-        
-        response = bedrock_runtime.invoke_model(
-            modelId="anthropic.claude-3-7-sonnet-20250219-v1:0",
-            body=str(test_body).encode('utf-8')
-        )
-        print("Direct Bedrock model access successful")
-        
-    except Exception as e:
-        print(f"Direct Bedrock access failed: {e}")
-        print(f"Error type: {type(e).__name__}")
-    
-    # Try creating agent with explicit model (no region parameter)
-    try:
-        # First try Amazon Nova Pro
+        _available_models = None
+    _available_models_expiry = now + MODEL_DISCOVERY_TTL_SECONDS
+    return _available_models
+
+
+def _candidate_models() -> List[str]:
+    """Models to try, in order, skipping ones not offered here or that failed recently."""
+    available = _discover_models()
+    now = time.monotonic()
+    candidates = [
+        model_id for model_id in MODEL_IDS
+        if (available is None or model_id in available) and _failed_models.get(model_id, 0.0) <= now
+    ]
+    # If everything is ruled out, try the whole chain again rather than fail without a call
+    return candidates or list(MODEL_IDS)
+
+
+def _mark_failed(model_id: str, error: Exception):
+    """Skip a model for MODEL_FAILURE_TTL_SECONDS unless the error was transient."""
+    response = getattr(error, "response", None)
+    code = response.get("Error", {}).get("Code") if isinstance(response, dict) else None
+    if code in _TRANSIENT_ERRORS or type(error).__name__ in _TRANSIENT_ERRORS:
+        return
+    _failed_models[model_id] = time.monotonic() + MODEL_FAILURE_TTL_SECONDS
+    _agents.pop(model_id, None)
+
+
+def _get_tools() -> List[Any]:
+    """Import the tool modules on first use."""
+    global _tools
+    if _tools is None:
+        _tools = [importlib.import_module(name) for name in TOOL_MODULES]
+    return _tools
+
+
+def _get_agent(model_id: str) -> Agent:
+    """
+    The agent for a model, created once per container.
+
+    The conversation is cleared so that one request never sees another's messages.
+    """
+    agent = _agents.get(model_id)
+    if agent is None:
         agent = Agent(
             system_prompt=SYSTEM_PROMPT,
-            tools=[search_pubmed, read_pubmed],
-            model="amazon.nova-pro-v1:0"
+            tools=_get_tools(),
+            model=model_id
         )
-        print("Agent created successfully with Amazon Nova Pro")
-        
-        response = agent(event.get("prompt"))
-        return str(response)
-        
-    except Exception as e:
-        print(f"Error with Amazon Nova Pro: {e}")
-        print(f"Error type: {type(e).__name__}")
-        
-        # Try Claude 3.5 Sonnet v2 as fallback
+        _agents[model_id] = agent
+        print(f"Agent created successfully with {model_id}")
+    agent.messages = []
+    return agent
+
+
+def handler(event: Dict[str, Any], _context) -> str:
+    last_error = None
+    for model_id in _candidate_models():
         try:
-            agent = Agent(
-                system_prompt=SYSTEM_PROMPT,
-                tools=[search_pubmed, read_pubmed],
-                model="anthropic.claude-3-5-sonnet-20241022-v2:0"
-            )
-            print("Agent created successfully with Claude 3.5 Sonnet v2")
-            
+            agent = _get_agent(model_id)
             response = agent(event.get("prompt"))
+            _failed_models.pop(model_id, None)
             return str(response)
-            
-        except Exception as e2:
-            print(f"Error with Claude 3.5 Sonnet v2: {e2}")
-            
-            # Try Claude 3 Haiku as final fallback
-            try:
-                agent = Agent(
-                    system_prompt=SYSTEM_PROMPT,
-                    tools=[search_pubmed, read_pubmed],
-                    model="anthropic.claude-3-haiku-20240307-v1:0"
-                )
-                print("Agent created successfully with Claude 3 Haiku")
-                
-                response = agent(event.get("prompt"))
-                return str(response)
-                
-            except Exception as e3:
-                print(f"Error with Claude 3 Haiku: {e3}")
-                return f"All model attempts failed. Last error: {str(e3)}"
+
+        except Exception as e:
+            print(f"Error with {model_id}: {e}")
+            print(f"Error type: {type(e).__name__}")
+            _mark_failed(model_id, e)
+            last_error = e
+
+    return f"All model attempts failed. Last error: {str(last_error)}"
@@ -0,0 +1,323 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""
+Persistent cache of PubMed articles and PMC summaries shared by the
+search_pubmed and read_pubmed tools.
+
+Entries are JSON values grouped by kind and keyed by an identifier:
+
+- "article": parsed ArticleDict (including its reference list), keyed by PMID
+- "pmc": where a PMC article was found and a hash of its full text, keyed by PMCID
+- "summary": Bedrock summary of a full text, keyed by content hash, model and length
+
+The local tier is a SQLite file (under /tmp on AWS Lambda, so it survives
+warm invocations). An optional S3 tier, enabled with PUBMED_CACHE_S3_URI,
+shares entries across containers and sessions.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import boto3
+from botocore.exceptions import BotoCoreError, ClientError
+
+logger = logging.getLogger("article_store")
+
+DEFAULT_CACHE_PATH = "/tmp/pubmed-article-store.sqlite"
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Per-article lookups against S3 would cost more than a batched efetch, so by
+# default only the expensive-to-rebuild kinds are shared through S3
+DEFAULT_S3_KINDS = ("pmc", "summary")
+
+# Expired and oversize entries are trimmed every this many writes
+_TRIM_INTERVAL = 200
+
+
+class ArticleStore:
+    """
+    Thread-safe, size-bounded key/value store with a time-to-live.
+
+    Local entries are evicted least recently used first once their total size
+    exceeds max_bytes. Failures in either tier are logged and treated as
+    cache misses so that the tools keep working without the cache.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        s3_uri: Optional[str] = None,
+        s3_kinds: Iterable[str] = DEFAULT_S3_KINDS,
+    ):
+        """
+        Initialize the store.
+
+        Args:
+            path: Path to the SQLite file
+            ttl_seconds: Seconds before an entry expires (None never expires)
+            max_bytes: Maximum total size of locally cached values
+            s3_uri: Optional s3://bucket/prefix used as a shared second tier
+            s3_kinds: Entry kinds that are read from and written to S3
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.s3_kinds = frozenset(s3_kinds)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db = self._open(path)
+        self._s3_bucket, self._s3_prefix = _parse_s3_uri(s3_uri) if s3_uri else (None, None)
+        self._s3_client = None
+
+    def _open(self, path: str) -> Optional[sqlite3.Connection]:
+        try:
+            db = sqlite3.connect(path, check_same_thread=False)
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "kind TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "size INTEGER NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL, "
+                "PRIMARY KEY (kind, key))"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)"
+            )
+            db.commit()
+            return db
+        except sqlite3.Error as e:
+            logger.warning(f"Disabling local article cache {path}: {e}")
+            return None
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def get(self, kind: str, key: str) -> Optional[Any]:
+        """
+        Look up a single entry.
+
+        Args:
+            kind: Entry kind ("article", "pmc" or "summary")
+            key: Entry identifier
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        return self.get_many(kind, [key]).get(key)
+
+    def get_many(self, kind: str, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Look up several entries of the same kind.
+
+        Args:
+            kind: Entry kind
+            keys: Entry identifiers
+
+        Returns:
+            Dictionary of the keys that were found to their values
+        """
+        keys = list(dict.fromkeys(keys))
+        now = time.time()
+        found: Dict[str, Any] = {}
+
+        if self._db is not None and keys:
+            with self._lock:
+                try:
+                    rows = []
+                    # Stay well under SQLite's bound-parameter limit
+                    for i in range(0, len(keys), 500):
+                        chunk = keys[i : i + 500]
+                        rows.extend(
+                            self._db.execute(
+                                f"SELECT key, value, created_at FROM entries WHERE kind = ? "
+                                f"AND key IN ({','.join('?' * len(chunk))})",
+                                (kind, *chunk),
+                            ).fetchall()
+                        )
+                    fresh = [
+                        (key, value)
+                        for key, value, created_at in rows
+                        if not self._expired(created_at, now)
+                    ]
+                    if fresh:
+                        self._db.executemany(
+                            "UPDATE entries SET accessed_at = ? WHERE kind = ? AND key = ?",
+                            [(now, kind, key) for key, _ in fresh],
+                        )
+                        self._db.commit()
+                    found = {key: json.loads(value) for key, value in fresh}
+                except (sqlite3.Error, ValueError) as e:
+                    logger.warning(f"Article cache read failed: {e}")
+
+        if kind in self.s3_kinds and self._s3_bucket:
+            for key in keys:
+                if key in found:
+                    continue
+                entry = self._s3_get(kind, key)
+                if (
+                    isinstance(entry, dict)
+                    and "value" in entry
+                    and not self._expired(entry.get("created_at", 0), now)
+                ):
+                    found[key] = entry["value"]
+                    self._local_put(
+                        kind, [(key, entry["value"])], entry.get("created_at", now)
+                    )
+
+        return found
+
+    def put(self, kind: str, key: str, value: Any) -> None:
+        """
+        Store a single JSON-serialisable value.
+
+        Args:
+            kind: Entry kind
+            key: Entry identifier
+            value: Value to store
+        """
+        self.put_many(kind, {key: value})
+
+    def put_many(self, kind: str, items: Dict[str, Any]) -> None:
+        """
+        Store several JSON-serialisable values of the same kind.
+
+        Args:
+            kind: Entry kind
+            items: Dictionary of entry identifiers to values
+        """
+        if not items:
+            return
+        now = time.time()
+        self._local_put(kind, list(items.items()), now)
+        if kind in self.s3_kinds and self._s3_bucket:
+            for key, value in items.items():
+                self._s3_put(kind, key, {"created_at": now, "value": value})
+
+    def _local_put(self, kind: str, items, created_at: float) -> None:
+        if self._db is None:
+            return
+        now = time.time()
+        with self._lock:
+            try:
+                rows = []
+                for key, value in items:
+                    encoded = json.dumps(value)
+                    rows.append((kind, key, encoded, len(encoded), created_at, now))
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)", rows
+                )
+                self._writes += len(rows)
+                if self._writes >= _TRIM_INTERVAL:
+                    self._writes = 0
+                    self._trim(now)
+                self._db.commit()
+            except (sqlite3.Error, TypeError, ValueError) as e:
+                logger.warning(f"Article cache write failed: {e}")
+
+    def _trim(self, now: float) -> None:
+        """Drop expired entries, then least recently used ones beyond max_bytes"""
+        if self.ttl_seconds is not None:
+            self._db.execute(
+                "DELETE FROM entries WHERE created_at < ?", (now - self.ttl_seconds,)
+            )
+        self._db.execute(
+            "DELETE FROM entries WHERE rowid IN (SELECT rowid FROM ("
+            "SELECT rowid, SUM(size) OVER (ORDER BY accessed_at DESC, rowid DESC) AS running "
+            "FROM entries) WHERE running > ?)",
+            (self.max_bytes,),
+        )
+
+    def _s3(self):
+        if self._s3_client is None:
+            self._s3_client = boto3.client("s3")
+        return self._s3_client
+
+    def _s3_key(self, kind: str, key: str) -> str:
+        return f"{self._s3_prefix}{kind}/{key}.json"
+
+    def _s3_get(self, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            response = self._s3().get_object(
+                Bucket=self._s3_bucket, Key=self._s3_key(kind, key)
+            )
+            return json.loads(response["Body"].read())
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ("NoSuchKey", "404"):
+                logger.warning(f"Article cache S3 read failed for {kind}/{key}: {e}")
+        except (BotoCoreError, ValueError) as e:
+            logger.warning(f"Article cache S3 read failed for {kind}/{key}: {e}")
+        return None
+
+    def _s3_put(self, kind: str, key: str, entry: Dict[str, Any]) -> None:
+        try:
+            self._s3().put_object(
+                Bucket=self._s3_bucket,
+                Key=self._s3_key(kind, key),
+                Body=json.dumps(entry).encode("utf-8"),
+                ContentType="application/json",
+            )
+        except (BotoCoreError, ClientError) as e:
+            logger.warning(f"Article cache S3 write failed for {kind}/{key}: {e}")
+
+    def clear(self) -> None:
+        """Remove all local entries (the S3 tier is left untouched)"""
+        if self._db is None:
+            return
+        with self._lock:
+            try:
+                self._db.execute("DELETE FROM entries")
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Article cache clear failed: {e}")
+
+
+def _parse_s3_uri(uri: str) -> Tuple[str, str]:
+    """Split s3://bucket/prefix into the bucket and a prefix ending in '/'"""
+    if not uri.startswith("s3://"):
+        raise ValueError(f"Invalid S3 URI: {uri}. Expected format: s3://bucket/prefix")
+    bucket, _, prefix = uri[len("s3://") :].partition("/")
+    prefix = prefix.strip("/")
+    return bucket, f"{prefix}/" if prefix else ""
+
+
+_store: Optional[ArticleStore] = None
+_store_lock = threading.Lock()
+
+
+def get_article_store() -> Optional[ArticleStore]:
+    """
+    Return the process-wide article store, creating it on first use.
+
+    Configured with the environment variables PUBMED_CACHE_PATH (set to an
+    empty string to disable caching), PUBMED_CACHE_TTL_SECONDS,
+    PUBMED_CACHE_MAX_BYTES and PUBMED_CACHE_S3_URI.
+
+    Returns:
+        The shared ArticleStore, or None if caching is disabled
+    """
+    global _store
+    path = os.getenv("PUBMED_CACHE_PATH", DEFAULT_CACHE_PATH)
+    if not path:
+        return None
+    with _store_lock:
+        if _store is None or _store.path != path:
+            try:
+                _store = ArticleStore(
+                    path=path,
+                    ttl_seconds=float(
+                        os.getenv("PUBMED_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)
+                    ),
+                    max_bytes=int(os.getenv("PUBMED_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+                    s3_uri=os.getenv("PUBMED_CACHE_S3_URI") or None,
+                )
+            except ValueError as e:
+                logger.warning(f"Article cache disabled: {e}")
+                return None
+        return _store
@@ -0,0 +1,547 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""
+Persistent citation graph of PubMed articles, used to rank search results by
+how often each article is cited across everything fetched so far rather than
+only within the current result set.
+
+The graph is stored in compressed sparse row (CSR) form in a single file that
+is memory-mapped on load:
+
+- nodes: sorted PMIDs (int64); a PMID's position is its node index
+- indptr, indices: out-edges (citing -> cited) of each node
+- in_degree: number of articles citing each node
+- pagerank: PageRank of each node, computed offline by compact(pagerank=True)
+
+Reference lists from newly fetched articles are appended to a small delta log
+next to the file and merged into the CSR arrays once enough edges accumulate.
+
+Build or refresh the graph offline with, for example:
+
+    python citation_graph.py build edges.csv --path graph.bin
+    python citation_graph.py compact --pagerank --path graph.bin
+"""
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger("citation_graph")
+
+DEFAULT_GRAPH_PATH = "/tmp/pubmed-citation-graph.bin"
+DEFAULT_COMPACT_THRESHOLD = 100_000
+
+_MAGIC = b"PMCGRAPH"
+_VERSION = 1
+_ALIGNMENT = 64
+# Edges are packed as citing << 32 | cited, so PMIDs must fit in 32 bits
+_MAX_PMID = 2**32 - 1
+
+
+def _pmid_keys(pmids: Iterable[str]) -> np.ndarray:
+    """PMIDs as int64, with -1 for anything that is not a PMID"""
+    pmids = list(pmids)
+    try:
+        return np.fromiter(map(int, pmids), dtype=np.int64, count=len(pmids))
+    except (TypeError, ValueError):
+        return np.array(
+            [int(p) if str(p).isdigit() else -1 for p in pmids], dtype=np.int64
+        )
+
+
+def compute_pagerank(
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    damping: float = 0.85,
+    tol: float = 1e-6,
+    max_iter: int = 100,
+) -> np.ndarray:
+    """
+    Compute PageRank by power iteration over a CSR adjacency matrix.
+
+    Rank from nodes without out-edges (dangling nodes) is spread uniformly.
+
+    Args:
+        indptr: CSR row pointers, one row of out-edges per node
+        indices: CSR column indices (cited nodes)
+        damping: Probability of following a citation rather than jumping
+        tol: Stop once the L1 change between iterations falls below this
+        max_iter: Maximum number of iterations
+
+    Returns:
+        float32 PageRank per node, summing to 1
+    """
+    n = len(indptr) - 1
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+
+    out_degree = np.diff(indptr)
+    sources = np.repeat(np.arange(n, dtype=np.int32), out_degree)
+    dangling = out_degree == 0
+    inv_out_degree = np.zeros(n)
+    inv_out_degree[~dangling] = 1.0 / out_degree[~dangling]
+
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        contribution = (rank * inv_out_degree)[sources]
+        new_rank = np.bincount(indices, weights=contribution, minlength=n)
+        new_rank = damping * (new_rank + rank[dangling].sum() / n) + (1.0 - damping) / n
+        delta = np.abs(new_rank - rank).sum()
+        rank = new_rank
+        if delta < tol:
+            break
+    return rank.astype(np.float32)
+
+
+def _sorted_unique(values: np.ndarray) -> np.ndarray:
+    """Sorted unique values; sort plus mask is much faster than np.unique here"""
+    values = np.sort(values)
+    if len(values) == 0:
+        return values
+    keep = np.empty(len(values), dtype=bool)
+    keep[0] = True
+    np.not_equal(values[1:], values[:-1], out=keep[1:])
+    return values[keep]
+
+
+def _build_arrays(citing: np.ndarray, cited: np.ndarray) -> Dict[str, np.ndarray]:
+    """Build deduplicated CSR arrays from parallel arrays of citing and cited PMIDs"""
+    citing = np.asarray(citing, dtype=np.int64)
+    cited = np.asarray(cited, dtype=np.int64)
+    keep = (citing != cited) & (citing > 0) & (cited > 0)
+    keep &= (citing <= _MAX_PMID) & (cited <= _MAX_PMID)
+
+    # Pack each edge into one integer so a single sort orders edges by citing
+    # then cited PMID and exposes duplicates
+    edges = _sorted_unique((citing[keep] << 32) | cited[keep])
+    citing = edges >> 32
+    cited = edges & 0xFFFFFFFF
+    del edges
+
+    nodes = _sorted_unique(np.concatenate([_sorted_unique(citing), cited]))
+    n = len(nodes)
+    src = np.searchsorted(nodes, citing)
+    # Binary searches are far faster on sorted needles, so search cited PMIDs
+    # in sorted order and scatter the results back
+    order = np.argsort(cited)
+    dst = np.empty(len(cited), dtype=np.int32)
+    dst[order] = np.searchsorted(nodes, cited[order])
+
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return {
+        "nodes": nodes,
+        "indptr": indptr,
+        "indices": dst,
+        "in_degree": np.bincount(dst, minlength=n).astype(np.int32),
+    }
+
+
+def _write_graph(
+    path: str, arrays: Dict[str, np.ndarray], metadata: Dict[str, Any]
+) -> None:
+    """Atomically write arrays to path, each aligned for memory mapping"""
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = -(-offset // _ALIGNMENT) * _ALIGNMENT
+        layout[name] = {
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": offset,
+        }
+        offset += array.nbytes
+    header = json.dumps(
+        {"version": _VERSION, "arrays": layout, "metadata": metadata}
+    ).encode("utf-8")
+    preamble = len(_MAGIC) + 8 + len(header)
+    data_start = -(-preamble // _ALIGNMENT) * _ALIGNMENT
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".citation-graph-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_MAGIC)
+            f.write(np.uint64(len(header)).tobytes())
+            f.write(header)
+            for name, array in arrays.items():
+                f.seek(data_start + layout[name]["offset"])
+                f.write(np.ascontiguousarray(array).tobytes())
+        # Replacing the file leaves existing memory maps of the old one intact
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _read_graph(path: str):
+    """Memory-map the arrays in a graph file"""
+    with open(path, "rb") as f:
+        if f.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError(f"{path} is not a citation graph file")
+        header_length = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+        header = json.loads(f.read(header_length))
+    if header.get("version") != _VERSION:
+        raise ValueError(f"Unsupported citation graph version in {path}")
+    data_start = -(-(len(_MAGIC) + 8 + header_length) // _ALIGNMENT) * _ALIGNMENT
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        shape = tuple(spec["shape"])
+        if int(np.prod(shape)) == 0:
+            arrays[name] = np.zeros(shape, dtype=spec["dtype"])
+        else:
+            arrays[name] = np.memmap(
+                path,
+                dtype=spec["dtype"],
+                mode="r",
+                offset=data_start + spec["offset"],
+                shape=shape,
+            )
+    return arrays, header.get("metadata", {})
+
+
+class CitationGraph:
+    """
+    Memory-mapped global citation graph keyed by PMID.
+
+    Lookups are vectorised binary searches over the sorted PMID array, so
+    scoring a result set of 1000 articles takes microseconds to a millisecond.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_GRAPH_PATH,
+        compact_threshold: int = DEFAULT_COMPACT_THRESHOLD,
+    ):
+        """
+        Open (or start) a citation graph.
+
+        Args:
+            path: Graph file location; the delta log is written to path + ".delta"
+            compact_threshold: Pending edges that trigger merging the delta log into the file
+        """
+        self.path = path
+        self.delta_path = f"{path}.delta"
+        self.compact_threshold = compact_threshold
+        self._lock = threading.Lock()
+        self._pending: Dict[int, List[int]] = {}
+        self._pending_in_degree: Counter = Counter()
+        self._pending_edges = 0
+        self._load()
+
+    def _load(self) -> None:
+        empty = np.zeros(0, dtype=np.int64)
+        self._arrays = {
+            "nodes": empty,
+            "indptr": np.zeros(1, dtype=np.int64),
+            "indices": np.zeros(0, dtype=np.int32),
+            "in_degree": np.zeros(0, dtype=np.int32),
+            "pagerank": np.zeros(0, dtype=np.float32),
+        }
+        self.metadata: Dict[str, Any] = {}
+        if os.path.exists(self.path):
+            try:
+                self._arrays, self.metadata = _read_graph(self.path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable citation graph {self.path}: {e}")
+
+        self._pending.clear()
+        self._pending_in_degree.clear()
+        self._pending_edges = 0
+        if os.path.exists(self.delta_path):
+            try:
+                with open(self.delta_path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        record = json.loads(line)
+                        self._add_pending(int(record[0]), record[1])
+            except (OSError, ValueError) as e:
+                logger.warning(
+                    f"Ignoring unreadable citation graph delta {self.delta_path}: {e}"
+                )
+
+    def __len__(self) -> int:
+        return len(self._arrays["nodes"]) + sum(
+            1 for pmid in self._pending_in_degree if self._node_index(pmid) < 0
+        )
+
+    @property
+    def num_edges(self) -> int:
+        """Number of citation edges, including those not yet compacted"""
+        return len(self._arrays["indices"]) + self._pending_edges
+
+    @property
+    def has_pagerank(self) -> bool:
+        """Whether PageRank has been computed for this graph"""
+        return bool(self.metadata.get("pagerank_computed_at"))
+
+    def _node_index(self, pmid: int) -> int:
+        nodes = self._arrays["nodes"]
+        i = int(np.searchsorted(nodes, pmid))
+        return i if i < len(nodes) and nodes[i] == pmid else -1
+
+    def _lookup(self, pmids: Iterable[str]) -> np.ndarray:
+        """Node index per PMID, or -1 for PMIDs not in the compacted graph"""
+        keys = _pmid_keys(pmids)
+        nodes = self._arrays["nodes"]
+        if len(nodes) == 0:
+            return np.full(len(keys), -1, dtype=np.int64)
+        # Searching in sorted order keeps the binary searches cache-friendly
+        order = np.argsort(keys)
+        positions = np.empty(len(keys), dtype=np.int64)
+        positions[order] = np.searchsorted(nodes, keys[order])
+        positions = np.minimum(positions, len(nodes) - 1)
+        return np.where(nodes[positions] == keys, positions, -1)
+
+    def _gather(self, name: str, pmids: List[str]) -> np.ndarray:
+        """Values of a per-node array for each PMID, 0 where the PMID is not a node"""
+        values = self._arrays[name]
+        positions = self._lookup(pmids)
+        found = positions >= 0
+        result = np.zeros(len(pmids), dtype=values.dtype)
+        result[found] = values[positions[found]]
+        return result
+
+    def _has_out_edges(self, pmid: int) -> bool:
+        if pmid in self._pending:
+            return True
+        i = self._node_index(pmid)
+        indptr = self._arrays["indptr"]
+        return i >= 0 and indptr[i + 1] > indptr[i]
+
+    def _add_pending(self, pmid: int, references: Iterable[str]) -> List[int]:
+        if self._has_out_edges(pmid):
+            return []
+        cited = sorted(
+            {
+                int(ref)
+                for ref in references
+                if ref and str(ref).isdigit() and int(ref) != pmid
+            }
+        )
+        if cited:
+            self._pending[pmid] = cited
+            self._pending_in_degree.update(cited)
+            self._pending_edges += len(cited)
+        return cited
+
+    def add_articles(self, articles: Iterable[Dict[str, Any]]) -> int:
+        """
+        Record the reference lists of fetched articles.
+
+        Articles whose references are already in the graph are skipped, so this
+        is cheap to call with every result set.
+
+        Args:
+            articles: Article dictionaries with "id" and "references"
+
+        Returns:
+            Number of new citation edges recorded
+        """
+        added = 0
+        with self._lock:
+            new_records = []
+            for article in articles:
+                pmid = article.get("id")
+                if not pmid or not str(pmid).isdigit() or not article.get("references"):
+                    continue
+                cited = self._add_pending(int(pmid), article["references"])
+                if cited:
+                    new_records.append(json.dumps([int(pmid), [str(c) for c in cited]]))
+                    added += len(cited)
+
+            if new_records:
+                try:
+                    with open(self.delta_path, "a", encoding="utf-8") as f:
+                        f.write("\n".join(new_records) + "\n")
+                except OSError as e:
+                    logger.warning(f"Citation graph delta not persisted: {e}")
+
+            if self._pending_edges >= self.compact_threshold:
+                self._compact(pagerank=False)
+        return added
+
+    def in_degree(self, pmids: Iterable[str]) -> np.ndarray:
+        """
+        Number of known articles citing each PMID.
+
+        Args:
+            pmids: PubMed IDs
+
+        Returns:
+            int64 array of citation counts (0 for unknown PMIDs)
+        """
+        pmids = list(pmids)
+        with self._lock:
+            counts = self._gather("in_degree", pmids).astype(np.int64)
+            if self._pending_in_degree:
+                pending = self._pending_in_degree
+                counts += np.array(
+                    [pending.get(key, 0) for key in _pmid_keys(pmids).tolist()],
+                    dtype=np.int64,
+                )
+        return counts
+
+    def pagerank(self, pmids: Iterable[str]) -> np.ndarray:
+        """
+        PageRank of each PMID from the last offline computation.
+
+        Args:
+            pmids: PubMed IDs
+
+        Returns:
+            float32 array of PageRank scores (0 for PMIDs added since, or unknown)
+        """
+        with self._lock:
+            return self._gather("pagerank", list(pmids)).astype(np.float32)
+
+    def compact(self, pagerank: bool = False) -> None:
+        """
+        Merge pending edges into the graph file.
+
+        Args:
+            pagerank: Recompute PageRank (otherwise previous scores are carried over)
+        """
+        with self._lock:
+            self._compact(pagerank)
+
+    def _compact(self, pagerank: bool) -> None:
+        start = time.perf_counter()
+        nodes = np.asarray(self._arrays["nodes"])
+        indptr = np.asarray(self._arrays["indptr"])
+        citing = [nodes[np.repeat(np.arange(len(nodes)), np.diff(indptr))]]
+        cited = [nodes[np.asarray(self._arrays["indices"])]]
+        for pmid, references in self._pending.items():
+            citing.append(np.full(len(references), pmid, dtype=np.int64))
+            cited.append(np.asarray(references, dtype=np.int64))
+        arrays = _build_arrays(np.concatenate(citing), np.concatenate(cited))
+
+        metadata = dict(self.metadata)
+        if pagerank:
+            arrays["pagerank"] = compute_pagerank(arrays["indptr"], arrays["indices"])
+            metadata["pagerank_computed_at"] = time.time()
+        else:
+            # Carry over scores for existing nodes; new nodes score 0 until the next run
+            previous = np.asarray(self._arrays["pagerank"])
+            scores = np.zeros(len(arrays["nodes"]), dtype=np.float32)
+            if len(previous):
+                positions = np.searchsorted(arrays["nodes"], nodes)
+                scores[positions] = previous
+            arrays["pagerank"] = scores
+        metadata["compacted_at"] = time.time()
+
+        try:
+            _write_graph(self.path, arrays, metadata)
+            if os.path.exists(self.delta_path):
+                os.remove(self.delta_path)
+        except OSError as e:
+            logger.warning(f"Citation graph not persisted: {e}")
+            self._arrays, self.metadata = arrays, metadata
+        else:
+            self._arrays, self.metadata = _read_graph(self.path)
+        self._pending.clear()
+        self._pending_in_degree.clear()
+        self._pending_edges = 0
+        logger.info(
+            f"Compacted citation graph to {len(arrays['nodes'])} nodes and "
+            f"{len(arrays['indices'])} edges in {time.perf_counter() - start:.2f}s"
+        )
+
+    @classmethod
+    def build(
+        cls, path: str, citing: np.ndarray, cited: np.ndarray, pagerank: bool = True
+    ) -> "CitationGraph":
+        """
+        Build a graph file from edge arrays, replacing any existing graph.
+
+        Args:
+            path: Graph file location
+            citing: PMIDs of citing articles
+            cited: PMIDs of the articles they cite, parallel to citing
+            pagerank: Compute PageRank as part of the build
+
+        Returns:
+            The opened CitationGraph
+        """
+        arrays = _build_arrays(citing, cited)
+        metadata: Dict[str, Any] = {"compacted_at": time.time()}
+        if pagerank:
+            arrays["pagerank"] = compute_pagerank(arrays["indptr"], arrays["indices"])
+            metadata["pagerank_computed_at"] = time.time()
+        else:
+            arrays["pagerank"] = np.zeros(len(arrays["nodes"]), dtype=np.float32)
+        _write_graph(path, arrays, metadata)
+        if os.path.exists(f"{path}.delta"):
+            os.remove(f"{path}.delta")
+        return cls(path)
+
+
+_graph: Optional[CitationGraph] = None
+_graph_lock = threading.Lock()
+
+
+def get_citation_graph() -> Optional[CitationGraph]:
+    """
+    Return the process-wide citation graph, opening it on first use.
+
+    Configured with PUBMED_CITATION_GRAPH_PATH (set to an empty string to
+    disable the graph).
+
+    Returns:
+        The shared CitationGraph, or None if disabled
+    """
+    global _graph
+    path = os.getenv("PUBMED_CITATION_GRAPH_PATH", DEFAULT_GRAPH_PATH)
+    if not path:
+        return None
+    with _graph_lock:
+        if _graph is None or _graph.path != path:
+            _graph = CitationGraph(path)
+        return _graph
+
+
+def main() -> None:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--path", default=DEFAULT_GRAPH_PATH, help="Graph file location"
+    )
+    parser = argparse.ArgumentParser(
+        description="Build or compact a PubMed citation graph"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser(
+        "build", parents=[common], help="Build from a citing,cited PMID CSV file"
+    )
+    build.add_argument(
+        "edges", help="CSV file with one citing,cited PMID pair per line"
+    )
+    build.add_argument("--no-pagerank", action="store_true")
+    compact = commands.add_parser(
+        "compact", parents=[common], help="Merge the delta log into the graph"
+    )
+    compact.add_argument("--pagerank", action="store_true", help="Recompute PageRank")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        edges = np.loadtxt(
+            args.edges, delimiter=",", dtype=np.int64, ndmin=2, comments="#"
+        )
+        graph = CitationGraph.build(
+            args.path, edges[:, 0], edges[:, 1], pagerank=not args.no_pagerank
+        )
+    else:
+        graph = CitationGraph(args.path)
+        graph.compact(pagerank=args.pagerank)
+    print(f"{args.path}: {len(graph)} articles, {graph.num_edges} citations")
+
+
+if __name__ == "__main__":
+    main()
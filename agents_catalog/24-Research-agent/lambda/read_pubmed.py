@@ -4,11 +4,18 @@
 import boto3
 from botocore.exceptions import ClientError, NoCredentialsError
 from dataclasses import dataclass
+import hashlib
 import json
 import logging
 import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from strands import tool
-from typing import Optional
+from typing import List, Optional
+
+from article_store import get_article_store
+from passages import format_passages, question_key, select_passages
 
 logger = logging.getLogger("read_pubmed")
 
@@ -21,6 +28,18 @@ BEDROCK_MODEL_ID = "us.anthropic.claude-3-7-sonnet-20250219-v1:0"
 MAX_SUMMARY_TOKENS = 1000  # Limit for summary generation
 TARGET_SUMMARY_LENGTH = 2000  # Target character count for summaries
 
+# PMC Open Access Subset location
+PMC_BUCKET = "pmc-oa-opendata"
+PMC_BUCKET_REGION = "us-east-2"
+
+# Concurrency limits for read_pubmed_many
+MAX_BATCH_ARTICLES = 10
+S3_MAX_CONCURRENCY = 16
+SUMMARY_MAX_CONCURRENCY = 4
+
+# Number of summaries memoized in-process, in front of the article store
+SUMMARY_MEMO_SIZE = 256
+
 
 class PMCError(Exception):
     """Base exception for PMC-related errors"""
@@ -145,6 +164,60 @@ class PMCArticleResponse:
         return result
 
 
+_clients = {}
+_clients_lock = threading.Lock()
+_summary_memo: "OrderedDict[str, str]" = OrderedDict()
+_summary_memo_lock = threading.Lock()
+
+
+def _get_s3_client():
+    """
+    Return the shared anonymous S3 client for the PMC Open Access bucket
+
+    Returns:
+        botocore client: S3 client reused across calls and threads
+    """
+    from botocore import UNSIGNED
+    from botocore.config import Config
+
+    with _clients_lock:
+        if "s3" not in _clients:
+            _clients["s3"] = boto3.client(
+                "s3",
+                region_name=PMC_BUCKET_REGION,
+                # Configure for anonymous access
+                config=Config(
+                    signature_version=UNSIGNED,
+                    max_pool_connections=S3_MAX_CONCURRENCY,
+                ),
+            )
+        return _clients["s3"]
+
+
+def _get_bedrock_client():
+    """
+    Return the shared Amazon Bedrock runtime client used for summarization
+
+    Returns:
+        botocore client: bedrock-runtime client reused across calls and threads
+    """
+    from botocore.config import Config
+
+    with _clients_lock:
+        if "bedrock-runtime" not in _clients:
+            # Configure extended timeout for long-running AI synthesis requests
+            bedrock_config = Config(
+                read_timeout=3600,  # 3600 seconds (1 hour) for long AI processing
+                connect_timeout=60,  # 60 seconds for connection establishment
+                retries={"max_attempts": 3, "mode": "standard"},
+                max_pool_connections=SUMMARY_MAX_CONCURRENCY,
+            )
+            _clients["bedrock-runtime"] = boto3.Session().client(
+                "bedrock-runtime", config=bedrock_config
+            )
+        return _clients["bedrock-runtime"]
+
+
 def _validate_pmcid(pmcid: str) -> bool:
     """
     Validate PMCID format: PMC followed by digits
@@ -243,19 +316,7 @@ def _download_from_s3(bucket: str, key: str) -> str:
     s3_path = f"s3://{bucket}/{key}"
 
     try:
-        # Configure S3 client for anonymous access
-        from botocore import UNSIGNED
-        from botocore.config import Config
-
-        logger.debug(f"Configuring S3 client for anonymous access to {s3_path}")
-
-        s3_client = boto3.client(
-            "s3",
-            # Use us-east-2 region for PMC Open Access bucket
-            region_name="us-east-2",
-            # Configure for anonymous access
-            config=Config(signature_version=UNSIGNED),
-        )
+        s3_client = _get_s3_client()
 
         logger.info(f"Attempting to download {s3_path}")
 
@@ -362,29 +423,59 @@ def _create_error_response(
 
 
 def _create_success_response(
-    content: str, pmcid: str, license_type: str, s3_path: str, source: str = None
+    content: str,
+    pmcid: str,
+    license_type: str,
+    s3_path: str,
+    source: str = None,
+    question: Optional[str] = None,
 ) -> PMCArticleResponse:
     """
     Create standardized success response with summarized content
 
+    With a question, only the passages most relevant to it are summarized,
+    and they are returned as they are if summarization fails.
+
     Args:
         content: Article full text content
         pmcid: Original PMCID
         license_type: License type (commercial/non_commercial)
         s3_path: S3 path where article was found
         source: Optional DOI URL to include in response
+        question: Optional question to focus the summary on
 
     Returns:
         PMCArticleResponse: Standardized success response with summarized content
     """
+    # Reuse a stored summary of identical content from the same model
+    summary_key = _summary_key(_content_hash(content), question)
+    summarized_content = _lookup_summary(summary_key)
+
     # Summarize content for optimal report generation
-    try:
-        summarized_content = _summarize_content(content, pmcid)
-        logger.info(f"Content summarization successful for {pmcid}")
-    except Exception as e:
-        logger.error(f"Content summarization failed for {pmcid}: {str(e)}")
-        # Use fallback summarization
-        summarized_content = _fallback_summarization(content, pmcid)
+    if summarized_content is not None:
+        logger.info(f"Using stored summary for {pmcid}")
+    else:
+        if question:
+            excerpts = format_passages(select_passages(content, question))
+            if excerpts:
+                content = excerpts
+                logger.info(
+                    f"Selected {len(content)} chars of passages from {pmcid} for the question"
+                )
+            else:
+                # e.g. every section was back matter; summarize the whole text
+                logger.info(f"No passages selected from {pmcid}, using the full text")
+        try:
+            summarized_content = _summarize_content(content, pmcid, question)
+            logger.info(f"Content summarization successful for {pmcid}")
+            # Only model summaries are stored, so a failed call is retried next time
+            _remember_summary(summary_key, summarized_content)
+        except Exception as e:
+            logger.error(f"Content summarization failed for {pmcid}: {str(e)}")
+            # The selected passages already are a focused excerpt
+            summarized_content = (
+                content if question else _fallback_summarization(content, pmcid)
+            )
 
     return PMCArticleResponse(
         status="success",
@@ -512,22 +603,97 @@ def _format_licensing_restriction_message(pmcid: str) -> str:
     return f"Article {pmcid} is available in PMC Open Access Subset but not licensed for commercial use"
 
 
-def _summarize_content(content: str, pmcid: str) -> str:
+def _content_hash(content: str) -> str:
     """
-    Summarize article content using Amazon Bedrock for optimal report generation.
+    Hash article text so that summaries are keyed by content rather than location
 
     Args:
         content: Full text content of the article
+
+    Returns:
+        str: Hex SHA-256 digest of the content
+    """
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _summary_key(content_hash: str, question: Optional[str] = None) -> str:
+    """
+    Build the article store key for a summary of some content
+
+    Args:
+        content_hash: Hash of the full text from _content_hash
+        question: Optional question the summary focuses on
+
+    Returns:
+        str: Key combining the content hash, model, target summary length and question
+    """
+    key = f"{content_hash}:{BEDROCK_MODEL_ID}:{TARGET_SUMMARY_LENGTH}"
+    return f"{key}:{question_key(question)}" if question else key
+
+
+def _lookup_summary(summary_key: str) -> Optional[str]:
+    """
+    Find a memoized summary in-process or in the article store
+
+    Args:
+        summary_key: Key from _summary_key
+
+    Returns:
+        str: The summary, or None if it has not been generated before
+    """
+    with _summary_memo_lock:
+        if summary_key in _summary_memo:
+            _summary_memo.move_to_end(summary_key)
+            return _summary_memo[summary_key]
+
+    store = get_article_store()
+    summary = store.get("summary", summary_key) if store else None
+    if not summary:
+        return None
+    _remember_summary(summary_key, summary, persist=False)
+    return summary
+
+
+def _remember_summary(summary_key: str, summary: str, persist: bool = True) -> None:
+    """
+    Memoize a summary in-process and, optionally, in the article store
+
+    Args:
+        summary_key: Key from _summary_key
+        summary: Generated summary
+        persist: Whether to also write the summary to the article store
+    """
+    if not summary or not summary.strip():
+        # An empty summary would be served for every later request
+        logger.warning(f"Not storing empty summary {summary_key}")
+        return
+
+    with _summary_memo_lock:
+        _summary_memo[summary_key] = summary
+        _summary_memo.move_to_end(summary_key)
+        while len(_summary_memo) > SUMMARY_MEMO_SIZE:
+            _summary_memo.popitem(last=False)
+
+    store = get_article_store() if persist else None
+    if store is not None:
+        store.put("summary", summary_key, summary)
+
+
+def _summarize_content(content: str, pmcid: str, question: Optional[str] = None) -> str:
+    """
+    Summarize article content using Amazon Bedrock for optimal report generation.
+
+    Args:
+        content: Full text content of the article, or passages selected for question
         pmcid: PMC identifier for logging purposes
+        question: Optional question to focus the summary on
 
     Returns:
         str: Summarized content limited to approximately 2000 characters
 
     Raises:
-        Exception: If summarization fails, returns truncated original content
+        Exception: If summarization fails; callers fall back to _fallback_summarization
     """
-    from botocore.config import Config
-
     logger.info(f"Starting content summarization for {pmcid}")
 
     # Handle edge cases for very short content
@@ -547,19 +713,9 @@ def _summarize_content(content: str, pmcid: str) -> str:
         )
 
     try:
-        # Initialize Amazon Bedrock client
+        # Get the shared Amazon Bedrock client
         try:
-            # Configure extended timeout for long-running AI synthesis requests
-            bedrock_config = Config(
-                read_timeout=3600,  # 3600 seconds (1 hour) for long AI processing
-                connect_timeout=60,  # 60 seconds for connection establishment
-                retries={"max_attempts": 3, "mode": "standard"},
-            )
-
-            boto_session = boto3.Session()
-            bedrock_client = boto_session.client(
-                "bedrock-runtime", config=bedrock_config
-            )
+            bedrock_client = _get_bedrock_client()
             logger.debug(f"Initialized Bedrock client for {pmcid}")
         except NoCredentialsError as e:
             logger.error(f"AWS credentials not found for summarization of {pmcid}")
@@ -573,14 +729,25 @@ def _summarize_content(content: str, pmcid: str) -> str:
             ) from e
 
         # Prepare summarization prompt
-        prompt = (
-            f"Please provide a concise scientific summary of the following research article. "
-            f"Focus on key findings, methodology, and conclusions. "
-            f"Preserve scientific accuracy and important details. "
-            f"Limit the summary to approximately {TARGET_SUMMARY_LENGTH} characters. "
-            f"Maintain the technical language appropriate for researchers.\n\n"
-            f"Article content:\n{content}"
-        )
+        if question:
+            prompt = (
+                f"The following excerpts were selected from a research article for the question: {question}\n"
+                f"Please summarize what they say that is relevant to the question, "
+                f"including findings, methods and figures that bear on it. "
+                f"Preserve scientific accuracy and important details, and say so if the excerpts do not answer it. "
+                f"Limit the summary to approximately {TARGET_SUMMARY_LENGTH} characters. "
+                f"Maintain the technical language appropriate for researchers.\n\n"
+                f"Article excerpts:\n{content}"
+            )
+        else:
+            prompt = (
+                f"Please provide a concise scientific summary of the following research article. "
+                f"Focus on key findings, methodology, and conclusions. "
+                f"Preserve scientific accuracy and important details. "
+                f"Limit the summary to approximately {TARGET_SUMMARY_LENGTH} characters. "
+                f"Maintain the technical language appropriate for researchers.\n\n"
+                f"Article content:\n{content}"
+            )
 
         # Prepare request body
         request_body = {
@@ -622,13 +789,13 @@ def _summarize_content(content: str, pmcid: str) -> str:
         error_code = e.response.get("Error", {}).get("Code", "Unknown")
         error_message = e.response.get("Error", {}).get("Message", str(e))
         logger.error(f"Bedrock API error for {pmcid} ({error_code}): {error_message}")
-        # Fall back to truncated content
-        return _fallback_summarization(content, pmcid)
+        # Let the caller fall back to truncated content
+        raise
 
     except Exception as e:
         logger.error(f"Unexpected error during summarization for {pmcid}: {str(e)}")
-        # Fall back to truncated content
-        return _fallback_summarization(content, pmcid)
+        # Let the caller fall back to truncated content
+        raise
 
 
 def _fallback_summarization(content: str, pmcid: str) -> str:
@@ -715,14 +882,95 @@ def _fallback_summarization(content: str, pmcid: str) -> str:
     return content
 
 
+def _store_location(
+    store, pmcid: str, license_type: str, s3_path: str, content: Optional[str] = None
+) -> None:
+    """
+    Record where a PMC article was found, and a hash of its text, in the article store
+
+    Args:
+        store: The shared ArticleStore, or None if caching is disabled
+        pmcid: PMC identifier
+        license_type: License type (commercial/non_commercial)
+        s3_path: S3 path where the article was found
+        content: Full text for commercial articles
+    """
+    if store is None:
+        return
+    record = {"license_type": license_type, "s3_path": s3_path}
+    if content is not None:
+        record["content_hash"] = _content_hash(content)
+    store.put("pmc", pmcid, record)
+
+
+def _tool_result(pmcid: str, source: Optional[str], text: str) -> dict:
+    """
+    Build the simplified read_pubmed result object
+
+    Args:
+        pmcid: PMC identifier
+        source: Optional DOI URL provided by the caller
+        text: Summary or status message
+
+    Returns:
+        dict: Object with "source" and "text" keys
+    """
+    return {
+        "source": source or f"https://www.ncbi.nlm.nih.gov/pmc/articles/{pmcid}/",
+        "text": text,
+    }
+
+
+def _read_from_store(
+    store, pmcid: str, source: Optional[str], question: Optional[str] = None
+) -> Optional[dict]:
+    """
+    Build a read_pubmed result from the article store, if possible
+
+    Args:
+        store: The shared ArticleStore
+        pmcid: Validated PMC identifier
+        source: Optional DOI URL to include in the response
+        question: Optional question the summary should focus on
+
+    Returns:
+        dict: read_pubmed result, or None if the article must be fetched
+    """
+    record = store.get("pmc", pmcid)
+    if record is None:
+        return None
+
+    if record.get("license_type") == "non_commercial":
+        logger.info(f"Using stored licensing status for {pmcid}")
+        response = _create_licensing_response(pmcid, record["s3_path"], source)
+        return {
+            "source": source or f"https://www.ncbi.nlm.nih.gov/pmc/articles/{pmcid}/",
+            "text": response.message,
+        }
+
+    if record.get("license_type") == "commercial" and record.get("content_hash"):
+        summary = _lookup_summary(_summary_key(record["content_hash"], question))
+        if summary is not None:
+            logger.info(f"Using stored summary for {pmcid}")
+            return {
+                "source": source
+                or f"https://www.ncbi.nlm.nih.gov/pmc/articles/{pmcid}/",
+                "text": summary,
+            }
+
+    return None
+
+
 @tool
-def read_pubmed(pmcid: str, source: str = None) -> dict:
+def read_pubmed(pmcid: str, source: str = None, question: str = None) -> dict:
     """
     Retrieve full text of PMC article from S3.
 
     Args:
         pmcid: PMC identifier (e.g., "PMC6033041")
         source: Optional DOI URL to include in the response for citation purposes
+        question: Optional question you are reading the article for; the summary
+            then covers only the passages most relevant to it, which is much faster
 
     Returns:
         dict: Object with "source" (DOI/URL) and "text" (content/summary) keys
@@ -743,12 +991,18 @@ def read_pubmed(pmcid: str, source: str = None) -> dict:
             )
 
         # S3 configuration
-        bucket = "pmc-oa-opendata"
+        bucket = PMC_BUCKET
         commercial_key = f"oa_comm/txt/all/{pmcid}.txt"
         noncommercial_key = f"oa_noncomm/txt/all/{pmcid}.txt"
         commercial_s3_path = f"s3://{bucket}/{commercial_key}"
         noncommercial_s3_path = f"s3://{bucket}/{noncommercial_key}"
 
+        # Answer repeat requests from the article store without S3 or Bedrock
+        store = get_article_store()
+        cached = _read_from_store(store, pmcid, source, question) if store else None
+        if cached is not None:
+            return cached
+
         # Step 3: Check commercial bucket first (priority)
         try:
             logger.debug(f"Checking commercial bucket for {pmcid}")
@@ -756,8 +1010,9 @@ def read_pubmed(pmcid: str, source: str = None) -> dict:
 
             logger.info(f"Successfully retrieved commercial article {pmcid}")
             response = _create_success_response(
-                content, pmcid, "commercial", commercial_s3_path, source
+                content, pmcid, "commercial", commercial_s3_path, source, question
             )
+            _store_location(store, pmcid, "commercial", commercial_s3_path, content)
             # Return simplified object with just source and text
             logger.info(
                 f"Content summary:\n#############################\n{response.content[:1000]}...\n#############################"
@@ -782,18 +1037,14 @@ def read_pubmed(pmcid: str, source: str = None) -> dict:
             logger.info(f"Checking non-commercial bucket for {pmcid}")
             # We don't actually download the content for non-commercial articles
             # Just check if it exists by attempting to get object metadata
-            from botocore import UNSIGNED
-            from botocore.config import Config
-
-            s3_client = boto3.client(
-                "s3", region_name="us-east-2", config=Config(signature_version=UNSIGNED)
-            )
+            s3_client = _get_s3_client()
 
             # Use head_object to check existence without downloading content
             s3_client.head_object(Bucket=bucket, Key=noncommercial_key)
 
             logger.info(f"Found non-commercial article {pmcid}")
             response = _create_licensing_response(pmcid, noncommercial_s3_path, source)
+            _store_location(store, pmcid, "non_commercial", noncommercial_s3_path)
             # Return simplified object with licensing restriction message
             return {
                 "source": source
@@ -886,6 +1137,184 @@ def read_pubmed(pmcid: str, source: str = None) -> dict:
         }
 
 
+def _head_object(bucket: str, key: str) -> None:
+    """
+    Check that an object exists without downloading it
+
+    Args:
+        bucket: S3 bucket name
+        key: S3 object key
+
+    Raises:
+        ClientError: If the object does not exist or cannot be accessed
+    """
+    _get_s3_client().head_object(Bucket=bucket, Key=key)
+
+
+def _batch_outcome(
+    pmcid: str, download, probe, summary_pool, question: Optional[str] = None
+) -> dict:
+    """
+    Resolve one article of a batch once its commercial download has finished
+
+    Args:
+        pmcid: PMC identifier
+        download: Future for the commercial-prefix download
+        probe: Future for the non-commercial head_object probe
+        summary_pool: Executor used for summarization
+        question: Optional question to focus the summary on
+
+    Returns:
+        dict: Either {"summary": future} or {"text": message}
+    """
+    commercial_s3_path = f"s3://{PMC_BUCKET}/oa_comm/txt/all/{pmcid}.txt"
+    noncommercial_s3_path = f"s3://{PMC_BUCKET}/oa_noncomm/txt/all/{pmcid}.txt"
+    store = get_article_store()
+
+    try:
+        content = download.result()
+    except PMCS3Error as e:
+        if "not found" not in str(e).lower():
+            logger.error(f"S3 error accessing commercial bucket: {str(e)}")
+            return {"text": _format_s3_error_message(pmcid, str(e))}
+    else:
+        logger.info(f"Successfully retrieved commercial article {pmcid}")
+        _store_location(store, pmcid, "commercial", commercial_s3_path, content)
+        return {
+            "summary": summary_pool.submit(
+                _create_success_response,
+                content,
+                pmcid,
+                "commercial",
+                commercial_s3_path,
+                None,
+                question,
+            )
+        }
+
+    try:
+        probe.result()
+    except ClientError as e:
+        error_code = e.response.get("Error", {}).get("Code", "Unknown")
+        if error_code in ["NoSuchKey", "404"]:
+            logger.info(
+                f"Article {pmcid} not found in either commercial or non-commercial buckets"
+            )
+            return {"text": _format_not_found_message(pmcid)}
+        error_message = e.response.get("Error", {}).get("Message", str(e))
+        return {
+            "text": _format_s3_error_message(
+                pmcid, f"S3 access error during non-commercial check: {error_message}"
+            )
+        }
+    except Exception as e:
+        return {
+            "text": _format_s3_error_message(
+                pmcid, f"Unexpected error during non-commercial check: {str(e)}"
+            )
+        }
+
+    logger.info(f"Found non-commercial article {pmcid}")
+    _store_location(store, pmcid, "non_commercial", noncommercial_s3_path)
+    return {"text": _format_licensing_restriction_message(pmcid)}
+
+
+@tool
+def read_pubmed_many(
+    pmcids: List[str], sources: Optional[List[str]] = None, question: str = None
+) -> list:
+    """
+    Retrieve and summarize several PMC articles from S3 in parallel.
+
+    Use this instead of repeated read_pubmed calls when reading more than one article.
+
+    Args:
+        pmcids: PMC identifiers (e.g., ["PMC6033041", "PMC5334499"]), at most 10
+        sources: Optional DOI URLs, one per PMCID in the same order, to include in the responses
+        question: Optional question you are reading the articles for; each summary
+            then covers only the passages most relevant to it
+
+    Returns:
+        list: One object per PMCID, in the same order, with "source" (DOI/URL) and "text" (content/summary) keys
+    """
+    if not isinstance(pmcids, list) or not pmcids:
+        return [
+            {"source": None, "text": "pmcids must be a non-empty list of PMC identifiers"}
+        ]
+    if len(pmcids) > MAX_BATCH_ARTICLES:
+        return [
+            {
+                "source": None,
+                "text": f"Too many articles requested ({len(pmcids)}). Request at most {MAX_BATCH_ARTICLES} at a time.",
+            }
+        ]
+
+    logger.info(f"Starting read_pubmed_many for {len(pmcids)} PMCIDs")
+    sources = list(sources or [])[: len(pmcids)]
+    sources += [None] * (len(pmcids) - len(sources))
+    store = get_article_store()
+    results: List[Optional[dict]] = [None] * len(pmcids)
+    pending = {}  # PMCID -> positions still to be resolved
+
+    for i, (pmcid, source) in enumerate(zip(pmcids, sources)):
+        if not _validate_pmcid(pmcid):
+            results[i] = _tool_result(pmcid, source, _format_validation_error_message(pmcid))
+        elif source is not None and not _validate_source_url(source):
+            results[i] = _tool_result(
+                pmcid, source, _format_source_validation_error_message(source)
+            )
+        else:
+            cached = _read_from_store(store, pmcid, source, question) if store else None
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.setdefault(pmcid, []).append(i)
+
+    if pending:
+        with ThreadPoolExecutor(
+            max_workers=min(S3_MAX_CONCURRENCY, 2 * len(pending))
+        ) as s3_pool, ThreadPoolExecutor(
+            max_workers=SUMMARY_MAX_CONCURRENCY
+        ) as summary_pool:
+            # Probe both prefixes at once so a miss costs one round trip, not two
+            downloads = {
+                s3_pool.submit(
+                    _download_from_s3, PMC_BUCKET, f"oa_comm/txt/all/{pmcid}.txt"
+                ): pmcid
+                for pmcid in pending
+            }
+            probes = {
+                pmcid: s3_pool.submit(
+                    _head_object, PMC_BUCKET, f"oa_noncomm/txt/all/{pmcid}.txt"
+                )
+                for pmcid in pending
+            }
+
+            # Start summarizing each article as soon as its text arrives
+            outcomes = {}
+            for download in as_completed(downloads):
+                pmcid = downloads[download]
+                outcomes[pmcid] = _batch_outcome(
+                    pmcid, download, probes[pmcid], summary_pool, question
+                )
+
+            for pmcid, positions in pending.items():
+                outcome = outcomes[pmcid]
+                if "summary" in outcome:
+                    try:
+                        text = outcome["summary"].result().content
+                    except Exception as e:
+                        logger.error(f"Unexpected error reading {pmcid}: {str(e)}")
+                        text = f"An unexpected error occurred while processing {pmcid}: {str(e)}"
+                else:
+                    text = outcome["text"]
+                for i in positions:
+                    results[i] = _tool_result(pmcid, sources[i], text)
+
+    logger.info(f"Completed read_pubmed_many for {len(pmcids)} PMCIDs")
+    return results
+
+
 # def _get_api_key_params(base_params: Dict[str, Any]) -> Dict[str, Any]:
 #     """
 #     Add NCBI API key to request parameters if available.
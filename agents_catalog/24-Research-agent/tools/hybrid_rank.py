@@ -0,0 +1,341 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""
+Local hybrid reranking of PubMed search results.
+
+Each result set is indexed in memory with BM25 over article titles, abstracts
+and MeSH terms. The term index is a sparse term-by-document matrix in
+compressed sparse column form (one column of postings per term), so a query
+is scored with a handful of array operations regardless of result set size.
+The BM25 score is blended with citation and recency features:
+
+    score = w_bm25 * bm25 + w_citations * citations + w_recency * recency
+
+where each feature is scaled to [0, 1] within the result set. Weights default
+to HYBRID_WEIGHTS and can be overridden with the PUBMED_HYBRID_WEIGHTS
+environment variable, e.g. "bm25=0.7,citations=0.2,recency=0.1".
+"""
+
+import logging
+import os
+import re
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("hybrid_rank")
+
+HYBRID_WEIGHTS = {"bm25": 0.6, "citations": 0.25, "recency": 0.15}
+
+# Term frequencies from each field are weighted before BM25 saturation, so a
+# query term in the title or MeSH headings counts more than one in the abstract
+FIELD_WEIGHTS = {"title": 2.0, "abstract": 1.0, "mesh_terms": 2.0}
+
+# Age in years at which the recency feature halves
+RECENCY_HALF_LIFE_YEARS = 5.0
+
+# Tokens are runs of letters, digits, hyphens and non-ASCII characters; other
+# ASCII punctuation separates them like whitespace does
+_SEPARATORS = str.maketrans(
+    {c: " " for c in "!\"#$%&'()*+,./:;<=>?@[\\]^_`{|}~\u00a0\u2009"}
+)
+
+# PubMed search tags that filter rather than describe the topic; the term or
+# phrase they qualify is dropped from the ranking query
+_FILTER_TAG_RE = re.compile(
+    r'(?:"[^"]*"|\S+?)\[(?:dp|pdat|edat|crdt|mhda|lr|pt|la|lang|sb|filter|'
+    r"publication date|publication type|language|subset)\]",
+    re.IGNORECASE,
+)
+_FIELD_TAG_RE = re.compile(r"\[[^\]]*\]")
+
+# Boolean operators and common English function words carry no topical signal
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from in into is it of on or not that the "
+    "their this to was were which with".split()
+)
+
+# Tokens are identified by a polynomial hash of their UTF-8 bytes modulo 2**64,
+# sum(byte[i] * _HASH_BASE**i), so that a whole result set can be tokenized
+# and hashed with array operations instead of a Python loop over tokens
+_HASH_BASE = 0x100000001B3
+_HASH_MASK = 2**64 - 1
+_HASH_INVERSE = pow(_HASH_BASE, -1, 2**64)
+# Powers of the base and its inverse, grown on demand and reused across calls
+_power_cache = (np.ones(1, dtype=np.uint64), np.ones(1, dtype=np.uint64))
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase tokens, keeping internal hyphens (e.g. "covid-19")"""
+    return text.lower().translate(_SEPARATORS).split()
+
+
+def term_hash(token: str) -> int:
+    """Hash of a single token, matching the hashes computed by BM25Index"""
+    value = 0
+    for byte in reversed(token.encode("utf-8")):
+        value = (value * _HASH_BASE + byte) & _HASH_MASK
+    return value
+
+
+def _powers(n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """First n powers of the hash base and of its modular inverse"""
+    global _power_cache
+    powers, inverses = _power_cache
+    if len(powers) < n:
+        size = max(n, 2 * len(powers))
+        powers = np.full(size, _HASH_BASE, dtype=np.uint64)
+        inverses = np.full(size, _HASH_INVERSE, dtype=np.uint64)
+        powers[0] = inverses[0] = 1
+        # uint64 products wrap around, which is exactly arithmetic modulo 2**64
+        np.cumprod(powers, out=powers)
+        np.cumprod(inverses, out=inverses)
+        _power_cache = (powers, inverses)
+    return powers[:n], inverses[:n]
+
+
+def query_terms(query: str) -> List[str]:
+    """
+    Extract ranking terms from a PubMed search query.
+
+    Filter clauses such as "last 2 years"[dp] are removed, other field tags
+    are stripped from their terms, and boolean operators and stopwords are
+    dropped.
+
+    Args:
+        query: Query in PubMed search syntax
+
+    Returns:
+        Distinct query terms in order of first appearance
+    """
+    query = _FIELD_TAG_RE.sub(" ", _FILTER_TAG_RE.sub(" ", query))
+    terms = [term for term in tokenize(query) if term not in _STOPWORDS]
+    return list(dict.fromkeys(terms))
+
+
+class BM25Index:
+    """
+    In-memory BM25 index over a small set of documents with weighted fields.
+
+    Postings are stored as a sparse term-by-document matrix in compressed
+    sparse column form: for the term with hash term_hashes[t], the entries
+    indptr[t]:indptr[t + 1] of doc_ids and weights are its occurrences. As in
+    other sparse matrix formats, repeated (term, document) entries are summed,
+    here when a query is scored.
+    """
+
+    def __init__(
+        self,
+        documents: Sequence[Dict[str, Any]],
+        field_weights: Optional[Dict[str, float]] = None,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        """
+        Index documents.
+
+        Args:
+            documents: Dictionaries of field name to text (or list of texts)
+            field_weights: Weight of each indexed field (defaults to FIELD_WEIGHTS)
+            k1: Term frequency saturation
+            b: Document length normalisation
+        """
+        self.k1 = k1
+        self.b = b
+        self.num_docs = len(documents)
+        field_weights = FIELD_WEIGHTS if field_weights is None else field_weights
+
+        segments: List[str] = []
+        segment_docs: List[int] = []
+        segment_weights: List[float] = []
+        for doc_id, document in enumerate(documents):
+            for field, weight in field_weights.items():
+                text = document.get(field)
+                if not text:
+                    continue
+                segments.append(text if isinstance(text, str) else " ".join(text))
+                segment_docs.append(doc_id)
+                segment_weights.append(weight)
+
+        # Tokenize every field of every document in one pass over a NUL-separated
+        # byte buffer: tokens are maximal runs of bytes above ASCII space
+        text = "\0".join(["", *segments, ""]).lower().translate(_SEPARATORS)
+        data = np.frombuffer(text.encode("utf-8"), dtype=np.uint8)
+        in_token = data > 32
+        bounds = np.flatnonzero(in_token[1:] != in_token[:-1]) + 1
+        starts, ends = bounds[0::2], bounds[1::2]
+
+        powers, inverses = _powers(len(data))
+        prefix = np.empty(len(data) + 1, dtype=np.uint64)
+        prefix[0] = 0
+        np.multiply(data, powers, out=prefix[1:])
+        np.cumsum(prefix[1:], out=prefix[1:])
+        token_hashes = (prefix[ends] - prefix[starts]) * inverses[starts]
+
+        # Tokens per field, from where each NUL separator falls among the starts
+        separators = np.flatnonzero(data == 0)
+        token_counts = np.diff(np.searchsorted(starts, separators))
+        token_docs = np.repeat(np.asarray(segment_docs, dtype=np.int64), token_counts)
+        token_weights = np.repeat(
+            np.asarray(segment_weights, dtype=np.float64), token_counts
+        )
+
+        self.doc_lengths = np.bincount(
+            token_docs, weights=token_weights, minlength=self.num_docs
+        )
+        self.avg_doc_length = float(self.doc_lengths.mean()) if self.num_docs else 0.0
+
+        # Group occurrences by term
+        order = np.argsort(token_hashes)
+        sorted_hashes = token_hashes[order]
+        self.doc_ids = token_docs[order]
+        self.weights = token_weights[order]
+        new_term = np.empty(len(sorted_hashes), dtype=bool)
+        new_term[:1] = True
+        np.not_equal(sorted_hashes[1:], sorted_hashes[:-1], out=new_term[1:])
+        term_starts = np.flatnonzero(new_term)
+        self.term_hashes = sorted_hashes[term_starts]
+        self.indptr = np.append(term_starts, len(sorted_hashes))
+
+    def __len__(self) -> int:
+        """Number of distinct terms"""
+        return len(self.term_hashes)
+
+    def term_frequencies(self, term: str) -> np.ndarray:
+        """Field-weighted frequency of a term in every document"""
+        key = np.uint64(term_hash(term))
+        t = int(np.searchsorted(self.term_hashes, key))
+        if t == len(self.term_hashes) or self.term_hashes[t] != key:
+            return np.zeros(self.num_docs)
+        span = slice(self.indptr[t], self.indptr[t + 1])
+        return np.bincount(
+            self.doc_ids[span], weights=self.weights[span], minlength=self.num_docs
+        )
+
+    def score(
+        self, terms: Iterable[str], idf: Optional[Sequence[float]] = None
+    ) -> np.ndarray:
+        """
+        BM25 score of every document for a bag of query terms.
+
+        Args:
+            terms: Query terms (already tokenized)
+            idf: Optional weight per distinct term, in order of first appearance,
+                replacing the IDF computed from this index
+
+        Returns:
+            float64 score per document, in indexing order
+        """
+        terms = list(dict.fromkeys(terms))
+        if not terms or not self.num_docs or not self.avg_doc_length:
+            return np.zeros(self.num_docs)
+
+        # Dense (query terms x documents) block of the term matrix
+        tf = np.stack([self.term_frequencies(term) for term in terms])
+        if idf is None:
+            doc_freqs = np.count_nonzero(tf, axis=1)
+            # Lucene's non-negative BM25 IDF
+            idf = np.log1p((self.num_docs - doc_freqs + 0.5) / (doc_freqs + 0.5))
+        else:
+            idf = np.asarray(idf, dtype=np.float64)
+        norm = self.k1 * (
+            1.0 - self.b + self.b * self.doc_lengths / self.avg_doc_length
+        )
+        return idf @ (tf * (self.k1 + 1.0) / (tf + norm))
+
+
+def hybrid_weights() -> Dict[str, float]:
+    """
+    Feature weights from PUBMED_HYBRID_WEIGHTS, falling back to HYBRID_WEIGHTS.
+
+    Features missing from the environment variable keep their default weight.
+    Malformed values are logged and ignored.
+    """
+    weights = dict(HYBRID_WEIGHTS)
+    setting = os.getenv("PUBMED_HYBRID_WEIGHTS", "")
+    for item in filter(None, (part.strip() for part in setting.split(","))):
+        name, _, value = item.partition("=")
+        name = name.strip()
+        try:
+            if name not in weights:
+                raise ValueError(f"unknown feature {name!r}")
+            weights[name] = float(value)
+        except ValueError as e:
+            logger.warning(f"Ignoring PUBMED_HYBRID_WEIGHTS entry {item!r}: {e}")
+    return weights
+
+
+def _scaled(values: np.ndarray) -> np.ndarray:
+    """Scale non-negative values to [0, 1] by the maximum"""
+    top = values.max() if len(values) else 0.0
+    return values / top if top > 0 else np.zeros_like(values)
+
+
+def _citation_feature(articles: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """log(1 + citations), preferring the global count over the in-result count"""
+    counts = np.array(
+        [
+            article.get("global_cited_by_count", article.get("referenced_by_count", 0))
+            for article in articles
+        ],
+        dtype=np.float64,
+    )
+    return _scaled(np.log1p(counts))
+
+
+def _recency_feature(
+    articles: Sequence[Dict[str, Any]], current_year: int, half_life: float
+) -> np.ndarray:
+    """Exponential decay by publication age; 0 for articles without a year"""
+    years = np.array(
+        [
+            float(article["year"]) if str(article.get("year", "")).isdigit() else np.nan
+            for article in articles
+        ]
+    )
+    age = np.clip(current_year - years, 0.0, None)
+    return np.nan_to_num(0.5 ** (age / half_life), nan=0.0)
+
+
+def rank_hybrid(
+    articles: List[Dict[str, Any]],
+    query: str,
+    weights: Optional[Dict[str, float]] = None,
+    half_life: float = RECENCY_HALF_LIFE_YEARS,
+    current_year: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Re-rank articles by a weighted blend of BM25 relevance, citations and recency.
+
+    Args:
+        articles: Articles with title, abstract, mesh_terms, year and citation counts
+        query: The PubMed search query
+        weights: Feature weights (defaults to hybrid_weights())
+        half_life: Age in years at which the recency feature halves
+        current_year: Year used to compute article age (defaults to this year)
+
+    Returns:
+        Re-ordered list with highest scoring articles first. Each article gains
+        bm25 (raw score) and hybrid_score fields.
+    """
+    if not articles:
+        return articles
+    weights = hybrid_weights() if weights is None else weights
+    current_year = time.gmtime().tm_year if current_year is None else current_year
+
+    bm25 = BM25Index(articles).score(query_terms(query))
+    score = (
+        weights.get("bm25", 0.0) * _scaled(bm25)
+        + weights.get("citations", 0.0) * _citation_feature(articles)
+        + weights.get("recency", 0.0)
+        * _recency_feature(articles, current_year, half_life)
+    )
+
+    for article, raw, blended in zip(articles, bm25, score):
+        article["bm25"] = float(raw)
+        article["hybrid_score"] = float(blended)
+
+    # Stable sort on the negated score keeps NCBI relevance order for ties
+    return [articles[i] for i in np.argsort(-score, kind="stable")]
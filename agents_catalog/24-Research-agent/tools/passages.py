@@ -0,0 +1,219 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""
+Question-focused passage retrieval over PMC full text.
+
+A 30,000 word article is mostly irrelevant to any one question. The text is
+split into overlapping passages that never cross a section boundary, the
+passages are ranked against the question with the BM25 index from
+hybrid_rank, and only the top few are kept. read_pubmed summarises those
+passages instead of the whole article.
+"""
+
+import hashlib
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import numpy as np
+
+from .hybrid_rank import BM25Index, query_terms
+
+# Passage length and overlap in words
+PASSAGE_WORDS = 200
+PASSAGE_OVERLAP_WORDS = 50
+
+# Number of passages kept for a question
+PASSAGE_TOP_K = 5
+
+# Matching a section heading counts for less than matching the passage itself
+PASSAGE_FIELD_WEIGHTS = {"section": 0.5, "text": 1.0}
+
+# A heading is a short line followed by a paragraph of at least this many words,
+# which tells it apart from table cells and figure labels
+_HEADING_MAX_WORDS = 10
+_HEADING_MAX_CHARS = 80
+_PARAGRAPH_MIN_WORDS = 20
+
+# Back matter whose text matches many questions without answering them
+_SKIPPED_SECTIONS = frozenset(
+    {
+        "references",
+        "bibliography",
+        "acknowledgements",
+        "acknowledgments",
+        "funding",
+        "author contributions",
+        "competing interests",
+        "conflict of interest",
+        "conflicts of interest",
+        "declaration of competing interest",
+        "abbreviations",
+        "supplementary material",
+        "supplementary information",
+        "data availability",
+        "data availability statement",
+    }
+)
+
+
+@dataclass
+class Passage:
+    """A window of words from one section of an article"""
+
+    section: str
+    text: str
+    start: int  # Offset of the first word within the section
+    end: int  # Offset after the last word within the section
+    score: float = 0.0
+
+
+def _is_heading(line: str, next_line: str) -> bool:
+    words = line.split()
+    return (
+        0 < len(words) <= _HEADING_MAX_WORDS
+        and len(line) <= _HEADING_MAX_CHARS
+        and line[-1] not in ".,;:?!)"
+        and (line[0].isupper() or line[0].isdigit())
+        and len(next_line.split()) >= _PARAGRAPH_MIN_WORDS
+    )
+
+
+def _normalized_heading(heading: str) -> str:
+    """Lower-case a heading and drop numbering such as "4.2."."""
+    return heading.lstrip("0123456789. ").rstrip(":").strip().lower()
+
+
+def split_sections(text: str) -> List[Tuple[str, List[str]]]:
+    """
+    Split plain article text into (heading, words) sections.
+
+    Text before the first heading belongs to a section named "Front matter".
+    Back matter such as references and acknowledgements is dropped.
+    """
+    lines = [line.strip() for line in text.splitlines()]
+    lines = [line for line in lines if line]
+    sections = []
+    heading, words = "Front matter", []
+    for i, line in enumerate(lines):
+        next_line = lines[i + 1] if i + 1 < len(lines) else ""
+        if _is_heading(line, next_line):
+            if words:
+                sections.append((heading, words))
+            heading, words = line, []
+        else:
+            words.extend(line.split())
+    if words:
+        sections.append((heading, words))
+    return [
+        (heading, words)
+        for heading, words in sections
+        if _normalized_heading(heading) not in _SKIPPED_SECTIONS
+    ]
+
+
+def split_passages(
+    text: str,
+    passage_words: int = PASSAGE_WORDS,
+    overlap_words: int = PASSAGE_OVERLAP_WORDS,
+) -> List[Passage]:
+    """
+    Split article text into overlapping, section-aware passages.
+
+    Args:
+        text: Plain article text, e.g. from the PMC Open Access Subset
+        passage_words: Words per passage
+        overlap_words: Words shared by consecutive passages of a section
+
+    Returns:
+        Passages in document order
+    """
+    step = max(1, passage_words - overlap_words)
+    passages = []
+    for heading, words in split_sections(text):
+        for start in range(0, len(words), step):
+            end = min(start + passage_words, len(words))
+            passages.append(Passage(heading, " ".join(words[start:end]), start, end))
+            if end == len(words):
+                break
+    return passages
+
+
+def rank_passages(
+    passages: List[Passage], question: str, k: int = PASSAGE_TOP_K
+) -> List[Passage]:
+    """
+    Pick the k passages that best match a question.
+
+    Passages are scored with BM25 over their section heading and text, and
+    passages sharing no term with the question are left out. If none shares
+    a term, the first k are kept.
+
+    Returns:
+        The selected passages, with scores set, in document order
+    """
+    terms = query_terms(question)
+    if not passages or not terms:
+        return passages[:k]
+    index = BM25Index(
+        [{"section": p.section, "text": p.text} for p in passages],
+        field_weights=PASSAGE_FIELD_WEIGHTS,
+    )
+    scores = index.score(terms)
+    if not scores.any():
+        return passages[:k]
+    top = np.argsort(-scores, kind="stable")[:k]
+    selected = np.sort(top[scores[top] > 0])
+    for i in selected:
+        passages[i].score = float(scores[i])
+    return [passages[i] for i in selected]
+
+
+def _merge_overlapping(passages: List[Passage]) -> List[Passage]:
+    """Join selected neighbours of the same section so no words repeat."""
+    merged: List[Passage] = []
+    for passage in passages:
+        previous = merged[-1] if merged else None
+        if (
+            previous is not None
+            and previous.section == passage.section
+            and passage.start <= previous.end
+        ):
+            new_words = passage.text.split()[previous.end - passage.start :]
+            if new_words:
+                previous.text = f"{previous.text} {' '.join(new_words)}"
+            previous.end = max(previous.end, passage.end)
+            previous.score = max(previous.score, passage.score)
+        else:
+            merged.append(passage)
+    return merged
+
+
+def select_passages(text: str, question: str, k: int = PASSAGE_TOP_K) -> List[Passage]:
+    """
+    The passages of an article most relevant to a question.
+
+    Args:
+        text: Plain article text
+        question: The agent's question
+        k: Number of passages to keep before overlapping ones are merged
+
+    Returns:
+        Selected passages in document order
+    """
+    return _merge_overlapping(rank_passages(split_passages(text), question, k))
+
+
+def format_passages(passages: List[Passage]) -> str:
+    """Render passages as excerpts labelled with their section."""
+    return "\n\n".join(f"[{p.section}] {p.text}" for p in passages)
+
+
+def question_key(question: str) -> str:
+    """
+    Short stable key for a question, for caching question-focused summaries.
+
+    Questions with the same search terms share a key.
+    """
+    terms = " ".join(sorted(set(query_terms(question))))
+    return hashlib.sha256(f"{terms}:{PASSAGE_TOP_K}".encode("utf-8")).hexdigest()[:16]
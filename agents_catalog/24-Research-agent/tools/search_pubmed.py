@@ -4,16 +4,55 @@
 # Adapted from https://github.com/andybrandt/mcp-simple-pubmed
 # SPDX-License-Identifier: MIT
 
+import heapq
+import io
+import json
 import logging
-from typing import List, Any, Dict
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 from xml.etree.ElementTree import Element
 from defusedxml import ElementTree as ET
 import httpx
-import os
+from ncbi_client import get_client
+
+from .article_store import get_article_store
+from .citation_graph import get_citation_graph
+from .hybrid_rank import BM25Index, query_terms, rank_hybrid
 
 # Global configuration for commercial use filtering
 COMMERCIAL_USE_ONLY = True
 
+# efetch is split into fixed-size PMID batches fetched concurrently. Requests go
+# through the shared ncbi_client, which holds the process-wide NCBI rate limit
+# (3 requests/second, or 10/second with NCBI_API_KEY) and retries throttled ones.
+EFETCH_BATCH_SIZE = 100
+EFETCH_MAX_WORKERS = 4
+
+# Searches for more than ESEARCH_MAX_IDS results page through NCBI's history
+# server (WebEnv) instead of listing every PMID up front. PubMed only serves the
+# first 10,000 records of a query this way.
+ESEARCH_MAX_IDS = 1000
+HISTORY_MAX_RESULTS = 10_000
+HISTORY_WINDOW_SIZE = 200
+HISTORY_PREFETCH_WINDOWS = 2
+# Paged searches keep only the best HISTORY_RERANK_POOL articles seen so far as
+# candidates for the final rerank, and return at most HISTORY_MAX_RECORDS
+HISTORY_RERANK_POOL = 500
+HISTORY_MAX_RECORDS = 100
+
 
 logger = logging.getLogger("strands")
 
@@ -22,6 +61,21 @@ ArticleDict = Dict[str, Any]
 ToolResult = Dict[str, Any]
 ReferenceDict = Dict[str, str]
 
+# Supported reranking methods and how each is described in the results
+RERANK_METHODS = {
+    "referenced_by": "Results ranked by citation count within this result set",
+    "pagerank": "Results ranked by PageRank over all articles fetched so far",
+    "hybrid": "Results ranked by a blend of query relevance (BM25), citation count and recency",
+}
+
+# Reference PMIDs live under PubmedData/ReferenceList, which NCBI occasionally
+# nests inside another ReferenceList
+_REFERENCE_ID_PATHS = (
+    "ReferenceList/Reference/ArticleIdList/ArticleId",
+    "ReferenceList/ReferenceList/Reference/ArticleIdList/ArticleId",
+)
+
+
 # Tool specification for Strands Agents framework
 TOOL_SPEC = {
     "name": "search_pubmed",
@@ -36,10 +90,10 @@ TOOL_SPEC = {
                 },
                 "max_results": {
                     "type": "integer",
-                    "description": "Maximum number of results to fetch from initial search",
+                    "description": "Maximum number of results to fetch from initial search. Above 1000, results are paged in relevance order, at most 100 are returned, and paging can stop early (see min_citations and min_relevance)",
                     "default": 100,
                     "minimum": 1,
-                    "maximum": 1000,
+                    "maximum": HISTORY_MAX_RESULTS,
                 },
                 "max_records": {
                     "type": "integer",
@@ -49,10 +103,21 @@ TOOL_SPEC = {
                 },
                 "rerank": {
                     "type": "string",
-                    "description": "Reranking method to apply",
-                    "enum": ["referenced_by"],
+                    "description": "Reranking method to apply: 'referenced_by' counts citations within this result set, 'pagerank' uses the citation graph of all articles fetched so far, 'hybrid' blends relevance to the query with citation count and recency",
+                    "enum": list(RERANK_METHODS),
                     "default": "referenced_by",
                 },
+                "min_citations": {
+                    "type": "integer",
+                    "description": "When max_results is above 1000, stop paging once max_records articles cited at least this many times by fetched articles have been found. Requires max_records",
+                    "minimum": 0,
+                },
+                "min_relevance": {
+                    "type": "number",
+                    "description": "When max_results is above 1000, stop paging at the first page whose mean relevance to the query (share of query terms matched, 0-1) is below this value",
+                    "minimum": 0,
+                    "maximum": 1,
+                },
             },
             "required": ["query"],
         }
@@ -74,9 +139,16 @@ def search_pubmed(tool: Dict[str, Any], **kwargs: Any) -> ToolResult:
             - toolUseId: String identifier for the tool invocation
             - input: Dictionary with search parameters:
                 - query (required): The search query for PubMed using standard PubMed search syntax
-                - max_results (optional): Maximum number of results to fetch from initial search (default: 100, range: 1-1000)
+                - max_results (optional): Maximum number of results to fetch from initial search (default: 100, range: 1-10000).
+                  Above 1000, results are paged through the NCBI history server with iter_pubmed_search,
+                  only the best HISTORY_RERANK_POOL are kept for reranking and at most HISTORY_MAX_RECORDS
+                  are returned
                 - max_records (optional): Maximum number of articles to return in final results (range: 1-100)
-                - rerank (optional): Reranking method to apply (default: "referenced_by", options: ["referenced_by"])
+                - rerank (optional): Reranking method to apply (default: "referenced_by", options: ["referenced_by", "pagerank", "hybrid"])
+                - min_citations (optional): With max_results above 1000, stop paging once max_records articles
+                  cited at least this many times by fetched articles have been found. Requires max_records
+                - min_relevance (optional): With max_results above 1000, stop paging at the first page whose
+                  mean relevance to the query falls below this value (range: 0-1)
         **kwargs: Additional keyword arguments (unused)
 
     Returns:
@@ -150,146 +222,187 @@ def search_pubmed(tool: Dict[str, Any], **kwargs: Any) -> ToolResult:
         max_results = input_params.get("max_results", 100)
         max_records = input_params.get("max_records")
         rerank = input_params.get("rerank", "referenced_by")
+        min_citations = input_params.get("min_citations")
+        min_relevance = input_params.get("min_relevance")
 
         logger.info(f"Searching PubMed for: {query}")
 
-        base_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
-        search_url = f"{base_url}/esearch.fcgi"
+        if max_results > ESEARCH_MAX_IDS:
+            # Large sweeps are paged through the history server, keeping only a
+            # bounded pool of rerank candidates and stopping early once enough
+            # well-cited articles have been found or relevance drops off
+            criteria = []
+            if min_citations is not None:
+                criteria.append(stop_after_cited(max_records, min_citations))
+            if min_relevance is not None:
+                criteria.append(stop_below_relevance(query, min_relevance))
+            if max_records is None:
+                max_records = HISTORY_MAX_RECORDS
+            try:
+                articles, total_found = _select_candidates(
+                    iter_pubmed_search(
+                        query, max_results, stop_when=_stop_on_any(criteria)
+                    ),
+                    query,
+                    rerank,
+                    HISTORY_RERANK_POOL,
+                )
+            except Exception as fetch_error:
+                logger.error(f"Error paging PubMed search results: {fetch_error}")
+                return {
+                    "toolUseId": tool_use_id,
+                    "status": "error",
+                    "content": [
+                        {"text": f"Error fetching article details: {str(fetch_error)}"}
+                    ],
+                }
+            if not articles:
+                logger.info("No articles found")
+                return {
+                    "toolUseId": tool_use_id,
+                    "status": "success",
+                    "content": [{"text": "No articles found for the given query."}],
+                }
+        else:
+            # Build search query with filters
+            try:
+                filtered_query = _build_search_query(query)
+            except Exception as query_error:
+                logger.error(f"Error building search query: {query_error}")
+                return {
+                    "toolUseId": tool_use_id,
+                    "status": "error",
+                    "content": [
+                        {"text": f"Error building search query: {str(query_error)}"}
+                    ],
+                }
 
-        # Build search query with filters
-        try:
-            filtered_query = _build_search_query(query)
-        except Exception as query_error:
-            logger.error(f"Error building search query: {query_error}")
-            return {
-                "toolUseId": tool_use_id,
-                "status": "error",
-                "content": [
-                    {"text": f"Error building search query: {str(query_error)}"}
-                ],
+            search_params = {
+                "db": "pubmed",
+                "term": filtered_query,
+                "retmax": max_results,
+                "retmode": "json",
+                "sort": "relevance",
             }
 
-        search_params = {
-            "db": "pubmed",
-            "term": filtered_query,
-            "retmax": max_results,
-            "retmode": "json",
-            "sort": "relevance",
-        }
-
-        try:
-            # Search for article IDs
-            search_response = httpx.post(
-                search_url, data=_get_api_key_params(search_params)
-            )
-            search_response.raise_for_status()
-        except httpx.HTTPStatusError as http_error:
-            logger.error(f"HTTP error during PubMed search: {http_error}")
-            return {
-                "toolUseId": tool_use_id,
-                "status": "error",
-                "content": [
-                    {
-                        "text": f"HTTP error during PubMed search: {http_error.response.status_code} - {str(http_error)}"
-                    }
-                ],
-            }
-        except httpx.TimeoutException as timeout_error:
-            logger.error(f"Timeout error during PubMed search: {timeout_error}")
-            return {
-                "toolUseId": tool_use_id,
-                "status": "error",
-                "content": [
-                    {
-                        "text": f"Request timeout during PubMed search: {str(timeout_error)}"
-                    }
-                ],
-            }
-        except httpx.NetworkError as network_error:
-            logger.error(f"Network error during PubMed search: {network_error}")
-            return {
-                "toolUseId": tool_use_id,
-                "status": "error",
-                "content": [
-                    {
-                        "text": f"Network error during PubMed search: {str(network_error)}"
-                    }
-                ],
-            }
-        except httpx.RequestError as request_error:
-            logger.error(f"Request error during PubMed search: {request_error}")
-            return {
-                "toolUseId": tool_use_id,
-                "status": "error",
-                "content": [
-                    {
-                        "text": f"Request error during PubMed search: {str(request_error)}"
-                    }
-                ],
-            }
+            try:
+                # Search for article IDs
+                search_body = get_client().request("esearch", search_params)
+            except httpx.HTTPStatusError as http_error:
+                logger.error(f"HTTP error during PubMed search: {http_error}")
+                return {
+                    "toolUseId": tool_use_id,
+                    "status": "error",
+                    "content": [
+                        {
+                            "text": f"HTTP error during PubMed search: {http_error.response.status_code} - {str(http_error)}"
+                        }
+                    ],
+                }
+            except httpx.TimeoutException as timeout_error:
+                logger.error(f"Timeout error during PubMed search: {timeout_error}")
+                return {
+                    "toolUseId": tool_use_id,
+                    "status": "error",
+                    "content": [
+                        {
+                            "text": f"Request timeout during PubMed search: {str(timeout_error)}"
+                        }
+                    ],
+                }
+            except httpx.NetworkError as network_error:
+                logger.error(f"Network error during PubMed search: {network_error}")
+                return {
+                    "toolUseId": tool_use_id,
+                    "status": "error",
+                    "content": [
+                        {
+                            "text": f"Network error during PubMed search: {str(network_error)}"
+                        }
+                    ],
+                }
+            except httpx.RequestError as request_error:
+                logger.error(f"Request error during PubMed search: {request_error}")
+                return {
+                    "toolUseId": tool_use_id,
+                    "status": "error",
+                    "content": [
+                        {
+                            "text": f"Request error during PubMed search: {str(request_error)}"
+                        }
+                    ],
+                }
 
-        try:
-            search_data = search_response.json()
-        except Exception as json_error:
-            logger.error(f"JSON parsing error in search response: {json_error}")
-            return {
-                "toolUseId": tool_use_id,
-                "status": "error",
-                "content": [
-                    {"text": f"Error parsing search response: {str(json_error)}"}
-                ],
-            }
+            try:
+                search_data = json.loads(search_body)
+            except Exception as json_error:
+                logger.error(f"JSON parsing error in search response: {json_error}")
+                return {
+                    "toolUseId": tool_use_id,
+                    "status": "error",
+                    "content": [
+                        {"text": f"Error parsing search response: {str(json_error)}"}
+                    ],
+                }
 
-        try:
-            # Extract IDs
-            id_list = search_data["esearchresult"]["idlist"]
-            logger.info(f"Found {len(id_list)} article pmids")
-        except KeyError as key_error:
-            logger.error(f"Unexpected search response format: {key_error}")
-            return {
-                "toolUseId": tool_use_id,
-                "status": "error",
-                "content": [
-                    {
-                        "text": f"Unexpected search response format: missing {str(key_error)}"
-                    }
-                ],
-            }
+            try:
+                # Extract IDs
+                id_list = search_data["esearchresult"]["idlist"]
+                logger.info(f"Found {len(id_list)} article pmids")
+            except KeyError as key_error:
+                logger.error(f"Unexpected search response format: {key_error}")
+                return {
+                    "toolUseId": tool_use_id,
+                    "status": "error",
+                    "content": [
+                        {
+                            "text": f"Unexpected search response format: missing {str(key_error)}"
+                        }
+                    ],
+                }
 
-        if not id_list:
-            logger.info("No articles found")
-            return {
-                "toolUseId": tool_use_id,
-                "status": "success",
-                "content": [{"text": "No articles found for the given query."}],
-            }
+            if not id_list:
+                logger.info("No articles found")
+                return {
+                    "toolUseId": tool_use_id,
+                    "status": "success",
+                    "content": [{"text": "No articles found for the given query."}],
+                }
 
-        # Fetch article details using the batch function
-        try:
-            articles = fetch_pubmed(id_list)
-        except Exception as fetch_error:
-            logger.error(f"Error fetching article details: {fetch_error}")
-            return {
-                "toolUseId": tool_use_id,
-                "status": "error",
-                "content": [
-                    {"text": f"Error fetching article details: {str(fetch_error)}"}
-                ],
-            }
+            # Fetch article details using the batch function
+            try:
+                articles = fetch_pubmed(id_list)
+            except Exception as fetch_error:
+                logger.error(f"Error fetching article details: {fetch_error}")
+                return {
+                    "toolUseId": tool_use_id,
+                    "status": "error",
+                    "content": [
+                        {"text": f"Error fetching article details: {str(fetch_error)}"}
+                    ],
+                }
+            total_found = len(articles)
 
         # Apply reranking if requested
-        if rerank == "referenced_by":
+        if rerank in RERANK_METHODS:
             try:
                 logger.info("Calculating citation relationships and ranking articles")
-                enhanced_articles = _calculate_referenced_by_counts(articles)
-                ranked_articles = _rank_by_citations(enhanced_articles)
+                enhanced_articles = _add_global_citation_scores(
+                    _calculate_referenced_by_counts(articles)
+                )
+                if rerank == "pagerank":
+                    ranked_articles = _rank_by_pagerank(enhanced_articles)
+                elif rerank == "hybrid":
+                    ranked_articles = rank_hybrid(enhanced_articles, query)
+                else:
+                    ranked_articles = _rank_by_citations(enhanced_articles)
                 logger.info("Citation ranking completed successfully")
 
                 # Apply max_records limit to ranked results
                 if max_records is not None:
                     final_results = ranked_articles[:max_records]
                     logger.info(
-                        f"Applied max_records limit: returning {len(final_results)} of {len(ranked_articles)} articles"
+                        f"Applied max_records limit: returning {len(final_results)} of {total_found} articles"
                     )
                 else:
                     final_results = ranked_articles
@@ -298,12 +411,12 @@ def search_pubmed(tool: Dict[str, Any], **kwargs: Any) -> ToolResult:
 
                 # Format search results using article formatting functions
                 # Pass the total before max_records limit for proper summary
-                total_before_limit = len(ranked_articles)
                 try:
                     formatted_content = _format_article_list(
                         final_results,
                         include_ranking=True,
-                        total_found=total_before_limit,
+                        total_found=total_found,
+                        rerank=rerank,
                     )
                 except Exception as format_error:
                     logger.error(f"Error formatting article results: {format_error}")
@@ -335,7 +448,7 @@ def search_pubmed(tool: Dict[str, Any], **kwargs: Any) -> ToolResult:
         if max_records is not None:
             final_results = articles[:max_records]
             logger.info(
-                f"Applied max_records limit: returning {len(final_results)} of {len(articles)} articles"
+                f"Applied max_records limit: returning {len(final_results)} of {total_found} articles"
             )
         else:
             final_results = articles
@@ -344,10 +457,9 @@ def search_pubmed(tool: Dict[str, Any], **kwargs: Any) -> ToolResult:
 
         # Format search results using article formatting functions
         # Pass the total before max_records limit for proper summary
-        total_before_limit = len(articles)
         try:
             formatted_content = _format_article_list(
-                final_results, include_ranking=False, total_found=total_before_limit
+                final_results, include_ranking=False, total_found=total_found
             )
 
             # Add warning message if citation analysis failed
@@ -383,101 +495,405 @@ def search_pubmed(tool: Dict[str, Any], **kwargs: Any) -> ToolResult:
         }
 
 
-def fetch_pubmed(pmids: List[str]) -> List[ArticleDict]:
+def fetch_pubmed(
+    pmids: List[str], batch_size: int = EFETCH_BATCH_SIZE
+) -> List[ArticleDict]:
     """
     Get detailed information about one or more PubMed articles.
 
+    Articles already in the persistent article store are served from it. The
+    remaining PMIDs are split into batches of batch_size that are fetched
+    concurrently over a shared connection pool, within NCBI's request rate
+    limit, and each batch is parsed as soon as its response arrives.
+
     Args:
         pmids: List of PubMed IDs to fetch
+        batch_size: Number of PMIDs per efetch request
 
     Returns:
-        List of article dictionaries with detailed information including keywords and references.
-        Empty articles are filtered out. Returns empty list if no articles found or on error.
+        List of article dictionaries with detailed information including keywords and references,
+        in the same order as pmids. Empty articles are filtered out. Returns empty list if no
+        articles found or on error.
     """
     if not pmids:
         return []
 
-    logger.info(f"Fetching {len(pmids)} PubMed articles")
+    store = get_article_store()
+    cached = store.get_many("article", pmids) if store is not None else {}
+    missing = [pmid for pmid in pmids if pmid not in cached]
+    if cached:
+        logger.info(f"Found {len(cached)} of {len(pmids)} articles in the article store")
+    if not missing:
+        articles = [cached[pmid] for pmid in pmids if pmid in cached]
+        _record_citations(articles)
+        return articles
 
-    base_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
-    fetch_url = f"{base_url}/efetch.fcgi"
+    fetched = _fetch_from_ncbi(missing, batch_size)
+    by_id = {article["id"]: article for article in fetched if "id" in article}
+    if store is not None:
+        store.put_many("article", by_id)
+
+    by_id.update(cached)
+    articles = [by_id[pmid] for pmid in dict.fromkeys(pmids) if pmid in by_id]
+    # Keep any article whose PMID could not be parsed, as before
+    articles.extend(article for article in fetched if "id" not in article)
+    _record_citations(articles)
+    return articles
+
+
+def iter_pubmed_search(
+    query: str,
+    max_results: Optional[int] = None,
+    window_size: int = HISTORY_WINDOW_SIZE,
+    stop_when: Optional[Callable[[List[ArticleDict]], bool]] = None,
+) -> Iterator[ArticleDict]:
+    """
+    Stream the articles matching a PubMed query, in relevance order.
 
-    fetch_params = {"db": "pubmed", "id": ",".join(pmids), "retmode": "xml"}
+    The search runs once with usehistory=y, then efetch pages through the
+    result on NCBI's history server (WebEnv and query_key) in windows of
+    window_size, starting at each retstart. Articles are yielded as soon as
+    their window has been parsed, and up to HISTORY_PREFETCH_WINDOWS further
+    windows are fetched in the background. Memory use therefore depends on
+    the window size, not on the number of hits, and the first results arrive
+    after a single efetch. Fetched articles are added to the article store
+    and the citation graph, and carry global citation scores.
 
-    try:
-        try:
-            fetch_response = httpx.post(
-                fetch_url, data=_get_api_key_params(fetch_params)
-            )
-            fetch_response.raise_for_status()
-        except httpx.HTTPStatusError as http_error:
-            logger.error(f"HTTP error during article fetch: {http_error}")
-            raise Exception(
-                f"HTTP error during article fetch: {http_error.response.status_code} - {str(http_error)}"
-            )
-        except httpx.TimeoutException as timeout_error:
-            logger.error(f"Timeout error during article fetch: {timeout_error}")
-            raise Exception(
-                f"Request timeout during article fetch: {str(timeout_error)}"
+    Args:
+        query: The search query in PubMed search syntax (license filters are added)
+        max_results: Maximum number of articles to yield (at most HISTORY_MAX_RESULTS)
+        window_size: Number of articles per efetch request
+        stop_when: Called with each window's articles once they have been
+            yielded; paging stops when it returns True (see stop_after_cited
+            and stop_below_relevance)
+
+    Yields:
+        Article dictionaries
+
+    Raises:
+        Exception: If the search or a fetch fails
+    """
+    search_result = get_client().esearch(
+        _build_search_query(query), retmax=0, sort="relevance", usehistory=True
+    )
+    limit = min(max_results or HISTORY_MAX_RESULTS, HISTORY_MAX_RESULTS)
+    total = min(search_result.count, limit)
+    logger.info(
+        f"Found {search_result.count} articles, paging through the first {total}"
+    )
+    if total == 0:
+        return
+
+    history = {
+        "db": "pubmed",
+        "WebEnv": search_result.webenv,
+        "query_key": search_result.query_key,
+        "retmode": "xml",
+    }
+    windows = iter(range(0, total, window_size))
+    executor = ThreadPoolExecutor(max_workers=HISTORY_PREFETCH_WINDOWS)
+    pending = deque()
+
+    def prefetch() -> None:
+        while len(pending) < HISTORY_PREFETCH_WINDOWS:
+            retstart = next(windows, None)
+            if retstart is None:
+                return
+            params = dict(
+                history, retstart=retstart, retmax=min(window_size, total - retstart)
             )
-        except httpx.NetworkError as network_error:
-            logger.error(f"Network error during article fetch: {network_error}")
-            raise Exception(f"Network error during article fetch: {str(network_error)}")
-        except httpx.RequestError as request_error:
-            logger.error(f"Request error during article fetch: {request_error}")
-            raise Exception(f"Request error during article fetch: {str(request_error)}")
-
-        # Parse XML response
-        try:
-            root = ET.fromstring(fetch_response.text)
-        except ET.ParseError as xml_error:
-            logger.error(f"XML parsing error in fetch response: {xml_error}")
-            raise Exception(f"Error parsing XML response from PubMed: {str(xml_error)}")
-        except Exception as parse_error:
-            logger.error(f"Unexpected parsing error in fetch response: {parse_error}")
-            raise Exception(f"Error parsing response from PubMed: {str(parse_error)}")
+            pending.append(executor.submit(_efetch, params))
 
-        articles = []
+    try:
+        prefetch()
+        while pending:
+            window = pending.popleft().result()
+            prefetch()
+            if not window:
+                # The history server returned nothing, e.g. because WebEnv expired
+                logger.warning("Empty page from the NCBI history server, stopping")
+                return
+
+            store = get_article_store()
+            if store is not None:
+                store.put_many(
+                    "article",
+                    {article["id"]: article for article in window if "id" in article},
+                )
+            _record_citations(window)
+            _add_global_citation_scores(window)
+
+            yield from window
+            if stop_when is not None and stop_when(window):
+                logger.info("Stop criterion met, no further pages fetched")
+                return
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def stop_after_cited(
+    count: int, min_citations: int
+) -> Callable[[List[ArticleDict]], bool]:
+    """
+    Stop criterion for iter_pubmed_search: enough well-cited articles found.
 
-        for article_element in root.findall(".//PubmedArticle"):
-            try:
-                article = _extract_article_data(article_element)
-                if article:  # Only add non-empty articles
-                    articles.append(article)
-            except Exception as e:
-                logger.error(f"Error parsing individual article: {e}")
-                continue
+    Args:
+        count: Number of qualifying articles to find
+        min_citations: Minimum global citation count of a qualifying article
 
-        logger.info(f"Successfully fetched {len(articles)} articles")
-        return articles
+    Returns:
+        Criterion that is True once count qualifying articles have been seen
+    """
+    found = 0
+
+    def stop(window: List[ArticleDict]) -> bool:
+        nonlocal found
+        found += sum(
+            1
+            for article in window
+            if article.get("global_cited_by_count", 0) >= min_citations
+        )
+        return found >= count
+
+    return stop
+
+
+def stop_below_relevance(
+    query: str, min_relevance: float
+) -> Callable[[List[ArticleDict]], bool]:
+    """
+    Stop criterion for iter_pubmed_search: results no longer relevant.
+
+    An article's relevance is the share of query terms in its title, abstract
+    and MeSH terms, using BM25 term frequency saturation and length
+    normalisation but no IDF, so scores are comparable between windows
+    (within a relevant window, every article matches the query terms and
+    window-level IDF would be close to 0). Results arrive in PubMed relevance
+    order, so once a window's mean relevance falls below min_relevance,
+    later windows are unlikely to do better.
+
+    Args:
+        query: The search query
+        min_relevance: Minimum mean relevance of a window, between 0 and 1
+
+    Returns:
+        Criterion that is True for the first window below min_relevance
+    """
+    terms = query_terms(query)
+
+    def stop(window: List[ArticleDict]) -> bool:
+        if not terms:
+            return False
+        return _window_relevance(window, terms).mean() < min_relevance
+
+    return stop
+
+
+def _window_relevance(window: List[ArticleDict], terms: List[str]) -> Any:
+    """
+    Relevance of each article in a window to the query terms, between 0 and 1.
+
+    BM25 without IDF (see stop_below_relevance), so scores from different
+    windows can be compared.
+    """
+    terms = list(dict.fromkeys(terms))
+    index = BM25Index(window)
+    if not terms:
+        return index.score(terms)
+    # Each matched term contributes at most k1 + 1 before scaling
+    weights = [1.0 / ((index.k1 + 1.0) * len(terms))] * len(terms)
+    return index.score(terms, idf=weights)
+
+
+def _stop_on_any(
+    criteria: List[Callable[[List[ArticleDict]], bool]],
+) -> Optional[Callable[[List[ArticleDict]], bool]]:
+    """Combine stop criteria; every criterion sees every window so counters stay right"""
+    if not criteria:
+        return None
+
+    def stop(window: List[ArticleDict]) -> bool:
+        return any([criterion(window) for criterion in criteria])
+
+    return stop
+
+
+def _select_candidates(
+    articles: Iterable[ArticleDict],
+    query: str,
+    rerank: str,
+    pool_size: int,
+    window_size: int = HISTORY_WINDOW_SIZE,
+) -> Tuple[List[ArticleDict], int]:
+    """
+    Keep the best pool_size articles of a stream as candidates for reranking.
+
+    Articles are read one window at a time and pushed through a bounded
+    min-heap, so memory depends on pool_size and window_size rather than on
+    the number of articles streamed. Candidates are kept by scores that are
+    fixed when an article arrives: global citation count (and PageRank for
+    "pagerank") from the citation graph, plus windowed BM25 relevance for
+    "hybrid". The final rerank then runs on the candidates only, so in-result
+    citation counts cover the candidate pool rather than every article seen.
+
+    Args:
+        articles: Articles in PubMed relevance order, e.g. from iter_pubmed_search
+        query: The search query
+        rerank: Reranking method the candidates are selected for
+        pool_size: Maximum number of candidates to keep
+        window_size: Number of articles scored together
 
+    Returns:
+        Tuple of the candidates in their original order and the number of
+        articles streamed
+    """
+    terms = query_terms(query) if rerank == "hybrid" else []
+    heap = []
+    total = 0
+    stream = iter(articles)
+    while True:
+        window = list(islice(stream, window_size))
+        if not window:
+            break
+        relevance = _window_relevance(window, terms) if terms else [0.0] * len(window)
+        for position, (article, score) in enumerate(zip(window, relevance), total):
+            key = (
+                float(score),
+                article.get("pagerank", 0.0) if rerank == "pagerank" else 0.0,
+                article.get("global_cited_by_count", 0),
+            )
+            # Earlier (more relevant to PubMed) articles win ties
+            entry = (key, -position, article)
+            if len(heap) < pool_size:
+                heapq.heappush(heap, entry)
+            else:
+                heapq.heappushpop(heap, entry)
+        total += len(window)
+    candidates = [article for _, _, article in sorted(heap, key=lambda e: -e[1])]
+    return candidates, total
+
+
+def _record_citations(articles: List[ArticleDict]) -> None:
+    """Add the reference lists of fetched articles to the global citation graph."""
+    try:
+        graph = get_citation_graph()
+        if graph is not None:
+            added = graph.add_articles(articles)
+            if added:
+                logger.info(f"Added {added} citations to the citation graph")
     except Exception as e:
-        logger.error(f"Error fetching article details: {e}")
-        # Re-raise the exception so search_pubmed can handle it properly
-        raise
+        # Ranking can still fall back to in-result citation counts
+        logger.error(f"Error updating citation graph: {e}")
+
+
+def _fetch_from_ncbi(pmids: List[str], batch_size: int) -> List[ArticleDict]:
+    """
+    Fetch articles from NCBI efetch in concurrent, rate-limited batches.
 
+    Args:
+        pmids: List of PubMed IDs to fetch
+        batch_size: Number of PMIDs per efetch request
+
+    Returns:
+        List of non-empty article dictionaries in the same order as pmids
+    """
+    logger.info(f"Fetching {len(pmids)} PubMed articles in batches of {batch_size}")
 
-def _get_api_key_params(base_params: Dict[str, Any]) -> Dict[str, Any]:
+    articles: List[ArticleDict] = []
+    try:
+        for body in get_client().efetch(
+            pmids,
+            batch_size=batch_size,
+            max_workers=EFETCH_MAX_WORKERS,
+            retmode="xml",
+        ):
+            articles.extend(_parse_efetch(body))
+    except httpx.HTTPError as http_error:
+        # Re-raise so search_pubmed can handle it properly
+        raise _fetch_error(http_error)
+
+    logger.info(f"Successfully fetched {len(articles)} articles")
+    return articles
+
+
+def _efetch(fetch_params: Dict[str, Any]) -> List[ArticleDict]:
     """
-    Add NCBI API key to request parameters if available.
+    Run one efetch request and parse the articles it returns.
 
     Args:
-        base_params: Base request parameters dictionary
+        fetch_params: efetch parameters, selecting articles by id or by
+            WebEnv, query_key, retstart and retmax
 
     Returns:
-        Parameters dictionary with API key added if available
+        List of non-empty article dictionaries
+    """
+    try:
+        body = get_client().request("efetch", fetch_params)
+    except httpx.HTTPError as http_error:
+        raise _fetch_error(http_error)
+    return _parse_efetch(body)
+
+
+def _fetch_error(error: httpx.HTTPError) -> Exception:
+    """Log an efetch transport error and describe it for the tool result."""
+    if isinstance(error, httpx.HTTPStatusError):
+        logger.error(f"HTTP error during article fetch: {error}")
+        return Exception(
+            f"HTTP error during article fetch: {error.response.status_code} - {str(error)}"
+        )
+    if isinstance(error, httpx.TimeoutException):
+        logger.error(f"Timeout error during article fetch: {error}")
+        return Exception(f"Request timeout during article fetch: {str(error)}")
+    if isinstance(error, httpx.NetworkError):
+        logger.error(f"Network error during article fetch: {error}")
+        return Exception(f"Network error during article fetch: {str(error)}")
+    logger.error(f"Request error during article fetch: {error}")
+    return Exception(f"Request error during article fetch: {str(error)}")
+
+
+def _parse_efetch(body: bytes) -> List[ArticleDict]:
+    """Parse an efetch response body into non-empty article dictionaries."""
+    try:
+        return list(iter_articles(body))
+    except ET.ParseError as xml_error:
+        logger.error(f"XML parsing error in fetch response: {xml_error}")
+        raise Exception(f"Error parsing XML response from PubMed: {str(xml_error)}")
+    except Exception as parse_error:
+        logger.error(f"Unexpected parsing error in fetch response: {parse_error}")
+        raise Exception(f"Error parsing response from PubMed: {str(parse_error)}")
+
+
+def iter_articles(source: Union[bytes, IO[bytes]]) -> Iterator[ArticleDict]:
     """
-    api_key = os.getenv("NCBI_API_KEY")
+    Incrementally parse efetch XML, yielding one article dictionary per PubmedArticle.
+
+    Each PubmedArticle element is discarded once it has been extracted, so
+    memory use stays bounded by a single article rather than the whole
+    response tree.
+
+    Args:
+        source: efetch XML response body, or a binary file-like object
+
+    Yields:
+        Non-empty article dictionaries, in document order
 
-    # If API key exists and is not empty, add it to parameters
-    if api_key and api_key.strip():
-        # Create a new dictionary to avoid modifying the original
-        params_with_key = base_params.copy()
-        params_with_key["api_key"] = api_key
-        return params_with_key
+    Raises:
+        ET.ParseError: If the XML is malformed
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
 
-    # Return original parameters if no API key or empty string
-    return base_params
+    for _, element in ET.iterparse(source, events=("end",)):
+        if element.tag != "PubmedArticle":
+            continue
+        try:
+            article = _extract_article_data(element)
+            if article:  # Only add non-empty articles
+                yield article
+        except Exception as e:
+            logger.error(f"Error parsing individual article: {e}")
+        # Drop the finished article's subtree; only its empty shell stays attached
+        element.clear()
 
 
 def _build_search_query(query: str) -> str:
@@ -494,27 +910,33 @@ def _build_search_query(query: str) -> str:
 
 
 def _extract_article_data(article_element: Element) -> ArticleDict:
-    """Extract article data from XML element."""
+    """
+    Extract article data from a PubmedArticle XML element.
+
+    Uses direct child paths from PubmedArticle rather than descendant (.//)
+    searches, which avoids rescanning large reference lists for every field.
+    """
     article = {}
+    citation = article_element.find("MedlineCitation")
+    journal_article = citation.find("Article") if citation is not None else None
 
     # Extract PMID
-    pmid_element = article_element.find(".//PMID")
+    pmid_element = citation.find("PMID") if citation is not None else None
     if pmid_element is not None and pmid_element.text:
         article["id"] = pmid_element.text
 
-    # Extract title
-    title_element = article_element.find(".//ArticleTitle")
-    if title_element is not None:
-        # Use itertext() to get all text content including text within child elements
-        title_text = "".join(title_element.itertext()).strip()
-        if title_text:
-            article["title"] = title_text
-
-    # Extract abstract
-    abstract_parts = article_element.findall(".//AbstractText")
-    if abstract_parts:
+    if journal_article is not None:
+        # Extract title
+        title_element = journal_article.find("ArticleTitle")
+        if title_element is not None:
+            # Use itertext() to get all text content including text within child elements
+            title_text = "".join(title_element.itertext()).strip()
+            if title_text:
+                article["title"] = title_text
+
+        # Extract abstract
         abstract_texts = []
-        for part in abstract_parts:
+        for part in journal_article.iterfind("Abstract/AbstractText"):
             # Use itertext() to get all text content including text within child elements
             text_content = "".join(part.itertext()).strip()
             if text_content:
@@ -526,11 +948,9 @@ def _extract_article_data(article_element: Element) -> ArticleDict:
             )
             article["text"] = abstract_content  # Add new consistent field name
 
-    # Extract authors
-    author_elements = article_element.findall(".//Author")
-    if author_elements:
+        # Extract authors
         authors = []
-        for author in author_elements:
+        for author in journal_article.iterfind("AuthorList/Author"):
             last_name_element = author.find("LastName")
             fore_name_element = author.find("ForeName")
 
@@ -543,48 +963,54 @@ def _extract_article_data(article_element: Element) -> ArticleDict:
         if authors:
             article["authors"] = ", ".join(authors)
 
-    # Extract journal info
-    journal_element = article_element.find(".//Journal/Title")
-    if journal_element is not None and journal_element.text:
-        article["journal"] = journal_element.text
-
-    # Extract publication year
-    pub_date_element = article_element.find(".//PubDate/Year")
-    if pub_date_element is not None and pub_date_element.text:
-        article["year"] = pub_date_element.text
+        # Extract journal info
+        journal_element = journal_article.find("Journal/Title")
+        if journal_element is not None and journal_element.text:
+            article["journal"] = journal_element.text
+
+        # Extract publication year
+        pub_date_element = journal_article.find("Journal/JournalIssue/PubDate/Year")
+        if pub_date_element is not None and pub_date_element.text:
+            article["year"] = pub_date_element.text
+
+    # Extract MeSH descriptors
+    if citation is not None:
+        mesh_terms = [
+            descriptor.text
+            for descriptor in citation.iterfind(
+                "MeshHeadingList/MeshHeading/DescriptorName"
+            )
+            if descriptor.text
+        ]
+        if mesh_terms:
+            article["mesh_terms"] = mesh_terms
 
     # Extract DOI and PMC from ArticleIdList (only from the main article, not references)
     # Look specifically in PubmedData/ArticleIdList to avoid picking up DOIs from references
     pubmed_data = article_element.find("PubmedData")
-    if pubmed_data is not None:
-        article_id_list = pubmed_data.find("ArticleIdList")
-        if article_id_list is not None:
-            article_id_elements = article_id_list.findall("ArticleId")
-            for article_id in article_id_elements:
-                id_type = article_id.get("IdType")
-                if id_type == "doi" and article_id.text:
-                    article["doi"] = article_id.text
-                    # Create URI from DOI
-                    doi_url = f"https://doi.org/{article_id.text}"
-                    article["uri"] = (
-                        doi_url  # Keep existing field for backward compatibility
-                    )
-                    article["source"] = doi_url  # Add new consistent field name
-                elif id_type == "pmc" and article_id.text:
-                    article["pmc"] = article_id.text
-
-    # Extract references from ReferenceList
-    reference_elements = article_element.findall(".//Reference")
-    if reference_elements:
-        references = []
-        for ref in reference_elements:
-            # Look for PubMed ID in the reference
-            ref_pmid_element = ref.find(".//ArticleId[@IdType='pubmed']")
-            if ref_pmid_element is not None and ref_pmid_element.text:
-                references.append(ref_pmid_element.text)
-
-        if references:
-            article["references"] = references
+    if pubmed_data is None:
+        return article
+
+    for article_id in pubmed_data.iterfind("ArticleIdList/ArticleId"):
+        id_type = article_id.get("IdType")
+        if id_type == "doi" and article_id.text:
+            article["doi"] = article_id.text
+            # Create URI from DOI
+            doi_url = f"https://doi.org/{article_id.text}"
+            article["uri"] = doi_url  # Keep existing field for backward compatibility
+            article["source"] = doi_url  # Add new consistent field name
+        elif id_type == "pmc" and article_id.text:
+            article["pmc"] = article_id.text
+
+    # Extract references from ReferenceList (which may be nested one level)
+    references = [
+        ref_id.text
+        for path in _REFERENCE_ID_PATHS
+        for ref_id in pubmed_data.iterfind(path)
+        if ref_id.get("IdType") == "pubmed" and ref_id.text
+    ]
+    if references:
+        article["references"] = references
 
     return article
 
@@ -652,6 +1078,39 @@ def _calculate_referenced_by_counts(articles: List[ArticleDict]) -> List[Article
     return enhanced_articles
 
 
+def _add_global_citation_scores(articles: List[ArticleDict]) -> List[ArticleDict]:
+    """
+    Add citation counts and PageRank from the global citation graph.
+
+    Args:
+        articles: List of articles
+
+    Returns:
+        Same list with global_cited_by_count and pagerank added to each article
+        when the citation graph is available
+    """
+    try:
+        graph = get_citation_graph()
+        if graph is None:
+            return articles
+        pmids = [article.get("id", "") for article in articles]
+        in_degree = graph.in_degree(pmids)
+        pagerank = graph.pagerank(pmids)
+    except Exception as e:
+        logger.error(f"Error reading citation graph: {e}")
+        return articles
+
+    for article, count, score in zip(articles, in_degree, pagerank):
+        article["global_cited_by_count"] = int(count)
+        article["pagerank"] = float(score)
+    return articles
+
+
+def _pmid_sort_key(article: ArticleDict) -> int:
+    """Numeric PMID for tie-breaking, 0 if missing or invalid"""
+    return int(article.get("id", "0")) if article.get("id", "").isdigit() else 0
+
+
 def _rank_by_citations(articles: List[ArticleDict]) -> List[ArticleDict]:
     """
     Re-rank articles by referenced_by_count in descending order.
@@ -662,21 +1121,47 @@ def _rank_by_citations(articles: List[ArticleDict]) -> List[ArticleDict]:
     Returns:
         Re-ordered list with highest cited articles first
     """
-    # Sort articles by referenced_by_count (descending), then by PMID (descending) for tie-breaking
+    # Sort articles by referenced_by_count (descending), then by global citation
+    # count and PMID (descending) so that the many ties within a small result set
+    # are broken consistently
     ranked_articles = sorted(
         articles,
         key=lambda article: (
             article.get("referenced_by_count", 0),  # Primary sort: citation count
-            (
-                int(article.get("id", "0")) if article.get("id", "").isdigit() else 0
-            ),  # Secondary sort: PMID
+            article.get("global_cited_by_count", 0),  # Secondary sort: global count
+            _pmid_sort_key(article),  # Tertiary sort: PMID
         ),
-        reverse=True,  # Both sorts in descending order
+        reverse=True,  # All sorts in descending order
     )
 
     return ranked_articles
 
 
+def _rank_by_pagerank(articles: List[ArticleDict]) -> List[ArticleDict]:
+    """
+    Re-rank articles by global citation graph PageRank in descending order.
+
+    Articles added to the graph since PageRank was last computed score 0, so
+    global and in-result citation counts break ties.
+
+    Args:
+        articles: List of articles with pagerank and citation counts
+
+    Returns:
+        Re-ordered list with most central articles first
+    """
+    return sorted(
+        articles,
+        key=lambda article: (
+            article.get("pagerank", 0.0),
+            article.get("global_cited_by_count", 0),
+            article.get("referenced_by_count", 0),
+            _pmid_sort_key(article),
+        ),
+        reverse=True,
+    )
+
+
 def _format_individual_article(
     article: ArticleDict, index: int = None, include_ranking: bool = False
 ) -> str:
@@ -734,12 +1219,24 @@ def _format_individual_article(
         referenced_by_count = article.get("referenced_by_count", 0)
         lines.append(f"References: {ref_count} articles")
         lines.append(f"Cited by: {referenced_by_count} articles in this result set")
+        if "global_cited_by_count" in article:
+            lines.append(
+                f"Cited by (all fetched articles): {article['global_cited_by_count']} articles"
+            )
+        if article.get("pagerank"):
+            lines.append(f"PageRank: {article['pagerank']:.3g}")
+        if "hybrid_score" in article:
+            lines.append(f"Relevance (BM25): {article['bm25']:.2f}")
+            lines.append(f"Hybrid score: {article['hybrid_score']:.3f}")
 
     return "\n".join(lines)
 
 
 def _format_article_list(
-    articles: List[ArticleDict], include_ranking: bool = False, total_found: int = None
+    articles: List[ArticleDict],
+    include_ranking: bool = False,
+    total_found: int = None,
+    rerank: str = "referenced_by",
 ) -> str:
     """
     Format a list of articles with numbering and summary information.
@@ -748,6 +1245,7 @@ def _format_article_list(
         articles: List of article dictionaries
         include_ranking: Whether to include citation ranking information
         total_found: Total number of articles found in search (before max_records limit)
+        rerank: Reranking method that was applied, used to describe the ordering
 
     Returns:
         Formatted string representation of the article list
@@ -765,7 +1263,7 @@ def _format_article_list(
         lines.append(f"Found {result_count} articles")
 
     if include_ranking:
-        lines.append("Results ranked by citation count within this result set")
+        lines.append(RERANK_METHODS.get(rerank, RERANK_METHODS["referenced_by"]))
 
     lines.append("")  # Empty line for spacing
 
@@ -845,7 +1343,7 @@ def _validate_parameters(
             "content": [{"text": "Error: query parameter cannot be empty"}],
         }
 
-    # Validate max_results parameter (integer 1-1000, default 100)
+    # Validate max_results parameter (integer 1-HISTORY_MAX_RESULTS, default 100)
     max_results = input_params.get("max_results", 100)
     if not isinstance(max_results, int):
         return {
@@ -854,12 +1352,14 @@ def _validate_parameters(
             "content": [{"text": "Error: max_results parameter must be an integer"}],
         }
 
-    if max_results < 1 or max_results > 1000:
+    if max_results < 1 or max_results > HISTORY_MAX_RESULTS:
         return {
             "toolUseId": tool_use_id,
             "status": "error",
             "content": [
-                {"text": "Error: max_results parameter must be between 1 and 1000"}
+                {
+                    "text": f"Error: max_results parameter must be between 1 and {HISTORY_MAX_RESULTS}"
+                }
             ],
         }
 
@@ -884,7 +1384,7 @@ def _validate_parameters(
                 ],
             }
 
-    # Validate rerank parameter (enum ["referenced_by"], default "referenced_by")
+    # Validate rerank parameter (enum RERANK_METHODS, default "referenced_by")
     rerank = input_params.get("rerank", "referenced_by")
     if not isinstance(rerank, str):
         return {
@@ -893,12 +1393,60 @@ def _validate_parameters(
             "content": [{"text": "Error: rerank parameter must be a string"}],
         }
 
-    if rerank not in ["referenced_by"]:
+    if rerank not in RERANK_METHODS:
+        return {
+            "toolUseId": tool_use_id,
+            "status": "error",
+            "content": [
+                {
+                    "text": "Error: rerank parameter must be one of: "
+                    + ", ".join(f"'{method}'" for method in RERANK_METHODS)
+                }
+            ],
+        }
+
+    # Validate min_citations parameter (optional non-negative integer)
+    min_citations = input_params.get("min_citations")
+    if min_citations is not None:
+        if not isinstance(min_citations, int) or min_citations < 0:
+            return {
+                "toolUseId": tool_use_id,
+                "status": "error",
+                "content": [
+                    {
+                        "text": "Error: min_citations parameter must be a non-negative integer"
+                    }
+                ],
+            }
+
+    if min_citations is not None and input_params.get("max_records") is None:
         return {
             "toolUseId": tool_use_id,
             "status": "error",
-            "content": [{"text": "Error: rerank parameter must be 'referenced_by'"}],
+            "content": [
+                {
+                    "text": "Error: min_citations requires max_records, the number of well-cited articles to find"
+                }
+            ],
         }
 
+    # Validate min_relevance parameter (optional number 0-1)
+    min_relevance = input_params.get("min_relevance")
+    if min_relevance is not None:
+        if (
+            isinstance(min_relevance, bool)
+            or not isinstance(min_relevance, (int, float))
+            or not 0 <= min_relevance <= 1
+        ):
+            return {
+                "toolUseId": tool_use_id,
+                "status": "error",
+                "content": [
+                    {
+                        "text": "Error: min_relevance parameter must be a number between 0 and 1"
+                    }
+                ],
+            }
+
     # All validations passed
     return None
@@ -1,9 +1,7 @@
 import json
 import logging
-import httpx
-import time
 from typing import Dict, Any, List, Optional
-from xml.etree import ElementTree as ET
+from ncbi_client import fetch_articles, get_client
 
 # Configure logging
 logger = logging.getLogger()
@@ -111,32 +109,20 @@ def perform_pubmed_search(query: str, max_results: int = 100, max_records: Optio
     """
     logger.info(f"Performing PubMed search for query: '{query}'")
     
-    base_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
-    search_url = f"{base_url}/esearch.fcgi"
-    fetch_url = f"{base_url}/efetch.fcgi"
-    
     # Build search query with commercial use filter
     filtered_query = f"{query} AND \"loattrfree full text\"[sb]"
     
     # Search for article IDs
-    search_params = {
-        "db": "pubmed",
-        "term": filtered_query,
-        "retmax": max_results,
-        "retmode": "json",
-        "sort": "relevance",
-    }
-    
     try:
-        search_response = httpx.post(search_url, data=search_params, timeout=30.0)
-        search_response.raise_for_status()
-        search_data = search_response.json()
+        search_result = get_client().esearch(
+            filtered_query, retmax=max_results, sort="relevance"
+        )
     except Exception as e:
         logger.error(f"Error during PubMed search: {e}")
         raise Exception(f"PubMed search failed: {str(e)}")
     
     # Extract PMIDs
-    pmids = search_data.get("esearchresult", {}).get("idlist", [])
+    pmids = search_result.ids
     if not pmids:
         return f"No articles found for query: '{query}'"
     
@@ -146,29 +132,13 @@ def perform_pubmed_search(query: str, max_results: int = 100, max_records: Optio
     if max_records and len(pmids) > max_records:
         pmids = pmids[:max_records]
     
-    # Fetch article details
-    fetch_params = {
-        "db": "pubmed",
-        "id": ",".join(pmids),
-        "retmode": "xml",
-        "rettype": "abstract"
-    }
-    
+    # Fetch and parse article details
     try:
-        fetch_response = httpx.post(fetch_url, data=fetch_params, timeout=60.0)
-        fetch_response.raise_for_status()
-        articles_xml = fetch_response.text
+        articles = [to_article_data(article) for article in fetch_articles(pmids)]
     except Exception as e:
         logger.error(f"Error fetching article details: {e}")
         raise Exception(f"Failed to fetch article details: {str(e)}")
     
-    # Parse XML and extract article information
-    try:
-        articles = parse_pubmed_xml(articles_xml)
-    except Exception as e:
-        logger.error(f"Error parsing PubMed XML: {e}")
-        raise Exception(f"Failed to parse article data: {str(e)}")
-    
     # Calculate citation counts if reranking is enabled
     if rerank == "referenced_by" and len(articles) > 1:
         try:
@@ -182,66 +152,19 @@ def perform_pubmed_search(query: str, max_results: int = 100, max_records: Optio
     return formatted_results
 
 
-def parse_pubmed_xml(xml_content: str) -> List[Dict[str, Any]]:
-    """Parse PubMed XML response and extract article information."""
-    try:
-        root = ET.fromstring(xml_content)
-        articles = []
-        
-        for article_elem in root.findall(".//PubmedArticle"):
-            try:
-                pmid_elem = article_elem.find(".//PMID")
-                pmid = pmid_elem.text if pmid_elem is not None else "Unknown"
-                
-                title_elem = article_elem.find(".//ArticleTitle")
-                title = title_elem.text if title_elem is not None else "No title available"
-                
-                abstract_elem = article_elem.find(".//Abstract/AbstractText")
-                abstract = abstract_elem.text if abstract_elem is not None else "No abstract available"
-                
-                # Extract authors
-                authors = []
-                for author_elem in article_elem.findall(".//Author"):
-                    lastname_elem = author_elem.find("LastName")
-                    forename_elem = author_elem.find("ForeName")
-                    if lastname_elem is not None and forename_elem is not None:
-                        authors.append(f"{forename_elem.text} {lastname_elem.text}")
-                
-                # Extract journal info
-                journal_elem = article_elem.find(".//Journal/Title")
-                journal = journal_elem.text if journal_elem is not None else "Unknown Journal"
-                
-                # Extract publication date
-                pub_date_elem = article_elem.find(".//PubDate/Year")
-                pub_year = pub_date_elem.text if pub_date_elem is not None else "Unknown"
-                
-                # Extract DOI
-                doi_elem = article_elem.find(".//ArticleId[@IdType='doi']")
-                doi = doi_elem.text if doi_elem is not None else None
-                
-                article_data = {
-                    'pmid': pmid,
-                    'title': title,
-                    'abstract': abstract,
-                    'authors': authors,
-                    'journal': journal,
-                    'publication_year': pub_year,
-                    'doi': doi,
-                    'pubmed_url': f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/",
-                    'referenced_by_count': 0  # Will be updated if citation counting is performed
-                }
-                
-                articles.append(article_data)
-                
-            except Exception as e:
-                logger.warning(f"Error parsing individual article: {e}")
-                continue
-        
-        return articles
-        
-    except ET.ParseError as e:
-        logger.error(f"XML parsing error: {e}")
-        raise Exception(f"Invalid XML response from PubMed: {str(e)}")
+def to_article_data(article: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert an article parsed by ncbi_client into the fields used for ranking and formatting."""
+    return {
+        'pmid': article['pmid'] or "Unknown",
+        'title': article['title'] or "No title available",
+        'abstract': article['abstract'] or "No abstract available",
+        'authors': article['authors'],
+        'journal': article['journal'] or "Unknown Journal",
+        'publication_year': article['year'] or "Unknown",
+        'doi': article['doi'],
+        'pubmed_url': article['url'],
+        'referenced_by_count': 0  # Will be updated if citation counting is performed
+    }
 
 
 def calculate_citation_counts(articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -0,0 +1,147 @@
+"""
+Benchmark streamed against blocking synthesis in the simple supervisor.
+
+Run from the 25-Pubmed-Supervisor-Agent directory:
+
+    python benchmarks/benchmark_streaming.py
+    python benchmarks/benchmark_streaming.py --fail-primary open
+    python benchmarks/benchmark_streaming.py --bedrock
+
+By default Bedrock is replaced by FakeBedrockRuntime, which produces
+Anthropic messages stream events locally at a configurable first-token
+latency and token rate. Time to first token of the blocking call is its full
+latency, since nothing can be shown until invoke_model returns.
+"""
+
+import argparse
+import io
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "lambda"))
+
+import simple_supervisor_handler as supervisor  # noqa: E402
+
+
+class FakeBedrockRuntime:
+    """
+    Local stand-in for the bedrock-runtime client.
+
+    Generates `tokens` output tokens after `first_token_latency` seconds at
+    `tokens_per_second`, for invoke_model and invoke_model_with_response_stream.
+    Models in `fail_models` fail when the stream is opened ("open") or with an
+    in-stream error event before the first token ("stream").
+    """
+
+    def __init__(self, first_token_latency=0.8, tokens_per_second=80.0, tokens=400,
+                 chunk_tokens=4, fail_models=(), fail_mode="open"):
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.tokens = tokens
+        self.chunk_tokens = chunk_tokens
+        self.fail_models = set(fail_models)
+        self.fail_mode = fail_mode
+
+    def _text(self):
+        return " ".join(f"token{i}" for i in range(self.tokens))
+
+    def invoke_model(self, modelId, body):
+        if modelId in self.fail_models:
+            raise Exception(f"Simulated failure of {modelId}")
+        time.sleep(self.first_token_latency + self.tokens / self.tokens_per_second)
+        response = {
+            "content": [{"type": "text", "text": self._text()}],
+            "usage": {"output_tokens": self.tokens},
+        }
+        return {"body": io.BytesIO(json.dumps(response).encode())}
+
+    def invoke_model_with_response_stream(self, modelId, body):
+        if modelId in self.fail_models and self.fail_mode == "open":
+            raise Exception(f"Simulated failure of {modelId}")
+        return {"body": self._events(modelId)}
+
+    def _events(self, model_id):
+        def event(payload):
+            return {"chunk": {"bytes": json.dumps(payload).encode()}}
+
+        start = time.perf_counter()
+        time.sleep(self.first_token_latency)
+        if model_id in self.fail_models:
+            yield {"modelStreamErrorException": {"message": "Simulated stream error"}}
+            return
+        yield event({"type": "message_start", "message": {"usage": {"input_tokens": 1000}}})
+        yield event({"type": "content_block_start", "index": 0})
+        words = self._text().split(" ")
+        for i in range(0, len(words), self.chunk_tokens):
+            time.sleep(self.chunk_tokens / self.tokens_per_second)
+            text = " ".join(words[i:i + self.chunk_tokens]) + " "
+            yield event({"type": "content_block_delta", "index": 0,
+                         "delta": {"type": "text_delta", "text": text}})
+        yield event({"type": "content_block_stop", "index": 0})
+        yield event({"type": "message_delta", "usage": {"output_tokens": self.tokens}})
+        yield event({
+            "type": "message_stop",
+            "amazon-bedrock-invocationMetrics": {
+                "outputTokenCount": self.tokens,
+                "invocationLatency": int((time.perf_counter() - start) * 1000),
+            },
+        })
+
+
+def blocking(prompt, max_tokens):
+    """Time to first visible output and total seconds of call_bedrock_model"""
+    start = time.perf_counter()
+    supervisor.call_bedrock_model(prompt, max_tokens=max_tokens)
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed, None
+
+
+def streaming(prompt, max_tokens):
+    """Time to first chunk, total seconds and metrics of stream_bedrock_model"""
+    metrics = supervisor.PipelineMetrics()
+    start = time.perf_counter()
+    first = None
+    for _ in supervisor.stream_bedrock_model(prompt, max_tokens=max_tokens, metrics=metrics):
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start, metrics.values
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streamed synthesis")
+    parser.add_argument("--bedrock", action="store_true", help="Call Amazon Bedrock")
+    parser.add_argument("--first-token-latency", type=float, default=0.8)
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--tokens", type=int, default=400)
+    parser.add_argument("--fail-primary", choices=["open", "stream"],
+                        help="Make the primary model fail when the stream opens or in the stream")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    if not args.bedrock:
+        supervisor.bedrock_runtime = FakeBedrockRuntime(
+            first_token_latency=args.first_token_latency,
+            tokens_per_second=args.tokens_per_second,
+            tokens=args.tokens,
+            fail_models=[supervisor.BEDROCK_MODEL_ID] if args.fail_primary else [],
+            fail_mode=args.fail_primary or "open",
+        )
+
+    prompt = "Summarise the evidence for osimertinib resistance mechanisms in EGFR mutant NSCLC."
+    print(f"{'mode':>10} {'first output s':>14} {'total s':>8} {'ttft ms':>8} {'tok/s':>7} {'fallback':>8}")
+    for name, run in (("blocking", blocking), ("streaming", streaming)):
+        for _ in range(args.repeats):
+            first, total, values = run(prompt, args.tokens)
+            values = values or {}
+            print(
+                f"{name:>10} {first:>14.2f} {total:>8.2f} "
+                f"{values.get('TimeToFirstToken', float('nan')):>8.0f} "
+                f"{values.get('TokensPerSecond', float('nan')):>7.1f} "
+                f"{values.get('FallbackUsed', '-'):>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
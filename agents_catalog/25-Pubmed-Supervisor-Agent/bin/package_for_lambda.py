@@ -73,6 +73,15 @@ def main():
         "--only-binary=:all:",
         "--upgrade"
     ], check=True)
+
+    # Add the shared NCBI E-utilities client (pure Python, so no platform wheels)
+    subprocess.run([
+        "pip", "install",
+        str(project_root.parent / "shared" / "ncbi-client"),
+        "--no-deps",
+        "--target", str(dependencies_dir),
+        "--upgrade"
+    ], check=True)
     
     print("=== Packaging dependencies ===")
     
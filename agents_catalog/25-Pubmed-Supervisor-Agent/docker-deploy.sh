@@ -129,6 +129,11 @@ build_image() {
         print_warning "This may take longer due to emulation"
     fi
     
+    # The shared NCBI client lives outside this directory, so copy it into the
+    # build context for the Dockerfile to install
+    rm -rf .ncbi-client
+    cp -R ../shared/ncbi-client .ncbi-client
+
     # Build with architecture-specific configuration
     if docker-compose -f "$DOCKER_COMPOSE_FILE" build --no-cache pubmed-deployment; then
         print_success "Docker image built successfully"
@@ -9,11 +9,25 @@ import boto3
 import json
 import logging
 import re
+import threading
 from botocore.exceptions import ClientError, NoCredentialsError
 from typing import Optional
 
 logger = logging.getLogger(__name__)
 
+# boto3 clients are thread-safe but creating them from the default session is
+# not, so concurrent reads share clients created once under a lock
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _get_client(service_name: str, **kwargs):
+    with _clients_lock:
+        if service_name not in _clients:
+            _clients[service_name] = boto3.client(service_name, **kwargs)
+        return _clients[service_name]
+
+
 def read_pubmed(pmcid: str, source: str = None) -> str:
     """
     Read PMC article from S3 Open Access Subset.
@@ -37,7 +51,7 @@ def read_pubmed(pmcid: str, source: str = None) -> str:
     
     try:
         # Create S3 client with anonymous access
-        s3_client = boto3.client(
+        s3_client = _get_client(
             's3',
             config=boto3.session.Config(signature_version='UNSIGNED')
         )
@@ -151,7 +165,7 @@ def summarize_article(article_text: str) -> str:
     """
     try:
         # Try to use Amazon Bedrock for summarization
-        bedrock_client = boto3.client('bedrock-runtime')
+        bedrock_client = _get_client('bedrock-runtime')
         
         prompt = f"""Please provide a concise summary of this scientific article, focusing on the main findings, methodology, and conclusions:
 
@@ -5,11 +5,11 @@ This is a clean, simplified version of the PubMed search functionality
 without any Strands framework dependencies.
 """
 
-import httpx
 import logging
 from typing import Dict, List, Any
 from xml.etree.ElementTree import Element
 from defusedxml import ElementTree as ET
+from ncbi_client import get_client
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +26,28 @@ def search_pubmed(query: str, max_results: int = 100, max_records: int = None, r
     Returns:
         str: Formatted search results
     """
+    if rerank not in ["referenced_by"]:
+        rerank = "referenced_by"
+
+    articles = search_articles(query, max_results, max_records)
+    return format_search_results(articles, query)
+
+
+def search_articles(query: str, max_results: int = 100, max_records: int = None) -> List[Dict[str, Any]]:
+    """
+    Search PubMed and return the matching articles as structured records.
+
+    Requests go through the process-wide ncbi_client, so searches running in
+    parallel threads share one connection pool and NCBI rate limit.
+
+    Args:
+        query: The search query for PubMed
+        max_results: Maximum number of results to fetch (default: 100)
+        max_records: Maximum number of articles to return (default: None)
+
+    Returns:
+        List[Dict[str, Any]]: Articles in relevance order, as returned by parse_pubmed_xml
+    """
     # Parameter validation
     if not query or not isinstance(query, str) or not query.strip():
         raise ValueError("Query parameter is required and must be a non-empty string")
@@ -35,9 +57,6 @@ def search_pubmed(query: str, max_results: int = 100, max_records: int = None, r
         
     if max_records is not None and (not isinstance(max_records, int) or max_records < 1 or max_records > 100):
         max_records = None
-        
-    if rerank not in ["referenced_by"]:
-        rerank = "referenced_by"
 
     logger.info(f"Searching PubMed for: {query}")
 
@@ -46,24 +65,10 @@ def search_pubmed(query: str, max_results: int = 100, max_records: int = None, r
         filtered_query = f"{query} AND \"loattrfree full text\"[sb]"
         
         # Search for article IDs
-        search_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
-        search_params = {
-            "db": "pubmed",
-            "term": filtered_query,
-            "retmax": max_results,
-            "retmode": "json",
-            "sort": "relevance",
-        }
-        
-        with httpx.Client(timeout=30.0) as client:
-            search_response = client.post(search_url, data=search_params)
-            search_response.raise_for_status()
-            search_data = search_response.json()
-        
-        # Extract PMIDs
-        pmids = search_data.get("esearchresult", {}).get("idlist", [])
+        client = get_client()
+        pmids = client.esearch(filtered_query, retmax=max_results, sort="relevance").ids
         if not pmids:
-            return f"No articles found for query: '{query}'"
+            return []
         
         logger.info(f"Found {len(pmids)} articles")
         
@@ -71,33 +76,18 @@ def search_pubmed(query: str, max_results: int = 100, max_records: int = None, r
         if max_records and len(pmids) > max_records:
             pmids = pmids[:max_records]
         
-        # Fetch article details
-        fetch_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
-        fetch_params = {
-            "db": "pubmed",
-            "id": ",".join(pmids),
-            "retmode": "xml",
-            "rettype": "abstract"
-        }
-        
-        with httpx.Client(timeout=60.0) as client:
-            fetch_response = client.post(fetch_url, data=fetch_params)
-            fetch_response.raise_for_status()
-            articles_xml = fetch_response.text
-        
-        # Parse XML and extract article information
-        articles = parse_pubmed_xml(articles_xml)
-        
-        # Format results
-        formatted_results = format_search_results(articles, query)
-        return formatted_results
+        # Fetch article details and parse XML into article records
+        articles = []
+        for body in client.efetch(pmids, retmode="xml", rettype="abstract"):
+            articles.extend(parse_pubmed_xml(body))
+        return articles
         
     except Exception as e:
         logger.error(f"Error in PubMed search: {e}")
         raise Exception(f"PubMed search failed: {str(e)}")
 
 
-def parse_pubmed_xml(xml_content: str) -> List[Dict[str, Any]]:
+def parse_pubmed_xml(xml_content) -> List[Dict[str, Any]]:
     """Parse PubMed XML response and extract article information."""
     try:
         root = ET.fromstring(xml_content)
@@ -134,6 +124,10 @@ def parse_pubmed_xml(xml_content: str) -> List[Dict[str, Any]]:
                 doi_elem = article_elem.find(".//ArticleId[@IdType='doi']")
                 doi = doi_elem.text if doi_elem is not None else None
                 
+                # Extract PMC ID of the article itself, not of its references
+                pmcid_elem = article_elem.find("./PubmedData/ArticleIdList/ArticleId[@IdType='pmc']")
+                pmcid = pmcid_elem.text if pmcid_elem is not None else None
+                
                 article_data = {
                     'pmid': pmid,
                     'title': title,
@@ -142,6 +136,7 @@ def parse_pubmed_xml(xml_content: str) -> List[Dict[str, Any]]:
                     'journal': journal,
                     'publication_year': pub_year,
                     'doi': doi,
+                    'pmcid': pmcid,
                     'pubmed_url': f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/",
                 }
                 
@@ -182,6 +177,9 @@ def format_search_results(articles: List[Dict[str, Any]], query: str) -> str:
             f"   URL: {article['pubmed_url']}",
         ])
         
+        if article.get('pmcid'):
+            result_lines.append(f"   PMCID: {article['pmcid']}")
+        
         if article['doi']:
             result_lines.append(f"   DOI: https://doi.org/{article['doi']}")
         
@@ -5,20 +5,40 @@ This implements the multi-agent pattern using basic Python libraries:
 - Supervisor Agent: Expands queries and coordinates research
 - PubMed Researcher: Uses proven search_pubmed and read_pubmed tools
 - Direct Bedrock API calls instead of Strands SDK
+
+The researcher runs as a concurrent pipeline: every expanded sub-query is
+searched in parallel, results are merged by PMID as each search finishes,
+and full-text reads start while later searches are still in flight.
 """
 
 import json
+import threading
+import time
 import boto3
 import logging
-from typing import Any, Dict, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
 import search_pubmed_simple
 import read_pubmed_simple
 
 # Configuration
 BEDROCK_MODEL_ID = "us.anthropic.claude-3-7-sonnet-20250219-v1:0"
+FALLBACK_MODEL_ID = "anthropic.claude-3-haiku-20240307-v1:0"
 MAX_SUMMARY_TOKENS = 1000  # Limit for summary generation
 TARGET_SUMMARY_LENGTH = 2000  # Target character count for summaries
 
+# Research pipeline
+MAX_SUB_QUERIES = 4  # Sub-queries searched in parallel
+SEARCH_MAX_RESULTS = 200  # Cast wide net
+SEARCH_MAX_RECORDS = 20  # Focus on top results of each sub-query
+MAX_FULL_TEXT_READS = 3  # Full-text articles read for detailed analysis
+SYNTHESIS_MAX_ARTICLES = 20  # Merged articles passed to synthesis
+SYNTHESIS_ABSTRACT_LENGTH = 500  # Abstract characters per article in synthesis
+
+# CloudWatch Embedded Metric Format namespace for per-stage timings
+METRICS_NAMESPACE = "PubMedSupervisor"
+
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -26,32 +46,102 @@ logger.setLevel(logging.INFO)
 # Initialize Bedrock client
 bedrock_runtime = boto3.client('bedrock-runtime', region_name='us-east-2')
 
+
+class PipelineMetrics:
+    """
+    Wall-clock timings and other measurements for one request.
+
+    emit() prints them as a CloudWatch Embedded Metric Format record, which
+    Lambda turns into metrics from the log stream without extra API calls.
+    """
+
+    def __init__(self):
+        self.values: Dict[str, float] = {}
+        self.units: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block as the named stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name: str, seconds: float):
+        self.count(name, round(seconds * 1000, 1), unit="Milliseconds")
+
+    def count(self, name: str, value: float, unit: str = "Count"):
+        with self._lock:
+            self.values[name] = value
+            self.units[name] = unit
+
+    def emit(self):
+        """Print the metrics as one EMF log line."""
+        with self._lock:
+            values = dict(self.values)
+            definitions = [{"Name": name, "Unit": unit} for name, unit in self.units.items()]
+        logger.info(f"Pipeline metrics: {json.dumps(values)}")
+        print(json.dumps({
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": METRICS_NAMESPACE,
+                    "Dimensions": [["Pipeline"]],
+                    "Metrics": definitions,
+                }],
+            },
+            "Pipeline": "simple_supervisor",
+            **values,
+        }))
+
+
 def handler(event: Dict[str, Any], context) -> str:
     """
     Main handler implementing the Supervisor Agent pattern without Strands SDK.
     """
+    return "".join(stream_handler(event, context))
+
+
+def stream_handler(event: Dict[str, Any], context) -> Iterator[str]:
+    """
+    Run the Supervisor Agent pattern and yield the response as it is generated.
+
+    The synthesis is streamed from Bedrock, so callers that can forward
+    partial output (e.g. a response-streaming front end) see the first
+    tokens long before the whole review is written.
+    """
     logger.info(f"Event received: {json.dumps(event)}")
     
     user_prompt = event.get("prompt", "")
     if not user_prompt:
-        return "Error: No prompt provided"
+        yield "Error: No prompt provided"
+        return
     
+    metrics = PipelineMetrics()
+    start = time.perf_counter()
     try:
         # Supervisor Agent analyzes and expands the query
-        expanded_query = expand_scientific_query(user_prompt)
+        with metrics.stage("ExpandQueryTime"):
+            expanded_query = expand_scientific_query(user_prompt)
         logger.info(f"Expanded query: {expanded_query}")
         
         # Delegate to PubMed Researcher Agent
-        research_results = conduct_pubmed_research(expanded_query)
+        research_results = conduct_pubmed_research(expanded_query, metrics)
         
         # Supervisor synthesizes the final response
-        final_response = synthesize_research_response(user_prompt, research_results)
-        
-        return final_response
+        synthesis_start = time.perf_counter()
+        yield from stream_research_response(user_prompt, research_results, metrics)
+        metrics.record("SynthesisTime", time.perf_counter() - synthesis_start)
         
     except Exception as e:
         logger.error(f"Error in supervisor handler: {str(e)}")
-        return f"Error processing request: {str(e)}"
+        yield f"Error processing request: {str(e)}"
+
+    finally:
+        metrics.record("TotalTime", time.perf_counter() - start)
+        metrics.emit()
 
 
 def expand_scientific_query(user_query: str) -> Dict[str, Any]:
@@ -65,12 +155,14 @@ User Query: "{user_query}"
 
 Provide:
 1. Expanded search terms (including MeSH terms, synonyms, related concepts)
-2. Suggested search strategy (recent papers, reviews, clinical trials, etc.)
-3. Key aspects to focus on in the research
+2. Between 2 and {MAX_SUB_QUERIES} focused PubMed sub-queries, each covering a different aspect of the question
+3. Suggested search strategy (recent papers, reviews, clinical trials, etc.)
+4. Key aspects to focus on in the research
 
 Respond in JSON format:
 {{
     "expanded_terms": "expanded search query with OR operators",
+    "sub_queries": ["focused query 1", "focused query 2"],
     "search_strategy": "description of search approach",
     "focus_areas": ["area1", "area2", "area3"],
     "temporal_filter": "time range if relevant (e.g., 'last 5 years')"
@@ -101,95 +193,188 @@ Respond in JSON format:
         }
 
 
-def conduct_pubmed_research(expansion_data: Dict[str, Any]) -> Dict[str, Any]:
+def build_search_queries(expansion_data: Dict[str, Any]) -> List[str]:
     """
-    PubMed Researcher Agent function: Execute literature search and analysis.
+    Supervisor Agent function: Turn the query expansion into the PubMed queries to run.
+
+    Uses the expanded sub-queries, or the expanded terms when there are none,
+    with the temporal filter applied and duplicates removed.
     """
-    expanded_query = expansion_data.get("expanded_terms", "")
-    temporal_filter = expansion_data.get("temporal_filter")
+    sub_queries = expansion_data.get("sub_queries") or []
+    if isinstance(sub_queries, str):
+        sub_queries = [sub_queries]
+    queries = [q.strip() for q in sub_queries if isinstance(q, str) and q.strip()]
+    if not queries:
+        queries = [expansion_data.get("expanded_terms", "")]
     
     # Add temporal filter if specified
+    temporal_filter = expansion_data.get("temporal_filter")
     if temporal_filter and "year" in temporal_filter.lower():
-        search_query = f"{expanded_query} AND {temporal_filter}[dp]"
-    else:
-        search_query = expanded_query
+        queries = [f"{query} AND {temporal_filter}[dp]" for query in queries]
+    
+    return list(dict.fromkeys(queries))[:MAX_SUB_QUERIES]
+
+
+def merge_articles(merged: Dict[str, Dict[str, Any]], query_index: int, articles: List[Dict[str, Any]]):
+    """
+    Merge one sub-query's articles into the results so far, deduplicated by PMID.
+
+    Each record keeps the sub-queries that found it and its best (rank, sub-query) position.
+    """
+    for rank, article in enumerate(articles):
+        record = merged.get(article["pmid"])
+        if record is None:
+            merged[article["pmid"]] = dict(article, sub_queries=[query_index], best_rank=(rank, query_index))
+        else:
+            record["sub_queries"].append(query_index)
+            record["best_rank"] = min(record["best_rank"], (rank, query_index))
+
+
+def rank_merged_articles(merged: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Order merged articles by the number of sub-queries that found them, then by best rank."""
+    return sorted(merged.values(), key=lambda a: (-len(a["sub_queries"]), a["best_rank"]))
+
+
+def conduct_pubmed_research(expansion_data: Dict[str, Any], metrics: Optional[PipelineMetrics] = None) -> Dict[str, Any]:
+    """
+    PubMed Researcher Agent function: Execute literature search and analysis.
+
+    Sub-queries are searched in parallel. As each search finishes its articles
+    are merged and its best full-text articles are read without waiting for
+    the remaining searches. Any read budget left once every search is done
+    goes to the best merged articles.
+    """
+    metrics = metrics or PipelineMetrics()
+    search_queries = build_search_queries(expansion_data)
+    logger.info(f"Executing {len(search_queries)} PubMed searches: {search_queries}")
     
-    logger.info(f"Executing PubMed search: {search_query}")
+    # Share the read budget between searches so the first to finish cannot take all of it
+    reads_per_search = max(1, -(-MAX_FULL_TEXT_READS // len(search_queries)))
+    merged: Dict[str, Dict[str, Any]] = {}
+    reads: Dict[str, Future] = {}
+    read_start: List[float] = []
     
-    try:
-        # Use the simplified search_pubmed tool
-        search_results = search_pubmed_simple.search_pubmed(
-            query=search_query,
-            max_results=200,  # Cast wide net
-            max_records=20,   # Focus on top results
-            rerank="referenced_by"  # Prioritize influential papers
-        )
+    def start_reads(articles: List[Dict[str, Any]], limit: int):
+        for article in articles:
+            if limit <= 0 or len(reads) >= MAX_FULL_TEXT_READS:
+                return
+            pmc_id = article.get("pmcid")
+            if pmc_id and pmc_id not in reads:
+                if not read_start:
+                    read_start.append(time.perf_counter())
+                reads[pmc_id] = executor.submit(read_pubmed_simple.read_pubmed, pmcid=pmc_id)
+                limit -= 1
+    
+    with ThreadPoolExecutor(max_workers=len(search_queries) + MAX_FULL_TEXT_READS) as executor:
+        with metrics.stage("SearchTime"):
+            searches = {
+                executor.submit(
+                    search_pubmed_simple.search_articles,
+                    query,
+                    max_results=SEARCH_MAX_RESULTS,
+                    max_records=SEARCH_MAX_RECORDS,
+                ): index
+                for index, query in enumerate(search_queries)
+            }
+            for future in as_completed(searches):
+                index = searches[future]
+                try:
+                    found = future.result()
+                except Exception as e:
+                    logger.warning(f"Search failed for '{search_queries[index]}': {e}")
+                    continue
+                logger.info(f"Sub-query {index + 1} returned {len(found)} articles")
+                merge_articles(merged, index, found)
+                start_reads(found, reads_per_search)
         
-        # Extract PMC IDs from search results for full-text reading
-        pmc_ids = extract_pmc_ids_from_search(search_results)
+        articles = rank_merged_articles(merged)
+        start_reads(articles, MAX_FULL_TEXT_READS)
         
-        # Read 2-3 most relevant articles for detailed analysis
+        # Collect full-text reads, most of which started during the searches
         full_text_analyses = []
-        for pmc_id in pmc_ids[:3]:  # Limit to top 3
-            try:
-                article_content = read_pubmed_simple.read_pubmed(pmcid=pmc_id)
-                full_text_analyses.append({
-                    "pmcid": pmc_id,
-                    "content": article_content
-                })
-            except Exception as e:
-                logger.warning(f"Failed to read {pmc_id}: {e}")
-                continue
-        
-        return {
-            "search_results": search_results,
-            "full_text_analyses": full_text_analyses,
-            "search_query": search_query
-        }
-        
-    except Exception as e:
-        logger.error(f"PubMed research failed: {e}")
-        return {
-            "search_results": f"Search failed: {str(e)}",
-            "full_text_analyses": [],
-            "search_query": search_query
-        }
+        with metrics.stage("ReadWaitTime"):
+            pmids = {article.get("pmcid"): article["pmid"] for article in articles}
+            for pmc_id, future in reads.items():
+                try:
+                    full_text_analyses.append({
+                        "pmcid": pmc_id,
+                        "pmid": pmids.get(pmc_id),
+                        "content": future.result()
+                    })
+                except Exception as e:
+                    logger.warning(f"Failed to read {pmc_id}: {e}")
+                    continue
+        if read_start:
+            metrics.record("ReadTime", time.perf_counter() - read_start[0])
+    
+    metrics.count("SubQueries", len(search_queries))
+    metrics.count("ArticlesFound", len(articles))
+    metrics.count("FullTextReads", len(full_text_analyses))
+    
+    return {
+        "articles": articles,
+        "full_text_analyses": full_text_analyses,
+        "search_queries": search_queries,
+        "search_query": "; ".join(search_queries)
+    }
 
 
-def extract_pmc_ids_from_search(search_results: str) -> List[str]:
+def format_articles_for_synthesis(research_data: Dict[str, Any]) -> str:
     """
-    Extract PMC IDs from search results for full-text reading.
+    Render the structured article records and full-text analyses for the synthesis prompt.
     """
-    pmc_ids = []
-    lines = search_results.split('\n')
+    articles = research_data.get("articles", [])
+    if not articles:
+        return "No articles found."
+    
+    lines = []
+    for i, article in enumerate(articles[:SYNTHESIS_MAX_ARTICLES], 1):
+        reference = f"PMID: {article['pmid']}"
+        if article.get("pmcid"):
+            reference += f", {article['pmcid']}"
+        abstract = article.get("abstract") or "No abstract available"
+        if len(abstract) > SYNTHESIS_ABSTRACT_LENGTH:
+            abstract = abstract[:SYNTHESIS_ABSTRACT_LENGTH] + "..."
+        lines.extend([
+            f"{i}. {article['title']} ({reference})",
+            f"   Journal: {article['journal']} ({article['publication_year']})",
+            f"   Found by {len(article['sub_queries'])} of {len(research_data.get('search_queries', []))} sub-queries",
+            f"   Abstract: {abstract}",
+        ])
     
-    for line in lines:
-        # Look for PMC IDs in the search results
-        if 'PMC' in line:
-            # Simple regex-like extraction
-            words = line.split()
-            for word in words:
-                if word.startswith('PMC') and word[3:].isdigit():
-                    pmc_ids.append(word)
-                    break
+    for analysis in research_data.get("full_text_analyses", []):
+        content = analysis["content"]
+        if len(content) > TARGET_SUMMARY_LENGTH:
+            content = content[:TARGET_SUMMARY_LENGTH] + "..."
+        lines.extend(["", f"Full text of {analysis['pmcid']} (PMID: {analysis['pmid']}):", content])
     
-    return pmc_ids[:5]  # Return up to 5 PMC IDs
+    return "\n".join(lines)
 
 
 def synthesize_research_response(original_query: str, research_data: Dict[str, Any]) -> str:
     """
     Supervisor Agent function: Synthesize research findings into comprehensive response.
     """
+    return "".join(stream_research_response(original_query, research_data))
+
+
+def stream_research_response(original_query: str, research_data: Dict[str, Any], metrics: Optional[PipelineMetrics] = None) -> Iterator[str]:
+    """
+    Supervisor Agent function: Stream the synthesis of research findings as it is generated.
+    """
     synthesis_prompt = f"""
 You are a scientific research supervisor synthesizing literature findings. Based on the research conducted, provide a comprehensive, well-cited response to the user's question.
 
 Original User Query: "{original_query}"
 
 Research Data:
-- Search Query Used: {research_data.get('search_query', 'N/A')}
-- Search Results: {research_data.get('search_results', 'No results')}
+- Search Queries Used: {research_data.get('search_query', 'N/A')}
+- Articles Found: {len(research_data.get('articles', []))}
 - Full-text Analyses: {len(research_data.get('full_text_analyses', []))} articles analyzed
 
+Articles:
+{format_articles_for_synthesis(research_data)}
+
 Provide a comprehensive response that:
 1. Directly answers the user's question
 2. Summarizes key findings from the literature
@@ -201,17 +386,27 @@ Provide a comprehensive response that:
 Format your response professionally as a scientific literature review summary.
 """
     
+    streamed = False
     try:
-        response = call_bedrock_model(synthesis_prompt, max_tokens=2000)
-        return response
+        for chunk in stream_bedrock_model(synthesis_prompt, max_tokens=2000, metrics=metrics, metric_prefix="Synthesis"):
+            streamed = True
+            yield chunk
+        return
     except Exception as e:
         logger.error(f"Synthesis failed: {e}")
+        if streamed:
+            # Part of the synthesis has already been forwarded
+            yield "\n\n[Synthesis interrupted due to a technical issue]"
+            return
+        search_results = search_pubmed_simple.format_search_results(
+            research_data.get('articles', []), research_data.get('search_query', original_query)
+        )
         # Fallback response
-        return f"""
+        yield f"""
 Based on the literature search for "{original_query}":
 
 Search Results Summary:
-{research_data.get('search_results', 'Search results unavailable')}
+{search_results}
 
 This represents a multi-agent approach where:
 1. Supervisor Agent expanded your query: "{research_data.get('search_query', original_query)}"
@@ -264,7 +459,7 @@ def call_bedrock_model(prompt: str, max_tokens: int = 1000) -> str:
             }
             
             response = bedrock_runtime.invoke_model(
-                modelId="anthropic.claude-3-haiku-20240307-v1:0",
+                modelId=FALLBACK_MODEL_ID,
                 body=json.dumps(request_body)
             )
             
@@ -276,6 +471,80 @@ def call_bedrock_model(prompt: str, max_tokens: int = 1000) -> str:
             raise Exception(f"Bedrock API calls failed: {str(e2)}")
 
 
+def stream_bedrock_model(prompt: str, max_tokens: int = 1000, metrics: Optional[PipelineMetrics] = None, metric_prefix: str = "") -> Iterator[str]:
+    """
+    Streaming Bedrock API call: yield the response text as chunks arrive.
+
+    The primary model is tried first. On the first error before any text
+    has been yielded, whether opening the stream or reading from it, the
+    fallback model is streamed instead. Errors after text has been yielded
+    are raised, since the partial output may already have been forwarded.
+
+    Records time to first token, output tokens and tokens per second of the
+    generation in metrics, prefixed with metric_prefix.
+    """
+    request_body = json.dumps({
+        "anthropic_version": "bedrock-2023-05-31",
+        "max_tokens": max_tokens,
+        "messages": [
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+    })
+    
+    # Time to first token includes any failed attempt on the primary model
+    start = time.perf_counter()
+    errors = []
+    for model_id in (BEDROCK_MODEL_ID, FALLBACK_MODEL_ID):
+        first_token = None
+        output_tokens = None
+        try:
+            response = bedrock_runtime.invoke_model_with_response_stream(
+                modelId=model_id,
+                body=request_body
+            )
+            for event in response['body']:
+                if 'chunk' not in event:
+                    # Errors raised inside the stream, e.g. throttlingException
+                    raise Exception(f"Stream error: {next(iter(event), 'unknown')}")
+                chunk = json.loads(event['chunk']['bytes'])
+                if chunk.get('type') == 'content_block_delta' and chunk['delta'].get('type') == 'text_delta':
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                    yield chunk['delta']['text']
+                elif chunk.get('type') == 'message_delta':
+                    output_tokens = chunk.get('usage', {}).get('output_tokens', output_tokens)
+                invocation_metrics = chunk.get('amazon-bedrock-invocationMetrics')
+                if invocation_metrics:
+                    output_tokens = invocation_metrics.get('outputTokenCount', output_tokens)
+        except Exception as e:
+            if first_token is not None:
+                raise
+            logger.warning(f"Streaming from {model_id} failed: {e}")
+            errors.append(e)
+            continue
+        
+        end = time.perf_counter()
+        if metrics is not None:
+            metrics.count(f"{metric_prefix}FallbackUsed", int(model_id != BEDROCK_MODEL_ID))
+            if first_token is not None:
+                metrics.record(f"{metric_prefix}TimeToFirstToken", first_token - start)
+            if output_tokens:
+                metrics.count(f"{metric_prefix}OutputTokens", output_tokens)
+                if first_token is not None and end > first_token:
+                    metrics.count(
+                        f"{metric_prefix}TokensPerSecond",
+                        round(output_tokens / (end - first_token), 1),
+                        unit="Count/Second"
+                    )
+        return
+    
+    logger.error(f"All Bedrock models failed: {errors[-1]}")
+    raise Exception(f"Bedrock API calls failed: {str(errors[-1])}")
+
+
 # Alternative entry point for testing
 def lambda_handler(event, context):
     """Alternative entry point name for AWS Lambda."""
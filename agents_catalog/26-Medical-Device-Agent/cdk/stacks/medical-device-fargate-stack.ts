@@ -9,6 +9,7 @@ import * as iam from "aws-cdk-lib/aws-iam";
 import * as logs from "aws-cdk-lib/aws-logs";
 import * as elbv2 from "aws-cdk-lib/aws-elasticloadbalancingv2";
 import * as ecrAssets from "aws-cdk-lib/aws-ecr-assets";
+import * as fs from "fs";
 import * as path from "path";
 import { NagSuppressions } from "cdk-nag";
 
@@ -126,9 +127,16 @@ export class MedicalDeviceFargateStack extends Stack {
       },
     });
 
+    // The shared NCBI client lives outside this directory, so copy it into the
+    // Docker build context for the Dockerfile to install
+    const appDir = path.resolve(__dirname, "../..");
+    const ncbiClientDir = path.join(appDir, ".ncbi-client");
+    fs.rmSync(ncbiClientDir, { recursive: true, force: true });
+    fs.cpSync(path.resolve(appDir, "../shared/ncbi-client"), ncbiClientDir, { recursive: true });
+
     // Create Docker image asset from current directory
     const dockerAsset = new ecrAssets.DockerImageAsset(this, `${projectName}-image`, {
-      directory: path.resolve(__dirname, "../.."),
+      directory: appDir,
       file: "./Dockerfile",
     });
 
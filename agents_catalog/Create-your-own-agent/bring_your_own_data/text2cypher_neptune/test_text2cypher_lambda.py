@@ -0,0 +1,298 @@
+"""
+Tests for streaming openCypher results, the Neptune executor and the query
+cache in text2cypher_lambda.py. The executor runs against a local
+http.server stand-in for the openCypher endpoint.
+
+    python -m pytest test_text2cypher_lambda.py
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import types
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock, patch
+from urllib.parse import parse_qs
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# The Lambda connects a NeptuneGraph at import time; iter_results needs neither
+_stubs = {}
+try:
+    import langchain_community.graphs  # noqa: F401
+except ImportError:
+    graphs = types.ModuleType("langchain_community.graphs")
+    graphs.NeptuneGraph = MagicMock()
+    _stubs = {
+        "langchain": types.ModuleType("langchain"),
+        "langchain_community": types.ModuleType("langchain_community"),
+        "langchain_community.graphs": graphs,
+    }
+
+with patch.dict(sys.modules, _stubs), patch.dict(
+    os.environ, {"NEPTUNE_HOST": "localhost", "NEPTUNE_PORT": "8182"}
+), patch("langchain_community.graphs.NeptuneGraph", MagicMock(), create=True):
+    import text2cypher_lambda
+
+
+def rows(*chunks):
+    return list(text2cypher_lambda.iter_results(chunk.encode("utf-8") for chunk in chunks))
+
+
+class TestIterResults(unittest.TestCase):
+    """Test cases for iter_results"""
+
+    def test_whole_response(self):
+        """Test a response that arrives in one chunk"""
+        self.assertEqual(rows('{"results": [{"a": 1}, {"a": 2}]}'), [{"a": 1}, {"a": 2}])
+
+    def test_boundary_inside_number(self):
+        """Test that a number split across chunks is not read as two numbers"""
+        self.assertEqual(rows('{"results":[12', '3, 4]}'), [123, 4])
+
+    def test_boundary_inside_literal_and_string(self):
+        """Test literals and strings split across chunks"""
+        self.assertEqual(rows('{"results":[tr', 'ue, "ab', 'c", nul', "l]}"), [True, "abc", None])
+
+    def test_boundary_inside_multibyte_character(self):
+        """Test that a UTF-8 character split across chunks is decoded once"""
+        body = '{"results": [{"name": "é"}]}'.encode("utf-8")
+        split = body.index(b"\xc3") + 1
+        chunks = [body[:split], body[split:]]
+        self.assertEqual(list(text2cypher_lambda.iter_results(chunks)), [{"name": "é"}])
+
+    def test_every_split_point(self):
+        """Test that the rows are the same wherever the body is split"""
+        body = '{"results": [1234, -5.5e3, {"x": [1, 2]}, "s", false, null]}'
+        expected = rows(body)
+        for i in range(1, len(body)):
+            self.assertEqual(rows(body[:i], body[i:]), expected, f"split at {i}")
+
+
+class FakeNeptune(BaseHTTPRequestHandler):
+    """openCypher endpoint returning rows {"id": 0} ... {"id": n - 1}, honouring a trailing SKIP/LIMIT"""
+
+    rows = 0
+    queries = []
+
+    @staticmethod
+    def row(i):
+        return {"id": i, "name": hashlib.sha256(str(i).encode()).hexdigest()}
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"])).decode()
+        query = parse_qs(body)["query"][0]
+        self.queries.append(query)
+        if "FAIL" in query:
+            self.send_response(400)
+            payload = json.dumps({"code": "MalformedQueryException", "detailedMessage": "Invalid input"})
+        else:
+            self.send_response(200)
+            paging = re.search(r"SKIP (\d+) LIMIT (\d+)$", query)
+            skip, limit = (int(paging.group(1)), int(paging.group(2))) if paging else (0, self.rows)
+            ids = range(skip, min(skip + limit, self.rows))
+            payload = json.dumps({"results": [self.row(i) for i in ids]})
+        payload = payload.encode()
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeS3:
+    """Records multipart uploads and put_object calls"""
+
+    def __init__(self):
+        self.calls = []
+        self.parts = []
+
+    def create_multipart_upload(self, **kwargs):
+        self.calls.append(("create_multipart_upload", kwargs))
+        return {"UploadId": "upload"}
+
+    def upload_part(self, **kwargs):
+        self.calls.append(("upload_part", kwargs))
+        self.parts.append(kwargs["Body"])
+        return {"ETag": f"etag{kwargs['PartNumber']}"}
+
+    def complete_multipart_upload(self, **kwargs):
+        self.calls.append(("complete_multipart_upload", kwargs))
+
+    def abort_multipart_upload(self, **kwargs):
+        self.calls.append(("abort_multipart_upload", kwargs))
+
+    def put_object(self, **kwargs):
+        self.calls.append(("put_object", kwargs))
+        self.parts.append(kwargs["Body"])
+
+    def generate_presigned_url(self, *args, **kwargs):
+        return "https://example.com/presigned"
+
+
+class TestNeptuneExecutor(unittest.TestCase):
+    """Test cases for NeptuneExecutor and query_neptune against a local server"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeNeptune)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.endpoint = f"http://127.0.0.1:{cls.server.server_port}/openCypher"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        FakeNeptune.rows = 10
+        FakeNeptune.queries = []
+        self.executor = text2cypher_lambda.NeptuneExecutor(self.endpoint)
+
+    def test_single_request_by_default(self):
+        """Test that ordered queries are streamed in one request unless paging is enabled"""
+        rows = list(self.executor.iter_rows("MATCH (n) RETURN n.id ORDER BY n.id;"))
+        self.assertEqual([row["id"] for row in rows], list(range(10)))
+        self.assertEqual(FakeNeptune.queries, ["MATCH (n) RETURN n.id ORDER BY n.id"])
+
+    def test_paging_stops_early(self):
+        """Test that pages are only requested while the caller reads"""
+        iterator = self.executor.iter_rows("MATCH (n) RETURN n.id ORDER BY n.id", page_size=3)
+        rows = [next(iterator)["id"] for _ in range(5)]
+        iterator.close()
+        self.assertEqual(rows, [0, 1, 2, 3, 4])
+        self.assertEqual(FakeNeptune.queries, [
+            "MATCH (n) RETURN n.id ORDER BY n.id SKIP 0 LIMIT 3",
+            "MATCH (n) RETURN n.id ORDER BY n.id SKIP 3 LIMIT 3",
+        ])
+
+    def test_paging_reads_every_page(self):
+        """Test that paging ends with the first short page and unordered queries are not paged"""
+        rows = list(self.executor.iter_rows("MATCH (n) RETURN n.id ORDER BY n.id", page_size=4))
+        self.assertEqual([row["id"] for row in rows], list(range(10)))
+        self.assertEqual(len(FakeNeptune.queries), 3)
+        list(self.executor.iter_rows("MATCH (n) RETURN n.id", page_size=4))
+        self.assertEqual(FakeNeptune.queries[-1], "MATCH (n) RETURN n.id")
+
+    def test_row_and_byte_budget(self):
+        """Test that reading stops at max_rows or max_bytes and the result is marked truncated"""
+        result = text2cypher_lambda.query_neptune("MATCH (n) RETURN n", executor=self.executor, max_rows=4)
+        self.assertEqual([row["id"] for row in result["results"]], [0, 1, 2, 3])
+        self.assertTrue(result["truncated"])
+
+        max_bytes = sum(len(json.dumps(FakeNeptune.row(i))) + 1 for i in range(3))
+        result = text2cypher_lambda.query_neptune(
+            "MATCH (n) RETURN n", executor=self.executor, max_bytes=max_bytes
+        )
+        self.assertEqual(len(result["results"]), 3)
+        self.assertTrue(result["truncated"])
+
+        result = text2cypher_lambda.query_neptune("MATCH (n) RETURN n", executor=self.executor)
+        self.assertEqual(len(result["results"]), 10)
+        self.assertNotIn("truncated", result)
+
+    def test_error_response(self):
+        """Test that Neptune errors are raised with their detailed message"""
+        with self.assertRaises(requests.exceptions.HTTPError) as raised:
+            text2cypher_lambda.query_neptune("FAIL", executor=self.executor)
+        self.assertIn("400 error from Neptune: Invalid input", str(raised.exception))
+
+    def test_multipart_overflow(self):
+        """Test that large results are streamed to S3 in parts as gzipped JSON Lines"""
+        FakeNeptune.rows = 3000
+        s3 = FakeS3()
+        writer = text2cypher_lambda.S3OverflowWriter
+        with patch.object(text2cypher_lambda, "get_s3_client", return_value=s3), patch.object(
+            text2cypher_lambda, "S3OverflowWriter",
+            lambda client, bucket, key: writer(client, bucket, key, part_bytes=16 * 1024),
+        ):
+            result = text2cypher_lambda.query_neptune(
+                "MATCH (n) RETURN n", bucket="bucket", key="result.jsonl.gz", executor=self.executor
+            )
+
+        self.assertEqual(result["type"], "presigned_url")
+        self.assertEqual(result["rows"], 3000)
+        self.assertFalse(result["truncated"])
+        names = [name for name, _ in s3.calls]
+        self.assertEqual(names[0], "create_multipart_upload")
+        self.assertEqual(names[-1], "complete_multipart_upload")
+        self.assertGreater(names.count("upload_part"), 1)
+        create = s3.calls[0][1]
+        self.assertEqual(create["ContentType"], "application/gzip")
+        self.assertNotIn("ContentEncoding", create)
+        lines = gzip.decompress(b"".join(s3.parts)).decode().splitlines()
+        self.assertEqual([json.loads(line)["id"] for line in lines], list(range(3000)))
+
+
+class TestQueryCache(unittest.TestCase):
+    """Test cases for the in-memory tier of QueryCache"""
+
+    def test_byte_bound(self):
+        """Test that least recently used entries are evicted by serialised size"""
+        cache = text2cypher_lambda.QueryCache(max_bytes=25, max_value_bytes=20)
+        cache.put("result", "a", "x" * 8)
+        cache.put("result", "b", "x" * 8)
+        cache.get("result", "a")
+        cache.put("result", "c", "x" * 8)
+        self.assertEqual(cache.get("result", "a"), "x" * 8)
+        self.assertIsNone(cache.get("result", "b"))
+        self.assertEqual(cache.memory_bytes, 20)
+
+    def test_large_values_are_not_cached(self):
+        """Test that values above max_value_bytes are skipped"""
+        cache = text2cypher_lambda.QueryCache(max_value_bytes=20)
+        cache.put("result", "a", "x" * 30)
+        self.assertIsNone(cache.get("result", "a"))
+        self.assertEqual(cache.memory_bytes, 0)
+
+    def test_invalidate_releases_bytes(self):
+        """Test that invalidated entries no longer count against the budget"""
+        cache = text2cypher_lambda.QueryCache()
+        cache.put("result", "a", [1, 2, 3])
+        cache.put("result", "a", [1, 2, 3])
+        self.assertEqual(cache.memory_bytes, len("[1, 2, 3]"))
+        cache.invalidate("result")
+        self.assertEqual(cache.memory_bytes, 0)
+
+
+class TestQuestionCache(unittest.TestCase):
+    """Test cases for get_schema_cached and remember_query"""
+
+    def setUp(self):
+        self.version = "v1"
+        patches = [
+            patch.object(text2cypher_lambda, "query_cache", text2cypher_lambda.QueryCache()),
+            patch.object(text2cypher_lambda, "get_data_version", lambda: self.version),
+            patch.object(text2cypher_lambda, "get_schema", return_value="schema"),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_only_queries_with_rows_are_remembered(self):
+        """Test that a query that returned nothing does not replace the suggestion"""
+        text2cypher_lambda.remember_query("Which genes?", "MATCH (g) RETURN g", {"results": [{"g": 1}]})
+        text2cypher_lambda.remember_query("which genes", "MATCH (g) RETURN g LIMIT 0", {"results": []})
+        schema = text2cypher_lambda.get_schema_cached("Which genes?")
+        self.assertIn("MATCH (g) RETURN g\n", schema + "\n")
+        self.assertNotIn("LIMIT 0", schema)
+
+    def test_new_data_version_drops_suggestion(self):
+        """Test that the schema and query are not served across data versions"""
+        text2cypher_lambda.remember_query("Which genes?", "MATCH (g) RETURN g", {"type": "presigned_url", "rows": 3})
+        self.assertIn("MATCH (g) RETURN g", text2cypher_lambda.get_schema_cached("Which genes?"))
+        self.version = "v2"
+        self.assertEqual(text2cypher_lambda.get_schema_cached("Which genes?"), "schema")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,22 +3,241 @@ import time
 import os
 import uuid
 import json
-import sys
-from collections import defaultdict
+import ast
+import codecs
+import gzip
+import io
+import math
+import re
+import hashlib
+from collections import OrderedDict, defaultdict
 from langchain_community.graphs import NeptuneGraph
 import langchain
 
 import requests
-import json
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
 from urllib.parse import quote
 
 NEPTUNE_HOST = os.environ['NEPTUNE_HOST']
 NEPTUNE_PORT = os.environ['NEPTUNE_PORT']
 graph =  NeptuneGraph(host = NEPTUNE_HOST, port=NEPTUNE_PORT)
 
+# "local" selects the relevant schema from a cached catalog, "llm" asks Claude on every question
+SCHEMA_SELECTION = os.environ.get('SCHEMA_SELECTION', 'local')
+# Ask Claude when no part of the schema matches the question locally
+SCHEMA_LLM_FALLBACK = os.environ.get('SCHEMA_LLM_FALLBACK', 'true').lower() == 'true'
+# How often the catalog checks whether the graph statistics have changed
+SCHEMA_TTL_SECONDS = int(os.environ.get('SCHEMA_TTL_SECONDS', '3600'))
+# Node labels returned for a question, including 1-hop neighbours
+SCHEMA_MAX_LABELS = int(os.environ.get('SCHEMA_MAX_LABELS', '8'))
+# Labels and relationship types matched directly by the question
+SCHEMA_MAX_MATCHES = 4
+
+# Words too common in questions to identify part of the schema
+SCHEMA_STOP_WORDS = {
+    'a', 'all', 'an', 'and', 'are', 'by', 'can', 'do', 'doe', 'for', 'from', 'give', 'ha', 'have', 'how',
+    'i', 'in', 'is', 'list', 'many', 'me', 'of', 'on', 'or', 'show', 'that', 'the', 'their', 'to',
+    'what', 'which', 'who', 'with',
+}
+
+TRIPLE_PATTERN = re.compile(r"\(:`?([^`)]+)`?\)-\[:`?([^`\]]+)`?\]->\(:`?([^`)]+)`?\)")
+SCHEMA_PATTERN = re.compile(
+    r"Node properties are the following:\s*(.*?)\s*"
+    r"Relationship properties are the following:\s*(.*?)\s*"
+    r"The relationships are the following:\s*(.*)",
+    re.DOTALL
+)
+
+
+def _stem(word):
+    if word.endswith('ies') and len(word) > 4:
+        return word[:-3] + 'y'
+    if word.endswith(('sses', 'xes', 'ches', 'shes')):
+        return word[:-2]
+    if word.endswith('s') and not word.endswith('ss') and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+def _tokens(text):
+    """Lower-case, singular words of text, splitting camelCase and snake_case names"""
+    text = re.sub(r'([a-z0-9])([A-Z])', r'\1 \2', text)
+    words = re.split(r'[^A-Za-z0-9]+', text)
+    return {_stem(word.lower()) for word in words if word} - SCHEMA_STOP_WORDS
+
+
+class SchemaCatalog:
+    """
+    The graph schema decomposed into node labels, relationship types, their
+    properties and the (label)-[type]->(label) triples, for picking the parts
+    relevant to a question without a model call.
+    """
+
+    def __init__(self, node_properties, edge_properties, triples, version=None):
+        self.node_properties = node_properties
+        self.edge_properties = edge_properties
+        self.triples = triples
+        self.version = version
+
+        # Index name and property words of every label and relationship type
+        self.elements = [('node', n['labels'], n.get('properties', [])) for n in node_properties]
+        self.elements += [('relationship', e['type'], e.get('properties', [])) for e in edge_properties]
+        self.name_tokens = [_tokens(name) for _, name, _ in self.elements]
+        self.property_tokens = [
+            set().union(*[_tokens(p['property']) for p in props]) if props else set()
+            for _, _, props in self.elements
+        ]
+        document_frequency = defaultdict(int)
+        for names, props in zip(self.name_tokens, self.property_tokens):
+            for token in names | props:
+                document_frequency[token] += 1
+        self.idf = {
+            token: math.log(1 + len(self.elements) / count)
+            for token, count in document_frequency.items()
+        }
+
+        self.neighbours = defaultdict(set)
+        for source, _, target in triples:
+            self.neighbours[source].add(target)
+            self.neighbours[target].add(source)
+
+    @classmethod
+    def from_schema(cls, schema, version=None):
+        """Parse the schema string built by NeptuneGraph"""
+        match = SCHEMA_PATTERN.search(schema)
+        if match is None:
+            raise ValueError("Unrecognised schema format")
+        node_properties, edge_properties, triples = (ast.literal_eval(part.strip()) for part in match.groups())
+        triples = [TRIPLE_PATTERN.match(triple).groups() for triple in triples if TRIPLE_PATTERN.match(triple)]
+        return cls(node_properties, edge_properties, triples, version)
+
+    def score(self, question):
+        """Relevance of every label and relationship type, weighting name matches above property matches"""
+        words = _tokens(question)
+        return [
+            sum(2 * self.idf[t] for t in words & names) + sum(self.idf[t] for t in (words & props) - names)
+            for names, props in zip(self.name_tokens, self.property_tokens)
+        ]
+
+    def select(self, question):
+        """
+        Node labels and relationship types relevant to a question.
+
+        The best matching labels and relationship types (and the endpoints of
+        those relationships) are expanded by one hop over the relationship
+        graph, so the relationships needed to join them are included.
+
+        Returns None when nothing in the schema matches the question.
+        """
+        scores = self.score(question)
+        ranked = sorted(range(len(self.elements)), key=lambda i: -scores[i])
+        ranked = [i for i in ranked if scores[i] > 0][:SCHEMA_MAX_MATCHES]
+        if not ranked:
+            return None
+        label_scores = {name: s for (kind, name, _), s in zip(self.elements, scores) if kind == 'node'}
+
+        labels = []
+        types = set()
+        for i in ranked:
+            kind, name, _ = self.elements[i]
+            if kind == 'node':
+                labels.append(name)
+            else:
+                types.add(name)
+                labels += [label for source, t, target in self.triples if t == name for label in (source, target)]
+        labels = list(dict.fromkeys(labels))[:SCHEMA_MAX_LABELS]
+        seeds = set(labels)
+
+        # 1-hop expansion: best matching neighbours first, then those joining
+        # several matched labels, then the best connected
+        neighbours = set().union(*[self.neighbours[label] for label in seeds]) - seeds
+        def priority(label):
+            return (-label_scores.get(label, 0), -len(self.neighbours[label] & seeds), -len(self.neighbours[label]), label)
+        for label in sorted(neighbours, key=priority):
+            if len(labels) >= SCHEMA_MAX_LABELS:
+                break
+            labels.append(label)
+
+        selected = set(labels)
+        triples = [
+            (source, t, target) for source, t, target in self.triples
+            if source in selected and target in selected and (source in seeds or target in seeds or t in types)
+        ]
+        types |= {t for _, t, _ in triples}
+        return selected, types, triples
+
+    def relevant_schema(self, question):
+        """The relevant part of the schema in NeptuneGraph's format, or None if nothing matches"""
+        selection = self.select(question)
+        if selection is None:
+            return None
+        labels, types, triples = selection
+        node_properties = [n for n in self.node_properties if n['labels'] in labels]
+        edge_properties = [e for e in self.edge_properties if e['type'] in types]
+        triple_schema = [f"(:`{a}`)-[:`{e}`]->(:`{b}`)" for a, e, b in triples]
+        return f"""
+        Node properties are the following:
+        {node_properties}
+        Relationship properties are the following:
+        {edge_properties}
+        The relationships are the following:
+        {triple_schema}
+        """
+
+
+schema_catalog = None
+schema_catalog_expiry = 0.0
+
+
+def get_schema_version():
+    """When Neptune last computed the graph statistics, or None if unavailable"""
+    try:
+        return graph.client.get_propertygraph_summary()['payload'].get('lastStatisticsComputationTime')
+    except Exception as e:
+        print("Error getting graph summary:", e)
+        return None
+
+
+def get_schema_catalog():
+    """
+    The schema catalog, kept across warm invocations.
+
+    After SCHEMA_TTL_SECONDS the graph statistics are checked and the schema
+    is reloaded only if they changed (or cannot be read).
+    """
+    global graph, schema_catalog, schema_catalog_expiry
+    now = time.time()
+    if schema_catalog is not None and now < schema_catalog_expiry:
+        return schema_catalog
+    version = get_schema_version()
+    if schema_catalog is None or version is None or version != schema_catalog.version:
+        if schema_catalog is not None:
+            print("Reloading schema")
+            graph = NeptuneGraph(host = NEPTUNE_HOST, port=NEPTUNE_PORT)
+        schema_catalog = SchemaCatalog.from_schema(graph.schema, version)
+    schema_catalog_expiry = now + SCHEMA_TTL_SECONDS
+    return schema_catalog
+
+
 #Return the neptune database schema
 def get_schema(question):
     print("Getting Schema")
+    if SCHEMA_SELECTION != 'llm':
+        try:
+            schema = get_schema_catalog().relevant_schema(question)
+            if schema:
+                print(schema)
+                return schema
+            print("No part of the schema matched the question")
+        except Exception as e:
+            print("Error selecting schema locally:", e)
+        if not SCHEMA_LLM_FALLBACK:
+            return graph.schema
+    return select_schema_with_llm(question)
+
+#Ask Claude for the parts of the schema relevant to the question
+def select_schema_with_llm(question):
     schema = graph.schema
     system_prompt = """You are a graph database expert. Your task is to analyze a user's query and the full database schema, then return only the relevant portions of the schema that are needed to answer the query. 
     
@@ -81,60 +300,583 @@ def get_schema(question):
     
     return "No schema was returned"
 
-#Query the Neptune database
-def query_neptune(query):
-    print("Querying Neptune")
-    try:
-        # Construct the full URL for the OpenCypher endpoint
-        url = f'https://{NEPTUNE_HOST}:{NEPTUNE_PORT}/openCypher'
+# Set to true when IAM database authentication is enabled on the Neptune cluster
+NEPTUNE_IAM_AUTH = os.environ.get('NEPTUNE_IAM_AUTH', 'false').lower() == 'true'
+# When above 0, queries whose final RETURN is ordered are fetched in SKIP/LIMIT
+# pages of this many rows, so Neptune stops work when reading stops. Every page
+# runs the query again, and pages only line up when the ORDER BY keys are
+# unique, so only enable it for queries ordered by a unique key
+NEPTUNE_PAGE_SIZE = int(os.environ.get('NEPTUNE_PAGE_SIZE', '0'))
+# Stop reading results after this many rows or bytes of JSON
+NEPTUNE_MAX_ROWS = int(os.environ.get('NEPTUNE_MAX_ROWS', '100000'))
+NEPTUNE_MAX_BYTES = int(os.environ.get('NEPTUNE_MAX_BYTES', str(100 * 1024 * 1024)))
+# Results larger than this are written to S3 instead of returned to the agent
+INLINE_RESULT_BYTES = 20000
+# Compressed bytes per S3 multipart upload part (at least 5 MB)
+S3_PART_BYTES = 8 * 1024 * 1024
+
+TRAILING_SKIP_LIMIT = re.compile(r'\b(SKIP|LIMIT)\s+\S+\s*$', re.IGNORECASE)
+WHITESPACE = re.compile(r'[\s,]*')
+ROW_END = re.compile(r'\s*([,\]])')
+
+
+def iter_results(chunks):
+    """
+    Yield the rows of an openCypher JSON response ({"results": [...]}) as
+    the body arrives, without holding the whole response in memory.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    position = 0
+    in_results = False
+    for chunk in chunks:
+        buffer = buffer[position:] + text_decoder.decode(chunk)
+        position = 0
+        if not in_results:
+            start = buffer.find('"results"')
+            bracket = buffer.find('[', start) if start >= 0 else -1
+            if bracket < 0:
+                continue
+            position = bracket + 1
+            in_results = True
+        while True:
+            position = WHITESPACE.match(buffer, position).end()
+            if position >= len(buffer):
+                break
+            if buffer[position] == ']':
+                return
+            try:
+                row, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The row continues in the next chunk
+                break
+            # A number cut off by the chunk boundary (e.g. "12" of "123", or
+            # "-5" of "-5.5") still decodes, so only accept a row once the
+            # "," or "]" that follows it has arrived
+            following = ROW_END.match(buffer, end)
+            if following is None:
+                break
+            position = following.start(1)
+            yield row
+
+
+class NeptuneExecutor:
+    """
+    Runs openCypher queries over one keep-alive HTTPS session, signing
+    requests with SigV4 from cached credentials when IAM auth is enabled.
+    """
+
+    def __init__(self, endpoint, iam_auth=False, region=None, session=None, timeout=(5, 900), chunk_bytes=64 * 1024):
+        self.endpoint = endpoint
+        self.session = session or requests.Session()
+        self.session.mount(endpoint, requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        self.timeout = timeout
+        self.chunk_bytes = chunk_bytes
+        self.credentials = None
+        self.region = region or os.environ.get('AWS_REGION')
+        if iam_auth:
+            # Refreshable credentials renew themselves before they expire
+            self.credentials = boto3.Session().get_credentials()
+
+    def _headers(self, data):
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+        if self.credentials is None:
+            return headers
+        request = AWSRequest(method='POST', url=self.endpoint, data=data, headers=headers)
+        SigV4Auth(self.credentials.get_frozen_credentials(), 'neptune-db', self.region).add_auth(request)
+        return dict(request.headers)
+
+    def _iter_request(self, query):
+        data = f'query={quote(query)}'
+        with self.session.post(self.endpoint, headers=self._headers(data), data=data,
+                               stream=True, timeout=self.timeout, verify=True) as response:
+            if not response.ok:
+                try:
+                    detail = response.json().get('detailedMessage', response.text)
+                except ValueError:
+                    detail = response.text
+                raise requests.exceptions.HTTPError(
+                    f"{response.status_code} error from Neptune: {detail}", response=response
+                )
+            yield from iter_results(response.iter_content(chunk_size=self.chunk_bytes))
+
+    @staticmethod
+    def paginate(query):
+        """Whether the query can be fetched in SKIP/LIMIT pages: the final RETURN is ordered and not already limited"""
+        upper = query.upper()
+        return (
+            upper.rfind('ORDER BY') > upper.rfind('RETURN') >= 0
+            and 'UNION' not in upper
+            and not TRAILING_SKIP_LIMIT.search(query)
+        )
+
+    def iter_rows(self, query, page_size=NEPTUNE_PAGE_SIZE):
+        """
+        Yield result rows as they are parsed.
+
+        With page_size above 0, ordered queries are fetched in SKIP/LIMIT
+        pages so the server stops work when the caller stops reading; other
+        queries are streamed in one request.
+        """
+        query = query.strip().rstrip(';')
+        if page_size <= 0 or not self.paginate(query):
+            yield from self._iter_request(query)
+            return
+        skip = 0
+        while True:
+            rows = 0
+            for row in self._iter_request(f"{query} SKIP {skip} LIMIT {page_size}"):
+                rows += 1
+                yield row
+            if rows < page_size:
+                return
+            skip += page_size
+
+
+class S3OverflowWriter:
+    """
+    Gzip-compressed JSON Lines written to S3 while rows arrive, in multipart
+    upload parts so at most one part is held in memory.
+    """
+
+    def __init__(self, s3_client, bucket, key, part_bytes=S3_PART_BYTES):
+        self.s3 = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.part_bytes = part_bytes
+        self.buffer = io.BytesIO()
+        self.gzip = gzip.GzipFile(fileobj=self.buffer, mode='wb')
+        self.upload_id = None
+        self.parts = []
+
+    def write(self, line):
+        self.gzip.write(line.encode('utf-8') + b'\n')
+        if self.buffer.tell() >= self.part_bytes:
+            self._upload_part()
+
+    def _upload_part(self):
+        if self.upload_id is None:
+            self.upload_id = self.s3.create_multipart_upload(
+                Bucket=self.bucket, Key=self.key,
+                ContentType='application/gzip'
+            )['UploadId']
+        part_number = len(self.parts) + 1
+        response = self.s3.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            PartNumber=part_number, Body=self.buffer.getvalue()
+        )
+        self.parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+        self.buffer.seek(0)
+        self.buffer.truncate()
+
+    def close(self):
+        self.gzip.close()
+        if self.upload_id is None:
+            self.s3.put_object(
+                Bucket=self.bucket, Key=self.key, Body=self.buffer.getvalue(),
+                ContentType='application/gzip'
+            )
+            return
+        self._upload_part()
+        self.s3.complete_multipart_upload(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            MultipartUpload={'Parts': self.parts}
+        )
 
-        # Set up the headers
-        headers = {
-            'Content-Type': 'application/x-www-form-urlencoded'
-        }
+    def abort(self):
+        if self.upload_id is not None:
+            self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
 
-        # Prepare the data (URL-encode the query)
-        data = f'query={quote(query)}'
 
-        # Send the POST request
-        response = requests.post(url, headers=headers, data=data, verify=True)
+neptune_executor = None
+s3_client = None
 
-        # Check if the request was successful
-        response.raise_for_status()
 
-        # Parse the JSON response
-        result = response.json()
+def get_neptune_executor():
+    global neptune_executor
+    if neptune_executor is None:
+        neptune_executor = NeptuneExecutor(
+            f'https://{NEPTUNE_HOST}:{NEPTUNE_PORT}/openCypher', iam_auth=NEPTUNE_IAM_AUTH
+        )
+    return neptune_executor
+
+
+def get_s3_client():
+    global s3_client
+    if s3_client is None:
+        s3_client = boto3.client('s3')
+    return s3_client
 
-        return result
+
+#Query the Neptune database
+def query_neptune(query, bucket=None, key=None, executor=None, max_rows=NEPTUNE_MAX_ROWS, max_bytes=NEPTUNE_MAX_BYTES):
+    """
+    Run a query, reading rows until the results end or the row or byte budget is reached.
+
+    Small results are returned as {"results": [...]}. Once the results pass
+    INLINE_RESULT_BYTES they are streamed to s3://bucket/key as gzipped JSON
+    Lines and a presigned URL is returned instead.
+    """
+    print("Querying Neptune")
+    executor = executor or get_neptune_executor()
+    rows = []
+    row_count = 0
+    result_bytes = 0
+    truncated = False
+    overflow = None
+    iterator = executor.iter_rows(query)
+    try:
+        for row in iterator:
+            line = json.dumps(row, default=str)
+            size = len(line.encode('utf-8')) + 1
+            if row_count >= max_rows or result_bytes + size > max_bytes:
+                truncated = True
+                break
+            row_count += 1
+            result_bytes += size
+            if overflow is not None:
+                overflow.write(line)
+                continue
+            rows.append(row)
+            if result_bytes > INLINE_RESULT_BYTES and bucket:
+                print(f'Results greater than {INLINE_RESULT_BYTES} bytes, writing to s3://{bucket}/{key}')
+                overflow = S3OverflowWriter(get_s3_client(), bucket, key)
+                # Only the rows are buffered, so serialize them again once
+                for buffered in rows:
+                    overflow.write(json.dumps(buffered, default=str))
+                rows = None
+        iterator.close()
+        if overflow is not None:
+            overflow.close()
 
     except requests.exceptions.RequestException as e:
         print("Error executing Neptune query:", e)
-        raise
-
-    except json.JSONDecodeError as e:
-        print("Error parsing JSON response:", e)
+        if overflow is not None:
+            overflow.abort()
         raise
 
     except Exception as e:
         print("Unexpected error:", e)
+        if overflow is not None:
+            overflow.abort()
         raise
-      
+
+    print(f"Read {row_count} rows, {result_bytes} bytes{' (truncated)' if truncated else ''}")
+    if overflow is None:
+        result = {'results': rows}
+        if truncated:
+            result['truncated'] = True
+        return result
+
+    presigned_url = get_s3_client().generate_presigned_url('get_object',
+        Params={'Bucket': bucket, 'Key': key},
+        ExpiresIn=3600
+    )
+    return {
+        'type': 'presigned_url',
+        'url': presigned_url,
+        'format': 'jsonl',
+        'compression': 'gzip',
+        'rows': row_count,
+        'truncated': truncated
+    }
+
 def upload_result_s3(result, bucket, key):
     s3 = boto3.resource('s3')
     s3object = s3.Object(bucket, key)
     s3object.put(Body=(bytes(json.dumps(result).encode('UTF-8'))))
     return s3object
 
+QUERY_CACHE_METRICS_NAMESPACE = os.environ.get('QUERY_CACHE_METRICS_NAMESPACE', 'Text2Cypher')
+# Change (for example after a bulk load) to stop serving results cached for earlier data
+DATA_VERSION = os.environ.get('DATA_VERSION', '')
+
+# Generated-query and result cache. Level 1 maps a normalised question to
+# the schema returned for it and the last query that returned rows for it;
+# level 2 maps a normalised query to its result. Both are keyed by the data
+# version, so a schema or data change starts them afresh.
+QUERY_CACHE_MAX_ENTRIES = int(os.environ.get('QUERY_CACHE_MAX_ENTRIES', '256'))
+QUERY_CACHE_TTL_SECONDS = int(os.environ.get('QUERY_CACHE_TTL_SECONDS', '3600'))
+# Budget of the in-memory tier, in bytes of JSON-serialised values
+QUERY_CACHE_MAX_BYTES = int(os.environ.get('QUERY_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+# Values that serialise to more than this are not cached in either tier
+QUERY_CACHE_MAX_VALUE_BYTES = int(os.environ.get('QUERY_CACHE_MAX_VALUE_BYTES', str(1024 * 1024)))
+# Optional tier shared by all containers: dynamodb://<table> (partition key
+# "cache_key", TTL attribute "expires_at") or s3://<bucket>/<prefix>
+QUERY_CACHE_URI = os.environ.get('QUERY_CACHE_URI', '')
+# How often the shared tier is checked for invalidations by other containers
+QUERY_CACHE_GENERATION_CHECK_SECONDS = 60
+# DynamoDB items are limited to 400 KB
+QUERY_CACHE_MAX_ITEM_BYTES = 350000
+
+QUESTION_LEVEL = 'question'
+RESULT_LEVEL = 'result'
+QUOTED = re.compile(r"""('(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.)*"|`[^`]*`)""")
+
+
+def normalize_question(question):
+    return re.sub(r'\s+', ' ', question).strip().rstrip('?.! ').lower()
+
+
+def normalize_query(query):
+    """Collapse whitespace outside quoted literals and drop a trailing semicolon; case is kept"""
+    parts = QUOTED.split(query.strip().rstrip(';').strip())
+    return ''.join(part if i % 2 else re.sub(r'\s+', ' ', part) for i, part in enumerate(parts)).strip()
+
+
+class DynamoDBCacheTier:
+    def __init__(self, table):
+        self.client = boto3.client('dynamodb')
+        self.table = table
+
+    def get(self, key):
+        item = self.client.get_item(TableName=self.table, Key={'cache_key': {'S': key}}).get('Item')
+        if item is None or float(item['expires_at']['N']) < time.time():
+            return None
+        return json.loads(item['value']['S'])
+
+    def put(self, key, value, ttl_seconds):
+        body = json.dumps(value, default=str)
+        if len(body) > QUERY_CACHE_MAX_ITEM_BYTES:
+            return
+        self.client.put_item(TableName=self.table, Item={
+            'cache_key': {'S': key},
+            'value': {'S': body},
+            'expires_at': {'N': str(int(time.time() + ttl_seconds))},
+        })
+
+
+class S3CacheTier:
+    def __init__(self, bucket, prefix):
+        self.client = boto3.client('s3')
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+
+    def get(self, key):
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=f'{self.prefix}{key}.json')
+        except self.client.exceptions.NoSuchKey:
+            return None
+        entry = json.loads(response['Body'].read())
+        return entry['value'] if entry['expires_at'] >= time.time() else None
+
+    def put(self, key, value, ttl_seconds):
+        entry = {'expires_at': time.time() + ttl_seconds, 'value': value}
+        self.client.put_object(Bucket=self.bucket, Key=f'{self.prefix}{key}.json',
+                               Body=json.dumps(entry, default=str), ContentType='application/json')
+
+
+class QueryCache:
+    """
+    Two-level cache with an in-memory LRU tier in front of an optional shared tier.
+
+    The memory tier is bounded by entry count and by the serialised size of
+    its values; values larger than max_value_bytes are not cached at all.
+
+    invalidate() drops a level by moving it to a new generation, which other
+    containers pick up from the shared tier within
+    QUERY_CACHE_GENERATION_CHECK_SECONDS.
+    """
+
+    def __init__(self, max_entries=QUERY_CACHE_MAX_ENTRIES, ttl_seconds=QUERY_CACHE_TTL_SECONDS, uri=QUERY_CACHE_URI,
+                 max_bytes=QUERY_CACHE_MAX_BYTES, max_value_bytes=QUERY_CACHE_MAX_VALUE_BYTES):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.max_value_bytes = max_value_bytes
+        self.memory = OrderedDict()
+        self.memory_bytes = 0
+        self.shared = None
+        if uri.startswith('dynamodb://'):
+            self.shared = DynamoDBCacheTier(uri[len('dynamodb://'):])
+        elif uri.startswith('s3://'):
+            bucket, _, prefix = uri[len('s3://'):].partition('/')
+            self.shared = S3CacheTier(bucket, prefix)
+        self.generations = {}
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+
+    def _generation(self, level):
+        generation, checked = self.generations.get(level, (0, 0.0))
+        if self.shared is not None and time.time() - checked > QUERY_CACHE_GENERATION_CHECK_SECONDS:
+            try:
+                generation = self.shared.get(f'{level}:generation') or 0
+            except Exception as e:
+                print(f"Error reading cache generation: {e}")
+            self.generations[level] = (generation, time.time())
+        return generation
+
+    def _key(self, level, text, version):
+        digest = hashlib.sha256(f'{version}\0{text}'.encode('utf-8')).hexdigest()
+        return f'{level}:{self._generation(level)}:{digest}'
+
+    def get(self, level, text, version='', count=True):
+        """The cached value or None; count=False leaves the hit and miss counts alone"""
+        key = self._key(level, text, version)
+        entry = self.memory.get(key)
+        if entry is not None and entry[0] >= time.time():
+            self.memory.move_to_end(key)
+            self.hits[level] += count
+            return entry[1]
+        value = None
+        if self.shared is not None:
+            try:
+                value = self.shared.get(key)
+            except Exception as e:
+                print(f"Error reading shared cache: {e}")
+        if value is None:
+            self.misses[level] += count
+            return None
+        self._remember(key, value, len(json.dumps(value, default=str)))
+        self.hits[level] += count
+        return value
+
+    def put(self, level, text, value, version=''):
+        size = len(json.dumps(value, default=str))
+        if size > self.max_value_bytes:
+            print(f"Not caching a {size} byte value")
+            return
+        key = self._key(level, text, version)
+        self._remember(key, value, size)
+        if self.shared is not None:
+            try:
+                self.shared.put(key, value, self.ttl_seconds)
+            except Exception as e:
+                print(f"Error writing shared cache: {e}")
+
+    def _remember(self, key, value, size):
+        if size > self.max_value_bytes:
+            return
+        self._forget(key)
+        self.memory[key] = (time.time() + self.ttl_seconds, value, size)
+        self.memory_bytes += size
+        while len(self.memory) > self.max_entries or self.memory_bytes > self.max_bytes:
+            self.memory_bytes -= self.memory.popitem(last=False)[1][2]
+
+    def _forget(self, key):
+        entry = self.memory.pop(key, None)
+        if entry is not None:
+            self.memory_bytes -= entry[2]
+
+    def invalidate(self, level=None):
+        """Drop one level, or both, in this container and the shared tier"""
+        for name in ([level] if level else [QUESTION_LEVEL, RESULT_LEVEL]):
+            generation = self._generation(name) + 1
+            self.generations[name] = (generation, time.time())
+            for key in [k for k in self.memory if k.startswith(f'{name}:')]:
+                self._forget(key)
+            if self.shared is not None:
+                try:
+                    self.shared.put(f'{name}:generation', generation, 10 * 365 * 24 * 3600)
+                except Exception as e:
+                    print(f"Error writing cache generation: {e}")
+
+    def emit_metrics(self):
+        """Print hit and miss counts as a CloudWatch Embedded Metric Format record, then reset them"""
+        values = {}
+        for level in (QUESTION_LEVEL, RESULT_LEVEL):
+            values[f'{level.capitalize()}CacheHits'] = self.hits[level]
+            values[f'{level.capitalize()}CacheMisses'] = self.misses[level]
+        print(json.dumps({
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': QUERY_CACHE_METRICS_NAMESPACE,
+                    'Dimensions': [[]],
+                    'Metrics': [{'Name': name, 'Unit': 'Count'} for name in values],
+                }],
+            },
+            **values,
+        }))
+        self.hits.clear()
+        self.misses.clear()
+
+
+query_cache = QueryCache()
+
+
+data_version = None
+data_version_expiry = 0.0
+
+
+def get_data_version():
+    """
+    Version stamp for cached results: DATA_VERSION and when Neptune last computed
+    the graph statistics, checked at most once per QUERY_CACHE_GENERATION_CHECK_SECONDS.
+    """
+    global data_version, data_version_expiry
+    now = time.time()
+    if data_version is None or now >= data_version_expiry:
+        data_version = f"{DATA_VERSION}:{get_schema_version() or ''}"
+        data_version_expiry = now + QUERY_CACHE_GENERATION_CHECK_SECONDS
+    return data_version
+
+
+def get_schema_cached(question):
+    """get_schema through the question cache, with the query that last returned rows for the question"""
+    key = normalize_question(question)
+    version = get_data_version()
+    cached = query_cache.get(QUESTION_LEVEL, key, version)
+    if cached is None or 'schema' not in cached:
+        cached = {**(cached or {}), 'schema': get_schema(question)}
+        query_cache.put(QUESTION_LEVEL, key, cached, version)
+    else:
+        print("Question cache hit, skipping schema selection")
+    if cached.get('query'):
+        return (f"{cached['schema']}\n\nThe last openCypher query that returned rows for the same question "
+                f"was the one below. It may have been an intermediate step, so check that it answers "
+                f"the question before running it with /queryneptune:\n{cached['query']}")
+    return cached['schema']
+
+
+def remember_query(question, query, result):
+    """
+    Record the query as the latest candidate answer to a question if it
+    returned rows; queries that return nothing are not worth suggesting again
+    """
+    if not (result.get('results') or result.get('rows')):
+        return
+    key = normalize_question(question)
+    version = get_data_version()
+    cached = query_cache.get(QUESTION_LEVEL, key, version, count=False) or {}
+    if cached.get('query') != query:
+        query_cache.put(QUESTION_LEVEL, key, {**cached, 'query': query}, version)
+
+
+def query_neptune_cached(query, bucket=None, key=None):
+    """query_neptune through the result cache; results written to S3 are not cached"""
+    normalized = normalize_query(query)
+    version = get_data_version()
+    result = query_cache.get(RESULT_LEVEL, normalized, version)
+    if result is not None:
+        print("Result cache hit, skipping Neptune")
+        return result
+    result = query_neptune(query, bucket, key)
+    if 'results' in result:
+        query_cache.put(RESULT_LEVEL, normalized, result, version)
+    return result
+
+
 def lambda_handler(event, context):
     result = None
     error_message = None
     schema = None
+    BUCKET_NAME = os.environ['BUCKET_NAME']
+    RESULT_ID = str(uuid.uuid4())
+    KEY = RESULT_ID + '.json'
+
+    if 'invalidateCache' in event:
+        # Direct invocation, e.g. {"invalidateCache": "result"} after loading new data
+        level = event['invalidateCache']
+        query_cache.invalidate(None if level in (None, 'all') else level)
+        return {'invalidated': level or 'all'}
 
     try:
         print(event)
         if event['apiPath'] == "/getschema":
             question = event['inputText']
-            result = get_schema(question)
+            result = get_schema_cached(question)
             schema = result
         
         elif event['apiPath'] == "/queryneptune":
@@ -144,7 +886,9 @@ def lambda_handler(event, context):
                     query = param.get("value")
                     print(query)
                 
-            result = query_neptune(query)
+            result = query_neptune_cached(query, BUCKET_NAME, RESULT_ID + '.jsonl.gz')
+            if event.get('inputText'):
+                remember_query(event['inputText'], query, result)
 
         else:
             raise ValueError(f"Unknown apiPath: {event['apiPath']}")
@@ -156,13 +900,19 @@ def lambda_handler(event, context):
         error_message = str(e)
         print(f"Error occurred: {error_message}")
 
-    BUCKET_NAME = os.environ['BUCKET_NAME']
-    KEY = str(uuid.uuid4()) + '.json'
-    size = sys.getsizeof(str(result)) if result else 0
+    query_cache.emit_metrics()
+    size = len(json.dumps(result, default=str).encode('utf-8')) if result else 0
     print(f"Response size: {size} bytes")
     response_body = None
 
-    if size > 20000:
+    if isinstance(result, dict) and result.get('type') == 'presigned_url':
+        # query_neptune already streamed the results to S3
+        response_body = {
+            'application/json': {
+                'body': json.dumps(result)
+            }
+        }
+    elif size > INLINE_RESULT_BYTES:
         print('Size greater than 20KB, writing to a file in S3')
         result = upload_result_s3(result, BUCKET_NAME, KEY)
 
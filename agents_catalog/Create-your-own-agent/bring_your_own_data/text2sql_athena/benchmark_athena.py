@@ -0,0 +1,238 @@
+"""
+Benchmark reading large Athena results with lambda_function.py against moto.
+
+    python benchmark_athena.py
+    python benchmark_athena.py --rows 100000 --query-seconds 1 --latency 0.05
+    python benchmark_athena.py --rows 1000 --tables 100
+
+Requires moto (pip install "moto[athena,glue,s3]"); no AWS account is used.
+moto returns a prepared result set for each query and writes it to the
+OutputLocation as CSV, the way Athena does. Its get_query_results is made to
+return 1000 rows per call like Athena's, and every API call is delayed by
+--latency seconds to stand in for the network round trip. "legacy" is the
+previous query_athena: a fixed 2 second poll and a single get_query_results
+call, which stops at 1000 rows. Schema lookups are then timed through an
+information_schema query and through the Glue schema catalog.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import boto3
+from moto import mock_aws
+from moto.athena import responses as athena_responses
+from moto.athena.models import QueryResults, athena_backends
+from moto.core import DEFAULT_ACCOUNT_ID
+from moto.moto_api import state_manager
+
+REGION = "us-east-1"
+RESULTS_BUCKET = "text2sql-athena-results"
+DATABASE = "california_schools"
+QUERY = "SELECT cds, school, enrollment, frpm_rate, charter, opened FROM frpm"
+
+COLUMNS = [
+    ("cds", "varchar"),
+    ("school", "varchar"),
+    ("enrollment", "integer"),
+    ("frpm_rate", "double"),
+    ("charter", "boolean"),
+    ("opened", "date"),
+]
+
+
+def synthetic_results(rows, seed=0):
+    """A moto QueryResults with a header row and rows of school data"""
+    rng = random.Random(seed)
+
+    def cell(value):
+        return {} if value is None else {"VarCharValue": value}
+
+    data = [{"Data": [cell(name) for name, _ in COLUMNS]}]
+    for i in range(rows):
+        data.append({"Data": [
+            cell(f"{rng.randint(10 ** 13, 10 ** 14 - 1)}"),
+            cell(f"School {i}, District {i % 500}"),
+            cell(str(rng.randint(20, 4000))),
+            cell(f"{rng.random():.4f}") if i % 17 else cell(None),
+            cell(rng.choice(["true", "false"])),
+            cell(f"{rng.randint(1950, 2020)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}"),
+        ]})
+    column_info = [{"Name": name, "Label": name, "Type": type_} for name, type_ in COLUMNS]
+    return QueryResults(rows=data, column_info=column_info)
+
+
+def page_query_results():
+    """Make moto's get_query_results honour MaxResults and NextToken (at most 1000 rows) like Athena"""
+
+    def get_query_results(self):
+        results = self.athena_backend.get_query_results(self._get_param("QueryExecutionId")).to_dict()
+        start = int(self._get_param("NextToken") or 0)
+        size = min(int(self._get_param("MaxResults") or 1000), 1000)
+        rows = results["ResultSet"]["Rows"]
+        results["ResultSet"]["Rows"] = rows[start:start + size]
+        if start + size < len(rows):
+            results["NextToken"] = str(start + size)
+        return json.dumps(results)
+
+    athena_responses.AthenaResponse.get_query_results = get_query_results
+
+
+def run_queries_for(seconds):
+    """Report each query as queued, then running, then succeeded by time since it started, like Athena"""
+    original = athena_backends[DEFAULT_ACCOUNT_ID][REGION].__class__.get_query_execution
+
+    def get_query_execution(self, exec_id):
+        execution = original(self, exec_id)
+        elapsed = time.time() - execution.start_time
+        execution.status = "QUEUED" if elapsed < seconds / 2 else "RUNNING" if elapsed < seconds else "SUCCEEDED"
+        return execution
+
+    athena_backends[DEFAULT_ACCOUNT_ID][REGION].__class__.get_query_execution = get_query_execution
+    # Stop moto advancing the state itself
+    state_manager.set_transition(model_name="athena::execution", transition={"progression": "manual", "times": 10 ** 9})
+
+
+def add_latency(client, seconds):
+    def delay(**kwargs):
+        time.sleep(seconds)
+
+    client.meta.events.register("before-send", delay)
+
+
+def create_glue_tables(glue, tables, columns):
+    """A Glue database of tables with columns each, like the BIRD-SQL databases"""
+    glue.create_database(DatabaseInput={"Name": DATABASE})
+    for t in range(tables):
+        glue.create_table(DatabaseName=DATABASE, TableInput={
+            "Name": f"table{t}",
+            "StorageDescriptor": {"Columns": [{"Name": f"column{c}", "Type": "string"} for c in range(columns)]},
+            "PartitionKeys": [],
+        })
+
+
+def information_schema_results(tables, columns):
+    """What information_schema.columns returns for the tables of create_glue_tables"""
+    header = [{"Data": [{"VarCharValue": name} for name in ("table_name", "column_name", "data_type")]}]
+    rows = [
+        {"Data": [{"VarCharValue": f"table{t}"}, {"VarCharValue": f"column{c}"}, {"VarCharValue": "varchar"}]}
+        for t in range(tables) for c in range(columns)
+    ]
+    column_info = [{"Name": name, "Type": "varchar"} for name in ("table_name", "column_name", "data_type")]
+    return QueryResults(rows=header + rows, column_info=column_info)
+
+
+def benchmark_schema(lambda_function, backend, args):
+    """Time a schema lookup through Athena, and through the catalog from Glue, /tmp and memory"""
+    sql = f"SELECT table_name, column_name, data_type FROM information_schema.columns WHERE table_schema = '{DATABASE}'"
+    backend.query_results_queue.append(information_schema_results(args.tables, args.columns))
+    start = time.perf_counter()
+    lambda_function.athena_executor.query(sql, DATABASE)
+    timings = [("athena", time.perf_counter() - start)]
+
+    lambda_function.invalidate_schema_catalog()
+    start = time.perf_counter()
+    lambda_function.get_schema()
+    timings.append(("glue", time.perf_counter() - start))
+
+    lambda_function.schema_catalog = None
+    start = time.perf_counter()
+    lambda_function.get_schema()
+    timings.append(("/tmp", time.perf_counter() - start))
+
+    start = time.perf_counter()
+    for _ in range(args.repeats * 100):
+        lambda_function.get_schema()
+    timings.append(("memory", (time.perf_counter() - start) / (args.repeats * 100)))
+
+    print(f"\nschema lookup, {args.tables} tables of {args.columns} columns")
+    for name, seconds in timings:
+        print(f"{name:>8} {seconds * 1e6:>12,.0f} us")
+
+
+def legacy_query(athena, query):
+    """The previous query_athena"""
+    query_execution_id = athena.start_query_execution(
+        QueryString=query, QueryExecutionContext={"Database": DATABASE},
+        ResultConfiguration={"OutputLocation": f"s3://{RESULTS_BUCKET}/athena-results/"},
+    )["QueryExecutionId"]
+    while athena.get_query_execution(QueryExecutionId=query_execution_id)["QueryExecution"]["Status"]["State"] != "SUCCEEDED":
+        time.sleep(2)
+    results = athena.get_query_results(QueryExecutionId=query_execution_id)
+    headers = [field.get("VarCharValue", "") for field in results["ResultSet"]["Rows"][0]["Data"]]
+    return [
+        dict(zip(headers, [field.get("VarCharValue", "") for field in row["Data"]]))
+        for row in results["ResultSet"]["Rows"][1:]
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Athena result reading")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--query-seconds", type=float, default=1.0, help="Seconds each query takes to run")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds added to every API call")
+    parser.add_argument("--repeats", type=int, default=2)
+    parser.add_argument("--tables", type=int, default=20, help="Tables in the schema lookup benchmark")
+    parser.add_argument("--columns", type=int, default=30, help="Columns per table")
+    args = parser.parse_args()
+
+    os.environ.update({
+        "AWS_ACCESS_KEY_ID": "testing", "AWS_SECRET_ACCESS_KEY": "testing",
+        "AWS_DEFAULT_REGION": REGION, "BUCKET_NAME": RESULTS_BUCKET,
+        "ATHENA_OUTPUT_LOCATION": f"s3://{RESULTS_BUCKET}/athena-results/",
+        "ATHENA_DATABASES": DATABASE,
+        "SCHEMA_CACHE_PATH": os.path.join(tempfile.mkdtemp(), "schema-catalog.json"),
+    })
+    page_query_results()
+    run_queries_for(args.query_seconds)
+
+    with mock_aws():
+        boto3.client("s3", region_name=REGION).create_bucket(Bucket=RESULTS_BUCKET)
+        create_glue_tables(boto3.client("glue", region_name=REGION), args.tables, args.columns)
+        sys.path.insert(0, str(Path(__file__).resolve().parent))
+        import lambda_function
+
+        add_latency(lambda_function.athena_client, args.latency)
+        add_latency(lambda_function.s3_client, args.latency)
+        backend = athena_backends[DEFAULT_ACCOUNT_ID][REGION]
+        results = synthetic_results(args.rows)
+        streaming = lambda_function.athena_executor
+
+        class PagingExecutor(lambda_function.AthenaExecutor):
+            """Pages through get_query_results instead of reading the CSV output"""
+
+            def iter_rows(self, execution):
+                return super().iter_rows({**execution, "ResultConfiguration": {}})
+
+        paging = PagingExecutor(lambda_function.athena_client, lambda_function.s3_client)
+
+        def paged(query):
+            return paging.query(query, DATABASE, max_rows=args.rows)[0]
+
+        def streamed(query):
+            return streaming.query(query, DATABASE, max_rows=args.rows)[0]
+
+        print(f"{'mode':>8} {'rows':>8} {'seconds':>8} {'rows/s':>9}")
+        outputs = {}
+        for _ in range(args.repeats):
+            for name, run in (("legacy", lambda q: legacy_query(lambda_function.athena_client, q)),
+                              ("paged", paged), ("streamed", streamed)):
+                backend.query_results_queue.append(results)
+                start = time.perf_counter()
+                rows = run(QUERY)
+                elapsed = time.perf_counter() - start
+                outputs[name] = rows
+                print(f"{name:>8} {len(rows):>8} {elapsed:>8.2f} {len(rows) / elapsed:>9.0f}")
+        assert outputs["paged"] == outputs["streamed"], "paged and streamed results differ"
+
+        add_latency(lambda_function.glue_client, args.latency)
+        benchmark_schema(lambda_function, backend, args)
+
+
+if __name__ == "__main__":
+    main()
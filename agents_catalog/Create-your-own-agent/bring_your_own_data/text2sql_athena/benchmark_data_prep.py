@@ -0,0 +1,209 @@
+"""
+Benchmark SQLite to Parquet conversion in data_prep.py.
+
+    python benchmark_data_prep.py
+    python benchmark_data_prep.py --size-gb 4 --workers 4
+    python benchmark_data_prep.py --size-gb 0.5 --bucket my-test-bucket
+
+A synthetic database shaped like the BIRD-SQL california_schools one (a few
+wide tables of text, integer and real columns with NULLs) is generated once
+at --db, split across tables in the proportions of TABLES. "legacy" is the
+previous conversion: each table read whole with pd.read_sql_query and written
+with to_parquet, one after another. "chunked" is iter_converted_tables. Each
+runs in its own interpreter so peak memory (max RSS of the process and its
+workers) is measured separately. With --bucket the chunked run also uploads
+through process_database_and_upload, and legacy uploads each file with
+upload_file.
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+# Table name, share of the database size, and columns as (name, SQLite type, NULL rate)
+TABLES = [
+    ("frpm", 0.45, [
+        ("CDSCode", "TEXT", 0.0), ("Academic Year", "TEXT", 0.0), ("County Name", "TEXT", 0.0),
+        ("District Name", "TEXT", 0.0), ("School Name", "TEXT", 0.0), ("Charter School (Y/N)", "INTEGER", 0.05),
+        ("Enrollment (K-12)", "REAL", 0.02), ("Free Meal Count (K-12)", "REAL", 0.1),
+        ("Percent (%) Eligible Free (K-12)", "REAL", 0.1), ("2013-14 CALPADS Fall 1 Certification Status", "INTEGER", 0.0),
+    ]),
+    ("schools", 0.35, [
+        ("CDSCode", "TEXT", 0.0), ("NCESDist", "TEXT", 0.05), ("StatusType", "TEXT", 0.0), ("County", "TEXT", 0.0),
+        ("School", "TEXT", 0.02), ("Street", "TEXT", 0.02), ("City", "TEXT", 0.02), ("Zip", "TEXT", 0.02),
+        ("OpenDate", "DATE", 0.1), ("Latitude", "REAL", 0.1), ("Longitude", "REAL", 0.1), ("Magnet", "INTEGER", 0.3),
+    ]),
+    ("satscores", 0.20, [
+        ("cds", "TEXT", 0.0), ("rtype", "TEXT", 0.0), ("sname", "TEXT", 0.05), ("dname", "TEXT", 0.0),
+        ("enroll12", "INTEGER", 0.0), ("NumTstTakr", "INTEGER", 0.0), ("AvgScrRead", "INTEGER", 0.2),
+        ("AvgScrMath", "INTEGER", 0.2), ("NumGE1500", "INTEGER", 0.2),
+    ]),
+]
+
+WORDS = ["Alameda", "Berkeley", "Oakland", "Fresno", "Elementary", "High", "Unified", "Charter", "Academy",
+         "Valley", "Lincoln", "Washington", "Street", "Avenue", "Community", "Middle", "Preparatory"]
+
+
+def value_pool(sqlite_type, rng, size=5000):
+    """Pre-generated values for a column, cycled through to make generation fast"""
+    if sqlite_type == "INTEGER":
+        return [rng.randint(0, 5000) for _ in range(size)]
+    if sqlite_type == "REAL":
+        return [round(rng.uniform(0, 2000), 3) for _ in range(size)]
+    if sqlite_type == "DATE":
+        return [f"{rng.randint(1950, 2020)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}" for _ in range(size)]
+    return [" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))) + f" {rng.randint(0, 99999)}"
+            for _ in range(size)]
+
+
+def generate_database(path, size_gb, seed=0):
+    """Write a synthetic SQLite database of roughly size_gb gigabytes to path"""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    for table_name, share, columns in TABLES:
+        definitions = ", ".join(f'"{name}" {sqlite_type}' for name, sqlite_type, _ in columns)
+        conn.execute(f'CREATE TABLE "{table_name}" ({definitions})')
+        pools = [value_pool(sqlite_type, rng) for _, sqlite_type, _ in columns]
+        null_masks = [[rng.random() < null_rate for _ in range(4999)] for _, _, null_rate in columns]
+        row_bytes = sum(len(str(pool[0])) + 2 for pool in pools)
+        rows = int(size_gb * share * 1024 ** 3 / row_bytes)
+
+        def generate():
+            for i in range(rows):
+                yield tuple(
+                    None if mask[i % 4999] else pool[(i * 7 + c) % len(pool)]
+                    for c, (pool, mask) in enumerate(zip(pools, null_masks))
+                )
+
+        placeholders = ", ".join("?" for _ in columns)
+        conn.executemany(f'INSERT INTO "{table_name}" VALUES ({placeholders})', generate())
+        conn.commit()
+        print(f"Generated {table_name}: {rows:,} rows")
+    conn.close()
+
+
+def peak_rss_mb():
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) / 1024
+
+
+def run_legacy(args, output_dir):
+    import boto3
+    import pandas as pd
+
+    conn = sqlite3.connect(args.db)
+    tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table';")]
+    for table_name in tables:
+        df = pd.read_sql_query(f'SELECT * FROM "{table_name}"', conn)
+        path = output_dir / f"{table_name}.parquet"
+        df.to_parquet(path, index=False)
+        del df
+        if args.bucket:
+            boto3.client("s3").upload_file(str(path), args.bucket, f"benchmark/legacy/{table_name}.parquet")
+    conn.close()
+
+
+def run_chunked(args, output_dir):
+    import data_prep
+
+    data_prep.SQLITE_CHUNK_ROWS = args.chunk_rows
+    data_prep.PARQUET_ROW_GROUP_ROWS = args.row_group_rows
+    if args.bucket:
+        database_dir = output_dir / "benchmark"
+        database_dir.mkdir()
+        shutil.copy(args.db, database_dir / "benchmark.sqlite")
+        data_prep.process_database_and_upload(database_dir, args.bucket)
+        return
+    for _ in data_prep.iter_converted_tables(args.db, output_dir, workers=args.workers):
+        pass
+
+
+def run_child(args):
+    output_dir = Path(tempfile.mkdtemp(prefix="data-prep-benchmark-"))
+    os.environ["CONVERT_WORKERS"] = str(args.workers)
+    start = time.perf_counter()
+    (run_legacy if args.child == "legacy" else run_chunked)(args, output_dir)
+    elapsed = time.perf_counter() - start
+    files = sorted(output_dir.glob("*.parquet"))
+    result = {
+        "seconds": elapsed,
+        "peak_mb": peak_rss_mb(),
+        "parquet_mb": sum(f.stat().st_size for f in files) / 1024 ** 2,
+        "files": [str(f) for f in files],
+        "output_dir": str(output_dir),
+    }
+    print(json.dumps(result))
+
+
+def compare_schema_reads(path):
+    """Seconds to get column types by reading the whole file, and from the footer alone"""
+    import pandas as pd
+    import pyarrow.parquet as pq
+
+    start = time.perf_counter()
+    pd.read_parquet(path).dtypes
+    whole = time.perf_counter() - start
+    start = time.perf_counter()
+    pq.read_schema(path)
+    footer = time.perf_counter() - start
+    return whole, footer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark data_prep SQLite to Parquet conversion")
+    parser.add_argument("--size-gb", type=float, default=2.0, help="Approximate size of the generated database")
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "data-prep-benchmark.sqlite"),
+                        help="Database path; generated if missing")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-rows", type=int, default=100000)
+    parser.add_argument("--row-group-rows", type=int, default=1000000)
+    parser.add_argument("--bucket", help="Also upload to this S3 bucket")
+    parser.add_argument("--modes", nargs="+", default=["legacy", "chunked"], choices=["legacy", "chunked"])
+    parser.add_argument("--child", choices=["legacy", "chunked"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    if not os.path.exists(args.db):
+        generate_database(args.db, args.size_gb)
+    print(f"database: {os.path.getsize(args.db) / 1024 ** 3:.2f} GB, workers: {args.workers}")
+
+    print(f"{'mode':>8} {'seconds':>8} {'peak MB':>8} {'parquet MB':>10}")
+    files = []
+    output_dirs = []
+    for mode in args.modes:
+        output = subprocess.run(
+            [sys.executable, __file__, "--child", mode] + sys.argv[1:],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        files = result["files"] or files
+        output_dirs.append(result["output_dir"])
+        print(f"{mode:>8} {result['seconds']:>8.1f} {result['peak_mb']:>8.0f} {result['parquet_mb']:>10.1f}")
+
+    if files:
+        largest = max(files, key=os.path.getsize)
+        whole, footer = compare_schema_reads(largest)
+        print(f"\ncolumn types of {Path(largest).name}: read whole file {whole:.2f} s, footer only {footer * 1000:.1f} ms")
+    for output_dir in output_dirs:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,33 @@
 import boto3
+import concurrent.futures
 import json
+import multiprocessing
 import os
-import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import sqlite3
 import uuid
 import zipfile
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
 from pathlib import Path
 import time
 import joblib
 
+# Rows read from SQLite at a time
+SQLITE_CHUNK_ROWS = int(os.environ.get('SQLITE_CHUNK_ROWS', '100000'))
+# Rows per Parquet row group
+PARQUET_ROW_GROUP_ROWS = int(os.environ.get('PARQUET_ROW_GROUP_ROWS', '1000000'))
+# Tables converted at the same time, each in its own process
+CONVERT_WORKERS = int(os.environ.get('CONVERT_WORKERS', str(os.cpu_count() or 1)))
+# Parquet files uploaded at the same time, each as a multipart upload
+UPLOAD_WORKERS = int(os.environ.get('UPLOAD_WORKERS', '4'))
+S3_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=16 * 1024 * 1024,
+    multipart_chunksize=16 * 1024 * 1024,
+    max_concurrency=8
+)
+
 
 # S3 Bucket Creation and Setup
 def create_s3_bucket(bucket_name, region):
@@ -62,54 +80,186 @@ def create_and_unzip(first_zip, new_directory, second_zip):
     else:
         print(f"No directories found in {new_dir}")
 
+def quote_identifier(name):
+    return '"' + name.replace('"', '""') + '"'
+
+def sqlite_arrow_schema(conn, table_name):
+    """
+    Arrow schema for a SQLite table, from the storage classes of its values.
+
+    Also returns the text columns that hold numbers too, whose values are
+    converted to strings (as stored, so 5 and 5.0 stay distinct) before writing.
+    """
+    columns = [row[1] for row in conn.execute(f'PRAGMA table_info({quote_identifier(table_name)})')]
+    if not columns:
+        return pa.schema([]), []
+    select = ', '.join(f'group_concat(DISTINCT typeof({quote_identifier(c)}))' for c in columns)
+    storage_classes = conn.execute(f'SELECT {select} FROM {quote_identifier(table_name)}').fetchone()
+
+    fields = []
+    mixed = []
+    for column, classes in zip(columns, storage_classes):
+        kinds = set(classes.split(',')) - {'null'} if classes else set()
+        if kinds == {'integer'}:
+            fields.append(pa.field(column, pa.int64()))
+        elif kinds and kinds <= {'integer', 'real'}:
+            fields.append(pa.field(column, pa.float64()))
+        elif kinds == {'blob'}:
+            fields.append(pa.field(column, pa.binary()))
+        else:
+            fields.append(pa.field(column, pa.string()))
+            if kinds - {'text'}:
+                mixed.append(column)
+    return pa.schema(fields), mixed
+
+def athena_type(arrow_type):
+    """Athena column type for an Arrow type"""
+    if pa.types.is_boolean(arrow_type):
+        return 'boolean'
+    if pa.types.is_int8(arrow_type):
+        return 'tinyint'
+    if pa.types.is_int16(arrow_type):
+        return 'smallint'
+    if pa.types.is_int32(arrow_type):
+        return 'int'
+    if pa.types.is_integer(arrow_type):
+        return 'bigint'
+    if pa.types.is_float32(arrow_type):
+        return 'float'
+    if pa.types.is_floating(arrow_type):
+        return 'double'
+    if pa.types.is_decimal(arrow_type):
+        return f'decimal({arrow_type.precision},{arrow_type.scale})'
+    if pa.types.is_date(arrow_type):
+        return 'date'
+    if pa.types.is_timestamp(arrow_type):
+        return 'timestamp'
+    if pa.types.is_binary(arrow_type) or pa.types.is_large_binary(arrow_type):
+        return 'binary'
+    return 'string'
+
+def athena_columns(schema):
+    return [(field.name, athena_type(field.type)) for field in schema]
+
+def convert_table(sqlite_file, table_name, parquet_path,
+                  chunk_rows=SQLITE_CHUNK_ROWS, row_group_rows=PARQUET_ROW_GROUP_ROWS):
+    """
+    Write a SQLite table to a Parquet file, reading chunk_rows rows at a time
+    and writing row groups of row_group_rows rows.
+
+    Rows are converted straight from the values SQLite returns, not through
+    pandas, so integer columns with NULLs keep their exact values.
+
+    Returns the table's Athena columns and row count.
+    """
+    conn = sqlite3.connect(f'{Path(sqlite_file).resolve().as_uri()}?mode=ro', uri=True)
+    try:
+        schema, mixed = sqlite_arrow_schema(conn, table_name)
+        rows = 0
+        pending = []
+        pending_rows = 0
+        with pq.ParquetWriter(parquet_path, schema) as writer:
+            cursor = conn.execute(f'SELECT * FROM {quote_identifier(table_name)}')
+            while True:
+                chunk = cursor.fetchmany(chunk_rows)
+                if not chunk:
+                    break
+                arrays = []
+                for field, values in zip(schema, zip(*chunk)):
+                    if field.name in mixed:
+                        values = [None if value is None else str(value) for value in values]
+                    arrays.append(pa.array(values, type=field.type))
+                pending.append(pa.Table.from_arrays(arrays, schema=schema))
+                pending_rows += len(chunk)
+                rows += len(chunk)
+                if pending_rows >= row_group_rows:
+                    buffered = pa.concat_tables(pending)
+                    complete = pending_rows - pending_rows % row_group_rows
+                    writer.write_table(buffered.slice(0, complete), row_group_size=row_group_rows)
+                    pending = [buffered.slice(complete)]
+                    pending_rows -= complete
+            if pending_rows:
+                writer.write_table(pa.concat_tables(pending), row_group_size=row_group_rows)
+        return athena_columns(schema), rows
+    finally:
+        conn.close()
+
+def iter_converted_tables(sqlite_file, output_folder, workers=CONVERT_WORKERS):
+    """
+    Convert every table of a SQLite database to Parquet in a process pool,
+    yielding (table name, Parquet path, Athena columns, row count) as each
+    table finishes
+    """
+    conn = sqlite3.connect(sqlite_file)
+    cursor = conn.cursor()
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+    tables = [table[0] for table in cursor.fetchall()]
+    conn.close()
+
+    # Fork so the worker functions need not be importable, as when run with %run
+    context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        conversions = {
+            pool.submit(convert_table, str(sqlite_file), table_name, str(Path(output_folder) / f"{table_name}.parquet")): table_name
+            for table_name in tables
+        }
+        for future in concurrent.futures.as_completed(conversions):
+            table_name = conversions[future]
+            try:
+                columns, rows = future.result()
+            except Exception as e:
+                print(f"Error processing table {table_name}: {str(e)}")
+                continue
+            print(f"Converted table {table_name}: {rows} rows")
+            yield table_name, Path(output_folder) / f"{table_name}.parquet", columns, rows
+
+def upload_parquet(s3_client, local_parquet_path, bucket_name, s3_key):
+    s3_client.upload_file(str(local_parquet_path), bucket_name, s3_key, Config=S3_TRANSFER_CONFIG)
+    print(f"Uploaded to s3://{bucket_name}/{s3_key}")
+    os.remove(local_parquet_path)
+
 def process_database_and_upload(database_folder, bucket_name):
+    """
+    Convert the tables of the SQLite database in database_folder to Parquet and
+    upload each to s3://bucket_name/<database>/<table>/<table>.parquet while the
+    others are converted.
+
+    Returns {database: {table: [(column, Athena type), ...]}} for the uploaded tables.
+    """
     folder_path = Path(database_folder)
     database_name = folder_path.name
     
     sqlite_files = list(folder_path.glob('*.db')) + list(folder_path.glob('*.sqlite'))
     if not sqlite_files:
         print(f"No SQLite file found in {database_folder}")
-        return
+        return {}
     
     sqlite_file = sqlite_files[0]
     print(f"\nProcessing database: {database_name}")
     print(f"SQLite file: {sqlite_file}")
     
+    schemas = {}
     try:
-        conn = sqlite3.connect(sqlite_file)
-        cursor = conn.cursor()
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        tables = cursor.fetchall()
         s3_client = boto3.client('s3')
-        
-        for table in tables:
-            table_name = table[0]
-            print(f"\nProcessing table: {table_name}")
-            
-            try:
-                df = pd.read_sql_query(f'SELECT * FROM "{table_name}"', conn)
-                parquet_filename = f"{table_name}.parquet"
-                local_parquet_path = folder_path / parquet_filename
-                df.to_parquet(local_parquet_path, index=False)
-                
-                s3_key = f"{database_name}/{parquet_filename}"
-                s3_client.upload_file(
-                    str(local_parquet_path),
-                    bucket_name,
-                    s3_key
-                )
-                print(f"Uploaded to s3://{bucket_name}/{s3_key}")
-                os.remove(local_parquet_path)
-                
-            except Exception as e:
-                print(f"Error processing table {table_name}: {str(e)}")
-                continue
-        
-        conn.close()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as uploader:
+            uploads = {}
+            for table_name, local_parquet_path, columns, rows in iter_converted_tables(sqlite_file, folder_path):
+                s3_key = f"{database_name}/{table_name}/{table_name}.parquet"
+                future = uploader.submit(upload_parquet, s3_client, local_parquet_path, bucket_name, s3_key)
+                uploads[future] = (table_name, columns)
+
+            for future in concurrent.futures.as_completed(uploads):
+                table_name, columns = uploads[future]
+                try:
+                    future.result()
+                    schemas[table_name] = columns
+                except Exception as e:
+                    print(f"Error uploading table {table_name}: {str(e)}")
         
     except Exception as e:
         print(f"Error processing database {database_name}: {str(e)}")
-        return
+
+    return {database_name: schemas}
 
 def set_athena_result_location(result_bucket):
     try:
@@ -166,31 +316,29 @@ def list_s3_folders_and_files(bucket_name):
         return None
 
 
-def generate_and_create_table(results_bucket_name, parquet_bucket_name, database_name, table_name):
-    """Generate and create a single table"""
+def read_parquet_schema(bucket_name, s3_key):
+    """The Arrow schema of a Parquet file in S3, read from its footer alone"""
+    s3_client = boto3.client('s3')
+    tail = s3_client.get_object(Bucket=bucket_name, Key=s3_key, Range='bytes=-8')['Body'].read()
+    footer_length = int.from_bytes(tail[:4], 'little')
+    footer = s3_client.get_object(Bucket=bucket_name, Key=s3_key, Range=f'bytes=-{footer_length + 8}')['Body'].read()
+    # The footer preceded by the leading magic bytes is enough for pyarrow to read the schema
+    return pq.read_schema(pa.BufferReader(b'PAR1' + footer))
+
+def generate_and_create_table(results_bucket_name, parquet_bucket_name, database_name, table_name, columns=None):
+    """
+    Generate and create a single table. columns are the table's
+    (name, Athena type) pairs; if None they are read from the Parquet footer.
+    """
     try:
         # Generate DDL
-        s3_path = f's3://{parquet_bucket_name}/{database_name}/{table_name}.parquet'
-        df = pd.read_parquet(s3_path)
-        
-        # Map pandas types to Athena types
-        type_mapping = {
-            'object': 'string',
-            'int64': 'int',
-            'float64': 'double',
-            'bool': 'boolean',
-            'datetime64[ns]': 'timestamp'
-        }
-        
-        # Generate column definitions
-        columns = []
-        for col, dtype in df.dtypes.items():
-            athena_type = type_mapping.get(str(dtype), 'string')
-            columns.append(f"`{col}` {athena_type}")
+        if columns is None:
+            s3_key = f'{database_name}/{table_name}/{table_name}.parquet'
+            columns = athena_columns(read_parquet_schema(parquet_bucket_name, s3_key))
         
         # Create DDL statement
-        column_definitions = ',\n    '.join(columns)
-        s3_location = f's3://{parquet_bucket_name}/{database_name}/'
+        column_definitions = ',\n    '.join(f"`{name}` {column_type}" for name, column_type in columns)
+        s3_location = f's3://{parquet_bucket_name}/{database_name}/{table_name}/'
         
         ddl = f"""CREATE EXTERNAL TABLE IF NOT EXISTS {database_name}.{table_name} (
         {column_definitions}
@@ -234,8 +382,12 @@ def generate_and_create_table(results_bucket_name, parquet_bucket_name, database
         print(f"Error creating table {database_name}.{table_name}: {e}")
         return False
 
-def create_all_databases_and_tables(results_bucket_name, parquet_bucket_name):
-    """Create all databases and tables from S3 bucket structure"""
+def create_all_databases_and_tables(results_bucket_name, parquet_bucket_name, schemas=None):
+    """
+    Create all databases and tables from S3 bucket structure. schemas, as
+    returned by process_database_and_upload, saves reading the Parquet footers.
+    """
+    schemas = schemas or {}
     try:
         # Get database and table structure from S3
         database_tables = list_s3_folders_and_files(parquet_bucket_name)
@@ -276,7 +428,8 @@ def create_all_databases_and_tables(results_bucket_name, parquet_bucket_name):
                         results_bucket_name,
                         parquet_bucket_name,
                         database_name,
-                        table_name
+                        table_name,
+                        schemas.get(database_name, {}).get(table_name)
                     )
             else:
                 print(f"Failed to create database {database_name}: {state}")
@@ -328,8 +481,9 @@ def main():
     base_path = Path(BASE_DIR)
     target_folder = base_path/DATABASE_NAME  # Create path to specific database folder
 
+    schemas = {}
     if target_folder.exists() and target_folder.is_dir():
-        process_database_and_upload(target_folder, main_bucket)
+        schemas = process_database_and_upload(target_folder, main_bucket)
     else:
         print(f"Database folder '{DATABASE_NAME}' not found in {BASE_DIR}")
 
@@ -337,7 +491,7 @@ def main():
     set_athena_result_location(athena_results_bucket)
 
     # Step 5: Create Athena databases and tables
-    success = create_all_databases_and_tables(athena_results_bucket, main_bucket)
+    success = create_all_databases_and_tables(athena_results_bucket, main_bucket, schemas)
     if success:
         print("\nCompleted creating all databases and tables in Athena!")
 
@@ -3,165 +3,388 @@ import time
 import os
 import uuid
 import json
-import sys
-from collections import defaultdict
+import re
+import io
+import fnmatch
+import itertools
+import hashlib
+import statistics
+from collections import OrderedDict, defaultdict, deque
 
 athena_client = boto3.client('athena')
-    
-def get_schema(database_name="california_schools"):
+glue_client = boto3.client('glue')
+s3_client = boto3.client('s3')
+
+ATHENA_WORKGROUP = os.environ.get('ATHENA_WORKGROUP', 'primary')
+# Where results are written, for workgroups that do not enforce an output location
+ATHENA_OUTPUT_LOCATION = os.environ.get('ATHENA_OUTPUT_LOCATION')
+# Reuse the results of an identical query run within this many minutes (0 disables);
+# needs a workgroup on Athena engine version 3
+ATHENA_RESULT_REUSE_MINUTES = int(os.environ.get('ATHENA_RESULT_REUSE_MINUTES', '0'))
+# Rows read from a result before it is truncated
+ATHENA_MAX_ROWS = int(os.environ.get('ATHENA_MAX_ROWS', '100000'))
+# Results larger than this are written to S3 instead of returned to the agent
+INLINE_RESULT_BYTES = 20000
+# Queries still running after this long are stopped
+ATHENA_TIMEOUT_SECONDS = int(os.environ.get('ATHENA_TIMEOUT_SECONDS', '600'))
+ATHENA_POLL_MIN_SECONDS = 0.1
+ATHENA_POLL_MAX_SECONDS = 5.0
+ATHENA_POLL_BACKOFF = 1.5
+# get_query_results returns at most 1000 rows per call
+ATHENA_PAGE_SIZE = 1000
+
+ATHENA_DECODERS = {
+    'boolean': lambda value: value.lower() == 'true',
+    'tinyint': int,
+    'smallint': int,
+    'integer': int,
+    'int': int,
+    'bigint': int,
+    'real': float,
+    'float': float,
+    'double': float,
+    'decimal': float,
+}
+# A field of an Athena CSV result: quoted, or unquoted and empty for NULL
+ATHENA_CSV_FIELD = re.compile(r'"((?:[^"]|"")*)"|([^,"]*)')
+
+
+def iter_athena_csv(lines):
     """
-    Get schema information for all tables in Athena databases
+    Records of an Athena CSV result as lists of strings, with NULLs as None.
+
+    Athena quotes every value and writes NULL as an empty unquoted field,
+    which csv.reader cannot tell apart from an empty string.
     """
+    record = ''
+    quotes = 0
+    for line in lines:
+        record += line
+        quotes += line.count('"')
+        # An odd number of quotes means a quoted value continues on the next line
+        if quotes % 2:
+            continue
+        record = record.rstrip('\r\n')
+        values = []
+        position = 0
+        while True:
+            match = ATHENA_CSV_FIELD.match(record, position)
+            quoted, unquoted = match.groups()
+            values.append(quoted.replace('""', '"') if quoted is not None else unquoted or None)
+            position = match.end() + 1
+            if position > len(record):
+                break
+        yield values
+        record = ''
+        quotes = 0
 
-    sql = f"""
-        SELECT
-            table_name,
-            column_name,
-            data_type
-        FROM information_schema.columns
-        WHERE table_schema = '{database_name}'
-        ORDER BY table_name, ordinal_position;
-        """
-        
-    try:
-        # Start query execution
-        response = athena_client.start_query_execution(
-            QueryString=sql,
-            QueryExecutionContext={
-                'Database': database_name
+
+class AthenaExecutor:
+    """
+    Runs Athena queries and reads their results.
+
+    Polling backs off exponentially from a first wait based on how long recent
+    queries took. Results longer than one page of get_query_results are
+    streamed from the CSV Athena wrote to the query's OutputLocation, and
+    values are decoded to Python types using ResultSetMetadata.
+    """
+
+    def __init__(self, athena, s3, workgroup=ATHENA_WORKGROUP, output_location=ATHENA_OUTPUT_LOCATION,
+                 reuse_minutes=ATHENA_RESULT_REUSE_MINUTES, timeout=ATHENA_TIMEOUT_SECONDS):
+        self.athena = athena
+        self.s3 = s3
+        self.workgroup = workgroup
+        self.output_location = output_location
+        self.reuse_minutes = reuse_minutes
+        self.timeout = timeout
+        # Run times in seconds of recent queries, used to seed polling
+        self.recent_seconds = deque(maxlen=20)
+
+    def start(self, query, database_name):
+        kwargs = {
+            'QueryString': query,
+            'QueryExecutionContext': {'Database': database_name},
+            'WorkGroup': self.workgroup,
+        }
+        if self.output_location:
+            kwargs['ResultConfiguration'] = {'OutputLocation': self.output_location}
+        if self.reuse_minutes > 0:
+            kwargs['ResultReuseConfiguration'] = {
+                'ResultReuseByAgeConfiguration': {'Enabled': True, 'MaxAgeInMinutes': self.reuse_minutes}
             }
-        )
-            
-        query_execution_id = response['QueryExecutionId']
-            
-        def wait_for_query_completion(query_execution_id):
-            while True:
-                response = athena_client.get_query_execution(
-                    QueryExecutionId=query_execution_id
-                )
-                state = response['QueryExecution']['Status']['State']
-                
-                if state in ['SUCCEEDED', 'FAILED', 'CANCELLED']:
-                    print(f"Query {state}")
-                    return state
-                    
-                print("Waiting for query to complete...")
-                time.sleep(2)
-            
-        # Wait for query completion
-        state = wait_for_query_completion(query_execution_id)
-
-        if state == 'SUCCEEDED':
-            # Get query results
-            results = athena_client.get_query_results(
-                QueryExecutionId=query_execution_id
-            )
-            print("Got query results for schema")
-            # Assuming you have a database connection and cursor setup
-            # cursor.execute(sql)
-            # results = cursor.fetchall()
-            
-            database_structure = []
-            table_dict = {}
-
-            # Skip the header row
-            rows = results['ResultSet']['Rows'][1:]
+        return self.athena.start_query_execution(**kwargs)['QueryExecutionId']
+
+    def first_wait(self):
+        """Most of the median recent run time, so short queries are not polled needlessly often"""
+        if not self.recent_seconds:
+            return ATHENA_POLL_MIN_SECONDS
+        return min(ATHENA_POLL_MAX_SECONDS, max(ATHENA_POLL_MIN_SECONDS, 0.8 * statistics.median(self.recent_seconds)))
+
+    def wait(self, query_execution_id):
+        """Poll until the query finishes, returning its QueryExecution"""
+        start = time.time()
+        delay = self.first_wait()
+        while True:
+            time.sleep(delay)
+            execution = self.athena.get_query_execution(QueryExecutionId=query_execution_id)['QueryExecution']
+            state = execution['Status']['State']
+
+            if state == 'SUCCEEDED':
+                stats = execution.get('Statistics', {})
+                total_millis = stats.get('TotalExecutionTimeInMillis')
+                self.recent_seconds.append(total_millis / 1000 if total_millis else time.time() - start)
+                if stats.get('ResultReuseInformation', {}).get('ReusedPreviousResult'):
+                    print("Reused previous query results")
+                return execution
+
+            if state == 'FAILED':
+                error_message = execution['Status'].get('StateChangeReason', 'Unknown error')
+                raise Exception(f"Query failed: {error_message}")
+
+            if state == 'CANCELLED':
+                raise Exception("Query was cancelled")
+
+            if time.time() - start > self.timeout:
+                self.athena.stop_query_execution(QueryExecutionId=query_execution_id)
+                raise Exception(f"Query did not finish within {self.timeout} seconds")
 
+            print(f"Waiting for query to complete ({state})...")
+            delay = min(ATHENA_POLL_MAX_SECONDS, delay * ATHENA_POLL_BACKOFF)
+
+    @staticmethod
+    def decoders(column_info):
+        return [(column['Name'], ATHENA_DECODERS.get(column['Type'].lower())) for column in column_info]
+
+    @staticmethod
+    def decode(values, decoders):
+        """A row as a dict, with NULLs (and empty numeric fields) as None; empty strings are kept"""
+        row = {}
+        for (name, decoder), value in zip(decoders, values):
+            if value is None or (decoder is not None and value == ''):
+                row[name] = None
+            elif decoder is not None:
+                try:
+                    row[name] = decoder(value)
+                except ValueError:
+                    row[name] = value
+            else:
+                row[name] = value
+        return row
+
+    def iter_rows(self, execution):
+        """Decoded rows of a finished query"""
+        query_execution_id = execution['QueryExecutionId']
+        page = self.athena.get_query_results(QueryExecutionId=query_execution_id, MaxResults=ATHENA_PAGE_SIZE)
+        decoders = self.decoders(page['ResultSet']['ResultSetMetadata']['ColumnInfo'])
+        # The first row of a SELECT result repeats the column names
+        header = execution.get('StatementType', 'DML') == 'DML'
+
+        output = execution.get('ResultConfiguration', {}).get('OutputLocation', '')
+        if 'NextToken' in page and header and output.endswith('.csv'):
+            try:
+                body = self._open_output(output)
+            except Exception as e:
+                print(f"Error reading {output}, paging through results instead: {e}")
+            else:
+                reader = iter_athena_csv(io.TextIOWrapper(body, encoding='utf-8', newline=''))
+                next(reader, None)
+                try:
+                    for values in reader:
+                        yield self.decode(values, decoders)
+                finally:
+                    body.close()
+                return
+
+        pages = [page]
+        if 'NextToken' in page:
+            paginator = self.athena.get_paginator('get_query_results')
+            pages = itertools.chain(pages, paginator.paginate(
+                QueryExecutionId=query_execution_id,
+                PaginationConfig={'PageSize': ATHENA_PAGE_SIZE, 'StartingToken': page['NextToken']},
+            ))
+        for page in pages:
+            rows = page['ResultSet']['Rows']
+            if header:
+                rows, header = rows[1:], False
             for row in rows:
-                # Extract values from the Data structure
-                table_name = row['Data'][0]['VarCharValue']
-                column_name = row['Data'][1]['VarCharValue']
-                data_type = row['Data'][2]['VarCharValue']
-                
-                # Initialize table if not exists
-                if table_name not in table_dict:
-                    table_dict[table_name] = []
-                
-                # Append column information
-                table_dict[table_name].append((column_name, data_type))
+                yield self.decode([field.get('VarCharValue') for field in row['Data']], decoders)
+
+    def _open_output(self, output):
+        bucket, _, key = output[len('s3://'):].partition('/')
+        return self.s3.get_object(Bucket=bucket, Key=key)['Body']
 
-            # Convert to the desired format
-            for table_name, columns in table_dict.items():
+    def query(self, query, database_name, max_rows=ATHENA_MAX_ROWS):
+        """Run a query and read up to max_rows rows, returning (rows, truncated)"""
+        execution = self.wait(self.start(query, database_name))
+        rows = []
+        truncated = False
+        iterator = self.iter_rows(execution)
+        for row in iterator:
+            if len(rows) >= max_rows:
+                truncated = True
+                break
+            rows.append(row)
+        iterator.close()
+        return rows, truncated
+
+
+athena_executor = AthenaExecutor(athena_client, s3_client)
+
+
+# Glue databases described to the agent; queries run in the first one by default
+ATHENA_DATABASES = [name.strip() for name in os.environ.get('ATHENA_DATABASES', 'california_schools').split(',') if name.strip()]
+# Comma-separated table name patterns, such as "frpm,sat*" or "california_schools.*"; empty for all tables
+SCHEMA_TABLE_FILTER = [pattern.strip() for pattern in os.environ.get('SCHEMA_TABLE_FILTER', '').split(',') if pattern.strip()]
+# How long the schema catalog is used before it is read from Glue again
+SCHEMA_TTL_SECONDS = int(os.environ.get('SCHEMA_TTL_SECONDS', '300'))
+# Copy of the catalog that outlives the Python process within the execution environment
+SCHEMA_CACHE_PATH = os.environ.get('SCHEMA_CACHE_PATH', '/tmp/text2sql-schema-catalog.json')
+# Load the catalog during container initialisation rather than on the first request
+SCHEMA_PREWARM = os.environ.get('SCHEMA_PREWARM', 'true').lower() == 'true'
+
+
+class SchemaCatalog:
+    """
+    Columns of the tables in a set of Glue databases.
+
+    `databases` maps database name to table name to a list of [column, type]
+    pairs, partition keys included. `version` is the latest table update
+    time, which changes when a table is created, altered or re-crawled.
+    """
+
+    def __init__(self, databases, version='', loaded_at=0.0):
+        self.databases = databases
+        self.version = version
+        self.loaded_at = loaded_at
+        self.schemas = {}
+
+    @classmethod
+    def from_glue(cls, glue, database_names):
+        databases = {}
+        updated = []
+        paginator = glue.get_paginator('get_tables')
+        for database_name in database_names:
+            tables = databases.setdefault(database_name, {})
+            for page in paginator.paginate(DatabaseName=database_name):
+                for table in page['TableList']:
+                    columns = table.get('StorageDescriptor', {}).get('Columns', []) + table.get('PartitionKeys', [])
+                    tables[table['Name']] = [[column['Name'], column['Type']] for column in columns]
+                    updated.append(str(table.get('UpdateTime', table.get('CreateTime', ''))))
+        return cls(databases, max(updated, default=''), time.time())
+
+    @classmethod
+    def load(cls, path):
+        """The catalog saved at path, or None if there is none"""
+        try:
+            with open(path) as f:
+                saved = json.load(f)
+            return cls(saved['databases'], saved['version'], saved['loaded_at'])
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save(self, path):
+        temporary = f'{path}.{os.getpid()}'
+        with open(temporary, 'w') as f:
+            json.dump({'databases': self.databases, 'version': self.version, 'loaded_at': self.loaded_at}, f)
+        os.replace(temporary, path)
+
+    def covers(self, database_names):
+        return set(database_names) <= set(self.databases)
+
+    def schema(self, database_names, table_filter=()):
+        """
+        The tables of database_names matching table_filter, in the format
+        returned by get_schema. Table names are qualified with the database
+        when more than one database is described.
+        """
+        key = (tuple(database_names), tuple(table_filter))
+        if key in self.schemas:
+            return self.schemas[key]
+        database_structure = []
+        for database_name in database_names:
+            for table_name, columns in sorted(self.databases.get(database_name, {}).items()):
+                qualified = f'{database_name}.{table_name}'
+                if table_filter and not any(fnmatch.fnmatch(table_name, pattern) or fnmatch.fnmatch(qualified, pattern)
+                                            for pattern in table_filter):
+                    continue
                 database_structure.append({
-                    "table_name": table_name,
-                    "columns": columns
+                    "table_name": qualified if len(database_names) > 1 else table_name,
+                    "columns": [tuple(column) for column in columns]
                 })
+        self.schemas[key] = database_structure
+        return database_structure
 
-            return database_structure
 
-        else:
-            raise Exception(f"Query failed with state: {state}")
+schema_catalog = None
+
+
+def get_schema_catalog(database_names=None):
+    """
+    The schema catalog, kept in memory and in SCHEMA_CACHE_PATH.
+
+    It is read from Glue when it is older than SCHEMA_TTL_SECONDS or does not
+    cover database_names.
+    """
+    global schema_catalog
+    database_names = database_names or ATHENA_DATABASES
+    if schema_catalog is None:
+        schema_catalog = SchemaCatalog.load(SCHEMA_CACHE_PATH)
+    if (schema_catalog is not None and schema_catalog.covers(database_names)
+            and time.time() < schema_catalog.loaded_at + SCHEMA_TTL_SECONDS):
+        return schema_catalog
+    print("Loading schema catalog from Glue")
+    schema_catalog = SchemaCatalog.from_glue(glue_client, sorted(set(database_names) | set(ATHENA_DATABASES)))
+    try:
+        schema_catalog.save(SCHEMA_CACHE_PATH)
+    except OSError as e:
+        print(f"Error saving schema catalog: {e}")
+    return schema_catalog
+
+
+def invalidate_schema_catalog():
+    """Read the schema from Glue on the next request"""
+    global schema_catalog
+    schema_catalog = None
+    try:
+        os.remove(SCHEMA_CACHE_PATH)
+    except FileNotFoundError:
+        pass
+
+
+def get_schema(database_names=None, table_filter=None):
+    """
+    Get schema information for the tables in Glue databases, by default
+    ATHENA_DATABASES filtered by SCHEMA_TABLE_FILTER
+    """
+    database_names = database_names or ATHENA_DATABASES
+    try:
+        return get_schema_catalog(database_names).schema(
+            database_names, SCHEMA_TABLE_FILTER if table_filter is None else table_filter
+        )
     except Exception as e:
             print(f"Error getting schema: {e}")
             raise
 
-def query_athena(query, database_name='california_schools'):
+
+if SCHEMA_PREWARM:
+    try:
+        get_schema_catalog()
+    except Exception as e:
+        print(f"Error loading schema catalog: {e}")
+
+def query_athena(query, database_name=None):
     """
-    Execute a query on Athena
+    Execute a query on Athena, returning {"results": [...]} with "truncated"
+    set if there were more than ATHENA_MAX_ROWS rows
     """
     try:
-        # Start query execution
-        response = athena_client.start_query_execution(
-            QueryString=query,
-            QueryExecutionContext={
-                'Database': database_name
-            }
-        )
-        
-        query_execution_id = response['QueryExecutionId']
-        
-        def wait_for_query_completion(query_execution_id):
-            while True:
-                response = athena_client.get_query_execution(
-                    QueryExecutionId=query_execution_id
-                )
-                state = response['QueryExecution']['Status']['State']
-                
-                if state == 'FAILED':
-                    error_message = response['QueryExecution']['Status'].get('StateChangeReason', 'Unknown error')
-                    raise Exception(f"Query failed: {error_message}")
-                    
-                if state == 'CANCELLED':
-                    raise Exception("Query was cancelled")
-                    
-                if state == 'SUCCEEDED':
-                    return state
-                    
-                print("Waiting for query to complete...")
-                time.sleep(2)
-        
-        # Wait for query completion
-        state = wait_for_query_completion(query_execution_id)
-        print("query complete")
-        # Get query results
-        print(state)
-
-        if state == 'SUCCEEDED':
-            results = athena_client.get_query_results(
-                QueryExecutionId=query_execution_id
-            )
-            print("got query results")
-            print(results)
-            # Process results
-            processed_results = []
-            headers = []
-            
-            # Get headers from first row
-            if results['ResultSet']['Rows']:
-                headers = [field.get('VarCharValue', '') for field in results['ResultSet']['Rows'][0]['Data']]
-            
-            # Process data rows
-            for row in results['ResultSet']['Rows'][1:]:
-                values = [field.get('VarCharValue', '') for field in row['Data']]
-                row_dict = dict(zip(headers, values))
-                processed_results.append(row_dict)
-            
-            print(processed_results)
-            return processed_results
+        rows, truncated = athena_executor.query(query, database_name or ATHENA_DATABASES[0])
+        print(f"Read {len(rows)} rows{' (truncated)' if truncated else ''}")
+        result = {'results': rows}
+        if truncated:
+            result['truncated'] = True
+        return result
 
-        else:
-            raise Exception(f"Query failed with state: {state}")
-        
     except Exception as e:
         print(f"Error executing query: {e}")
         raise
@@ -179,13 +402,290 @@ def upload_result_s3(result, bucket, key):
         "key": key
     }
 
+QUERY_CACHE_METRICS_NAMESPACE = os.environ.get('QUERY_CACHE_METRICS_NAMESPACE', 'Text2SQL')
+# Overrides the Glue table update times as the version stamp for cached results
+DATA_VERSION = os.environ.get('DATA_VERSION', '')
+
+# Generated-query and result cache. Level 1 maps a normalised question to
+# the schema returned for it and the last query that returned rows for it;
+# level 2 maps a normalised query to its result. Both are keyed by the data
+# version, so a schema or data change starts them afresh.
+QUERY_CACHE_MAX_ENTRIES = int(os.environ.get('QUERY_CACHE_MAX_ENTRIES', '256'))
+QUERY_CACHE_TTL_SECONDS = int(os.environ.get('QUERY_CACHE_TTL_SECONDS', '3600'))
+# Budget of the in-memory tier, in bytes of JSON-serialised values
+QUERY_CACHE_MAX_BYTES = int(os.environ.get('QUERY_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+# Values that serialise to more than this are not cached in either tier
+QUERY_CACHE_MAX_VALUE_BYTES = int(os.environ.get('QUERY_CACHE_MAX_VALUE_BYTES', str(1024 * 1024)))
+# Optional tier shared by all containers: dynamodb://<table> (partition key
+# "cache_key", TTL attribute "expires_at") or s3://<bucket>/<prefix>
+QUERY_CACHE_URI = os.environ.get('QUERY_CACHE_URI', '')
+# How often the shared tier is checked for invalidations by other containers
+QUERY_CACHE_GENERATION_CHECK_SECONDS = 60
+# DynamoDB items are limited to 400 KB
+QUERY_CACHE_MAX_ITEM_BYTES = 350000
+
+QUESTION_LEVEL = 'question'
+RESULT_LEVEL = 'result'
+QUOTED = re.compile(r"""('(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.)*"|`[^`]*`)""")
+
+
+def normalize_question(question):
+    return re.sub(r'\s+', ' ', question).strip().rstrip('?.! ').lower()
+
+
+def normalize_query(query):
+    """Collapse whitespace outside quoted literals and drop a trailing semicolon; case is kept"""
+    parts = QUOTED.split(query.strip().rstrip(';').strip())
+    return ''.join(part if i % 2 else re.sub(r'\s+', ' ', part) for i, part in enumerate(parts)).strip()
+
+
+class DynamoDBCacheTier:
+    def __init__(self, table):
+        self.client = boto3.client('dynamodb')
+        self.table = table
+
+    def get(self, key):
+        item = self.client.get_item(TableName=self.table, Key={'cache_key': {'S': key}}).get('Item')
+        if item is None or float(item['expires_at']['N']) < time.time():
+            return None
+        return json.loads(item['value']['S'])
+
+    def put(self, key, value, ttl_seconds):
+        body = json.dumps(value, default=str)
+        if len(body) > QUERY_CACHE_MAX_ITEM_BYTES:
+            return
+        self.client.put_item(TableName=self.table, Item={
+            'cache_key': {'S': key},
+            'value': {'S': body},
+            'expires_at': {'N': str(int(time.time() + ttl_seconds))},
+        })
+
+
+class S3CacheTier:
+    def __init__(self, bucket, prefix):
+        self.client = boto3.client('s3')
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+
+    def get(self, key):
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=f'{self.prefix}{key}.json')
+        except self.client.exceptions.NoSuchKey:
+            return None
+        entry = json.loads(response['Body'].read())
+        return entry['value'] if entry['expires_at'] >= time.time() else None
+
+    def put(self, key, value, ttl_seconds):
+        entry = {'expires_at': time.time() + ttl_seconds, 'value': value}
+        self.client.put_object(Bucket=self.bucket, Key=f'{self.prefix}{key}.json',
+                               Body=json.dumps(entry, default=str), ContentType='application/json')
+
+
+class QueryCache:
+    """
+    Two-level cache with an in-memory LRU tier in front of an optional shared tier.
+
+    The memory tier is bounded by entry count and by the serialised size of
+    its values; values larger than max_value_bytes are not cached at all.
+
+    invalidate() drops a level by moving it to a new generation, which other
+    containers pick up from the shared tier within
+    QUERY_CACHE_GENERATION_CHECK_SECONDS.
+    """
+
+    def __init__(self, max_entries=QUERY_CACHE_MAX_ENTRIES, ttl_seconds=QUERY_CACHE_TTL_SECONDS, uri=QUERY_CACHE_URI,
+                 max_bytes=QUERY_CACHE_MAX_BYTES, max_value_bytes=QUERY_CACHE_MAX_VALUE_BYTES):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.max_value_bytes = max_value_bytes
+        self.memory = OrderedDict()
+        self.memory_bytes = 0
+        self.shared = None
+        if uri.startswith('dynamodb://'):
+            self.shared = DynamoDBCacheTier(uri[len('dynamodb://'):])
+        elif uri.startswith('s3://'):
+            bucket, _, prefix = uri[len('s3://'):].partition('/')
+            self.shared = S3CacheTier(bucket, prefix)
+        self.generations = {}
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+
+    def _generation(self, level):
+        generation, checked = self.generations.get(level, (0, 0.0))
+        if self.shared is not None and time.time() - checked > QUERY_CACHE_GENERATION_CHECK_SECONDS:
+            try:
+                generation = self.shared.get(f'{level}:generation') or 0
+            except Exception as e:
+                print(f"Error reading cache generation: {e}")
+            self.generations[level] = (generation, time.time())
+        return generation
+
+    def _key(self, level, text, version):
+        digest = hashlib.sha256(f'{version}\0{text}'.encode('utf-8')).hexdigest()
+        return f'{level}:{self._generation(level)}:{digest}'
+
+    def get(self, level, text, version='', count=True):
+        """The cached value or None; count=False leaves the hit and miss counts alone"""
+        key = self._key(level, text, version)
+        entry = self.memory.get(key)
+        if entry is not None and entry[0] >= time.time():
+            self.memory.move_to_end(key)
+            self.hits[level] += count
+            return entry[1]
+        value = None
+        if self.shared is not None:
+            try:
+                value = self.shared.get(key)
+            except Exception as e:
+                print(f"Error reading shared cache: {e}")
+        if value is None:
+            self.misses[level] += count
+            return None
+        self._remember(key, value, len(json.dumps(value, default=str)))
+        self.hits[level] += count
+        return value
+
+    def put(self, level, text, value, version=''):
+        size = len(json.dumps(value, default=str))
+        if size > self.max_value_bytes:
+            print(f"Not caching a {size} byte value")
+            return
+        key = self._key(level, text, version)
+        self._remember(key, value, size)
+        if self.shared is not None:
+            try:
+                self.shared.put(key, value, self.ttl_seconds)
+            except Exception as e:
+                print(f"Error writing shared cache: {e}")
+
+    def _remember(self, key, value, size):
+        if size > self.max_value_bytes:
+            return
+        self._forget(key)
+        self.memory[key] = (time.time() + self.ttl_seconds, value, size)
+        self.memory_bytes += size
+        while len(self.memory) > self.max_entries or self.memory_bytes > self.max_bytes:
+            self.memory_bytes -= self.memory.popitem(last=False)[1][2]
+
+    def _forget(self, key):
+        entry = self.memory.pop(key, None)
+        if entry is not None:
+            self.memory_bytes -= entry[2]
+
+    def invalidate(self, level=None):
+        """Drop one level, or both, in this container and the shared tier"""
+        for name in ([level] if level else [QUESTION_LEVEL, RESULT_LEVEL]):
+            generation = self._generation(name) + 1
+            self.generations[name] = (generation, time.time())
+            for key in [k for k in self.memory if k.startswith(f'{name}:')]:
+                self._forget(key)
+            if self.shared is not None:
+                try:
+                    self.shared.put(f'{name}:generation', generation, 10 * 365 * 24 * 3600)
+                except Exception as e:
+                    print(f"Error writing cache generation: {e}")
+
+    def emit_metrics(self):
+        """Print hit and miss counts as a CloudWatch Embedded Metric Format record, then reset them"""
+        values = {}
+        for level in (QUESTION_LEVEL, RESULT_LEVEL):
+            values[f'{level.capitalize()}CacheHits'] = self.hits[level]
+            values[f'{level.capitalize()}CacheMisses'] = self.misses[level]
+        print(json.dumps({
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': QUERY_CACHE_METRICS_NAMESPACE,
+                    'Dimensions': [[]],
+                    'Metrics': [{'Name': name, 'Unit': 'Count'} for name in values],
+                }],
+            },
+            **values,
+        }))
+        self.hits.clear()
+        self.misses.clear()
+
+
+query_cache = QueryCache()
+
+
+def get_data_version():
+    """
+    Version stamp for cached results: DATA_VERSION if set, otherwise the latest
+    Glue table update time, refreshed with the schema catalog.
+    """
+    if DATA_VERSION:
+        return DATA_VERSION
+    try:
+        return get_schema_catalog().version
+    except Exception as e:
+        print(f"Error getting table update times: {e}")
+        return ''
+
+
+def get_schema_cached(question):
+    """get_schema through the question cache, with the query that last returned rows for the question"""
+    key = normalize_question(question)
+    version = get_data_version()
+    cached = query_cache.get(QUESTION_LEVEL, key, version)
+    if cached is None or 'schema' not in cached:
+        cached = {**(cached or {}), 'schema': get_schema()}
+        query_cache.put(QUESTION_LEVEL, key, cached, version)
+    else:
+        print("Question cache hit, skipping schema query")
+    if cached.get('query'):
+        return (f"{cached['schema']}\n\nThe last SQL query that returned rows for the same question "
+                f"was the one below. It may have been an intermediate step, so check that it answers "
+                f"the question before running it with /queryathena:\n{cached['query']}")
+    return cached['schema']
+
+
+def remember_query(question, query, result):
+    """
+    Record the query as the latest candidate answer to a question if it
+    returned rows; queries that return nothing are not worth suggesting again
+    """
+    if not (result.get('results') or result.get('rows')):
+        return
+    key = normalize_question(question)
+    version = get_data_version()
+    cached = query_cache.get(QUESTION_LEVEL, key, version, count=False) or {}
+    if cached.get('query') != query:
+        query_cache.put(QUESTION_LEVEL, key, {**cached, 'query': query}, version)
+
+
+def query_athena_cached(query):
+    """query_athena through the result cache; results too large to return inline are not cached"""
+    normalized = normalize_query(query)
+    version = get_data_version()
+    result = query_cache.get(RESULT_LEVEL, normalized, version)
+    if result is not None:
+        print("Result cache hit, skipping Athena")
+        return result
+    result = query_athena(query)
+    if len(json.dumps(result, default=str).encode('utf-8')) <= INLINE_RESULT_BYTES:
+        query_cache.put(RESULT_LEVEL, normalized, result, version)
+    return result
+
+
 def lambda_handler(event, context):
     result = None
     error_message = None
 
+    if 'invalidateCache' in event:
+        # Direct invocation, e.g. {"invalidateCache": "result"} after loading new data
+        level = event['invalidateCache']
+        query_cache.invalidate(None if level in (None, 'all') else level)
+        invalidate_schema_catalog()
+        return {'invalidated': level or 'all'}
+
     try:
         if event['apiPath'] == "/getschema":
-            result = get_schema()
+            if event.get('inputText'):
+                result = get_schema_cached(event['inputText'])
+            else:
+                result = get_schema()
         
         elif event['apiPath'] == "/queryathena":
             params =event['parameters']
@@ -194,8 +694,10 @@ def lambda_handler(event, context):
                     query = param.get("value")
                     print(query)
                 
-            result = query_athena(query)
+            result = query_athena_cached(query)
             print("end of query ")
+            if event.get('inputText'):
+                remember_query(event['inputText'], query, result)
 
         else:
             raise ValueError(f"Unknown apiPath: {event['apiPath']}")
@@ -207,12 +709,13 @@ def lambda_handler(event, context):
         error_message = str(e)
         print(f"Error occurred: {error_message}")
 
+    query_cache.emit_metrics()
     BUCKET_NAME = os.environ['BUCKET_NAME']
     KEY = str(uuid.uuid4()) + '.json'
-    size = sys.getsizeof(str(result)) if result else 0
+    size = len(json.dumps(result, default=str).encode('utf-8')) if result else 0
     print(f"Response size: {size} bytes")
     
-    if size > 20000:
+    if size > INLINE_RESULT_BYTES:
         print('Size greater than 20KB, writing to a file in S3')
         result = upload_result_s3(result, BUCKET_NAME, KEY)
         response_body = {
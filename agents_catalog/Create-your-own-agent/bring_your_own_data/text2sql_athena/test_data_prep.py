@@ -0,0 +1,62 @@
+"""
+Tests for the SQLite to Parquet conversion in data_prep.py
+
+    python -m pytest test_data_prep.py
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import data_prep
+
+
+class TestConvertTable(unittest.TestCase):
+    """Test cases for convert_table"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.sqlite_file = os.path.join(self.tmp_dir.name, "test.sqlite")
+        self.parquet_path = os.path.join(self.tmp_dir.name, "t.parquet")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def convert(self, rows, chunk_rows=2):
+        conn = sqlite3.connect(self.sqlite_file)
+        conn.execute('CREATE TABLE t ("id" INTEGER, "mixed" TEXT, "score" REAL)')
+        conn.executemany("INSERT INTO t VALUES (?, ?, ?)", rows)
+        conn.commit()
+        conn.close()
+        columns, count = data_prep.convert_table(
+            self.sqlite_file, "t", self.parquet_path, chunk_rows=chunk_rows, row_group_rows=3
+        )
+        return columns, count, pq.read_table(self.parquet_path)
+
+    def test_large_integers_with_nulls(self):
+        """Test that integers above 2^53 in a column with NULLs are written exactly"""
+        big = 2 ** 53 + 1
+        columns, count, table = self.convert([(big, "a", 1.5), (None, "b", None), (-big, "c", 2)])
+        self.assertEqual(columns, [("id", "bigint"), ("mixed", "string"), ("score", "double")])
+        self.assertEqual(count, 3)
+        self.assertEqual(table.schema.field("id").type, pa.int64())
+        self.assertEqual(table.column("id").to_pylist(), [big, None, -big])
+        self.assertEqual(table.column("score").to_pylist(), [1.5, None, 2.0])
+
+    def test_mixed_column(self):
+        """Test that numbers in a text column are written as stored, whatever their chunk holds"""
+        rows = [(1, 5, 0.0), (2, None, 0.0), (3, 5, 0.0), (4, 5.5, 0.0), (5, "text", 0.0)]
+        _, count, table = self.convert(rows)
+        self.assertEqual(count, 5)
+        self.assertEqual(table.column("mixed").to_pylist(), ["5", None, "5", "5.5", "text"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+"""
+ncbi-client: Rate-limited NCBI E-utilities client shared by the PubMed tools
+"""
+
+from .adapters import fetch_articles, iter_articles, search_articles, search_summaries
+from .cache import MemoryCache, ResponseCache, SQLiteCache, cache_key
+from .client import (
+    AsyncEutilsClient,
+    EutilsClient,
+    SearchResult,
+    get_client,
+    set_client,
+)
+from .ratelimit import TokenBucket, get_rate_limiter, requests_per_second
+
+__all__ = [
+    "EutilsClient",
+    "AsyncEutilsClient",
+    "SearchResult",
+    "get_client",
+    "set_client",
+    "TokenBucket",
+    "get_rate_limiter",
+    "requests_per_second",
+    "ResponseCache",
+    "MemoryCache",
+    "SQLiteCache",
+    "cache_key",
+    "iter_articles",
+    "fetch_articles",
+    "search_articles",
+    "search_summaries",
+]
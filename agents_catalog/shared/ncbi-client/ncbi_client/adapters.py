@@ -0,0 +1,155 @@
+"""
+Ready-made PubMed lookups that existing tools wrap
+"""
+
+import io
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+from xml.etree.ElementTree import Element
+
+from defusedxml import ElementTree as ET
+
+from .client import EutilsClient, get_client
+
+PUBMED_URL = "https://pubmed.ncbi.nlm.nih.gov"
+
+# Stands in for a missing MedlineCitation or Article so lookups find nothing
+_EMPTY = Element("empty")
+
+
+def _text(element: Any) -> Optional[str]:
+    """All text inside an element, including inline markup such as <i>."""
+    if element is None:
+        return None
+    text = "".join(element.itertext()).strip()
+    return text or None
+
+
+def _year(citation: Any) -> Optional[str]:
+    for path in (
+        "Article/Journal/JournalIssue/PubDate/Year",
+        "DateCompleted/Year",
+    ):
+        year = _text(citation.find(path))
+        if year:
+            return year
+    # Some PubDates only have a free-text MedlineDate such as "1998 Dec-1999 Jan"
+    medline_date = _text(citation.find("Article/Journal/JournalIssue/PubDate/MedlineDate"))
+    return medline_date[:4] if medline_date else None
+
+
+def _parse_article(article: Any) -> Dict[str, Any]:
+    # Direct child paths only: a descendant search (.//) would also scan the
+    # reference list under PubmedData, which can hold hundreds of citations
+    citation = article.find("MedlineCitation")
+    if citation is None:
+        citation = _EMPTY
+    journal_article = citation.find("Article")
+    if journal_article is None:
+        journal_article = _EMPTY
+
+    pmid = _text(citation.find("PMID")) or ""
+    sections = []
+    for abstract_text in journal_article.iterfind("Abstract/AbstractText"):
+        text = _text(abstract_text)
+        if not text:
+            continue
+        label = abstract_text.get("Label")
+        sections.append(f"{label}: {text}" if label else text)
+
+    authors = []
+    for author in journal_article.iterfind("AuthorList/Author"):
+        names = (_text(author.find("ForeName")), _text(author.find("LastName")))
+        name = " ".join(filter(None, names)) or _text(author.find("CollectiveName"))
+        if name:
+            authors.append(name)
+
+    return {
+        "pmid": pmid,
+        "title": _text(journal_article.find("ArticleTitle")),
+        "abstract": "\n".join(sections) or None,
+        "authors": authors,
+        "journal": _text(journal_article.find("Journal/Title")),
+        "year": _year(citation),
+        "doi": _text(article.find("PubmedData/ArticleIdList/ArticleId[@IdType='doi']")),
+        "url": f"{PUBMED_URL}/{pmid}/",
+    }
+
+
+def iter_articles(xml: bytes) -> Iterator[Dict[str, Any]]:
+    """
+    Incrementally parse a PubMed efetch XML response.
+
+    Each PubmedArticle is discarded once parsed, so memory stays bounded by
+    one article. Missing fields are None (authors is an empty list).
+
+    Yields:
+        Dictionaries with pmid, title, abstract, authors, journal, year, doi and url
+    """
+    for _, element in ET.iterparse(io.BytesIO(xml), events=("end",)):
+        if element.tag == "PubmedArticle":
+            yield _parse_article(element)
+            element.clear()
+
+
+def fetch_articles(
+    pmids: Sequence[str], client: Optional[EutilsClient] = None
+) -> List[Dict[str, Any]]:
+    """
+    Fetch and parse PubMed articles in batches.
+
+    Returns:
+        Article dictionaries (see iter_articles) in the order of pmids;
+        PMIDs that efetch did not return are skipped
+    """
+    client = client or get_client()
+    by_pmid = {}
+    for body in client.efetch(pmids, retmode="xml"):
+        for article in iter_articles(body):
+            by_pmid[article["pmid"]] = article
+    return [by_pmid[pmid] for pmid in pmids if pmid in by_pmid]
+
+
+def search_articles(
+    term: str,
+    retmax: int = 20,
+    sort: Optional[str] = "relevance",
+    client: Optional[EutilsClient] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Search PubMed and fetch the matching articles.
+
+    Args:
+        term: PubMed query
+        retmax: Maximum number of articles
+        sort: esearch sort order
+        client: Client to use; defaults to the process-wide client
+
+    Returns:
+        Article dictionaries (see iter_articles) in search order
+    """
+    client = client or get_client()
+    result = client.esearch(term, retmax=retmax, sort=sort)
+    return fetch_articles(result.ids, client) if result.ids else []
+
+
+def search_summaries(
+    term: str,
+    retmax: int = 20,
+    sort: Optional[str] = None,
+    client: Optional[EutilsClient] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Search PubMed and fetch esummary document summaries.
+
+    Summaries are much smaller than full records, which suits tools that only
+    list titles, authors and dates.
+
+    Returns:
+        esummary dictionaries in search order
+    """
+    client = client or get_client()
+    result = client.esearch(term, retmax=retmax, sort=sort)
+    if not result.ids:
+        return []
+    summaries = client.esummary(result.ids)
+    return [summaries[pmid] for pmid in result.ids if pmid in summaries]
@@ -0,0 +1,200 @@
+"""
+Pluggable response caches for E-utilities requests
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Parameters that identify the caller rather than the request
+_IDENTITY_PARAMS = ("api_key", "tool", "email")
+
+
+def cache_key(endpoint: str, params: Dict[str, Any]) -> str:
+    """
+    Key for an E-utilities request.
+
+    Parameters are sorted, list values joined, and caller identity (API key,
+    tool and email) left out, so the same request from differently
+    configured clients shares an entry.
+    """
+    parts = [endpoint]
+    for name in sorted(params):
+        if name in _IDENTITY_PARAMS:
+            continue
+        value = params[name]
+        if isinstance(value, (list, tuple)):
+            value = ",".join(str(v) for v in value)
+        parts.append(f"{name}={value}")
+    return hashlib.sha256("&".join(parts).encode("utf-8")).hexdigest()
+
+
+class ResponseCache(ABC):
+    """
+    Interface for response caches.
+
+    Subclasses store raw response bodies under keys from cache_key(). Both
+    methods must be thread-safe; errors should be logged, not raised, so a
+    broken cache only costs a request.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached body for key, or None."""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes) -> None:
+        """Store a response body under key."""
+
+
+class MemoryCache(ResponseCache):
+    """
+    In-process LRU cache bounded by total size, with a time-to-live.
+
+    Entries survive across warm Lambda invocations but not cold starts.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 32 * 1024 * 1024,
+        ttl_seconds: Optional[float] = 600.0,
+    ):
+        """
+        Initialize the memory cache.
+
+        Args:
+            max_bytes: Maximum total size of cached bodies
+            ttl_seconds: Seconds before an entry expires (None never expires)
+        """
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[0]):
+                self._pop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            self._entries[key] = (time.monotonic(), value)
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expired(self, created_at: float) -> bool:
+        return (
+            self.ttl_seconds is not None
+            and time.monotonic() - created_at > self.ttl_seconds
+        )
+
+    def _pop(self, key: str) -> None:
+        _, value = self._entries.pop(key)
+        self._size -= len(value)
+
+
+class SQLiteCache(ResponseCache):
+    """
+    Response cache in a SQLite file.
+
+    On AWS Lambda a file under /tmp is shared by warm invocations and by
+    every process on the same execution environment.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: Optional[float] = 24 * 3600,
+        max_entries: int = 10_000,
+    ):
+        """
+        Initialize the SQLite cache.
+
+        Args:
+            path: Path to the SQLite file, created if missing
+            ttl_seconds: Seconds before an entry expires (None never expires)
+            max_entries: Entries kept after pruning the oldest
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, created_at REAL NOT NULL, body BLOB NOT NULL)"
+        )
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT created_at, body FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Error reading cached E-utilities response: {e}")
+            return None
+        if row is None:
+            return None
+        created_at, body = row
+        if self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds:
+            return None
+        return bytes(body)
+
+    def set(self, key: str, value: bytes) -> None:
+        try:
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                    (key, time.time(), sqlite3.Binary(value)),
+                )
+                self._writes += 1
+                # Prune occasionally rather than on every write
+                if self._writes % 100 == 0:
+                    self._db.execute(
+                        "DELETE FROM responses WHERE key NOT IN ("
+                        "SELECT key FROM responses ORDER BY created_at DESC LIMIT ?)",
+                        (self.max_entries,),
+                    )
+                self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Error caching E-utilities response: {e}")
+
+    def close(self) -> None:
+        """Close the SQLite connection."""
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,625 @@
+"""
+Pooled sync and async clients for NCBI E-utilities
+"""
+
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence
+
+import httpx
+
+from .cache import MemoryCache, ResponseCache, cache_key
+from .ratelimit import TokenBucket, api_key, get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+EUTILS_BASE_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
+DEFAULT_TIMEOUT = httpx.Timeout(30.0, connect=10.0)
+MAX_CONNECTIONS = 5
+
+# IDs per request; NCBI asks for POST above ~200 IDs, which every request uses
+EFETCH_BATCH_SIZE = 200
+ESUMMARY_BATCH_SIZE = 200
+ELINK_BATCH_SIZE = 100
+
+# Retry settings for rate-limited (429) and transient server (5xx) responses
+MAX_RETRIES = 4
+BASE_BACKOFF = 0.5
+MAX_BACKOFF = 8.0
+
+
+@dataclass
+class SearchResult:
+    """IDs and history server location returned by esearch"""
+
+    count: int
+    ids: List[str] = field(default_factory=list)
+    webenv: Optional[str] = None
+    query_key: Optional[str] = None
+
+
+def batched(ids: Sequence[str], size: int) -> List[List[str]]:
+    """Split ids into consecutive batches of at most size."""
+    return [list(ids[i : i + size]) for i in range(0, len(ids), size)]
+
+
+class _EutilsClientBase:
+    """Request building, caching and response parsing shared by both clients"""
+
+    def __init__(
+        self,
+        base_url: str,
+        cache: Optional[ResponseCache],
+        rate_limiter: Optional[TokenBucket],
+        max_retries: int,
+        tool: Optional[str],
+        email: Optional[str],
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.cache = cache
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.max_retries = max_retries
+        self.tool = tool
+        self.email = email
+
+    def _url(self, endpoint: str) -> str:
+        return f"{self.base_url}/{endpoint}.fcgi"
+
+    def _prepare(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Add the API key and caller identity to request parameters."""
+        data = dict(params)
+        key = api_key()
+        if key:
+            data["api_key"] = key
+        if self.tool:
+            data["tool"] = self.tool
+        if self.email:
+            data["email"] = self.email
+        return data
+
+    def _cache_key(self, endpoint: str, params: Dict[str, Any]) -> Optional[str]:
+        """Cache key for a request, or None if it should not be cached."""
+        if self.cache is None:
+            return None
+        # History server sessions expire, so their results are not reusable
+        if params.get("usehistory") == "y" or "WebEnv" in params or "webenv" in params:
+            return None
+        return cache_key(endpoint, params)
+
+    @staticmethod
+    def _retryable(status_code: int) -> bool:
+        return status_code == 429 or status_code >= 500
+
+    @staticmethod
+    def _retry_delay(response: httpx.Response, attempt: int) -> float:
+        """Seconds to wait before retrying, from Retry-After or exponential backoff."""
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), MAX_BACKOFF)
+        backoff = min(BASE_BACKOFF * 2**attempt, MAX_BACKOFF)
+        return backoff / 2 + random.uniform(0, backoff / 2)
+
+    @staticmethod
+    def _esearch_params(
+        term: str,
+        db: str,
+        retmax: int,
+        retstart: int,
+        sort: Optional[str],
+        usehistory: bool,
+        params: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        search_params = {
+            "db": db,
+            "term": term,
+            "retmax": retmax,
+            "retstart": retstart,
+            "retmode": "json",
+            **params,
+        }
+        if sort:
+            search_params["sort"] = sort
+        if usehistory:
+            search_params["usehistory"] = "y"
+        return search_params
+
+    @staticmethod
+    def _parse_search(body: bytes) -> SearchResult:
+        result = json.loads(body).get("esearchresult", {})
+        if "ERROR" in result:
+            logger.warning(f"esearch returned an error: {result['ERROR']}")
+        return SearchResult(
+            count=int(result.get("count", 0)),
+            ids=list(result.get("idlist", [])),
+            webenv=result.get("webenv"),
+            query_key=result.get("querykey"),
+        )
+
+    @staticmethod
+    def _parse_summaries(body: bytes) -> Dict[str, dict]:
+        result = json.loads(body).get("result", {})
+        return {uid: result[uid] for uid in result.get("uids", []) if uid in result}
+
+    @staticmethod
+    def _elink_params(
+        ids: List[str],
+        dbfrom: str,
+        db: str,
+        linkname: Optional[str],
+        params: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        # One id parameter per ID keeps the links for each ID in its own linkset
+        link_params = {"dbfrom": dbfrom, "db": db, "id": ids, "retmode": "json", **params}
+        if linkname:
+            link_params["linkname"] = linkname
+        return link_params
+
+    @staticmethod
+    def _parse_links(
+        body: bytes, ids: List[str], linkname: Optional[str]
+    ) -> Dict[str, List[str]]:
+        links: Dict[str, List[str]] = {uid: [] for uid in ids}
+        for linkset in json.loads(body).get("linksets", []):
+            for uid in linkset.get("ids", []):
+                uid = str(uid)
+                for linksetdb in linkset.get("linksetdbs", []):
+                    if linkname is None or linksetdb.get("linkname") == linkname:
+                        links.setdefault(uid, []).extend(
+                            str(link) for link in linksetdb.get("links", [])
+                        )
+        return links
+
+
+class EutilsClient(_EutilsClientBase):
+    """
+    Thread-safe E-utilities client over a pooled keep-alive HTTP connection.
+
+    Every request waits on the process-wide token bucket, so any number of
+    clients and threads in one process stay within NCBI's rate limit
+    together. Rate-limited and transient server errors are retried with
+    exponential backoff and jitter, honouring Retry-After.
+    """
+
+    def __init__(
+        self,
+        base_url: str = EUTILS_BASE_URL,
+        cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        max_retries: int = MAX_RETRIES,
+        max_connections: int = MAX_CONNECTIONS,
+        timeout: httpx.Timeout = DEFAULT_TIMEOUT,
+        tool: Optional[str] = None,
+        email: Optional[str] = None,
+        transport: Optional[httpx.BaseTransport] = None,
+    ):
+        """
+        Initialize the client.
+
+        Args:
+            base_url: E-utilities base URL
+            cache: Optional response cache; history server requests are never cached
+            rate_limiter: Token bucket to share; defaults to the process-wide one
+            max_retries: Retries for rate-limited and transient server errors
+            max_connections: Size of the keep-alive connection pool
+            timeout: Request timeout
+            tool: Optional tool name sent to NCBI
+            email: Optional contact email sent to NCBI
+            transport: Optional httpx transport, e.g. for tests
+        """
+        super().__init__(base_url, cache, rate_limiter, max_retries, tool, email)
+        self._http = httpx.Client(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            transport=transport,
+        )
+
+    def request(self, endpoint: str, params: Dict[str, Any]) -> bytes:
+        """
+        POST to an E-utilities endpoint and return the response body.
+
+        Args:
+            endpoint: Endpoint name, e.g. "esearch"
+            params: Request parameters (the API key is added if configured)
+
+        Returns:
+            The body of the successful response
+
+        Raises:
+            httpx.HTTPStatusError: If the final response is an error status
+            httpx.RequestError: If the request could not be sent
+        """
+        key = self._cache_key(endpoint, params)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        data = self._prepare(params)
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            response = self._http.post(self._url(endpoint), data=data)
+            if not self._retryable(response.status_code) or attempt == self.max_retries:
+                break
+            delay = self._retry_delay(response, attempt)
+            logger.warning(
+                f"E-utilities returned {response.status_code}, retrying in {delay:.1f}s"
+            )
+            time.sleep(delay)
+        response.raise_for_status()
+
+        if key is not None:
+            self.cache.set(key, response.content)
+        return response.content
+
+    def esearch(
+        self,
+        term: str,
+        db: str = "pubmed",
+        retmax: int = 20,
+        retstart: int = 0,
+        sort: Optional[str] = None,
+        usehistory: bool = False,
+        **params: Any,
+    ) -> SearchResult:
+        """
+        Search a database.
+
+        Args:
+            term: Entrez query
+            db: Database to search
+            retmax: Maximum number of IDs to return
+            retstart: Index of the first ID to return
+            sort: Optional sort order, e.g. "relevance" or "pub_date"
+            usehistory: Keep the results on the history server
+            **params: Further esearch parameters
+
+        Returns:
+            The matching IDs, total count and, with usehistory, WebEnv and query_key
+        """
+        search_params = self._esearch_params(
+            term, db, retmax, retstart, sort, usehistory, params
+        )
+        return self._parse_search(self.request("esearch", search_params))
+
+    def efetch(
+        self,
+        ids: Sequence[str],
+        db: str = "pubmed",
+        batch_size: int = EFETCH_BATCH_SIZE,
+        max_workers: int = 1,
+        **params: Any,
+    ) -> Iterator[bytes]:
+        """
+        Fetch records by ID in batches.
+
+        Args:
+            ids: IDs to fetch
+            db: Database to fetch from
+            batch_size: IDs per efetch request
+            max_workers: Batches fetched concurrently
+            **params: Further efetch parameters, e.g. retmode="xml"
+
+        Yields:
+            One response body per batch, in the order of ids
+        """
+        batches = batched(ids, batch_size)
+        if max_workers <= 1 or len(batches) <= 1:
+            for batch in batches:
+                yield self.request("efetch", {"db": db, "id": ",".join(batch), **params})
+            return
+
+        executor = ThreadPoolExecutor(max_workers=min(max_workers, len(batches)))
+        try:
+            yield from executor.map(
+                lambda batch: self.request(
+                    "efetch", {"db": db, "id": ",".join(batch), **params}
+                ),
+                batches,
+            )
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def efetch_history(
+        self,
+        webenv: str,
+        query_key: str,
+        retstart: int = 0,
+        retmax: int = EFETCH_BATCH_SIZE,
+        db: str = "pubmed",
+        **params: Any,
+    ) -> bytes:
+        """
+        Fetch one window of a search kept on the history server.
+
+        Args:
+            webenv: WebEnv returned by esearch with usehistory
+            query_key: query_key returned by esearch with usehistory
+            retstart: Index of the first record
+            retmax: Number of records
+            db: Database to fetch from
+            **params: Further efetch parameters
+
+        Returns:
+            The response body
+        """
+        fetch_params = {
+            "db": db,
+            "WebEnv": webenv,
+            "query_key": query_key,
+            "retstart": retstart,
+            "retmax": retmax,
+            **params,
+        }
+        return self.request("efetch", fetch_params)
+
+    def esummary(
+        self,
+        ids: Sequence[str],
+        db: str = "pubmed",
+        batch_size: int = ESUMMARY_BATCH_SIZE,
+        **params: Any,
+    ) -> Dict[str, dict]:
+        """
+        Fetch document summaries by ID in batches.
+
+        Returns:
+            Summary dictionaries keyed by ID
+        """
+        summaries: Dict[str, dict] = {}
+        for batch in batched(ids, batch_size):
+            body = self.request(
+                "esummary",
+                {"db": db, "id": ",".join(batch), "retmode": "json", **params},
+            )
+            summaries.update(self._parse_summaries(body))
+        return summaries
+
+    def elink(
+        self,
+        ids: Sequence[str],
+        dbfrom: str = "pubmed",
+        db: str = "pubmed",
+        linkname: Optional[str] = None,
+        batch_size: int = ELINK_BATCH_SIZE,
+        **params: Any,
+    ) -> Dict[str, List[str]]:
+        """
+        Find linked records for each ID, in batches.
+
+        Args:
+            ids: IDs to link from
+            dbfrom: Database of ids
+            db: Database to link to
+            linkname: Optional link to follow, e.g. "pubmed_pubmed_citedin"
+            batch_size: IDs per elink request
+            **params: Further elink parameters
+
+        Returns:
+            Linked IDs for every requested ID (empty if it has none)
+        """
+        links: Dict[str, List[str]] = {}
+        for batch in batched(ids, batch_size):
+            body = self.request(
+                "elink", self._elink_params(batch, dbfrom, db, linkname, params)
+            )
+            links.update(self._parse_links(body, batch, linkname))
+        return links
+
+    def close(self) -> None:
+        """Close the connection pool."""
+        self._http.close()
+
+    def __enter__(self) -> "EutilsClient":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class AsyncEutilsClient(_EutilsClientBase):
+    """
+    asyncio counterpart of EutilsClient.
+
+    Shares the process-wide token bucket with every sync and async client.
+    Use one client per event loop, e.g. with ``async with``.
+    """
+
+    def __init__(
+        self,
+        base_url: str = EUTILS_BASE_URL,
+        cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        max_retries: int = MAX_RETRIES,
+        max_connections: int = MAX_CONNECTIONS,
+        timeout: httpx.Timeout = DEFAULT_TIMEOUT,
+        tool: Optional[str] = None,
+        email: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        """Initialize the client; arguments are as for EutilsClient."""
+        super().__init__(base_url, cache, rate_limiter, max_retries, tool, email)
+        self._http = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            transport=transport,
+        )
+
+    async def request(self, endpoint: str, params: Dict[str, Any]) -> bytes:
+        """POST to an E-utilities endpoint and return the response body."""
+        key = self._cache_key(endpoint, params)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        data = self._prepare(params)
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire_async()
+            response = await self._http.post(self._url(endpoint), data=data)
+            if not self._retryable(response.status_code) or attempt == self.max_retries:
+                break
+            delay = self._retry_delay(response, attempt)
+            logger.warning(
+                f"E-utilities returned {response.status_code}, retrying in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+        response.raise_for_status()
+
+        if key is not None:
+            self.cache.set(key, response.content)
+        return response.content
+
+    async def esearch(
+        self,
+        term: str,
+        db: str = "pubmed",
+        retmax: int = 20,
+        retstart: int = 0,
+        sort: Optional[str] = None,
+        usehistory: bool = False,
+        **params: Any,
+    ) -> SearchResult:
+        """Search a database; see EutilsClient.esearch."""
+        search_params = self._esearch_params(
+            term, db, retmax, retstart, sort, usehistory, params
+        )
+        return self._parse_search(await self.request("esearch", search_params))
+
+    async def efetch(
+        self,
+        ids: Sequence[str],
+        db: str = "pubmed",
+        batch_size: int = EFETCH_BATCH_SIZE,
+        max_workers: int = 1,
+        **params: Any,
+    ) -> AsyncIterator[bytes]:
+        """Fetch records by ID in batches; see EutilsClient.efetch."""
+        pending: deque = deque()
+        try:
+            for batch in batched(ids, batch_size):
+                pending.append(
+                    asyncio.ensure_future(
+                        self.request("efetch", {"db": db, "id": ",".join(batch), **params})
+                    )
+                )
+                if len(pending) >= max_workers:
+                    yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def efetch_history(
+        self,
+        webenv: str,
+        query_key: str,
+        retstart: int = 0,
+        retmax: int = EFETCH_BATCH_SIZE,
+        db: str = "pubmed",
+        **params: Any,
+    ) -> bytes:
+        """Fetch one window of a history server search; see EutilsClient.efetch_history."""
+        fetch_params = {
+            "db": db,
+            "WebEnv": webenv,
+            "query_key": query_key,
+            "retstart": retstart,
+            "retmax": retmax,
+            **params,
+        }
+        return await self.request("efetch", fetch_params)
+
+    async def esummary(
+        self,
+        ids: Sequence[str],
+        db: str = "pubmed",
+        batch_size: int = ESUMMARY_BATCH_SIZE,
+        **params: Any,
+    ) -> Dict[str, dict]:
+        """Fetch document summaries concurrently in batches; see EutilsClient.esummary."""
+        bodies = await asyncio.gather(
+            *(
+                self.request(
+                    "esummary",
+                    {"db": db, "id": ",".join(batch), "retmode": "json", **params},
+                )
+                for batch in batched(ids, batch_size)
+            )
+        )
+        summaries: Dict[str, dict] = {}
+        for body in bodies:
+            summaries.update(self._parse_summaries(body))
+        return summaries
+
+    async def elink(
+        self,
+        ids: Sequence[str],
+        dbfrom: str = "pubmed",
+        db: str = "pubmed",
+        linkname: Optional[str] = None,
+        batch_size: int = ELINK_BATCH_SIZE,
+        **params: Any,
+    ) -> Dict[str, List[str]]:
+        """Find linked records concurrently in batches; see EutilsClient.elink."""
+        batches = batched(ids, batch_size)
+        bodies = await asyncio.gather(
+            *(
+                self.request(
+                    "elink", self._elink_params(batch, dbfrom, db, linkname, params)
+                )
+                for batch in batches
+            )
+        )
+        links: Dict[str, List[str]] = {}
+        for batch, body in zip(batches, bodies):
+            links.update(self._parse_links(body, batch, linkname))
+        return links
+
+    async def aclose(self) -> None:
+        """Close the connection pool."""
+        await self._http.aclose()
+
+    async def __aenter__(self) -> "AsyncEutilsClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+
+_default_client: Optional[EutilsClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_client() -> EutilsClient:
+    """
+    The process-wide EutilsClient, created on first use.
+
+    It keeps its connection pool and a MemoryCache across warm Lambda
+    invocations. Replace it with set_client() to change its configuration.
+    """
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = EutilsClient(cache=MemoryCache())
+        return _default_client
+
+
+def set_client(client: EutilsClient) -> None:
+    """Replace the process-wide EutilsClient returned by get_client()."""
+    global _default_client
+    with _default_client_lock:
+        _default_client = client
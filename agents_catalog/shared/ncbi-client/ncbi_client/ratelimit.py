@@ -0,0 +1,77 @@
+"""
+Process-wide request budget for NCBI E-utilities
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Optional
+
+# NCBI allows 3 requests per second without an API key and 10 with one
+NCBI_RATE_LIMIT = 3.0
+NCBI_RATE_LIMIT_WITH_KEY = 10.0
+
+
+def api_key() -> Optional[str]:
+    """The NCBI API key from the NCBI_API_KEY environment variable, if set."""
+    key = os.getenv("NCBI_API_KEY")
+    return key.strip() if key and key.strip() else None
+
+
+def requests_per_second() -> float:
+    """NCBI request budget for this process, depending on whether an API key is set."""
+    return NCBI_RATE_LIMIT_WITH_KEY if api_key() else NCBI_RATE_LIMIT
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket that paces sync and async requests alike.
+
+    Without a fixed rate the refill rate is read on each acquire, so setting
+    NCBI_API_KEY in a warm container raises the budget without a restart.
+    """
+
+    def __init__(self, rate: Optional[float] = None):
+        """
+        Initialize the token bucket.
+
+        Args:
+            rate: Requests per second. None follows requests_per_second()
+        """
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._tokens = 1.0
+        self._updated = time.monotonic()
+
+    def _reserve(self) -> float:
+        """Take a token, possibly going negative, and return the seconds to wait."""
+        rate = self.rate or requests_per_second()
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(rate, self._tokens + (now - self._updated) * rate)
+            self._updated = now
+            # The debt is slept off outside the lock so other callers queue
+            # up behind us instead of all waking at once
+            self._tokens -= 1.0
+            return -self._tokens / rate if self._tokens < 0 else 0.0
+
+    def acquire(self) -> None:
+        """Block until a request may be sent."""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        """Wait, without blocking the event loop, until a request may be sent."""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+_rate_limiter = TokenBucket()
+
+
+def get_rate_limiter() -> TokenBucket:
+    """The token bucket shared by every client in this process."""
+    return _rate_limiter
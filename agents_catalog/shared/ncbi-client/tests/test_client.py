@@ -0,0 +1,247 @@
+"""
+Tests for the E-utilities clients, rate limiter and caches
+"""
+
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from urllib.parse import parse_qs
+
+import httpx
+
+from ncbi_client import (
+    AsyncEutilsClient,
+    EutilsClient,
+    MemoryCache,
+    SQLiteCache,
+    TokenBucket,
+    cache_key,
+    iter_articles,
+    requests_per_second,
+    search_articles,
+)
+
+
+def article_xml(pmid):
+    return (
+        f"<PubmedArticle><MedlineCitation><PMID>{pmid}</PMID><Article>"
+        "<Journal><Title>Journal</Title><JournalIssue><PubDate><Year>2024</Year>"
+        f"</PubDate></JournalIssue></Journal><ArticleTitle>Article <i>{pmid}</i>"
+        "</ArticleTitle><Abstract><AbstractText Label='RESULTS'>Text</AbstractText>"
+        "</Abstract><AuthorList><Author><LastName>Smith</LastName>"
+        "<ForeName>Ann</ForeName></Author></AuthorList></Article></MedlineCitation>"
+        "</PubmedArticle>"
+    )
+
+
+class FakeEutils:
+    """MockTransport handler that records requests and answers like E-utilities"""
+
+    def __init__(self, ids, fail_first=0):
+        self.ids = ids
+        self.fail_first = fail_first
+        self.requests = []
+
+    def __call__(self, request):
+        params = parse_qs(request.content.decode())
+        endpoint = request.url.path.rsplit("/", 1)[-1].split(".")[0]
+        self.requests.append((endpoint, params))
+        if self.fail_first:
+            self.fail_first -= 1
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        if endpoint == "esearch":
+            retmax = int(params["retmax"][0])
+            body = {"esearchresult": {"count": str(len(self.ids)), "idlist": self.ids[:retmax]}}
+            return httpx.Response(200, json=body)
+        if endpoint == "elink":
+            linksets = [
+                {"ids": [uid], "linksetdbs": [{"linkname": "pubmed_pubmed_citedin", "links": [f"9{uid}"]}]}
+                for uid in params["id"]
+            ]
+            return httpx.Response(200, json={"linksets": linksets})
+        ids = params["id"][0].split(",")
+        # Return articles out of order, as efetch may
+        xml = "".join(article_xml(pmid) for pmid in reversed(ids))
+        return httpx.Response(200, content=f"<PubmedArticleSet>{xml}</PubmedArticleSet>".encode())
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Test cases for the token bucket"""
+
+    def test_api_key_raises_budget(self):
+        """Test that NCBI_API_KEY selects the higher rate"""
+        with patch.dict(os.environ, {"NCBI_API_KEY": ""}):
+            self.assertEqual(requests_per_second(), 3.0)
+        with patch.dict(os.environ, {"NCBI_API_KEY": "key"}):
+            self.assertEqual(requests_per_second(), 10.0)
+
+    def test_requests_are_paced(self):
+        """Test that requests beyond the first wait for the refill rate"""
+        bucket = TokenBucket(rate=4.0)
+        with patch("ncbi_client.ratelimit.time.sleep") as sleep:
+            for _ in range(3):
+                bucket.acquire()
+        waits = [call.args[0] for call in sleep.call_args_list]
+        self.assertEqual(len(waits), 2)
+        self.assertAlmostEqual(waits[0], 0.25, places=2)
+        self.assertAlmostEqual(waits[1], 0.5, places=2)
+
+
+class TestCaches(unittest.TestCase):
+    """Test cases for the response caches"""
+
+    def test_cache_key_ignores_identity(self):
+        """Test that the API key, tool and email do not change the key"""
+        self.assertEqual(
+            cache_key("efetch", {"id": "1,2", "db": "pubmed"}),
+            cache_key("efetch", {"db": "pubmed", "id": ["1", "2"], "api_key": "k"}),
+        )
+        self.assertNotEqual(cache_key("efetch", {"id": "1"}), cache_key("efetch", {"id": "2"}))
+
+    def test_memory_cache_size_bound(self):
+        """Test that the least recently used entries are evicted by size"""
+        cache = MemoryCache(max_bytes=10)
+        cache.set("a", b"1234")
+        cache.set("b", b"1234")
+        cache.get("a")
+        cache.set("c", b"1234")
+        self.assertEqual(cache.get("a"), b"1234")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(len(cache), 2)
+
+    def test_memory_cache_ttl(self):
+        """Test that expired entries are not returned"""
+        cache = MemoryCache(ttl_seconds=0)
+        cache.set("a", b"1")
+        with patch("ncbi_client.cache.time.monotonic", return_value=1e12):
+            self.assertIsNone(cache.get("a"))
+
+    def test_sqlite_cache(self):
+        """Test that the SQLite cache persists across instances"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "eutils.sqlite")
+            cache = SQLiteCache(path)
+            cache.set("a", b"body")
+            cache.close()
+            cache = SQLiteCache(path)
+            self.assertEqual(cache.get("a"), b"body")
+            self.assertIsNone(cache.get("b"))
+            cache.close()
+
+
+class TestEutilsClient(unittest.TestCase):
+    """Test cases for the sync client"""
+
+    def setUp(self):
+        self.ids = [str(30_000_000 + i) for i in range(25)]
+        self.server = FakeEutils(self.ids)
+        self.client = EutilsClient(
+            rate_limiter=TokenBucket(rate=1e6),
+            transport=httpx.MockTransport(self.server),
+        )
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_esearch(self):
+        """Test that esearch returns IDs and the total count"""
+        result = self.client.esearch("cancer", retmax=10, sort="relevance")
+        self.assertEqual(result.ids, self.ids[:10])
+        self.assertEqual(result.count, 25)
+        self.assertEqual(self.server.requests[0][1]["sort"], ["relevance"])
+
+    def test_efetch_batches_in_order(self):
+        """Test that efetch splits IDs into batches and yields them in order"""
+        bodies = list(self.client.efetch(self.ids, batch_size=10, max_workers=3, retmode="xml"))
+        self.assertEqual(len(bodies), 3)
+        self.assertIn(f"<PMID>{self.ids[0]}</PMID>".encode(), bodies[0])
+        self.assertIn(f"<PMID>{self.ids[-1]}</PMID>".encode(), bodies[2])
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_elink(self):
+        """Test that elink maps every requested ID to its links"""
+        links = self.client.elink(self.ids[:3], linkname="pubmed_pubmed_citedin", batch_size=2)
+        self.assertEqual(links, {uid: [f"9{uid}"] for uid in self.ids[:3]})
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_retries_rate_limited_requests(self):
+        """Test that 429 responses are retried"""
+        self.server.fail_first = 2
+        with patch("ncbi_client.client.time.sleep"):
+            result = self.client.esearch("cancer")
+        self.assertEqual(len(result.ids), 20)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_gives_up_after_max_retries(self):
+        """Test that the last error response is raised"""
+        self.server.fail_first = 100
+        with patch("ncbi_client.client.time.sleep"):
+            with self.assertRaises(httpx.HTTPStatusError):
+                self.client.esearch("cancer")
+        self.assertEqual(len(self.server.requests), 5)
+
+    def test_api_key_sent(self):
+        """Test that NCBI_API_KEY is added to requests"""
+        with patch.dict(os.environ, {"NCBI_API_KEY": "secret"}):
+            self.client.esearch("cancer")
+        self.assertEqual(self.server.requests[0][1]["api_key"], ["secret"])
+
+    def test_cache(self):
+        """Test that cached responses are reused but history requests are not cached"""
+        self.client.cache = MemoryCache()
+        self.client.esearch("cancer")
+        self.client.esearch("cancer")
+        self.assertEqual(len(self.server.requests), 1)
+        self.client.esearch("cancer", usehistory=True)
+        self.client.esearch("cancer", usehistory=True)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_search_articles(self):
+        """Test that search_articles parses articles in search order"""
+        articles = search_articles("cancer", retmax=3, client=self.client)
+        self.assertEqual([a["pmid"] for a in articles], self.ids[:3])
+        self.assertEqual(articles[0]["title"], f"Article {self.ids[0]}")
+        self.assertEqual(articles[0]["abstract"], "RESULTS: Text")
+        self.assertEqual(articles[0]["authors"], ["Ann Smith"])
+        self.assertEqual(articles[0]["year"], "2024")
+
+    def test_reference_ids_are_ignored(self):
+        """Test that only the article's own ArticleIdList provides the DOI"""
+        xml = article_xml("1").replace(
+            "</MedlineCitation>",
+            "</MedlineCitation><PubmedData><ReferenceList><Reference><ArticleIdList>"
+            "<ArticleId IdType='doi'>10.1/ref</ArticleId></ArticleIdList></Reference>"
+            "</ReferenceList></PubmedData>",
+        )
+        (article,) = iter_articles(f"<PubmedArticleSet>{xml}</PubmedArticleSet>".encode())
+        self.assertIsNone(article["doi"])
+        self.assertEqual(article["journal"], "Journal")
+
+
+class TestAsyncEutilsClient(unittest.TestCase):
+    """Test cases for the async client"""
+
+    def test_efetch_and_elink(self):
+        """Test that async efetch yields batches in order and elink gathers batches"""
+        ids = [str(30_000_000 + i) for i in range(7)]
+        server = FakeEutils(ids)
+
+        async def run():
+            async with AsyncEutilsClient(
+                rate_limiter=TokenBucket(rate=1e6),
+                transport=httpx.MockTransport(server),
+            ) as client:
+                bodies = [body async for body in client.efetch(ids, batch_size=3, max_workers=2)]
+                links = await client.elink(ids, batch_size=4)
+            return bodies, links
+
+        bodies, links = asyncio.run(run())
+        self.assertEqual(len(bodies), 3)
+        self.assertIn(f"<PMID>{ids[6]}</PMID>".encode(), bodies[2])
+        self.assertEqual(set(links), set(ids))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,7 @@
-import json
 import logging
-import time
-import urllib.error
-import urllib.parse
-import urllib.request
-from typing import Any, Dict, Iterator, List
+from typing import Any, Iterator, List, Optional
 import xmltodict
+from ncbi_client import EutilsClient, get_client
 
 
 logger = logging.getLogger(__name__)
@@ -13,22 +9,22 @@ logger = logging.getLogger(__name__)
 class PubMed():
     """
     Calls pubmed API to fetch biomedical literature.
-    
+
     """
-    base_url_esearch: str = (
-        "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi?"
-    )
-    base_url_efetch: str = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi?"
-    max_retry: int = 5
-    sleep_time: float = 0.2
-    
+    # E-utilities client; None uses the process-wide ncbi_client, which
+    # shares NCBI's rate limit with every other PubMed tool in the process
+    # and retries rate-limited requests
+    client: Optional[EutilsClient] = None
+
     top_k_results: int = 5
+    # Number of UIDs fetched per efetch request
+    efetch_batch_size: int = 200
     MAX_QUERY_LENGTH: int = 300
     doc_content_chars_max: int = 10000
     email: str = "email@example.com"
 
 
-    
+
     def run(self, query: str) -> str:
         """
         Run PubMed search and get the article meta information.
@@ -51,26 +47,20 @@ class PubMed():
             )
         except Exception as ex:
             return f"PubMed exception: {ex}"
-            
+
     def lazy_load(self, query: str) -> Iterator[dict]:
         """
         Search PubMed for documents matching the query.
         Return an iterator of dictionaries containing the document metadata.
-        """
 
-        url = (
-            self.base_url_esearch
-            + "db=pubmed&term="
-            + str({urllib.parse.quote(query)})
-            + f"&retmode=json&retmax={self.top_k_results}&usehistory=y"
-        )
-        result = urllib.request.urlopen(url)
-        text = result.read().decode("utf-8")
-        json_text = json.loads(text)
-
-        webenv = json_text["esearchresult"]["webenv"]
-        for uid in json_text["esearchresult"]["idlist"]:
-            yield self.retrieve_article(uid, webenv)
+        UIDs are fetched in batches of efetch_batch_size per efetch request,
+        and each batch is yielded, in search order, as soon as it is parsed.
+        """
+        client = self.client or get_client()
+        uids = client.esearch(query, retmax=self.top_k_results).ids
+        batches = client.efetch(uids, batch_size=self.efetch_batch_size, retmode="xml")
+        for start, body in zip(range(0, len(uids), self.efetch_batch_size), batches):
+            yield from self._parse_batch(uids[start : start + self.efetch_batch_size], body)
 
     def load(self, query: str) -> List[dict]:
         """
@@ -81,37 +71,56 @@ class PubMed():
         # return list(self.lazy_load(query))
         return data
 
-    def retrieve_article(self, uid: str, webenv: str) -> dict:
-        url = (
-            self.base_url_efetch
-            + "db=pubmed&retmode=xml&id="
-            + uid
-            + "&webenv="
-            + webenv
-        )
+    def retrieve_article(self, uid: str, webenv: Optional[str] = None) -> dict:
+        articles = self.retrieve_articles([uid], webenv)
+        if not articles:
+            raise ValueError(f"No PubMed article found for UID {uid}")
+        return articles[0]
+
+    def retrieve_articles(self, uids: List[str], webenv: Optional[str] = None) -> List[dict]:
+        """
+        Fetch several articles with one efetch request.
+
+        Articles are returned in the order of uids; UIDs that efetch did not
+        return are skipped.
+        """
+        params = {"db": "pubmed", "retmode": "xml", "id": ",".join(uids)}
+        if webenv:
+            params["WebEnv"] = webenv
+        body = (self.client or get_client()).request("efetch", params)
+        return self._parse_batch(uids, body)
+
+    def _parse_batch(self, uids: List[str], body: bytes) -> List[dict]:
+        """
+        Parse one efetch response, in the order of uids.
+
+        The response is stream-parsed one PubmedArticle (or PubmedBookArticle)
+        at a time, so the whole batch is never held as a single document tree.
+        """
+        by_uid = {}
+
+        def handle(path, item):
+            article = self._parse_item(path[-1][0], item)
+            if article is not None:
+                by_uid[article["uid"]] = article
+            return True
+
+        xmltodict.parse(body, item_depth=2, item_callback=handle)
+        return [by_uid[uid] for uid in uids if uid in by_uid]
 
-        retry = 0
-        while True:
-            try:
-                result = urllib.request.urlopen(url)
-                break
-            except urllib.error.HTTPError as e:
-                if e.code == 429 and retry < self.max_retry:
-                    # Too Many Requests errors
-                    # wait for an exponentially increasing amount of time
-                    logger.warning( 
-                        f"Too Many Requests, "
-                        f"waiting for {self.sleep_time:.2f} seconds..."
-                    )
-                    time.sleep(self.sleep_time)
-                    self.sleep_time *= 2
-                    retry += 1
-                else:
-                    raise e
-
-        xml_text = result.read().decode("utf-8")
-        text_dict = xmltodict.parse(xml_text)
-        return self._parse_article(uid, text_dict)
+    def _parse_item(self, tag: str, item: Any) -> Optional[dict]:
+        """Parse a PubmedArticle or PubmedBookArticle element from a streamed efetch response."""
+        if not isinstance(item, dict):
+            return None
+        if tag == "PubmedArticle":
+            citation = item.get("MedlineCitation", {})
+        elif tag == "PubmedBookArticle":
+            citation = item.get("BookDocument", {})
+        else:
+            return None
+        pmid = citation.get("PMID", "")
+        uid = pmid.get("#text", "") if isinstance(pmid, dict) else str(pmid)
+        return self._parse_article(uid, {"PubmedArticleSet": {tag: item}})
 
     def _parse_article(self, uid: str, text_dict: dict) -> dict:
         try:
@@ -0,0 +1,198 @@
+"""
+Benchmark end-to-end PubMed.load time for several top_k_results values: the
+previous loader (one efetch per UID, with backoff that doubles a shared sleep
+time) against the batched, stream-parsed loader in ActionGroups/pubmed-lambda-function,
+which sends its requests through the shared, rate-limited ncbi_client.
+
+By default both run against a local simulated E-utilities server that adds a
+fixed latency per request and answers HTTP 429 above NCBI's rate limit of 3
+requests per second, so the results are repeatable and NCBI is not loaded.
+Run from the cancer_biomarker_discovery directory, with ncbi_client installed
+(pip install ../../agents_catalog/shared/ncbi-client):
+
+    python benchmarks/benchmark_pubmed.py
+    python benchmarks/benchmark_pubmed.py --live --query "EGFR lung cancer"
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(
+    0, str(Path(__file__).resolve().parent.parent / "ActionGroups" / "pubmed-lambda-function")
+)
+
+import xmltodict  # noqa: E402
+from ncbi_client import EutilsClient  # noqa: E402
+from PubMed import PubMed  # noqa: E402
+
+
+class LegacyPubMed(PubMed):
+    """The previous loader: one efetch per UID and a shared, doubling sleep time"""
+
+    base_url_esearch = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi?"
+    base_url_efetch = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi?"
+    max_retry = 5
+    sleep_time = 0.2
+
+    def lazy_load(self, query):
+        url = (
+            self.base_url_esearch
+            + "db=pubmed&term="
+            + urllib.parse.quote(query)
+            + f"&retmode=json&retmax={self.top_k_results}&usehistory=y"
+        )
+        json_text = json.loads(urllib.request.urlopen(url).read().decode("utf-8"))
+        webenv = json_text["esearchresult"]["webenv"]
+        for uid in json_text["esearchresult"]["idlist"]:
+            yield self.retrieve_article(uid, webenv)
+
+    def retrieve_article(self, uid, webenv):
+        url = self.base_url_efetch + "db=pubmed&retmode=xml&id=" + uid + "&webenv=" + webenv
+        retry = 0
+        while True:
+            try:
+                result = urllib.request.urlopen(url)
+                break
+            except urllib.error.HTTPError as e:
+                if e.code == 429 and retry < self.max_retry:
+                    time.sleep(self.sleep_time)
+                    self.sleep_time *= 2
+                    retry += 1
+                else:
+                    raise e
+        return self._parse_article(uid, xmltodict.parse(result.read().decode("utf-8")))
+
+
+def article_xml(uid):
+    abstract = " ".join(["Background text about the biomarker and its outcome."] * 30)
+    return (
+        "<PubmedArticle><MedlineCitation><PMID Version='1'>"
+        f"{uid}</PMID><Article><ArticleTitle>Article {uid}</ArticleTitle><Abstract>"
+        f"<AbstractText Label='BACKGROUND'>{abstract}</AbstractText>"
+        f"<AbstractText Label='RESULTS'>{abstract}</AbstractText></Abstract>"
+        "<ArticleDate><Year>2024</Year><Month>01</Month><Day>02</Day></ArticleDate>"
+        "</Article></MedlineCitation></PubmedArticle>"
+    )
+
+
+class SimulatedEutils(BaseHTTPRequestHandler):
+    latency = 0.15
+    rate = 3.0
+    _lock = threading.Lock()
+    _allowance = 3.0
+    _updated = time.monotonic()
+
+    def log_message(self, *args):
+        pass
+
+    def _admit(self):
+        cls = SimulatedEutils
+        with cls._lock:
+            now = time.monotonic()
+            cls._allowance = min(cls.rate, cls._allowance + (now - cls._updated) * cls.rate)
+            cls._updated = now
+            if cls._allowance < 1:
+                return False
+            cls._allowance -= 1
+            return True
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        self._respond(url.path, urllib.parse.parse_qs(url.query))
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+        self._respond(urllib.parse.urlparse(self.path).path, urllib.parse.parse_qs(body))
+
+    def _respond(self, path, query):
+        params = {k: v[0] for k, v in query.items()}
+        if not self._admit():
+            self.send_response(429)
+            self.end_headers()
+            return
+        time.sleep(self.latency)
+        if path.endswith("esearch.fcgi"):
+            retmax = int(params.get("retmax", 20))
+            ids = [str(30_000_000 + i) for i in range(retmax)]
+            body = json.dumps(
+                {"esearchresult": {"count": str(retmax), "webenv": "MCID_1", "idlist": ids}}
+            ).encode()
+            content_type = "application/json"
+        else:
+            ids = params["id"].split(",")
+            body = (
+                "<?xml version='1.0'?><PubmedArticleSet>"
+                + "".join(article_xml(uid) for uid in ids)
+                + "</PubmedArticleSet>"
+            ).encode()
+            content_type = "text/xml"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def timed_load(loader_cls, base_url, query, top_k, timeout):
+    """Seconds to load top_k articles, or None if the load did not finish within timeout"""
+    loader = loader_cls()
+    loader.top_k_results = top_k
+    # A fresh client without a response cache, so every size really hits the server
+    loader.client = EutilsClient(base_url=base_url) if base_url else EutilsClient()
+    if base_url:
+        loader.base_url_esearch = f"{base_url}/esearch.fcgi?"
+        loader.base_url_efetch = f"{base_url}/efetch.fcgi?"
+    docs = []
+
+    def load():
+        docs.extend(loader.lazy_load(query))
+
+    # The legacy backoff can grow without bound, so load on a daemon thread
+    thread = threading.Thread(target=load, daemon=True)
+    start = time.perf_counter()
+    thread.start()
+    thread.join(timeout)
+    seconds = time.perf_counter() - start
+    return (None if thread.is_alive() else seconds), len(docs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PubMed.load")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--query", default="breast cancer biomarker")
+    parser.add_argument("--live", action="store_true", help="Query NCBI instead")
+    parser.add_argument("--latency", type=float, default=0.15)
+    parser.add_argument(
+        "--timeout", type=float, default=120.0, help="Give up on a load after this long"
+    )
+    args = parser.parse_args()
+
+    base_url = None
+    if not args.live:
+        SimulatedEutils.latency = args.latency
+        server = ThreadingHTTPServer(("127.0.0.1", 0), SimulatedEutils)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    print(f"{'top_k':>6} {'loader':>8} {'articles':>9} {'seconds':>9}")
+    for top_k in args.sizes:
+        for name, loader_cls in (("legacy", LegacyPubMed), ("batched", PubMed)):
+            # Let the rate limit recover between runs
+            time.sleep(1.0)
+            seconds, count = timed_load(
+                loader_cls, base_url, args.query, top_k, args.timeout
+            )
+            elapsed = f"{seconds:9.2f}" if seconds is not None else f">{args.timeout:8.0f}"
+            print(f"{top_k:>6} {name:>8} {count:>9} {elapsed}")
+
+
+if __name__ == "__main__":
+    main()